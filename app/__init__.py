@@ -1,32 +1,59 @@
 # app/__init__.py
 import os
+import threading
 from datetime import timedelta
-from flask import Flask, request, redirect, render_template, session, url_for
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, current_user
-from flask_migrate import Migrate
-from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask_wtf.csrf import CSRFProtect
-from flask_session import Session
-from flask_caching import Cache
-from authlib.integrations.flask_client import OAuth
-
-db = SQLAlchemy()
-login_manager = LoginManager()
-migrate = Migrate()
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=[],
-    storage_uri=os.environ.get('RATELIMIT_STORAGE_URI', os.environ.get('REDIS_URL', 'redis://localhost:6379/0')),
-)
-csrf = CSRFProtect()
-sess = Session()
-cache = Cache()
-oauth = OAuth()
+
+# Extensões criadas no primeiro acesso (``from app import db``): o bot importa
+# app.models/app.utils sem carregar o Flask (ver app/models/base.py)
+_EXTENSIONS = ('db', 'login_manager', 'migrate', 'limiter', 'csrf', 'sess', 'cache', 'oauth')
+_extensions_lock = threading.Lock()
+
+
+def _create_extensions():
+    with _extensions_lock:
+        if 'db' in globals():
+            return
+        from flask_sqlalchemy import SQLAlchemy
+        from flask_login import LoginManager
+        from flask_migrate import Migrate
+        from flask_limiter import Limiter
+        from flask_limiter.util import get_remote_address
+        from flask_wtf.csrf import CSRFProtect
+        from flask_session import Session
+        from flask_caching import Cache
+        from authlib.integrations.flask_client import OAuth
+        from app.models.base import Model
+        from app.utils.read_replica import RoutingSession
+
+        globals().update(
+            db=SQLAlchemy(metadata=Model.metadata, session_options={'class_': RoutingSession}),
+            login_manager=LoginManager(),
+            migrate=Migrate(),
+            limiter=Limiter(
+                key_func=get_remote_address,
+                default_limits=[],
+                storage_uri=os.environ.get('RATELIMIT_STORAGE_URI', os.environ.get('REDIS_URL', 'redis://localhost:6379/0')),
+            ),
+            csrf=CSRFProtect(),
+            sess=Session(),
+            cache=Cache(),
+            oauth=OAuth(),
+        )
+
+
+def __getattr__(name):
+    if name in _EXTENSIONS:
+        _create_extensions()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 def create_app():
+    from flask import Flask, request, redirect, render_template, session, url_for
+    from flask_cors import CORS
+    from flask_login import current_user
+    from app import db, login_manager, migrate, limiter, csrf, sess, cache, oauth
+
     app = Flask(__name__)
 
     # Fix 4: Load environment-based config (development/production/testing)
@@ -45,9 +72,26 @@ def create_app():
     limiter.init_app(app)
     csrf.init_app(app)
     sess.init_app(app)
+    # Sessão deslizante sem regravar no Redis a cada request
+    from app.utils.session_refresh import init_session_refresh
+    init_session_refresh(app)
     cache.init_app(app)
     oauth.init_app(app)
 
+    # Queries por request (log de lentos/N+1) e métricas Prometheus (/metrics)
+    from app.utils import metrics, sql_profiler, tracing
+    sql_profiler.init_app(app)
+    metrics.init_app(app)
+    # Spans por request/query/chamada externa (TRACE_FILE / OTEL_EXPORTER_OTLP_ENDPOINT)
+    tracing.init_app(app)
+    # Relatórios na réplica de leitura (DATABASE_REPLICA_URL)
+    from app.utils import read_replica
+    read_replica.init_app(app)
+
+    # APIs externas em outro servidor (testes de carga): STRIPE_API_BASE / TELEGRAM_API_BASE
+    from app.services.stripe_service import configure_api_base
+    configure_api_base()
+
     # Registrar Google OAuth provider
     oauth.register(
         name='google',
@@ -62,12 +106,12 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor, faça login para acessar esta página.'
 
-    # Importar modelos e configurar user_loader
-    from app.models.user import Creator
+    # Configurar user_loader (snapshot em cache, sem consulta por requisição)
+    from app.utils.identity import get_creator_snapshot
 
     @login_manager.user_loader
     def load_user(user_id):
-        return Creator.query.get(int(user_id))
+        return get_creator_snapshot(user_id)
 
     # Registrar blueprints
     from app.routes import auth, dashboard, groups, admin, webhooks, api, public
@@ -86,8 +130,7 @@ def create_app():
     @app.context_processor
     def inject_admin_viewing():
         if current_user.is_authenticated and current_user.is_admin and session.get('admin_viewing_id'):
-            from app.models.user import Creator as _Creator
-            creator = _Creator.query.get(session['admin_viewing_id'])
+            creator = get_creator_snapshot(session['admin_viewing_id'])
             return {'admin_viewing': creator, 'is_admin_viewing': True}
         return {'admin_viewing': None, 'is_admin_viewing': False}
 
@@ -113,10 +156,21 @@ def create_app():
     os.makedirs(os.path.join(app.static_folder, 'uploads', 'avatars'), exist_ok=True)
     os.makedirs(os.path.join(app.static_folder, 'uploads', 'covers'), exist_ok=True)
 
-    # Renovar sessão a cada request (timeout por inatividade, não absoluto)
-    @app.before_request
-    def refresh_session():
-        session.permanent = True
+    # Imagens enviadas: <picture> responsivo e cache longo em /static/uploads
+    from app.services import media_service
+    media_service.init_app(app)
+
+    # flask archive: assinaturas/transações frias para as tabelas de arquivo
+    from app.services import archive_service
+    archive_service.init_app(app)
+
+    # flask partitions: próximas partições mensais de transactions (PostgreSQL)
+    from app.utils import partitioning
+    partitioning.init_app(app)
+
+    # Estáticos com hash no nome + .gz/.br (flask build-assets)
+    from app.utils import static_assets
+    static_assets.init_app(app)
 
     # Bloquear acesso de criadores bloqueados ao dashboard/groups
     @app.before_request
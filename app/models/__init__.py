@@ -6,6 +6,8 @@ from .group import Group, PricingPlan
 from .subscription import Subscription, Transaction
 from .leak_incident import LeakIncident
 from .report import Report
+from .notification import NotificationOutbox
+from .archive import SubscriptionArchive, TransactionArchive
 
 # Tentar importar Withdrawal se existir
 try:
@@ -16,4 +18,5 @@ except ImportError:
         pass
 
 # Exportar todos os modelos
-__all__ = ['Creator', 'Group', 'PricingPlan', 'Subscription', 'Transaction', 'LeakIncident', 'Withdrawal', 'Report']
\ No newline at end of file
+__all__ = ['Creator', 'Group', 'PricingPlan', 'Subscription', 'Transaction', 'LeakIncident', 'Withdrawal', 'Report', 'NotificationOutbox',
+           'SubscriptionArchive', 'TransactionArchive']
\ No newline at end of file
@@ -0,0 +1,107 @@
+# app/models/archive.py
+from app.models.base import db
+
+
+class SubscriptionArchive(db.Model):
+    """Assinaturas frias movidas de ``subscriptions`` (ver app/services/archive_service.py).
+
+    Mesmas colunas (e ids) da tabela quente, sem chaves estrangeiras: a linha
+    é só histórico e não bloqueia exclusões de grupos/planos. Os
+    relacionamentos (só leitura) têm os mesmos nomes dos de ``Subscription``,
+    então as telas de histórico tratam as duas do mesmo jeito.
+    """
+    is_archived = True
+
+    __tablename__ = 'subscriptions_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    group_id = db.Column(db.Integer, nullable=False)
+    plan_id = db.Column(db.Integer, nullable=False)
+    telegram_user_id = db.Column(db.String(50), nullable=False)
+    telegram_username = db.Column(db.String(100))
+    stripe_subscription_id = db.Column(db.String(100))
+    stripe_customer_id = db.Column(db.String(100))
+    start_date = db.Column(db.DateTime)
+    end_date = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20))
+    cancel_at_period_end = db.Column(db.Boolean)
+    payment_method_type = db.Column(db.String(20))
+    auto_renew = db.Column(db.Boolean)
+    is_legacy = db.Column(db.Boolean)
+    last_reminder_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_subscriptions_archive_group_id', 'group_id'),
+    )
+
+    group = db.relationship('Group', primaryjoin='foreign(SubscriptionArchive.group_id) == Group.id',
+                            viewonly=True)
+    plan = db.relationship('PricingPlan', primaryjoin='foreign(SubscriptionArchive.plan_id) == PricingPlan.id',
+                           viewonly=True)
+    transactions = db.relationship(
+        'TransactionArchive',
+        primaryjoin='foreign(TransactionArchive.subscription_id) == SubscriptionArchive.id',
+        viewonly=True,
+    )
+
+    def __repr__(self):
+        return f'<SubscriptionArchive {self.telegram_username} - {self.status}>'
+
+
+class TransactionArchive(db.Model):
+    """Transações frias movidas de ``transactions``.
+
+    ``group_id`` vem da assinatura no momento do arquivamento: os totais de
+    receita do criador/grupo somam o arquivo sem depender de onde a
+    assinatura está (quente ou arquivada). ``subscription`` resolve para a
+    que existir.
+    """
+    is_archived = True
+
+    __tablename__ = 'transactions_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    subscription_id = db.Column(db.Integer, nullable=False)
+    group_id = db.Column(db.Integer, nullable=False)
+
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    fee = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    net_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    fixed_fee = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    percentage_fee = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    total_fee = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    pix_transaction_id = db.Column(db.String(100))
+
+    status = db.Column(db.String(20))
+    payment_method = db.Column(db.String(20))
+    stripe_payment_intent_id = db.Column(db.String(100))
+    stripe_session_id = db.Column(db.String(200))
+    stripe_invoice_id = db.Column(db.String(100))
+    billing_reason = db.Column(db.String(50))
+
+    created_at = db.Column(db.DateTime)
+    paid_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_transactions_archive_group_status', 'group_id', 'status'),
+        db.Index('ix_transactions_archive_subscription_id', 'subscription_id'),
+    )
+
+    hot_subscription = db.relationship(
+        'Subscription', primaryjoin='foreign(TransactionArchive.subscription_id) == Subscription.id',
+        viewonly=True,
+    )
+    archived_subscription = db.relationship(
+        'SubscriptionArchive', primaryjoin='foreign(TransactionArchive.subscription_id) == SubscriptionArchive.id',
+        viewonly=True,
+    )
+
+    @property
+    def subscription(self):
+        return self.hot_subscription or self.archived_subscription
+
+    def __repr__(self):
+        return f'<TransactionArchive R${self.amount} - {self.status}>'
@@ -0,0 +1,81 @@
+# app/models/base.py
+"""
+Base declarativa dos modelos, sem Flask.
+
+Os modelos são mapeados com SQLAlchemy puro, então o bot importa
+``app.models`` sem carregar Flask, Flask-SQLAlchemy e as demais extensões
+(ver ``bot/utils/startup.py``). ``db`` aqui só expõe o que os modelos usam
+(``db.Column``, ``db.String``, ``db.relationship``...); ``Model.query`` e
+``db.session`` resolvem para o Flask-SQLAlchemy de ``app`` no primeiro acesso,
+então continuam exigindo contexto de aplicação, como antes.
+"""
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+
+class _QueryProperty:
+    """``Model.query`` do Flask-SQLAlchemy, resolvido só quando usado"""
+
+    def __get__(self, obj, cls):
+        from app import db as flask_db
+        return flask_db.Query(cls, session=flask_db.session())
+
+
+class Model(orm.DeclarativeBase):
+    """Base de todos os modelos (metadata única, usada também pelo Flask-SQLAlchemy)"""
+    metadata = sa.MetaData()
+
+    query = _QueryProperty()
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {sa.inspect(self).identity}>'
+
+
+class UserMixin:
+    """Mesma interface do ``flask_login.UserMixin``, sem importar o Flask"""
+
+    __hash__ = object.__hash__
+
+    @property
+    def is_active(self):
+        return True
+
+    @property
+    def is_authenticated(self):
+        return self.is_active
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, UserMixin):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return NotImplemented
+        return not equal
+
+
+class _Namespace:
+    """``db`` dos modelos: tipos/colunas do SQLAlchemy e ``Model``"""
+
+    Model = Model
+
+    def __getattr__(self, name):
+        if name == 'session':
+            from app import db as flask_db
+            return flask_db.session
+        for module in (sa, orm):
+            if hasattr(module, name):
+                return getattr(module, name)
+        raise AttributeError(name)
+
+
+db = _Namespace()
@@ -1,6 +1,6 @@
 import json
 import secrets
-from app import db
+from app.models.base import db
 from datetime import datetime
 
 class Group(db.Model):
@@ -26,6 +26,8 @@ class Group(db.Model):
     # Tipo de chat: 'group' (grupo/supergrupo) ou 'channel' (canal)
     chat_type = db.Column(db.String(20), default='group')
     cover_image_url = db.Column(db.String(500))
+    # Manifesto das variantes responsivas (app/services/media_service.py)
+    cover_variants_json = db.Column(db.Text)
     is_public = db.Column(db.Boolean, default=False)
     anti_leak_enabled = db.Column(db.Boolean, default=False)
     # Taxas personalizadas por grupo (sobrescreve taxa do criador e faixa escalonada)
@@ -0,0 +1,75 @@
+# app/models/notification.py
+import json
+from app.models.base import db
+from app.utils import tracing
+from datetime import datetime
+
+
+class NotificationOutbox(db.Model):
+    """Outbox transacional de mensagens do Telegram.
+
+    O Flask grava aqui (na mesma transação da mudança de estado) em vez de
+    chamar a Bot API; o bot drena a tabela em lotes respeitando rate limits.
+    """
+    __tablename__ = 'notification_outbox'
+
+    # Tipos de item
+    KIND_MESSAGE = 'message'                    # sendMessage simples
+    KIND_ACCESS_LINK = 'access_link'            # cria link de uso único e envia
+    KIND_KICK = 'kick'                          # remove usuário do grupo (ban + unban)
+    KIND_PLAN_SUBSCRIBERS = 'plan_subscribers'  # expande para os assinantes ativos de um plano
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    chat_id = db.Column(db.String(50))  # Destino: usuário ou grupo
+    payload_json = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.String(500))
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)  # Próxima tentativa
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_available', 'status', 'available_at'),
+    )
+
+    def __repr__(self):
+        return f'<NotificationOutbox {self.id} {self.kind} {self.status}>'
+
+    def get_payload(self):
+        """Retorna o payload como dict"""
+        try:
+            return json.loads(self.payload_json or '{}')
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+    @classmethod
+    def enqueue(cls, kind, chat_id, payload=None, session=None):
+        """Adicionar item à sessão atual (sem commit — entra na transação do chamador)
+
+        Com tracing ativo o payload leva o ``traceparent``: a entrega no bot
+        continua o trace de quem enfileirou.
+        """
+        payload = dict(payload or {})
+        traceparent = tracing.current_traceparent()
+        if traceparent:
+            payload.setdefault('traceparent', traceparent)
+        item = cls(
+            kind=kind,
+            chat_id=str(chat_id) if chat_id is not None else None,
+            payload_json=json.dumps(payload, ensure_ascii=False),
+            status='pending',
+            attempts=0,
+            available_at=datetime.utcnow(),
+        )
+        (session or db.session).add(item)
+        return item
+
+    @classmethod
+    def enqueue_message(cls, chat_id, text, keyboard=None, session=None):
+        """Mensagem HTML com teclado inline opcional"""
+        payload = {'text': text}
+        if keyboard:
+            payload['reply_markup'] = keyboard
+        return cls.enqueue(cls.KIND_MESSAGE, chat_id, payload, session=session)
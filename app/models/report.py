@@ -1,5 +1,5 @@
 # app/models/report.py
-from app import db
+from app.models.base import db
 from datetime import datetime
 
 
@@ -1,5 +1,5 @@
 # app/models/subscription.py
-from app import db
+from app.models.base import db
 from datetime import datetime
 
 # Importar PaymentService apenas quando necessário para evitar importação circular
@@ -7,6 +7,7 @@ from datetime import datetime
 
 class Subscription(db.Model):
     __tablename__ = 'subscriptions'
+    is_archived = False  # Linhas arquivadas: app/models/archive.py
     
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
@@ -28,6 +29,11 @@ class Subscription(db.Model):
     # Relacionamentos
     plan = db.relationship('PricingPlan', backref='subscriptions')
     transactions = db.relationship('Transaction', backref='subscription', lazy='dynamic')
+
+    __table_args__ = (
+        # Listagem de assinantes paginada por cursor em (end_date, id)
+        db.Index('ix_subscriptions_group_end_date_id', 'group_id', 'end_date', 'id'),
+    )
     
     def __repr__(self):
         return f'<Subscription {self.telegram_username} - {self.status}>'
@@ -35,6 +41,7 @@ class Subscription(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    is_archived = False  # Linhas arquivadas: app/models/archive.py
     
     id = db.Column(db.Integer, primary_key=True)
     subscription_id = db.Column(db.Integer, db.ForeignKey('subscriptions.id'), nullable=False)
@@ -58,9 +65,15 @@ class Transaction(db.Model):
     stripe_invoice_id = db.Column(db.String(100))
     billing_reason = db.Column(db.String(50))  # 'subscription_create', 'subscription_cycle'
     
-    # Timestamps
+    # Timestamps (created_at é a chave das partições mensais no PostgreSQL,
+    # ver app/utils/partitioning.py)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     paid_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Listagem de transações paginada por cursor em (created_at, id)
+        db.Index('ix_transactions_created_at_id', 'created_at', 'id'),
+    )
     
     def __init__(self, **kwargs):
         """Inicializa transação calculando taxas automaticamente"""
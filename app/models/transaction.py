@@ -1,5 +1,5 @@
 # app/models/transaction.py
-from app import db
+from app.models.base import db
 from datetime import datetime
 
 class Transaction(db.Model):
@@ -1,7 +1,5 @@
 # app/models/user.py
-from app import db
-from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.models.base import UserMixin, db
 from datetime import datetime
 
 class Creator(UserMixin, db.Model):
@@ -18,6 +16,8 @@ class Creator(UserMixin, db.Model):
     phone = db.Column(db.String(20))
     bio = db.Column(db.Text)
     avatar_url = db.Column(db.String(500))
+    # Manifesto das variantes responsivas (app/services/media_service.py)
+    avatar_variants_json = db.Column(db.Text)
 
     # Campos financeiros
     balance = db.Column(db.Numeric(10, 2), default=0)
@@ -78,15 +78,17 @@ class Creator(UserMixin, db.Model):
 
     def set_password(self, password):
         """Define a senha do usuário"""
+        from werkzeug.security import generate_password_hash
         self.password_hash = generate_password_hash(password)
     
     def check_password(self, password):
         """Verifica a senha do usuário"""
         if not self.password_hash:
             return False
+        from werkzeug.security import check_password_hash
         return check_password_hash(self.password_hash, password)
     
-    def get_fee_rates(self, group_id=None):
+    def get_fee_rates(self, group_id=None, active_subscribers=None):
         """Retorna taxas efetivas. Prioridade:
         1. Taxa custom do grupo (mais específica)
         2. Taxa custom do criador (aplica a todos os grupos)
@@ -95,6 +97,7 @@ class Creator(UserMixin, db.Model):
 
         Args:
             group_id: ID do grupo para calcular faixa. Se None, usa taxa do criador ou padrão.
+            active_subscribers: assinantes ativos do grupo, se já conhecidos (evita a contagem).
         """
         from app.services.payment_service import PaymentService
 
@@ -134,10 +137,12 @@ class Creator(UserMixin, db.Model):
         # 4. Faixa escalonada por assinantes DO GRUPO ESPECÍFICO
         from app.models.subscription import Subscription
         from sqlalchemy import func
-        subscriber_count = db.session.query(func.count(Subscription.id)).filter(
-            Subscription.group_id == group_id,
-            Subscription.status == 'active'
-        ).scalar() or 0
+        subscriber_count = active_subscribers
+        if subscriber_count is None:
+            subscriber_count = db.session.query(func.count(Subscription.id)).filter(
+                Subscription.group_id == group_id,
+                Subscription.status == 'active'
+            ).scalar() or 0
 
         tiered_pct = PaymentService.get_tiered_percentage(subscriber_count)
 
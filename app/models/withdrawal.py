@@ -1,5 +1,5 @@
 # app/models/withdrawal.py
-from app import db
+from app.models.base import db
 from datetime import datetime
 
 class Withdrawal(db.Model):
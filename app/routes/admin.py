@@ -1,12 +1,16 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify, current_app
 from flask_login import login_required, current_user
-from app import db, limiter
-from app.models import Creator, Group, Subscription, Transaction
+from app import db, limiter, cache
+from app.models import Creator, Group, PricingPlan, Subscription, Transaction
+from app.services import telegram_service
 from app.services.payment_service import PaymentService
 from app.utils.decorators import admin_required
+from app.utils import metrics
+from app.utils.read_replica import use_replica
 from datetime import datetime, timedelta
 from decimal import Decimal
-from sqlalchemy import func
+from sqlalchemy import case, func
+from sqlalchemy.orm import contains_eager
 import requests as http_requests
 import os
 import logging
@@ -26,6 +30,7 @@ bp = Blueprint('admin', __name__, url_prefix='/admin')
 @bp.route('/')
 @login_required
 @admin_required
+@use_replica
 def index():
     """Painel administrativo principal"""
     # Estatísticas gerais
@@ -113,6 +118,20 @@ def index():
                          total_paid=total_paid,
                          creators=creators)
 
+@bp.route('/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    """Hit ratio do cache (L1 local + Redis) e gravações de sessão neste worker"""
+    backend = cache.cache
+    data = {'backend': type(backend).__name__, 'pid': os.getpid()}
+    if hasattr(backend, 'stats'):
+        data.update(backend.stats())
+    if hasattr(current_app.session_interface, 'stats'):
+        data['session'] = current_app.session_interface.stats()
+    return jsonify(data)
+
+
 @bp.route('/withdrawal/<int:id>/process', methods=['POST'])
 @login_required
 @admin_required
@@ -181,6 +200,7 @@ def view_creator_dashboard(creator_id):
 @bp.route('/creator/<int:creator_id>/details')
 @login_required
 @admin_required
+@use_replica
 def creator_details(creator_id):
     """Ver detalhes completos de um criador"""
     creator = Creator.query.get_or_404(creator_id)
@@ -197,13 +217,29 @@ def creator_details(creator_id):
         'pending_withdrawal': 0
     }
     
-    # Calcular estatísticas
-    for group in groups:
-        stats['total_subscribers'] += Subscription.query.filter_by(group_id=group.id).count()
-        stats['active_subscribers'] += Subscription.query.filter_by(
-            group_id=group.id,
-            status='active'
-        ).count()
+    # Calcular estatísticas (uma query agrupada para todos os grupos)
+    group_ids = [group.id for group in groups]
+    active_by_group = {}
+    if group_ids:
+        rows = db.session.query(
+            Subscription.group_id,
+            func.count(Subscription.id),
+            func.sum(case((Subscription.status == 'active', 1), else_=0))
+        ).filter(
+            Subscription.group_id.in_(group_ids)
+        ).group_by(Subscription.group_id).all()
+        for group_id, total, active in rows:
+            stats['total_subscribers'] += total
+            stats['active_subscribers'] += active or 0
+            active_by_group[group_id] = active or 0
+        plan_counts = dict(db.session.query(
+            PricingPlan.group_id, func.count(PricingPlan.id)
+        ).filter(
+            PricingPlan.group_id.in_(group_ids)
+        ).group_by(PricingPlan.group_id).all())
+        for group in groups:
+            group.active_subscribers = active_by_group.get(group.id, 0)
+            group.plan_count = plan_counts.get(group.id, 0)
     
     # Receita e saldo usando calculate_balance
     from app.routes.dashboard import calculate_balance
@@ -239,6 +275,8 @@ def creator_details(creator_id):
         Subscription
     ).join(Group).filter(
         Group.creator_id == creator_id
+    ).options(
+        contains_eager(Transaction.subscription).contains_eager(Subscription.group)
     ).order_by(Transaction.created_at.desc()).limit(10).all()
     
     fee_defaults = {
@@ -251,7 +289,8 @@ def creator_details(creator_id):
     # Fee rates por grupo (para tabela de faixas)
     group_fee_rates = {}
     for group in groups:
-        group_fee_rates[group.id] = creator.get_fee_rates(group_id=group.id)
+        group_fee_rates[group.id] = creator.get_fee_rates(
+            group_id=group.id, active_subscribers=active_by_group.get(group.id, 0))
 
     return render_template('admin/creator_details.html',
                          creator=creator,
@@ -413,13 +452,14 @@ def investigate_creator(creator_id):
         # Safety net: unban investigator in case they were previously removed
         try:
             http_requests.post(
-                f'https://api.telegram.org/bot{bot_token}/unbanChatMember',
+                telegram_service.api_url(bot_token, 'unbanChatMember'),
                 json={
                     'chat_id': group.telegram_id,
                     'user_id': int(investigator_user_id),
                     'only_if_banned': True
                 },
-                timeout=10
+                timeout=10,
+                hooks=metrics.TELEGRAM_HOOKS,
             )
         except Exception as e:
             logger.warning(f'unbanChatMember failed for group {group.telegram_id}: {e}')
@@ -427,13 +467,14 @@ def investigate_creator(creator_id):
         # Generate single-use invite link (expires in 7 days, no name for anonymity)
         try:
             response = http_requests.post(
-                f'https://api.telegram.org/bot{bot_token}/createChatInviteLink',
+                telegram_service.api_url(bot_token, 'createChatInviteLink'),
                 json={
                     'chat_id': group.telegram_id,
                     'member_limit': 1,
                     'expire_date': int((datetime.utcnow() + timedelta(days=7)).timestamp())
                 },
-                timeout=10
+                timeout=10,
+                hooks=metrics.TELEGRAM_HOOKS,
             )
             data = response.json()
 
@@ -1,9 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, session, abort
 from flask_login import login_user, logout_user, current_user, login_required
 from app import db, limiter, oauth
 from app.models import Creator, Report
 from app.utils.email import send_password_reset_email, send_welcome_email, send_confirmation_email
 from app.utils.security import generate_reset_token, verify_reset_token, generate_confirmation_token, verify_confirmation_token, is_safe_url
+from app.services.sitemap_service import INDEX_FILE, serve_sitemap_file, shard_name
 import re
 import logging
 import secrets
@@ -403,68 +404,17 @@ def logout():
 
 @bp.route('/sitemap.xml')
 def sitemap():
-    """Sitemap XML dinâmico — páginas estáticas + criadores + grupos públicos"""
-    from app.models import Group
-    from sqlalchemy import or_
-
-    base = 'https://televip.app'
-
-    # Páginas estáticas
-    static_pages = [
-        ('/', 'daily', '1.0'),
-        ('/recursos', 'weekly', '0.8'),
-        ('/precos', 'weekly', '0.8'),
-        ('/como-funciona', 'weekly', '0.7'),
-        ('/termos', 'monthly', '0.3'),
-        ('/privacidade', 'monthly', '0.3'),
-        ('/denuncia', 'monthly', '0.3'),
-    ]
-
-    xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-
-    for path, freq, priority in static_pages:
-        xml += (
-            f'  <url>\n'
-            f'    <loc>{base}{path}</loc>\n'
-            f'    <changefreq>{freq}</changefreq>\n'
-            f'    <priority>{priority}</priority>\n'
-            f'  </url>\n'
-        )
+    """Sitemap (urlset ou índice) pré-gerado — não consulta o banco"""
+    return serve_sitemap_file(INDEX_FILE)
 
-    # Páginas públicas de criadores ativos
-    creators = Creator.query.filter(
-        Creator.is_active == True,
-        or_(Creator.is_blocked == False, Creator.is_blocked.is_(None)),
-        Creator.username.isnot(None)
-    ).all()
-
-    for creator in creators:
-        xml += (
-            f'  <url>\n'
-            f'    <loc>{base}/c/{creator.username}</loc>\n'
-            f'    <changefreq>weekly</changefreq>\n'
-            f'    <priority>0.6</priority>\n'
-            f'  </url>\n'
-        )
 
-        # Grupos públicos deste criador
-        public_groups = Group.query.filter_by(
-            creator_id=creator.id, is_public=True, is_active=True
-        ).all()
-
-        for group in public_groups:
-            if group.invite_slug:
-                xml += (
-                    f'  <url>\n'
-                    f'    <loc>{base}/c/{creator.username}/{group.invite_slug}</loc>\n'
-                    f'    <changefreq>weekly</changefreq>\n'
-                    f'    <priority>0.5</priority>\n'
-                    f'  </url>\n'
-                )
-
-    xml += '</urlset>\n'
-    return Response(xml, content_type='application/xml')
+@bp.route('/sitemap-<int:number>.xml.gz')
+def sitemap_shard(number):
+    """Parte N do sitemap quando há mais de 50 mil URLs"""
+    response = serve_sitemap_file(shard_name(number), gzip_file=True)
+    if response is None:
+        abort(404)
+    return response
 
 
 @bp.route('/robots.txt')
@@ -1,19 +1,22 @@
 # app/routes/dashboard.py
+import hashlib
+import json
 import logging
-import os
-import time
 from flask import Blueprint, render_template, jsonify, request, redirect, url_for, flash, session, current_app
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
 from app import db, limiter, cache
-from app.models import Group, Transaction, Subscription, Creator, PricingPlan
+from app.models import Group, Transaction, TransactionArchive, Subscription, Creator, PricingPlan
 from app.services.payment_service import PaymentService
+from app.services import archive_service, export_service
 from app.utils.security import generate_reset_token
 from app.utils.email import send_password_reset_email
 from app.utils.admin_helpers import get_effective_creator, is_admin_viewing
+from app.utils.pagination import keyset_paginate_union, cached_count
+from app.utils.read_replica import use_replica
 
 logger = logging.getLogger(__name__)
 from sqlalchemy import func, and_, or_, desc
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -82,6 +85,13 @@ def calculate_balance(creator_id):
                 'status': 'blocked'
             })
     
+    # Transações arquivadas (app/services/archive_service.py): só os totais
+    archived = archive_service.archived_balance(creator_id, available_date)
+    total_received += archived['total_received']
+    total_fees += archived['total_fees']
+    available_balance += archived['available_balance']
+    blocked_balance += archived['blocked_balance']
+
     # Organizar transações bloqueadas por dias restantes
     blocked_by_days = {}
     for bt in blocked_transactions:
@@ -102,7 +112,7 @@ def calculate_balance(creator_id):
         'available_balance': available_balance,
         'blocked_balance': blocked_balance,
         'total_balance': available_balance + blocked_balance,
-        'transaction_count': len(transactions),
+        'transaction_count': len(transactions) + archived['transaction_count'],
         'available_transactions': available_transactions,
         'blocked_transactions': blocked_transactions,
         'blocked_by_days': blocked_by_days
@@ -111,56 +121,71 @@ def calculate_balance(creator_id):
 @bp.route('/')
 @login_required
 def index():
-    """Dashboard principal do criador"""
+    """Dashboard principal do criador (casca; números vêm de /dashboard/api/*)"""
     effective = get_effective_creator()
 
-    # Calcular saldo com as taxas corretas
-    balance_info = calculate_balance(effective.id)
-
-    # Buscar grupos do criador
-    groups = Group.query.filter_by(creator_id=effective.id).all()
-
-    # Calcular estatísticas
-    total_groups = len(groups)
-    active_groups = 0
-    total_subscribers = 0
-
-    for group in groups:
-        # Receita do grupo (valor bruto)
-        group_revenue = db.session.query(func.sum(Transaction.amount)).join(
-            Subscription
-        ).filter(
-            Subscription.group_id == group.id,
-            Transaction.status == 'completed'
-        ).scalar() or 0
+    # Só os 5 primeiros grupos (links); métricas, gráfico e KPIs chegam via JSON
+    groups = Group.query.filter_by(creator_id=effective.id).order_by(Group.id).limit(5).all()
 
-        group.total_revenue = float(group_revenue)
+    return render_template('dashboard/index.html',
+        effective=effective,
+        groups=groups
+    )
 
-        # Assinantes ativos
-        active_subs = Subscription.query.filter_by(
-            group_id=group.id,
-            status='active'
-        ).count()
 
-        group.total_subscribers = active_subs
-        total_subscribers += active_subs
+def _dashboard_json(name, build):
+    """JSON do dashboard em cache por criador (TTL curto), com ETag/304"""
+    effective = get_effective_creator()
+    ttl = current_app.config.get('DASHBOARD_JSON_TTL', 30)
+    key = f'dashboard:{name}:{effective.id}'
+    entry = cache.get(key)
+    if entry is None:
+        body = json.dumps(build(effective), sort_keys=True, separators=(',', ':'))
+        entry = {'body': body, 'etag': hashlib.sha1(body.encode()).hexdigest()[:20]}
+        cache.set(key, entry, timeout=ttl)
+
+    response = current_app.response_class(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.cache_control.private = True
+    response.cache_control.max_age = ttl
+    return response.make_conditional(request)
+
+
+def _kpis(effective):
+    balance_info = calculate_balance(effective.id)
 
-        # Grupos ativos
-        if group.is_active:
-            active_groups += 1
+    groups_by_type = dict(db.session.query(
+        Group.chat_type, func.count(Group.id)
+    ).filter(
+        Group.creator_id == effective.id
+    ).group_by(Group.chat_type).all())
 
-    # Transações recentes (todas, para visibilidade completa de status)
-    recent_transactions = Transaction.query.join(
-        Subscription
-    ).join(
+    total_subscribers = db.session.query(func.count(Subscription.id)).join(
         Group
     ).filter(
-        Group.creator_id == effective.id
-    ).order_by(
-        Transaction.created_at.desc()
-    ).limit(10).all()
+        Group.creator_id == effective.id,
+        Subscription.status == 'active'
+    ).scalar() or 0
+
+    return {
+        'available_balance': round(balance_info['available_balance'], 2),
+        'blocked_balance': round(balance_info['blocked_balance'], 2),
+        'total_balance': round(balance_info['total_balance'], 2),
+        'total_fees': round(balance_info['total_fees'], 2),
+        'total_revenue': round(balance_info['total_received'], 2),
+        'transaction_count': balance_info['transaction_count'],
+        'blocked_by_days': [
+            {'days': days, 'amount': round(info['amount'], 2), 'count': info['count']}
+            for days, info in sorted(balance_info['blocked_by_days'].items())
+        ],
+        'total_subscribers': total_subscribers,
+        'total_groups': sum(groups_by_type.values()),
+        'num_channels': groups_by_type.get('channel', 0),
+    }
 
-    # Dados para gráfico (últimos 7 dias)
+
+def _revenue_chart(effective):
+    """Receita bruta dos últimos 7 dias"""
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=6)
 
@@ -174,15 +199,17 @@ def index():
         JOIN groups g ON s.group_id = g.id
         WHERE g.creator_id = :creator_id
           AND t.status = 'completed'
-          AND DATE(t.created_at) >= :start_date
-          AND DATE(t.created_at) <= :end_date
+          AND t.created_at >= :start_date
+          AND t.created_at < :end_date
         GROUP BY DATE(t.created_at)
     """)
 
+    # Intervalo direto em created_at (não DATE(created_at)): no PostgreSQL a
+    # query só lê as partições mensais do período
     daily_revenue_result = db.session.execute(daily_revenue_query, {
         'creator_id': effective.id,
         'start_date': start_date.strftime('%Y-%m-%d'),
-        'end_date': end_date.strftime('%Y-%m-%d')
+        'end_date': (end_date + timedelta(days=1)).strftime('%Y-%m-%d')
     })
 
     # Converter resultado para dicionário
@@ -199,41 +226,108 @@ def index():
 
     current_date = start_date
     while current_date <= end_date:
-        label = current_date.strftime('%d/%m')
-        chart_labels.append(label)
+        chart_labels.append(current_date.strftime('%d/%m'))
+        chart_data.append(float(revenue_by_date.get(current_date.strftime('%Y-%m-%d'), 0.0)))
+        current_date += timedelta(days=1)
 
-        date_key = current_date.strftime('%Y-%m-%d')
-        value = revenue_by_date.get(date_key, 0.0)
-        chart_data.append(float(value))
+    return {'labels': chart_labels, 'data': chart_data}
 
-        current_date += timedelta(days=1)
 
-    return render_template('dashboard/index.html',
-        effective=effective,
-        available_balance=balance_info['available_balance'],
-        blocked_balance=balance_info['blocked_balance'],
-        blocked_by_days=balance_info['blocked_by_days'],
-        total_balance=balance_info['total_balance'],
-        balance=balance_info['available_balance'],
-        total_fees=balance_info['total_fees'],
-        transaction_count=balance_info['transaction_count'],
-        total_groups=total_groups,
-        active_groups=active_groups,
-        total_revenue=balance_info['total_received'],
-        total_subscribers=total_subscribers,
-        groups=groups,
-        recent_transactions=recent_transactions,
-        chart_labels=chart_labels,
-        chart_data=chart_data
-    )
+def _group_stats(effective):
+    """Assinantes ativos e receita bruta por grupo (duas queries agregadas)"""
+    revenue = db.session.query(
+        Subscription.group_id, func.sum(Transaction.amount)
+    ).join(
+        Transaction, Transaction.subscription_id == Subscription.id
+    ).join(
+        Group
+    ).filter(
+        Group.creator_id == effective.id,
+        Transaction.status == 'completed'
+    ).group_by(Subscription.group_id).all()
+
+    subscribers = db.session.query(
+        Subscription.group_id, func.count(Subscription.id)
+    ).join(
+        Group
+    ).filter(
+        Group.creator_id == effective.id,
+        Subscription.status == 'active'
+    ).group_by(Subscription.group_id).all()
+
+    archived = archive_service.archived_revenue_by_group(
+        [group_id for (group_id,) in db.session.query(Group.id).filter_by(creator_id=effective.id)])
+
+    stats = {}
+    for group_id, total in revenue:
+        stats.setdefault(str(group_id), {'subscribers': 0, 'revenue': 0.0})['revenue'] = float(total or 0)
+    for group_id, total in archived.items():
+        stats.setdefault(str(group_id), {'subscribers': 0, 'revenue': 0.0})['revenue'] += float(total or 0)
+    for group_id, count in subscribers:
+        stats.setdefault(str(group_id), {'subscribers': 0, 'revenue': 0.0})['subscribers'] = count
+    return {'groups': stats}
+
+
+def _recent_transactions(effective):
+    """Transações recentes (todas, para visibilidade completa de status)"""
+    recent = Transaction.query.join(
+        Subscription
+    ).join(
+        Group
+    ).filter(
+        Group.creator_id == effective.id
+    ).options(
+        contains_eager(Transaction.subscription).contains_eager(Subscription.group),
+        contains_eager(Transaction.subscription).joinedload(Subscription.plan)
+    ).order_by(
+        Transaction.created_at.desc()
+    ).limit(10).all()
+
+    return {'transactions': [{
+        'id': txn.id,
+        'status': txn.status,
+        'amount': float(txn.amount or 0),
+        # UTC → BRT, como o filtro to_brt
+        'created_at': (txn.created_at - timedelta(hours=3)).strftime('%d/%m %H:%M') if txn.created_at else '',
+        'subscriber': txn.subscription.telegram_username or txn.subscription.telegram_user_id,
+        'group_name': txn.subscription.group.name,
+        'plan_name': txn.subscription.plan.name if txn.subscription.plan else '',
+    } for txn in recent]}
+
+
+@bp.route('/api/kpis')
+@login_required
+def kpis_api():
+    """Saldo, receita, taxas e assinantes do dashboard"""
+    return _dashboard_json('kpis', _kpis)
+
+
+@bp.route('/api/revenue-chart')
+@login_required
+def revenue_chart_api():
+    """Série do gráfico de receita (7 dias)"""
+    return _dashboard_json('revenue-chart', _revenue_chart)
+
+
+@bp.route('/api/group-stats')
+@login_required
+def group_stats_api():
+    """Métricas por grupo da lista do dashboard"""
+    return _dashboard_json('group-stats', _group_stats)
+
+
+@bp.route('/api/recent-transactions')
+@login_required
+def recent_transactions_api():
+    """Últimas 10 transações do dashboard"""
+    return _dashboard_json('recent-transactions', _recent_transactions)
+
 
 @bp.route('/transactions')
 @login_required
 def transactions():
     """Listar todas as transações"""
     effective = get_effective_creator()
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
 
     # Auto-fix: corrigir transações pendentes de subs Stripe já ativas
     # (causado por webhook que falhava antes do fix de import)
@@ -271,38 +365,115 @@ def transactions():
     if fixed_count:
         db.session.commit()
 
-    # Query base
+    transactions = _transactions_page(effective)
+
+    # Buscar grupos para filtro
+    groups = Group.query.filter_by(creator_id=effective.id).all()
+
+    return render_template('dashboard/transactions.html',
+        transactions=transactions,
+        groups=groups
+    )
+
+
+@bp.route('/api/transactions')
+@login_required
+def transactions_api():
+    """Transações em JSON, paginadas por cursor (scroll infinito)"""
+    effective = get_effective_creator()
+    page = _transactions_page(effective)
+    return jsonify(page.to_dict(lambda txn: {
+        'id': txn.id,
+        'status': txn.status,
+        'amount': float(txn.amount or 0),
+        'total_fee': float(txn.total_fee or 0),
+        'net_amount': float(txn.net_amount or 0),
+        'created_at': txn.created_at.isoformat() if txn.created_at else None,
+        'telegram_username': txn.subscription.telegram_username,
+        'telegram_user_id': txn.subscription.telegram_user_id,
+        'group_name': txn.subscription.group.name,
+        'plan_name': txn.subscription.plan.name if txn.subscription.plan else None,
+        'archived': txn.is_archived,
+    }))
+
+
+def _transactions_page(effective, per_page=20):
+    """Página de transações do criador (filtros da querystring, cursor em (created_at, id))
+
+    Inclui as transações arquivadas (app/services/archive_service.py),
+    intercaladas por data.
+    """
     query = Transaction.query.join(
         Subscription
     ).join(
         Group
     ).filter(
         Group.creator_id == effective.id
+    ).options(
+        contains_eager(Transaction.subscription).contains_eager(Subscription.group)
     )
+    archived = archive_service.archived_transactions(effective.id)
 
     # Filtros
     status = request.args.get('status')
     if status:
         query = query.filter(Transaction.status == status)
+        archived = archived.filter(TransactionArchive.status == status)
 
     group_id = request.args.get('group_id', type=int)
     if group_id:
         # Security: ownership already enforced by Group.creator_id filter in base query
         query = query.filter(Subscription.group_id == group_id)
+        archived = archived.filter(TransactionArchive.group_id == group_id)
+
+    total = (cached_count(query, 'transactions', effective.id, status, group_id)
+             + cached_count(archived, 'transactions_archive', effective.id, status, group_id))
+    return keyset_paginate_union(
+        [(query, Transaction.created_at, Transaction.id),
+         (archived, TransactionArchive.created_at, TransactionArchive.id)],
+        after=request.args.get('after'), before=request.args.get('before'),
+        per_page=per_page, total=total,
+    )
 
-    # Ordenar por data
-    query = query.order_by(Transaction.created_at.desc())
 
-    # Paginar
-    transactions = query.paginate(page=page, per_page=per_page, error_out=False)
+@bp.route('/transactions/export')
+@login_required
+@limiter.limit("30 per hour")
+@use_replica
+def export_transactions():
+    """Exportar transações em streaming (CSV ou Parquet via ?format=)"""
+    effective = get_effective_creator()
+    return _export(
+        export_service.TRANSACTIONS,
+        export_service.transaction_rows(
+            effective.id,
+            group_id=request.args.get('group_id', type=int),
+            status=request.args.get('status') or None,
+        ),
+        'transacoes',
+    )
 
-    # Buscar grupos para filtro
-    groups = Group.query.filter_by(creator_id=effective.id).all()
 
-    return render_template('dashboard/transactions.html',
-        transactions=transactions,
-        groups=groups
-    )
+@bp.route('/revenue/export')
+@login_required
+@limiter.limit("30 per hour")
+@use_replica
+def export_revenue():
+    """Exportar receita por grupo (CSV ou Parquet via ?format=)"""
+    effective = get_effective_creator()
+    return _export(export_service.GROUP_REVENUE, export_service.group_revenue_rows(effective.id), 'receita_por_grupo')
+
+
+def _export(spec, rows, filename_base):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export_service.FORMATS:
+        fmt = 'csv'
+    response = export_service.export_response(spec, rows, fmt, filename_base)
+    if response is None:
+        flash('Exportação em Parquet indisponível no servidor. Use CSV.', 'warning')
+        return redirect(url_for('dashboard.transactions'))
+    return response
+
 
 @bp.route('/withdrawals')
 @login_required
@@ -484,6 +655,8 @@ def update_profile():
         flash('Ação não permitida no modo admin.', 'warning')
         return redirect(url_for('dashboard.profile'))
 
+    creator = Creator.query.get(current_user.id)  # current_user é um snapshot somente leitura
+
     name = request.form.get('name')
     email = request.form.get('email')
     phone = request.form.get('phone', '').strip()
@@ -504,13 +677,13 @@ def update_profile():
         return redirect(url_for('dashboard.profile'))
 
     # Check if PIX key is being changed
-    changing_pix = new_pix_key != current_user.pix_key
+    changing_pix = new_pix_key != creator.pix_key
 
     # Check if sensitive changes are being made (email, password, or PIX)
-    changing_email = email and email != current_user.email
+    changing_email = email and email != creator.email
     changing_password = bool(new_password)
 
-    is_oauth_only = not current_user.password_hash
+    is_oauth_only = not creator.password_hash
     if changing_email or changing_password or changing_pix:
         if is_oauth_only and changing_password and not changing_email and not changing_pix:
             # OAuth-only user definindo senha pela primeira vez — não exigir senha atual
@@ -519,7 +692,7 @@ def update_profile():
             if not current_password:
                 flash('Informe a senha atual para alterar email, senha ou chave PIX', 'error')
                 return redirect(url_for('dashboard.profile'))
-            if not current_user.check_password(current_password):
+            if not creator.check_password(current_password):
                 flash('Senha atual incorreta', 'error')
                 return redirect(url_for('dashboard.profile'))
 
@@ -537,55 +710,55 @@ def update_profile():
         if not any(c.isdigit() for c in new_password):
             flash('A nova senha deve conter pelo menos um número', 'error')
             return redirect(url_for('dashboard.profile'))
-        current_user.set_password(new_password)
+        creator.set_password(new_password)
 
     # Update name (no password required)
     if name:
-        current_user.name = name
+        creator.name = name
 
     # Update username (14-day cooldown)
     new_username = request.form.get('username', '').strip().lower()
-    if new_username and new_username != current_user.username:
+    if new_username and new_username != creator.username:
         import re
         if not re.match(r'^[a-zA-Z0-9_]{3,30}$', new_username):
             flash('Username inválido. Use apenas letras, números e _ (3-30 caracteres).', 'error')
             return redirect(url_for('dashboard.profile'))
         # Check cooldown
-        if current_user.username_changed_at:
-            days_since = (datetime.utcnow() - current_user.username_changed_at).days
+        if creator.username_changed_at:
+            days_since = (datetime.utcnow() - creator.username_changed_at).days
             if days_since < 14:
                 flash(f'Você só pode alterar o username novamente em {14 - days_since} dia(s).', 'error')
                 return redirect(url_for('dashboard.profile'))
         # Check uniqueness
-        if Creator.query.filter(Creator.username == new_username, Creator.id != current_user.id).first():
+        if Creator.query.filter(Creator.username == new_username, Creator.id != creator.id).first():
             flash('Este username já está em uso.', 'error')
             return redirect(url_for('dashboard.profile'))
-        current_user.username = new_username
-        current_user.username_changed_at = datetime.utcnow()
+        creator.username = new_username
+        creator.username_changed_at = datetime.utcnow()
 
     # Update email (password already verified above)
     if changing_email:
         if Creator.query.filter_by(email=email).first():
             flash('Este email já está em uso', 'error')
             return redirect(url_for('dashboard.profile'))
-        current_user.email = email
+        creator.email = email
 
     # Update PIX key (password already verified above)
     if changing_pix:
-        current_user.pix_key = new_pix_key
+        creator.pix_key = new_pix_key
 
     # Update phone (no password required)
     if phone is not None:
-        current_user.phone = phone
+        creator.phone = phone
 
     # Update bio (no password required)
     bio = request.form.get('bio', '').strip()
-    current_user.bio = bio if bio else None
+    creator.bio = bio if bio else None
 
     # Update page theme (no password required)
     page_theme = request.form.get('page_theme', '').strip()
     if page_theme in ('galactic', 'clean', 'neon', 'premium'):
-        current_user.page_theme = page_theme
+        creator.page_theme = page_theme
 
     db.session.commit()
     flash('Perfil atualizado com sucesso!', 'success')
@@ -627,8 +800,8 @@ def check_username():
 @login_required
 @limiter.limit("10 per hour")
 def upload_avatar():
-    """Upload de avatar do criador"""
-    from app.utils.security import validate_and_sanitize_image
+    """Upload de avatar do criador (processado em segundo plano)"""
+    from app.services import media_service
 
     if is_admin_viewing():
         return jsonify({'success': False, 'error': 'Ação não permitida no modo admin.'}), 403
@@ -636,37 +809,14 @@ def upload_avatar():
     if 'avatar' not in request.files:
         return jsonify({'success': False, 'error': 'Nenhum arquivo enviado.'}), 400
 
-    file = request.files['avatar']
-
-    # Validar e sanitizar imagem (magic bytes, Pillow re-process, strip metadata)
+    # Validação barata aqui; decodificação, variantes e remoção de metadados no pool
     try:
-        clean_bytes, ext = validate_and_sanitize_image(file)
+        media_service.accept_upload(request.files['avatar'], 'avatar', current_user.id)
     except ValueError as e:
         return jsonify({'success': False, 'error': str(e)}), 400
-
-    # Remover avatar antigo do disco
-    if current_user.avatar_url and '/uploads/avatars/' in (current_user.avatar_url or ''):
-        old_filename = current_user.avatar_url.rsplit('/', 1)[-1]
-        old_path = os.path.join(current_app.static_folder, 'uploads', 'avatars', old_filename)
-        if os.path.exists(old_path):
-            try:
-                os.remove(old_path)
-            except OSError:
-                pass
-
-    # Salvar arquivo sanitizado
-    filename = secure_filename(f"{current_user.id}_{int(time.time())}.{ext}")
-    upload_dir = os.path.join(current_app.static_folder, 'uploads', 'avatars')
-    filepath = os.path.join(upload_dir, filename)
-    with open(filepath, 'wb') as f:
-        f.write(clean_bytes)
-
-    # Atualizar URL do avatar
-    relative_path = f"uploads/avatars/{filename}"
-    current_user.avatar_url = url_for('static', filename=relative_path)
     db.session.commit()
 
-    return jsonify({'success': True, 'url': current_user.avatar_url})
+    return jsonify({'success': True, 'pending': True})
 
 
 @bp.route('/profile/delete', methods=['POST'])
@@ -710,11 +860,11 @@ def delete_account():
 
 @bp.route('/analytics')
 @login_required
+@use_replica
 def analytics():
     """Analytics avançado - versão corrigida"""
     effective = get_effective_creator()
     from datetime import datetime, timedelta, date
-    from sqlalchemy import func, desc
 
     # Período selecionado
     period = request.args.get('period', '30')
@@ -807,8 +957,9 @@ def analytics():
     ).filter(
         Group.creator_id == effective.id,
         Transaction.status == 'completed',
-        func.date(Transaction.created_at) >= start_date.date(),
-        func.date(Transaction.created_at) <= end_date.date()
+        # Intervalo em created_at (e não func.date) para o partition pruning
+        Transaction.created_at >= datetime.combine(start_date.date(), datetime.min.time()),
+        Transaction.created_at < datetime.combine(end_date.date() + timedelta(days=1), datetime.min.time())
     ).group_by(
         func.date(Transaction.created_at)
     ).all()
@@ -992,36 +1143,35 @@ def analytics():
         plan_labels.append(p.name)
         plan_data.append(float(p.total))
     
-    # 5. Performance por grupo
-    for group in groups:
-        group.total_subscribers = Subscription.query.filter_by(
-            group_id=group.id,
-            status='active'
-        ).count()
-        
-        group_period_revenue = db.session.query(
-            func.sum(Transaction.amount)
+    # 5. Performance por grupo (2 queries agrupadas para todos os grupos)
+    active_by_group = dict(db.session.query(
+        Subscription.group_id, func.count(Subscription.id)
+    ).join(Group).filter(
+        Group.creator_id == effective.id,
+        Subscription.status == 'active'
+    ).group_by(Subscription.group_id).all())
+
+    period_by_group = {
+        row.group_id: (float(row.revenue or 0), row.count)
+        for row in db.session.query(
+            Subscription.group_id,
+            func.sum(Transaction.amount).label('revenue'),
+            func.count(Transaction.id).label('count')
         ).join(
-            Subscription
-        ).filter(
-            Subscription.group_id == group.id,
+            Transaction, Transaction.subscription_id == Subscription.id
+        ).join(Group).filter(
+            Group.creator_id == effective.id,
             Transaction.status == 'completed',
             Transaction.created_at >= start_date,
             Transaction.created_at <= end_date
-        ).scalar() or 0
-        
-        group.period_revenue = float(group_period_revenue)
-        
-        group_transactions = Transaction.query.join(
-            Subscription
-        ).filter(
-            Subscription.group_id == group.id,
-            Transaction.status == 'completed',
-            Transaction.created_at >= start_date,
-            Transaction.created_at <= end_date
-        ).count()
-        
-        group.average_ticket = float(group_period_revenue) / group_transactions if group_transactions > 0 else 0
+        ).group_by(Subscription.group_id).all()
+    }
+
+    for group in groups:
+        group.total_subscribers = active_by_group.get(group.id, 0)
+        group_period_revenue, group_transactions = period_by_group.get(group.id, (0.0, 0))
+        group.period_revenue = group_period_revenue
+        group.average_ticket = group_period_revenue / group_transactions if group_transactions > 0 else 0
         group.churned = churn_by_group.get(group.id, 0)
 
     # Preparar dados finais
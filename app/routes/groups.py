@@ -1,54 +1,39 @@
 # app/routes/groups.py
-import time
 from markupsafe import escape
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response, session, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 import json
 from flask_limiter.util import get_remote_address
-from app import db, limiter
-from app.models import Group, PricingPlan, Subscription, Transaction, LeakIncident
+from app import db, limiter, cache
+from app.models import (Group, PricingPlan, Subscription, SubscriptionArchive, Transaction, LeakIncident,
+                        NotificationOutbox)
 from app.utils.admin_helpers import get_effective_creator, is_admin_viewing
+from app.utils.pagination import keyset_paginate_union, cached_count
+from app.utils.read_replica import use_replica
+from app.services import archive_service, export_service, media_service, telegram_service
+from app.utils import metrics
 from datetime import datetime, timedelta
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 import requests
 import os
 import re
-import csv
 import logging
-from io import StringIO
 
 bp = Blueprint('groups', __name__, url_prefix='/groups')
 logger = logging.getLogger(__name__)
 
-def _save_cover_image(file, group_id, old_cover_url=None):
-    """Valida, sanitiza e salva imagem de capa. Remove capa antiga do disco."""
-    from app.utils.security import validate_and_sanitize_image
-
+def _save_cover_image(file, group_id):
+    """Valida a capa e agenda o processamento (variantes e troca da capa antiga após o commit)."""
     if not file or file.filename == '':
-        return None
+        return False
 
     try:
-        clean_bytes, ext = validate_and_sanitize_image(file)
+        media_service.accept_upload(file, 'cover', group_id)
     except ValueError:
-        return None
-
-    # Remover capa antiga do disco
-    if old_cover_url and '/uploads/covers/' in (old_cover_url or ''):
-        old_filename = old_cover_url.rsplit('/', 1)[-1]
-        old_path = os.path.join(current_app.static_folder, 'uploads', 'covers', old_filename)
-        if os.path.exists(old_path):
-            try:
-                os.remove(old_path)
-            except OSError:
-                pass
-
-    filename = secure_filename(f"{group_id}_{int(time.time())}.{ext}")
-    upload_dir = os.path.join(current_app.static_folder, 'uploads', 'covers')
-    filepath = os.path.join(upload_dir, filename)
-    with open(filepath, 'wb') as f:
-        f.write(clean_bytes)
-    return url_for('static', filename=f"uploads/covers/{filename}")
+        return False
+    return True
 
 
 def _validate_plan_input(name, price_str, duration_str, description=None, is_lifetime=False):
@@ -90,37 +75,28 @@ def _validate_plan_input(name, price_str, duration_str, description=None, is_lif
 
 
 def _notify_plan_price_change(plan, old_price, new_price):
-    """Notificar assinantes ativos sobre mudança de preço via Telegram."""
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN') or os.getenv('BOT_TOKEN')
-    if not bot_token:
-        return
+    """Enfileirar aviso de mudança de preço para os assinantes ativos do plano.
 
+    Um único item no outbox: o bot expande para cada assinante no envio.
+    Sem commit — entra na transação da edição do plano.
+    """
     group = plan.group
     creator = group.creator
-    active_subs = Subscription.query.filter_by(
-        plan_id=plan.id, status='active'
-    ).all()
-
-    for sub in active_subs:
-        end_date_str = sub.end_date.strftime('%d/%m/%Y') if sub.end_date else 'N/A'
-        text = (
-            f"<b>Alteração de preço</b>\n\n"
-            f"O criador <b>{escape(creator.name)}</b> alterou o valor do plano "
-            f"<b>{escape(plan.name)}</b> do grupo <b>{escape(group.name)}</b>.\n\n"
-            f"Valor anterior: <code>R$ {old_price:.2f}</code>\n"
-            f"Novo valor: <code>R$ {new_price:.2f}</code>\n\n"
-            f"Sua próxima renovação em <code>{end_date_str}</code> será "
-            f"no novo valor.\n\n"
-            f"<i>Se preferir, pode cancelar a qualquer momento.</i>"
-        )
-        try:
-            requests.post(
-                f'https://api.telegram.org/bot{bot_token}/sendMessage',
-                json={'chat_id': sub.telegram_user_id, 'text': text, 'parse_mode': 'HTML'},
-                timeout=5
-            )
-        except Exception:
-            pass
+    text = (
+        f"<b>Alteração de preço</b>\n\n"
+        f"O criador <b>{escape(creator.name)}</b> alterou o valor do plano "
+        f"<b>{escape(plan.name)}</b> do grupo <b>{escape(group.name)}</b>.\n\n"
+        f"Valor anterior: <code>R$ {old_price:.2f}</code>\n"
+        f"Novo valor: <code>R$ {new_price:.2f}</code>\n\n"
+        f"Sua próxima renovação em <code>{{end_date}}</code> será "
+        f"no novo valor.\n\n"
+        f"<i>Se preferir, pode cancelar a qualquer momento.</i>"
+    )
+    NotificationOutbox.enqueue(
+        NotificationOutbox.KIND_PLAN_SUBSCRIBERS,
+        None,
+        {'plan_id': plan.id, 'text': text},
+    )
 
 
 def _escape_ilike(search_term):
@@ -134,10 +110,9 @@ def _sanitize_log(message):
 
 
 def _notify_creator_leak_detected(group, sub, incident):
-    """Notificar o criador via Telegram sobre vazamento identificado."""
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN') or os.getenv('BOT_TOKEN')
+    """Enfileirar aviso de vazamento identificado para o criador (sem commit)."""
     creator = group.creator
-    if not bot_token or not creator or not creator.telegram_id:
+    if not creator or not creator.telegram_id:
         return
 
     username_display = f"@{sub.telegram_username}" if sub.telegram_username else sub.telegram_user_id
@@ -151,14 +126,7 @@ def _notify_creator_leak_detected(group, sub, incident):
         f"O suspeito foi adicionado à lista de vazadores.\n"
         f"Acesse o painel Anti-Vazamento para decidir a ação (bloquear, remover, etc)."
     )
-    try:
-        requests.post(
-            f'https://api.telegram.org/bot{bot_token}/sendMessage',
-            json={'chat_id': creator.telegram_id, 'text': text, 'parse_mode': 'HTML'},
-            timeout=5,
-        )
-    except Exception:
-        pass
+    NotificationOutbox.enqueue_message(creator.telegram_id, text)
 
 
 @bp.route('/')
@@ -167,22 +135,39 @@ def list():
     """Lista todos os grupos do criador"""
     effective = get_effective_creator()
     groups = Group.query.filter_by(creator_id=effective.id).all()
-    
-    # Atualizar contador de assinantes para cada grupo
+    group_ids = [group.id for group in groups]
+
+    # Assinantes ativos, planos ativos e receita de todos os grupos (3 queries, não 3 por grupo)
+    subscriber_counts = dict(db.session.query(
+        Subscription.group_id, func.count(Subscription.id)
+    ).filter(
+        Subscription.group_id.in_(group_ids),
+        Subscription.status == 'active'
+    ).group_by(Subscription.group_id).all()) if group_ids else {}
+
+    plan_counts = dict(db.session.query(
+        PricingPlan.group_id, func.count(PricingPlan.id)
+    ).filter(
+        PricingPlan.group_id.in_(group_ids),
+        PricingPlan.is_active == True
+    ).group_by(PricingPlan.group_id).all()) if group_ids else {}
+
+    revenues = dict(db.session.query(
+        Subscription.group_id, func.sum(Transaction.amount)
+    ).join(
+        Transaction, Transaction.subscription_id == Subscription.id
+    ).filter(
+        Subscription.group_id.in_(group_ids),
+        Transaction.status == 'completed'
+    ).group_by(Subscription.group_id).all()) if group_ids else {}
+
+    archived_revenues = archive_service.archived_revenue_by_group(group_ids)
+
     for group in groups:
-        group.total_subscribers = Subscription.query.filter_by(
-            group_id=group.id,
-            status='active'
-        ).count()
-        
-        # Calcular receita total do grupo
-        group.total_revenue = db.session.query(func.sum(Transaction.amount)).join(
-            Subscription
-        ).filter(
-            Subscription.group_id == group.id,
-            Transaction.status == 'completed'
-        ).scalar() or 0
-    
+        group.total_subscribers = subscriber_counts.get(group.id, 0)
+        group.active_plans = plan_counts.get(group.id, 0)
+        group.total_revenue = (revenues.get(group.id) or 0) + (archived_revenues.get(group.id) or 0)
+
     return render_template('dashboard/groups.html', groups=groups)
 
 @bp.route('/create', methods=['GET', 'POST'])
@@ -215,8 +200,9 @@ def create():
 
         if bot_token and telegram_id:
             try:
-                url = f"https://api.telegram.org/bot{bot_token}/getChat"
-                response = requests.get(url, params={"chat_id": telegram_id}, timeout=10)
+                url = telegram_service.api_url(bot_token, "getChat")
+                response = requests.get(url, params={"chat_id": telegram_id}, timeout=10,
+                                        hooks=metrics.TELEGRAM_HOOKS)
 
                 if response.status_code != 200:
                     flash('Erro ao conectar com o Telegram. Verifique o ID e tente novamente.', 'error')
@@ -239,9 +225,10 @@ def create():
                 # Verificar se o bot é admin
                 bot_id = bot_token.split(':')[0]
                 bot_member = requests.get(
-                    f"https://api.telegram.org/bot{bot_token}/getChatMember",
+                    telegram_service.api_url(bot_token, "getChatMember"),
                     params={"chat_id": telegram_id, "user_id": bot_id},
-                    timeout=10
+                    timeout=10,
+                    hooks=metrics.TELEGRAM_HOOKS,
                 )
 
                 if bot_member.status_code == 200:
@@ -312,9 +299,7 @@ def create():
             # Upload de capa (se enviado arquivo)
             cover_file = request.files.get('cover_image')
             if cover_file and cover_file.filename:
-                cover_url = _save_cover_image(cover_file, group.id)
-                if cover_url:
-                    group.cover_image_url = cover_url
+                _save_cover_image(cover_file, group.id)
 
             # Adicionar planos (create) — máximo 5
             plan_names = request.form.getlist('plan_name[]')[:6]
@@ -417,9 +402,7 @@ def edit(id):
         # Upload de capa (se enviado arquivo)
         cover_file = request.files.get('cover_image')
         if cover_file and cover_file.filename:
-            cover_url = _save_cover_image(cover_file, group.id, old_cover_url=group.cover_image_url)
-            if cover_url:
-                group.cover_image_url = cover_url
+            _save_cover_image(cover_file, group.id)
 
         # Atualizar lista de exceção (whitelist)
         whitelist_ids = request.form.getlist('whitelist_ids[]')
@@ -516,7 +499,9 @@ def edit(id):
                 if has_active_subs:
                     # NEVER deactivate a plan with active subscribers
                     pass
-                elif Subscription.query.filter(Subscription.plan_id == plan.id).count() > 0:
+                elif (Subscription.query.filter(Subscription.plan_id == plan.id).count() > 0
+                      or SubscriptionArchive.query.filter_by(plan_id=plan.id).first()):
+                    # Histórico (inclusive arquivado) continua apontando para o plano
                     plan.is_active = False
                 else:
                     db.session.delete(plan)
@@ -566,6 +551,7 @@ def delete(id):
     for sub in subs:
         Transaction.query.filter_by(subscription_id=sub.id).delete()
     Subscription.query.filter_by(group_id=id).delete()
+    archive_service.delete_group_archive(id)
     PricingPlan.query.filter_by(group_id=id).delete()
     db.session.delete(group)
     db.session.commit()
@@ -737,9 +723,10 @@ def broadcast(group_id):
 
                     files = {field_name: (media_filename, media_bytes, media_content_type)}
                     response = requests.post(
-                        f'https://api.telegram.org/bot{bot_token}/{endpoint}',
+                        telegram_service.api_url(bot_token, endpoint),
                         data=data,
                         files=files,
+                        hooks=metrics.TELEGRAM_HOOKS,
                     )
 
                     # Send warning as separate reply after media
@@ -755,8 +742,9 @@ def broadcast(group_id):
                         if media_msg_id:
                             warn_payload['reply_to_message_id'] = media_msg_id
                         warn_resp = requests.post(
-                            f'https://api.telegram.org/bot{bot_token}/sendMessage',
+                            telegram_service.api_url(bot_token, 'sendMessage'),
                             json=warn_payload,
+                            hooks=metrics.TELEGRAM_HOOKS,
                         )
                         # Include warning msg in auto-delete list too
                         if auto_delete_seconds > 0 and warn_resp.status_code == 200:
@@ -787,8 +775,9 @@ def broadcast(group_id):
                         payload['protect_content'] = True
 
                     response = requests.post(
-                        f'https://api.telegram.org/bot{bot_token}/sendMessage',
+                        telegram_service.api_url(bot_token, 'sendMessage'),
                         json=payload,
+                        hooks=metrics.TELEGRAM_HOOKS,
                     )
 
                 if response.status_code == 200:
@@ -798,6 +787,8 @@ def broadcast(group_id):
             except Exception:
                 failed_count += 1
 
+        metrics.record_broadcast('web', sent_count, failed_count)
+
         # Schedule auto-delete of media messages in background thread
         if messages_to_delete and auto_delete_seconds > 0:
             import threading
@@ -808,8 +799,9 @@ def broadcast(group_id):
                 for chat_id, msg_id in msgs:
                     try:
                         requests.post(
-                            f'https://api.telegram.org/bot{token}/deleteMessage',
+                            telegram_service.api_url(token, 'deleteMessage'),
                             json={'chat_id': chat_id, 'message_id': msg_id},
+                            hooks=metrics.TELEGRAM_HOOKS,
                         )
                     except Exception:
                         pass
@@ -858,17 +850,54 @@ def subscribers(id):
     group = Group.query.filter_by(id=id, creator_id=effective.id).first_or_404()
 
     now = datetime.utcnow()
+    pagination = _subscribers_page(group)
+
+    return render_template('dashboard/subscribers.html',
+                         group=group,
+                         subscribers=pagination.items,
+                         pagination=pagination,
+                         stats=_subscriber_stats(group.id),
+                         now=now)
+
+
+@bp.route('/<int:id>/api/subscribers')
+@login_required
+def subscribers_api(id):
+    """Assinantes do grupo em JSON, paginados por cursor (scroll infinito)"""
+    effective = get_effective_creator()
+    group = Group.query.filter_by(id=id, creator_id=effective.id).first_or_404()
+
+    page = _subscribers_page(group)
+    return jsonify(page.to_dict(lambda sub: {
+        'id': sub.id,
+        'telegram_user_id': sub.telegram_user_id,
+        'telegram_username': sub.telegram_username,
+        'plan_name': sub.plan.name if sub.plan else None,
+        'status': sub.status,
+        'start_date': sub.start_date.isoformat() if sub.start_date else None,
+        'end_date': sub.end_date.isoformat() if sub.end_date else None,
+        'auto_renew': sub.auto_renew,
+        'archived': sub.is_archived,
+    }))
+
+
+def _subscribers_page(group, per_page=20):
+    """Página de assinantes (filtros da querystring, cursor em (end_date, id))
 
-    # Query base com filtros opcionais
-    query = Subscription.query.filter_by(group_id=id)
+    Inclui as assinaturas arquivadas do grupo, intercaladas por vencimento.
+    """
+    query = Subscription.query.filter_by(group_id=group.id).options(joinedload(Subscription.plan))
+    archived = archive_service.archived_subscriptions(group_id=group.id)
 
     status_filter = request.args.get('status')
     if status_filter:
         query = query.filter_by(status=status_filter)
+        archived = archived.filter_by(status=status_filter)
 
-    plan_filter = request.args.get('plan_id')
+    plan_filter = request.args.get('plan_id', type=int)
     if plan_filter:
-        query = query.filter_by(plan_id=int(plan_filter))
+        query = query.filter_by(plan_id=plan_filter)
+        archived = archived.filter_by(plan_id=plan_filter)
 
     search = request.args.get('search', '').strip()
     if search:
@@ -877,47 +906,58 @@ def subscribers(id):
             (Subscription.telegram_username.ilike(f'%{escaped}%', escape='\\')) |
             (Subscription.telegram_user_id.ilike(f'%{escaped}%', escape='\\'))
         )
+        archived = archived.filter(
+            (SubscriptionArchive.telegram_username.ilike(f'%{escaped}%', escape='\\')) |
+            (SubscriptionArchive.telegram_user_id.ilike(f'%{escaped}%', escape='\\'))
+        )
+
+    total = (cached_count(query, 'subscribers', group.id, status_filter, plan_filter, search)
+             + cached_count(archived, 'subscribers_archive', group.id, status_filter, plan_filter, search))
+    return keyset_paginate_union(
+        [(query, Subscription.end_date, Subscription.id),
+         (archived, SubscriptionArchive.end_date, SubscriptionArchive.id)],
+        after=request.args.get('after'), before=request.args.get('before'),
+        per_page=per_page, total=total,
+    )
+
 
-    # Paginacao
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-    total = query.count()
-    total_pages = max(1, (total + per_page - 1) // per_page)
+def _subscriber_stats(group_id):
+    """Contagens por status + receita do grupo (uma query agrupada, cache de 60s)"""
+    key = f"subscriber_stats:{group_id}"
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
 
-    all_subs = query.order_by(Subscription.end_date.desc()).offset(
-        (page - 1) * per_page
-    ).limit(per_page).all()
+    now = datetime.utcnow()
+    counts = dict(db.session.query(
+        Subscription.status, func.count(Subscription.id)
+    ).filter(
+        Subscription.group_id == group_id
+    ).group_by(Subscription.status).all())
 
-    # Estatísticas
-    active_count = Subscription.query.filter_by(group_id=id, status='active').count()
-    expired_count = Subscription.query.filter_by(group_id=id, status='expired').count()
     expiring_soon = Subscription.query.filter(
-        Subscription.group_id == id,
+        Subscription.group_id == group_id,
         Subscription.status == 'active',
         Subscription.end_date <= now + timedelta(days=7),
         Subscription.end_date > now
     ).count()
 
+    active_count = counts.get('active', 0)
+    expired_count = counts.get('expired', 0)
     stats = {
         'total': active_count + expired_count,
         'active': active_count,
         'expired': expired_count,
         'expiring_soon': expiring_soon,
-        'revenue': db.session.query(func.sum(Transaction.amount)).join(
+        'revenue': (db.session.query(func.sum(Transaction.amount)).join(
             Subscription
         ).filter(
-            Subscription.group_id == id,
+            Subscription.group_id == group_id,
             Transaction.status == 'completed'
-        ).scalar() or 0
+        ).scalar() or 0) + (archive_service.archived_revenue_by_group([group_id]).get(group_id) or 0)
     }
-
-    return render_template('dashboard/subscribers.html',
-                         group=group,
-                         subscribers=all_subs,
-                         stats=stats,
-                         now=now,
-                         page=page,
-                         total_pages=total_pages)
+    cache.set(key, stats, timeout=60)
+    return stats
 
 @bp.route('/<int:id>/subscribers/<int:sub_id>/details')
 @login_required
@@ -949,62 +989,34 @@ def subscriber_details(id, sub_id):
 @bp.route('/<int:id>/export-subscribers')
 @login_required
 @limiter.limit("30 per hour")
+@use_replica
 def export_subscribers(id):
-    """Exportar lista de assinantes em CSV"""
+    """Exportar assinantes em streaming (CSV ou Parquet via ?format=)"""
     effective = get_effective_creator()
     group = Group.query.filter_by(id=id, creator_id=effective.id).first_or_404()
 
-    # Buscar todos os assinantes
-    subscribers = Subscription.query.filter_by(group_id=id).all()
-
-    # Criar CSV
-    output = StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow([
-        'Username',
-        'Plano',
-        'Status',
-        'Data Início',
-        'Data Fim',
-        'Valor Pago'
-    ])
-
-    # Dados
-    for sub in subscribers:
-        # Calcular valor total pago
-        total_paid = db.session.query(func.sum(Transaction.amount)).filter_by(
-            subscription_id=sub.id,
-            status='completed'
-        ).scalar() or 0
-
-        writer.writerow([
-            sub.telegram_username or 'N/A',
-            sub.plan.name if sub.plan else 'N/A',
-            sub.status,
-            sub.start_date.strftime('%d/%m/%Y') if sub.start_date else '',
-            sub.end_date.strftime('%d/%m/%Y') if sub.end_date else '',
-            f'R$ {total_paid:.2f}'
-        ])
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export_service.FORMATS:
+        fmt = 'csv'
 
     # Sanitize filename: remove special chars, limit length
     safe_name = re.sub(r'[^\w\s-]', '', group.name)[:50].strip() or 'grupo'
 
-    # Preparar resposta
-    output.seek(0)
-    response = Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename="assinantes_{safe_name}_{datetime.now().strftime("%Y%m%d")}.csv"'
-        }
+    response = export_service.export_response(
+        export_service.SUBSCRIBERS,
+        export_service.subscriber_rows(group.id),
+        fmt,
+        f'assinantes_{safe_name}',
     )
-
+    if response is None:
+        flash('Exportação em Parquet indisponível no servidor. Use CSV.', 'warning')
+        return redirect(url_for('groups.subscribers', id=group.id))
     return response
 
+
 @bp.route('/<int:id>/stats')
 @login_required
+@use_replica
 def stats(id):
     """Estatísticas detalhadas do grupo"""
     effective = get_effective_creator()
@@ -1021,12 +1033,12 @@ def stats(id):
     }
     
     # Receita total
-    stats['total_revenue'] = db.session.query(func.sum(Transaction.amount)).join(
+    stats['total_revenue'] = (db.session.query(func.sum(Transaction.amount)).join(
         Subscription
     ).filter(
         Subscription.group_id == id,
         Transaction.status == 'completed'
-    ).scalar() or 0
+    ).scalar() or 0) + (archive_service.archived_revenue_by_group([id]).get(id) or 0)
     
     # Receita do mês atual
     start_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0)
@@ -1190,12 +1202,13 @@ def block_suspect(incident_id):
     if bot_token and group.telegram_id and incident.telegram_user_id:
         try:
             resp = requests.post(
-                f'https://api.telegram.org/bot{bot_token}/banChatMember',
+                telegram_service.api_url(bot_token, 'banChatMember'),
                 json={
                     'chat_id': group.telegram_id,
                     'user_id': int(incident.telegram_user_id),
                 },
                 timeout=10,
+                hooks=metrics.TELEGRAM_HOOKS,
             )
             if resp.status_code == 200 and resp.json().get('ok'):
                 kicked = True
@@ -1241,10 +1254,10 @@ def decode_watermark_route(id):
                 leaked_text_preview=text[:200] if text else None,
             )
             db.session.add(incident)
-            db.session.commit()
 
-            # Notify creator via Telegram
+            # Notify creator via Telegram (outbox, same transaction)
             _notify_creator_leak_detected(group, sub, incident)
+            db.session.commit()
 
             return jsonify({
                 'found': True,
@@ -4,12 +4,14 @@ from flask import Blueprint, render_template, abort
 from app import db
 from app.models import Group, Subscription, PricingPlan
 from app.models.user import Creator
-from sqlalchemy import or_
+from app.utils.page_cache import add_surrogate_keys, cached_page
+from sqlalchemy import func, or_
 
 bp = Blueprint('public', __name__, url_prefix='/c')
 
 
 @bp.route('/<username>')
+@cached_page
 def creator_page(username):
     """Página pública do criador — perfil + grid de grupos"""
     creator = Creator.query.filter(
@@ -21,17 +23,30 @@ def creator_page(username):
     groups = Group.query.filter_by(
         creator_id=creator.id, is_public=True
     ).all()
+    group_ids = [group.id for group in groups]
+    add_surrogate_keys(f'creator:{creator.id}', *[f'group:{gid}' for gid in group_ids])
 
-    # Para cada grupo: menor preço e contagem de assinantes ativos
-    for group in groups:
-        group.subscriber_count = Subscription.query.filter_by(
-            group_id=group.id, status='active'
-        ).count()
+    # Menor preço e contagem de assinantes ativos de todos os grupos (2 queries)
+    subscriber_counts = dict(db.session.query(
+        Subscription.group_id, func.count(Subscription.id)
+    ).filter(
+        Subscription.group_id.in_(group_ids),
+        Subscription.status == 'active'
+    ).group_by(Subscription.group_id).all()) if group_ids else {}
 
-        cheapest_plan = PricingPlan.query.filter(
-            PricingPlan.group_id == group.id,
+    cheapest_plans = {}
+    if group_ids:
+        plans = PricingPlan.query.filter(
+            PricingPlan.group_id.in_(group_ids),
             PricingPlan.is_active == True
-        ).order_by(PricingPlan.price.asc()).first()
+        ).order_by(PricingPlan.group_id, PricingPlan.price.asc()).all()
+        for plan in plans:
+            cheapest_plans.setdefault(plan.group_id, plan)
+
+    for group in groups:
+        group.subscriber_count = subscriber_counts.get(group.id, 0)
+
+        cheapest_plan = cheapest_plans.get(group.id)
         if cheapest_plan:
             group.min_price = float(cheapest_plan.price)
             group.min_price_duration = cheapest_plan.duration_days
@@ -50,6 +65,7 @@ def creator_page(username):
 
 
 @bp.route('/<username>/<invite_slug>')
+@cached_page
 def group_landing(username, invite_slug):
     """Landing page de venda individual do grupo"""
     creator = Creator.query.filter(
@@ -61,6 +77,7 @@ def group_landing(username, invite_slug):
     group = Group.query.filter_by(
         invite_slug=invite_slug, creator_id=creator.id
     ).first_or_404()
+    add_surrogate_keys(f'creator:{creator.id}', f'group:{group.id}')
 
     # Se inativo, mostra a página mas sem planos (aviso no template)
     if group.is_active:
@@ -6,9 +6,9 @@ from markupsafe import escape
 import stripe
 import os
 import logging
-import requests
 from datetime import datetime, timedelta, timezone
 from app import db, limiter
+from app.utils import tracing
 
 # Fuso horário de Brasília (UTC-3)
 BRT = timezone(timedelta(hours=-3))
@@ -20,7 +20,7 @@ def _fmt_date_brt(dt):
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(BRT).strftime('%d/%m/%Y')
-from app.models import Transaction, Subscription, Creator, Group, PricingPlan
+from app.models import Transaction, Subscription, Creator, Group, PricingPlan, NotificationOutbox
 
 bp = Blueprint('webhooks', __name__, url_prefix='/webhooks')
 logger = logging.getLogger(__name__)
@@ -58,49 +58,54 @@ def stripe_webhook():
         logger.error(f"Invalid signature: {e}")
         return jsonify({'error': 'Invalid signature'}), 400
     
+    # Handlers usam .get(), que o StripeObject (stripe >= 8) não tem mais
+    if isinstance(event, stripe.StripeObject):
+        event = event.to_dict()
+
     # Log do evento recebido
     logger.info(f"Event type: {event['type']}")
     logger.info(f"Event ID: {event['id']}")
     
-    # Processar diferentes tipos de eventos
-    try:
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-            handle_checkout_session_completed(session)
-
-        elif event['type'] == 'payment_intent.succeeded':
-            payment_intent = event['data']['object']
-            handle_payment_intent_succeeded(payment_intent)
-
-        elif event['type'] == 'payment_intent.payment_failed':
-            payment_intent = event['data']['object']
-            handle_payment_failed(payment_intent)
-
-        elif event['type'] == 'invoice.paid':
-            invoice = event['data']['object']
-            handle_invoice_paid(invoice)
-
-        elif event['type'] == 'invoice.created':
-            invoice = event['data']['object']
-            handle_invoice_created(invoice)
+    # Processar diferentes tipos de eventos. O span continua o trace do
+    # checkout criado pelo bot (metadata.traceparent), ligado ao do request
+    request_span = tracing.current_span()
+    event_object = event['data']['object']
+    with tracing.start_span(f"stripe.{event['type']}", tracing.KIND_CONSUMER, {'stripe.event_id': event['id']},
+                            parent=_event_traceparent(event_object),
+                            links=[request_span.context] if request_span is not None else None) as span:
+        try:
+            _dispatch_event(event['type'], event_object)
+        except Exception as e:
+            if span is not None:
+                span.set_error(e)
+            logger.error(f"Webhook processing error for {event['type']}: {e}", exc_info=True)
+            return jsonify({'error': 'Processing failed'}), 500
 
-        elif event['type'] == 'invoice.payment_failed':
-            invoice = event['data']['object']
-            handle_invoice_payment_failed(invoice)
+    return jsonify({'status': 'success'}), 200
 
-        elif event['type'] == 'customer.subscription.deleted':
-            stripe_subscription = event['data']['object']
-            handle_subscription_deleted(stripe_subscription)
 
-        elif event['type'] == 'charge.dispute.created':
-            dispute = event['data']['object']
-            handle_dispute_created(dispute)
+def _event_traceparent(obj):
+    """``traceparent`` gravado pelo bot na metadata da sessão (ou da assinatura, na 1ª fatura)"""
+    metadata = obj.get('metadata') or {}
+    if not metadata and obj.get('billing_reason') == 'subscription_create':
+        metadata = (obj.get('subscription_details') or {}).get('metadata') or {}
+    return metadata.get('traceparent')
 
-    except Exception as e:
-        logger.error(f"Webhook processing error for {event['type']}: {e}", exc_info=True)
-        return jsonify({'error': 'Processing failed'}), 500
 
-    return jsonify({'status': 'success'}), 200
+def _dispatch_event(event_type, obj):
+    """Chamar o handler do tipo de evento (tipos sem handler são ignorados)"""
+    handler = {
+        'checkout.session.completed': handle_checkout_session_completed,
+        'payment_intent.succeeded': handle_payment_intent_succeeded,
+        'payment_intent.payment_failed': handle_payment_failed,
+        'invoice.paid': handle_invoice_paid,
+        'invoice.created': handle_invoice_created,
+        'invoice.payment_failed': handle_invoice_payment_failed,
+        'customer.subscription.deleted': handle_subscription_deleted,
+        'charge.dispute.created': handle_dispute_created,
+    }.get(event_type)
+    if handler:
+        handler(obj)
 
 
 def handle_checkout_session_completed(session):
@@ -197,12 +202,13 @@ def handle_checkout_session_completed(session):
                 creator.total_earned = 0
             creator.total_earned += transaction.net_amount
 
+        # Notificação entra na mesma transação da ativação (outbox)
+        notify_bot_payment_complete(subscription, transaction)
+
         db.session.commit()
 
         logger.info(f"Assinatura legacy {subscription.id} ativada com sucesso!")
 
-        notify_bot_payment_complete(subscription, transaction)
-
     except Exception as e:
         logger.error(f"Erro ao processar checkout session: {str(e)}")
         db.session.rollback()
@@ -254,7 +260,6 @@ def handle_dispute_created(dispute):
     subscription = transaction.subscription
     if subscription:
         subscription.status = 'suspended'
-        db.session.commit()
 
         # Remover usuário do grupo imediatamente
         remove_user_from_group_via_bot(subscription)
@@ -279,6 +284,8 @@ def handle_dispute_created(dispute):
                 f"Assinante: <code>{subscription.telegram_user_id}</code>"
             )
 
+        db.session.commit()
+
         logger.warning(
             f"Dispute: usuário {subscription.telegram_user_id} removido do grupo "
             f"{subscription.group_id}, assinatura {subscription.id} suspensa"
@@ -288,40 +295,18 @@ def handle_dispute_created(dispute):
 
 
 def notify_bot_payment_complete(subscription, transaction):
-    """Notificar o usuário que o pagamento foi completado — com botão de acesso inline"""
-    bot_token = os.getenv('BOT_TOKEN') or os.getenv('TELEGRAM_BOT_TOKEN')
-
-    if not bot_token:
-        logger.error("Bot token não configurado")
-        return
+    """Enfileirar a mensagem de pagamento aprovado — o bot cria o link de uso único no envio.
 
+    Não faz commit: o item entra na mesma transação da ativação da assinatura.
+    """
     try:
         group = subscription.group
         type_label = "canal" if group.chat_type == 'channel' else "grupo"
 
-        # Generate single-use invite link via Bot API
-        invite_link = None
-        if group.telegram_id:
-            try:
-                create_link_url = f"https://api.telegram.org/bot{bot_token}/createChatInviteLink"
-                link_response = requests.post(create_link_url, json={
-                    'chat_id': int(group.telegram_id),
-                    'member_limit': 1
-                })
-                link_data = link_response.json()
-                if link_data.get('ok'):
-                    invite_link = link_data['result']['invite_link']
-                    logger.info(f"Created single-use invite link for group {group.telegram_id}")
-                else:
-                    logger.warning(f"Failed to create invite link: {link_data}")
-            except Exception as e:
-                logger.warning(f"Error creating single-use invite link: {e}")
-
-        # Fallback to stored links
-        if not invite_link:
-            invite_link = group.invite_link
-            if not invite_link and group.telegram_username:
-                invite_link = f"https://t.me/{group.telegram_username}"
+        # Fallback para links armazenados, caso o bot não consiga gerar o de uso único
+        fallback_link = group.invite_link
+        if not fallback_link and group.telegram_username:
+            fallback_link = f"https://t.me/{group.telegram_username}"
 
         group_name = group.name
         text = (
@@ -333,23 +318,20 @@ def notify_bot_payment_complete(subscription, transaction):
             f"</pre>\n\n"
         )
 
-        keyboard = {'inline_keyboard': []}
-
-        if invite_link:
-            text += (
-                f"Clique abaixo para entrar no {type_label}.\n"
-                f"<i>O link é de uso único — não compartilhe.</i>"
-            )
-            keyboard['inline_keyboard'].append([
-                {'text': f'Entrar no {type_label.capitalize()}', 'url': invite_link}
-            ])
-        else:
-            text += "Entre em contato com o suporte para receber o link de acesso."
-            keyboard['inline_keyboard'].append([
-                {'text': 'Suporte', 'url': 'https://t.me/suporte_televip'}
-            ])
-
-        notify_user_via_bot(subscription.telegram_user_id, text, keyboard=keyboard)
+        NotificationOutbox.enqueue(
+            NotificationOutbox.KIND_ACCESS_LINK,
+            subscription.telegram_user_id,
+            {
+                'group_chat_id': group.telegram_id,
+                'fallback_link': fallback_link,
+                'text_with_link': text + (
+                    f"Clique abaixo para entrar no {type_label}.\n"
+                    f"<i>O link é de uso único — não compartilhe.</i>"
+                ),
+                'button_text': f'Entrar no {type_label.capitalize()}',
+                'text_without_link': text + "Entre em contato com o suporte para receber o link de acesso.",
+            },
+        )
 
     except Exception as e:
         logger.error(f"Erro ao notificar bot: {str(e)}")
@@ -475,13 +457,13 @@ def handle_invoice_paid(invoice):
             elif already_credited:
                 logger.info(f"Transaction {pending_txn.id} already completed — skipping creator credit")
 
+            # Notify user with invite link (outbox, same transaction)
+            notify_bot_payment_complete(subscription, pending_txn)
+
             db.session.commit()
 
             logger.info(f"Subscription {subscription.id} activated until {subscription.end_date}")
 
-            # Notify user with invite link
-            notify_bot_payment_complete(subscription, pending_txn)
-
         elif billing_reason == 'subscription_cycle':
             # Renewal — extend end_date
             logger.info(f"Renewing subscription {subscription.id}")
@@ -526,10 +508,6 @@ def handle_invoice_paid(invoice):
                     creator.total_earned = 0
                 creator.total_earned += txn.net_amount
 
-            db.session.commit()
-
-            logger.info(f"Subscription {subscription.id} renewed until {subscription.end_date}")
-
             # Notify user about renewal with cancel option
             group_name_safe = escape(group.name)
             type_label = "canal" if group.chat_type == 'channel' else "grupo"
@@ -553,6 +531,10 @@ def handle_invoice_paid(invoice):
                 renewal_text,
                 keyboard=renewal_keyboard
             )
+
+            db.session.commit()
+
+            logger.info(f"Subscription {subscription.id} renewed until {subscription.end_date}")
         else:
             logger.info(f"Unhandled billing_reason: {billing_reason}")
 
@@ -611,6 +593,7 @@ def handle_invoice_created(invoice):
         ]]}
 
         notify_user_via_bot(subscription.telegram_user_id, msg, keyboard=keyboard)
+        db.session.commit()
 
         logger.info(
             f"Boleto link sent to user {subscription.telegram_user_id} "
@@ -619,6 +602,7 @@ def handle_invoice_created(invoice):
 
     except Exception as e:
         logger.error(f"Error handling invoice.created: {e}")
+        db.session.rollback()
 
 
 def handle_invoice_payment_failed(invoice):
@@ -703,6 +687,7 @@ def handle_invoice_payment_failed(invoice):
                 ]]}
 
         notify_user_via_bot(subscription.telegram_user_id, msg, keyboard=keyboard)
+        db.session.commit()
 
         logger.info(
             f"User {subscription.telegram_user_id} notified about payment failure "
@@ -711,6 +696,7 @@ def handle_invoice_payment_failed(invoice):
 
     except Exception as e:
         logger.error(f"Error handling invoice.payment_failed: {e}")
+        db.session.rollback()
 
 
 def handle_subscription_deleted(stripe_subscription):
@@ -742,9 +728,6 @@ def handle_subscription_deleted(stripe_subscription):
             reason_text = "O pagamento não foi processado."
 
         subscription.auto_renew = False
-        db.session.commit()
-
-        logger.info(f"Subscription {subscription.id} set to {subscription.status}")
 
         # Remove user from group via bot
         remove_user_from_group_via_bot(subscription)
@@ -759,18 +742,20 @@ def handle_subscription_deleted(stripe_subscription):
             f"Para assinar novamente, use o link de convite do grupo."
         )
 
+        db.session.commit()
+
+        logger.info(f"Subscription {subscription.id} set to {subscription.status}")
+
     except Exception as e:
         logger.error(f"Error handling subscription.deleted: {e}")
         db.session.rollback()
 
 
 def remove_user_from_group_via_bot(subscription):
-    """Remove user from Telegram group using Bot API (respects whitelist and admins)"""
-    bot_token = os.getenv('BOT_TOKEN') or os.getenv('TELEGRAM_BOT_TOKEN')
-    if not bot_token:
-        logger.error("Bot token not configured for group removal")
-        return
+    """Enfileirar remoção do usuário do grupo (respeita whitelist; admins são checados no envio).
 
+    Não faz commit: o item entra na transação do chamador.
+    """
     group = subscription.group
     if not group or not group.telegram_id:
         return
@@ -782,63 +767,19 @@ def remove_user_from_group_via_bot(subscription):
         logger.info(f"User {user_id_str} is whitelisted in group {group.telegram_id} — not removing")
         return
 
-    try:
-        user_id = int(user_id_str)
-        chat_id = int(group.telegram_id)
-
-        # Check if user is admin before kicking
-        try:
-            check_url = f"https://api.telegram.org/bot{bot_token}/getChatMember"
-            resp = requests.post(check_url, json={'chat_id': chat_id, 'user_id': user_id}, timeout=10)
-            if resp.status_code == 200:
-                data = resp.json()
-                if data.get('ok') and data['result'].get('status') in ['administrator', 'creator']:
-                    logger.info(f"User {user_id} is admin in group {chat_id} — not removing")
-                    return
-        except Exception:
-            pass  # If check fails, proceed with removal
-
-        # Ban then unban = kick without permanent ban
-        ban_url = f"https://api.telegram.org/bot{bot_token}/banChatMember"
-        requests.post(ban_url, json={'chat_id': chat_id, 'user_id': user_id})
-
-        unban_url = f"https://api.telegram.org/bot{bot_token}/unbanChatMember"
-        requests.post(unban_url, json={'chat_id': chat_id, 'user_id': user_id, 'only_if_banned': True})
-
-        logger.info(f"User {user_id} removed from group {chat_id}")
-
-    except Exception as e:
-        logger.error(f"Error removing user from group: {e}")
+    NotificationOutbox.enqueue(
+        NotificationOutbox.KIND_KICK,
+        group.telegram_id,
+        {'user_id': user_id_str},
+    )
 
 
 def notify_user_via_bot(telegram_user_id, text, keyboard=None):
-    """Send a Telegram message to a user via Bot API"""
-    bot_token = os.getenv('BOT_TOKEN') or os.getenv('TELEGRAM_BOT_TOKEN')
-
-    if not bot_token:
-        logger.error("Bot token not configured for notifications")
-        return
-
-    try:
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-            'chat_id': str(telegram_user_id),
-            'text': text,
-            'parse_mode': 'HTML'
-        }
+    """Enfileirar mensagem do Telegram para um usuário (enviada pelo bot via outbox).
 
-        if keyboard:
-            payload['reply_markup'] = keyboard
-
-        response = requests.post(url, json=payload)
-
-        if response.status_code == 200:
-            logger.info(f"User {telegram_user_id} notified successfully")
-        else:
-            logger.error(f"Failed to notify user {telegram_user_id}: {response.text}")
-
-    except Exception as e:
-        logger.error(f"Error notifying user via bot: {e}")
+    Não faz commit: o item entra na transação do chamador.
+    """
+    NotificationOutbox.enqueue_message(telegram_user_id, text, keyboard=keyboard)
 
 
 @bp.route('/billing-portal')
@@ -886,5 +827,34 @@ def telegram_webhook():
         logger.warning("TELEGRAM_WEBHOOK_SECRET not configured — rejecting request")
         return jsonify({'error': 'Webhook secret not configured'}), 403
 
-    # Este webhook pode ser usado futuramente para receber updates do bot
-    return jsonify({'status': 'ok'}), 200
\ No newline at end of file
+    # Em modo polling o bot busca os updates sozinho — apenas confirmar
+    from bot.utils.ingress import get_update_mode, enqueue_update
+    if get_update_mode() != 'webhook':
+        return jsonify({'status': 'ok'}), 200
+
+    payload = request.get_json(silent=True)
+    if not payload or 'update_id' not in payload:
+        return jsonify({'status': 'ok'}), 200
+
+    # Entregar ao processo do bot pela fila no Redis
+    try:
+        enqueue_update(_get_update_queue_redis(), payload)
+    except Exception as e:
+        logger.error(f"Telegram webhook: falha ao enfileirar update {payload.get('update_id')}: {e}")
+        # Telegram reenvia o update quando a resposta não é 2xx
+        return jsonify({'error': 'Queue unavailable'}), 503
+
+    return jsonify({'status': 'ok'}), 200
+
+
+_update_queue_redis = None
+
+
+def _get_update_queue_redis():
+    """Cliente Redis (síncrono) da fila de updates do bot"""
+    global _update_queue_redis
+    if _update_queue_redis is None:
+        import redis
+        url = os.getenv('BOT_REDIS_URL') or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        _update_queue_redis = redis.from_url(url)
+    return _update_queue_redis
\ No newline at end of file
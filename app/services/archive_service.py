@@ -0,0 +1,238 @@
+"""
+Arquivamento de assinaturas e transações frias
+
+``subscriptions`` e ``transactions`` só cresciam: assinaturas expiradas há
+anos continuavam nas varreduras dos jobs e checkouts abandonados (``pending``)
+em toda visita a /dashboard/transactions. ``archive_cold_rows`` move para
+``subscriptions_archive``/``transactions_archive`` (mesmas colunas e ids):
+
+- assinaturas ``expired``/``cancelled`` que terminaram há mais de
+  ARCHIVE_SUBSCRIPTION_DAYS (padrão 180) e checkouts ``pending`` nunca pagos
+  criados há mais de ARCHIVE_PENDING_DAYS (padrão 30), junto com todas as
+  suas transações;
+- transações ``pending`` abandonadas há mais de ARCHIVE_PENDING_DAYS de
+  assinaturas que não estão ativas.
+
+Ficam sempre na tabela quente assinaturas com pagamento recente ou com
+incidente de vazamento. Os prazos são maiores que as janelas dos jobs
+(30 dias) e do analytics (90 dias), que continuam lendo só as tabelas
+quentes; saldo do criador, receita por grupo e exportações somam o arquivo,
+e as listagens de histórico (transações do criador, assinantes do grupo,
+histórico do usuário no bot) intercalam as linhas arquivadas.
+
+Roda uma vez por dia no bot (``archive_loop`` em bot/jobs/scheduled_tasks.py,
+por partição de grupos) e pode ser disparado com ``flask archive`` — útil no
+primeiro arquivamento, em lotes de BATCH_SIZE com um commit por lote.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, and_, case, exists, func, insert, literal, or_, select, true
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models import Group, LeakIncident, Subscription, SubscriptionArchive, Transaction, TransactionArchive
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_DAYS = 180
+PENDING_DAYS = 30
+BATCH_SIZE = 500
+
+ARCHIVABLE_STATUSES = ('expired', 'cancelled')
+
+
+def _session(session):
+    if session is not None:
+        return session
+    from app import db
+    return db.session
+
+
+def _no_partition(column):
+    return true()
+
+
+def subscription_days():
+    return int(os.getenv('ARCHIVE_SUBSCRIPTION_DAYS', SUBSCRIPTION_DAYS))
+
+
+def pending_days():
+    return int(os.getenv('ARCHIVE_PENDING_DAYS', PENDING_DAYS))
+
+
+# Critérios
+
+def cold_subscriptions(now, partition=_no_partition):
+    """Assinaturas encerradas há muito tempo ou checkouts nunca pagos"""
+    cutoff = now - timedelta(days=subscription_days())
+    pending_cutoff = now - timedelta(days=pending_days())
+    return and_(
+        partition(Subscription.group_id),
+        or_(
+            and_(Subscription.status.in_(ARCHIVABLE_STATUSES), Subscription.end_date < cutoff),
+            and_(Subscription.status == 'pending', Subscription.created_at < pending_cutoff),
+        ),
+        # Pagamento recente (boleto, retry do Stripe) mantém a assinatura quente
+        ~exists().where(Transaction.subscription_id == Subscription.id,
+                        Transaction.created_at >= pending_cutoff),
+        ~exists().where(LeakIncident.subscription_id == Subscription.id),
+    )
+
+
+def abandoned_transactions(now, partition=_no_partition):
+    """Transações ``pending`` antigas de assinaturas que não estão ativas"""
+    return and_(
+        Transaction.status == 'pending',
+        Transaction.created_at < now - timedelta(days=pending_days()),
+        exists().where(Subscription.id == Transaction.subscription_id,
+                       Subscription.status != 'active',
+                       partition(Subscription.group_id)),
+    )
+
+
+# Movimentação
+
+def _ids(session, column, criterion, batch_size):
+    return [row[0] for row in session.query(column).filter(criterion).order_by(column).limit(batch_size)]
+
+
+def _move_transactions(session, criterion, now):
+    columns = Transaction.__table__.columns.keys()
+    source = select(
+        *(Transaction.__table__.c[name] for name in columns),
+        Subscription.group_id,
+        literal(now, DateTime()),
+    ).join(Subscription, Transaction.subscription_id == Subscription.id).where(criterion)
+    session.execute(insert(TransactionArchive).from_select(columns + ['group_id', 'archived_at'], source))
+    return session.query(Transaction).filter(criterion).delete(synchronize_session=False)
+
+
+def _move_subscriptions(session, ids, now):
+    columns = Subscription.__table__.columns.keys()
+    source = select(
+        *(Subscription.__table__.c[name] for name in columns),
+        literal(now, DateTime()),
+    ).where(Subscription.id.in_(ids))
+    session.execute(insert(SubscriptionArchive).from_select(columns + ['archived_at'], source))
+    return session.query(Subscription).filter(Subscription.id.in_(ids)).delete(synchronize_session=False)
+
+
+def archive_cold_rows(session=None, now=None, partition=_no_partition, batch_size=BATCH_SIZE):
+    """Mover as linhas frias para as tabelas de arquivo (um commit por lote)
+
+    ``partition(coluna_group_id)`` restringe aos grupos de um worker do bot.
+    Retorna quantas assinaturas e transações foram arquivadas.
+    """
+    session = _session(session)
+    now = now or datetime.utcnow()
+    moved = {'subscriptions': 0, 'transactions': 0}
+
+    criterion = abandoned_transactions(now, partition)
+    while True:
+        ids = _ids(session, Transaction.id, criterion, batch_size)
+        if not ids:
+            break
+        moved['transactions'] += _move_transactions(session, Transaction.id.in_(ids), now)
+        session.commit()
+
+    criterion = cold_subscriptions(now, partition)
+    while True:
+        ids = _ids(session, Subscription.id, criterion, batch_size)
+        if not ids:
+            break
+        moved['transactions'] += _move_transactions(session, Transaction.subscription_id.in_(ids), now)
+        moved['subscriptions'] += _move_subscriptions(session, ids, now)
+        session.commit()
+
+    if moved['subscriptions'] or moved['transactions']:
+        logger.info(f"Arquivamento: {moved['subscriptions']} assinaturas, {moved['transactions']} transações")
+    return moved
+
+
+def delete_group_archive(group_id, session=None):
+    """Apagar o histórico arquivado de um grupo excluído"""
+    session = _session(session)
+    session.query(TransactionArchive).filter_by(group_id=group_id).delete(synchronize_session=False)
+    session.query(SubscriptionArchive).filter_by(group_id=group_id).delete(synchronize_session=False)
+
+
+# Leitura do histórico
+
+def archived_revenue_by_group(group_ids, session=None):
+    """Receita bruta arquivada (transações completadas) por grupo"""
+    if not group_ids:
+        return {}
+    return dict(_session(session).query(
+        TransactionArchive.group_id, func.sum(TransactionArchive.amount)
+    ).filter(
+        TransactionArchive.group_id.in_(group_ids),
+        TransactionArchive.status == 'completed'
+    ).group_by(TransactionArchive.group_id).all())
+
+
+def archived_balance(creator_id, available_date, session=None):
+    """Totais das transações completadas arquivadas do criador (mesmas regras do calculate_balance)"""
+    net = func.coalesce(TransactionArchive.net_amount, 0)
+    fee = func.coalesce(func.nullif(TransactionArchive.total_fee, 0), TransactionArchive.amount - net)
+    available = func.coalesce(TransactionArchive.paid_at, TransactionArchive.created_at) <= available_date
+    count, received, fees, available_balance, blocked_balance = _session(session).query(
+        func.count(TransactionArchive.id),
+        func.coalesce(func.sum(TransactionArchive.amount), 0),
+        func.coalesce(func.sum(fee), 0),
+        func.coalesce(func.sum(case((available, net), else_=0)), 0),
+        func.coalesce(func.sum(case((available, 0), else_=net)), 0),
+    ).join(
+        Group, Group.id == TransactionArchive.group_id
+    ).filter(
+        Group.creator_id == creator_id,
+        TransactionArchive.status == 'completed'
+    ).one()
+    return {
+        'transaction_count': count,
+        'total_received': float(received),
+        'total_fees': float(fees),
+        'available_balance': float(available_balance),
+        'blocked_balance': float(blocked_balance),
+    }
+
+
+def archived_transactions(creator_id, session=None):
+    """Query das transações arquivadas do criador, com a assinatura (quente ou arquivada) carregada"""
+    return _session(session).query(TransactionArchive).join(
+        Group, Group.id == TransactionArchive.group_id
+    ).filter(
+        Group.creator_id == creator_id
+    ).options(
+        selectinload(TransactionArchive.hot_subscription).options(
+            joinedload(Subscription.group), joinedload(Subscription.plan)),
+        selectinload(TransactionArchive.archived_subscription).options(
+            joinedload(SubscriptionArchive.group), joinedload(SubscriptionArchive.plan)),
+    )
+
+
+def archived_subscriptions(group_id=None, telegram_user_id=None, session=None):
+    """Query das assinaturas arquivadas de um grupo e/ou usuário do Telegram
+
+    Checkouts nunca pagos (``pending``) ficam de fora: não são histórico.
+    """
+    query = _session(session).query(SubscriptionArchive).filter(
+        SubscriptionArchive.status != 'pending'
+    ).options(joinedload(SubscriptionArchive.plan))
+    if group_id is not None:
+        query = query.filter(SubscriptionArchive.group_id == group_id)
+    if telegram_user_id is not None:
+        query = query.filter(SubscriptionArchive.telegram_user_id == str(telegram_user_id))
+    return query
+
+
+def init_app(app):
+    """Registrar ``flask archive``"""
+    import click
+
+    @app.cli.command('archive')
+    @click.option('--batch-size', default=BATCH_SIZE, show_default=True)
+    def archive_command(batch_size):
+        """Mover assinaturas/transações frias para as tabelas de arquivo"""
+        moved = archive_cold_rows(batch_size=batch_size)
+        click.echo(f"{moved['subscriptions']} assinaturas e {moved['transactions']} transações arquivadas")
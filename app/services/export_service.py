@@ -0,0 +1,356 @@
+# app/services/export_service.py
+"""
+Exportação em streaming de assinantes, transações e receita por grupo
+
+As linhas saem de um cursor no servidor (``yield_per``) direto para o
+gerador da resposta, em lotes — a memória do worker fica constante
+independente do número de linhas. Formatos: CSV e Parquet (colunar, para
+análise offline; requer pyarrow). Assinaturas e transações arquivadas
+(app/services/archive_service.py) entram nas exportações antes das quentes.
+"""
+import csv
+from datetime import datetime
+from itertools import chain
+from decimal import Decimal
+
+from flask import Response, stream_with_context
+from sqlalchemy import func, select, union_all
+
+from app import db
+from app.models import Group, PricingPlan, Subscription, SubscriptionArchive, Transaction, TransactionArchive
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    has_pyarrow = True
+except ImportError:
+    pa = pq = None
+    has_pyarrow = False
+
+YIELD_PER = 1000          # Linhas por fetch do cursor
+CSV_CHUNK_ROWS = 500      # Linhas por pedaço enviado ao cliente
+PARQUET_ROW_GROUP = 10000
+
+FORMATS = ('csv', 'parquet')
+
+
+def _fmt_date(value):
+    return value.strftime('%d/%m/%Y') if value else ''
+
+
+def _fmt_datetime(value):
+    return value.strftime('%d/%m/%Y %H:%M') if value else ''
+
+
+def _fmt_brl(value):
+    return f'R$ {(value or 0):.2f}'
+
+
+def _or_na(value):
+    return value or 'N/A'
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+
+
+class ExportSpec:
+    """Colunas de uma exportação: (cabeçalho, tipo Parquet, formatador CSV)"""
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.headers = [c[0] for c in columns]
+        self.types = [c[1] for c in columns]
+        self.csv_formatters = [c[2] for c in columns]
+
+    def arrow_schema(self):
+        arrow_types = {
+            'string': pa.string(),
+            'int': pa.int64(),
+            'timestamp': pa.timestamp('us'),
+            'money': pa.decimal128(12, 2),
+        }
+        return pa.schema([(h, arrow_types[t]) for h, t in zip(self.headers, self.types)])
+
+
+SUBSCRIBERS = ExportSpec('assinantes', [
+    ('Username', 'string', _or_na),
+    ('Telegram ID', 'string', _text),
+    ('Plano', 'string', _or_na),
+    ('Status', 'string', _text),
+    ('Data Início', 'timestamp', _fmt_date),
+    ('Data Fim', 'timestamp', _fmt_date),
+    ('Valor Pago', 'money', _fmt_brl),
+])
+
+TRANSACTIONS = ExportSpec('transacoes', [
+    ('ID', 'int', _text),
+    ('Data', 'timestamp', _fmt_datetime),
+    ('Grupo', 'string', _text),
+    ('Plano', 'string', _or_na),
+    ('Username', 'string', _or_na),
+    ('Telegram ID', 'string', _text),
+    ('Status', 'string', _text),
+    ('Método', 'string', _text),
+    ('Bruto', 'money', _fmt_brl),
+    ('Taxa', 'money', _fmt_brl),
+    ('Líquido', 'money', _fmt_brl),
+    ('Pago em', 'timestamp', _fmt_datetime),
+])
+
+GROUP_REVENUE = ExportSpec('receita_por_grupo', [
+    ('Grupo', 'string', _text),
+    ('Transações', 'int', _text),
+    ('Bruto', 'money', _fmt_brl),
+    ('Taxas', 'money', _fmt_brl),
+    ('Líquido', 'money', _fmt_brl),
+])
+
+
+def subscriber_rows(group_id):
+    """Assinantes do grupo com o total pago (uma query por tabela, sem N+1)"""
+    return chain(
+        _subscriber_query(SubscriptionArchive, TransactionArchive, group_id),
+        _subscriber_query(Subscription, Transaction, group_id),
+    )
+
+
+def _subscriber_query(subscriptions, transactions, group_id):
+    paid = db.session.query(
+        transactions.subscription_id.label('subscription_id'),
+        func.sum(transactions.amount).label('total_paid'),
+    ).join(subscriptions, transactions.subscription_id == subscriptions.id).filter(
+        subscriptions.group_id == group_id,
+        transactions.status == 'completed',
+    ).group_by(transactions.subscription_id).subquery()
+
+    return db.session.query(
+        subscriptions.telegram_username,
+        subscriptions.telegram_user_id,
+        PricingPlan.name,
+        subscriptions.status,
+        subscriptions.start_date,
+        subscriptions.end_date,
+        paid.c.total_paid,
+    ).outerjoin(
+        PricingPlan, subscriptions.plan_id == PricingPlan.id
+    ).outerjoin(
+        paid, paid.c.subscription_id == subscriptions.id
+    ).filter(
+        subscriptions.group_id == group_id
+    ).order_by(subscriptions.id).yield_per(YIELD_PER)
+
+
+def transaction_rows(creator_id, group_id=None, status=None):
+    """Transações do criador (filtros opcionais de grupo e status)"""
+    query = db.session.query(
+        Transaction.id,
+        Transaction.created_at,
+        Group.name,
+        PricingPlan.name,
+        Subscription.telegram_username,
+        Subscription.telegram_user_id,
+        Transaction.status,
+        Transaction.payment_method,
+        Transaction.amount,
+        Transaction.total_fee,
+        Transaction.net_amount,
+        Transaction.paid_at,
+    ).join(
+        Subscription, Transaction.subscription_id == Subscription.id
+    ).join(
+        Group, Subscription.group_id == Group.id
+    ).outerjoin(
+        PricingPlan, Subscription.plan_id == PricingPlan.id
+    ).filter(Group.creator_id == creator_id)
+
+    if group_id:
+        query = query.filter(Subscription.group_id == group_id)
+    if status:
+        query = query.filter(Transaction.status == status)
+
+    return chain(
+        _archived_transaction_query(creator_id, group_id, status),
+        query.order_by(Transaction.id).yield_per(YIELD_PER),
+    )
+
+
+def _archived_transaction_query(creator_id, group_id, status):
+    # A assinatura de uma transação arquivada pode estar quente ou arquivada
+    plan_id = func.coalesce(Subscription.plan_id, SubscriptionArchive.plan_id)
+    query = db.session.query(
+        TransactionArchive.id,
+        TransactionArchive.created_at,
+        Group.name,
+        PricingPlan.name,
+        func.coalesce(Subscription.telegram_username, SubscriptionArchive.telegram_username),
+        func.coalesce(Subscription.telegram_user_id, SubscriptionArchive.telegram_user_id),
+        TransactionArchive.status,
+        TransactionArchive.payment_method,
+        TransactionArchive.amount,
+        TransactionArchive.total_fee,
+        TransactionArchive.net_amount,
+        TransactionArchive.paid_at,
+    ).join(
+        Group, TransactionArchive.group_id == Group.id
+    ).outerjoin(
+        Subscription, TransactionArchive.subscription_id == Subscription.id
+    ).outerjoin(
+        SubscriptionArchive, TransactionArchive.subscription_id == SubscriptionArchive.id
+    ).outerjoin(
+        PricingPlan, PricingPlan.id == plan_id
+    ).filter(Group.creator_id == creator_id)
+
+    if group_id:
+        query = query.filter(TransactionArchive.group_id == group_id)
+    if status:
+        query = query.filter(TransactionArchive.status == status)
+
+    return query.order_by(TransactionArchive.id).yield_per(YIELD_PER)
+
+
+def group_revenue_rows(creator_id):
+    """Receita agregada por grupo (transações completadas, inclusive arquivadas)"""
+    group_ids = select(Group.id).where(Group.creator_id == creator_id)
+    completed = union_all(
+        select(
+            Subscription.group_id.label('group_id'),
+            Transaction.amount,
+            Transaction.total_fee,
+            Transaction.net_amount,
+        ).join(Subscription, Transaction.subscription_id == Subscription.id).where(
+            Subscription.group_id.in_(group_ids),
+            Transaction.status == 'completed',
+        ),
+        select(
+            TransactionArchive.group_id,
+            TransactionArchive.amount,
+            TransactionArchive.total_fee,
+            TransactionArchive.net_amount,
+        ).where(
+            TransactionArchive.group_id.in_(group_ids),
+            TransactionArchive.status == 'completed',
+        ),
+    ).subquery()
+
+    return db.session.query(
+        Group.name,
+        func.count(),
+        func.coalesce(func.sum(completed.c.amount), 0),
+        func.coalesce(func.sum(completed.c.total_fee), 0),
+        func.coalesce(func.sum(completed.c.net_amount), 0),
+    ).join(
+        completed, completed.c.group_id == Group.id
+    ).group_by(Group.id, Group.name).order_by(Group.name).yield_per(YIELD_PER)
+
+
+class _LineBuffer:
+    """Destino do csv.writer que só devolve a linha escrita"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(spec, rows):
+    """Gerar o CSV em pedaços de CSV_CHUNK_ROWS linhas"""
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(spec.headers)
+
+    chunk = []
+    formatters = spec.csv_formatters
+    for row in rows:
+        chunk.append(writer.writerow([fmt(value) for fmt, value in zip(formatters, row)]))
+        if len(chunk) >= CSV_CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+class _StreamSink:
+    """Arquivo só-escrita para o ParquetWriter: acumula bytes até o próximo yield"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def writable(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(spec, rows):
+    """Gerar o Parquet em row groups de PARQUET_ROW_GROUP linhas"""
+    schema = spec.arrow_schema()
+    converters = [_money if t == 'money' else None for t in spec.types]
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+
+    def write_batch(columns):
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+            schema=schema,
+        ))
+
+    columns = [[] for _ in spec.headers]
+    count = 0
+    for row in rows:
+        for i, value in enumerate(row):
+            columns[i].append(converters[i](value) if converters[i] and value is not None else value)
+        count += 1
+        if count >= PARQUET_ROW_GROUP:
+            write_batch(columns)
+            columns = [[] for _ in spec.headers]
+            count = 0
+            data = sink.drain()
+            if data:
+                yield data
+
+    if count:
+        write_batch(columns)
+    writer.close()
+    yield sink.drain()
+
+
+def export_response(spec, rows, fmt, filename_base):
+    """Response em streaming no formato pedido (None se o formato não estiver disponível)"""
+    stamp = datetime.now().strftime('%Y%m%d')
+    if fmt == 'parquet':
+        if not has_pyarrow:
+            return None
+        body, mimetype, ext = iter_parquet(spec, rows), 'application/vnd.apache.parquet', 'parquet'
+    else:
+        body, mimetype, ext = iter_csv(spec, rows), 'text/csv', 'csv'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename_base}_{stamp}.{ext}"',
+            'X-Accel-Buffering': 'no',  # Nginx: repassar os pedaços sem bufferizar
+        },
+    )
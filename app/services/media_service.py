@@ -0,0 +1,393 @@
+# app/services/media_service.py
+"""
+Pipeline assíncrono de imagens (avatar do criador e capa de grupo)
+
+A requisição de upload só faz a validação barata (extensão, tamanho, magic
+bytes) e grava o arquivo original em MEDIA_RAW_DIR, fora de /static. Depois
+do commit, o processamento vai para um pool de processos (MEDIA_WORKERS):
+
+- decodifica com Pillow, aplica a orientação EXIF e descarta metadados;
+- gera variantes responsivas em WebP e AVIF (se o Pillow suportar), sem
+  ampliar a imagem, e um fallback JPEG/PNG na maior largura;
+- capa: miniatura 320x180 para listagens;
+- nomes com o dono e o hash do conteúdo
+  (``<kind>-<id do dono>-<sha256[:16]>-<largura>.<fmt>``), servidos com
+  ``Cache-Control: immutable``. O dono no nome garante que a troca de imagem
+  de um criador/grupo nunca apaga arquivos de outro que enviou a mesma imagem.
+
+Ao terminar, o resultado é gravado no modelo (``avatar_url`` /
+``cover_image_url`` apontam para o fallback e ``*_variants_json`` guarda o
+manifesto) e os arquivos anteriores são removidos. Nos templates, o global
+``picture`` monta o ``<picture>`` com ``srcset`` para o navegador escolher a
+menor variante.
+
+Com MEDIA_WORKERS = 0 (testes) o processamento roda na hora, após o commit.
+"""
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, has_app_context, request, url_for
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps, features
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.utils.security import validate_image_upload
+
+logger = logging.getLogger(__name__)
+
+MAX_DIMENSION = 4096  # Mesmo limite de validate_and_sanitize_image
+IMMUTABLE_MAX_AGE = 31536000  # 1 ano
+
+# kind -> (pasta em static/uploads, larguras, miniatura)
+VARIANTS = {
+    'avatar': ('avatars', (64, 128, 256, 512), None),
+    'cover': ('covers', (480, 960, 1440), (320, 180)),
+}
+
+_JOBS_KEY = 'media_jobs'
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def upload_dir(kind, app=None):
+    app = app or current_app
+    return os.path.join(app.static_folder, 'uploads', VARIANTS[kind][0])
+
+
+def raw_dir(app=None):
+    app = app or current_app
+    return app.config.get('MEDIA_RAW_DIR') or os.path.join(app.instance_path, 'uploads', 'raw')
+
+
+def _output_formats():
+    try:
+        avif = features.check('avif')
+    except Exception:
+        avif = False
+    return ['avif', 'webp'] if avif else ['webp']
+
+
+def _save_atomic(img, path, **params):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    img.save(tmp, **params)
+    os.replace(tmp, path)
+
+
+def process_image(raw_path, out_dir, kind, owner_id=None):
+    """
+    Gerar as variantes de uma imagem enviada (roda no pool de processos).
+
+    Os arquivos levam ``<kind>-<owner_id>-`` antes do hash, exceto sem
+    ``owner_id``.
+
+    Returns:
+        Manifesto com nomes de arquivo relativos a ``out_dir``
+
+    Raises:
+        ValueError se a imagem for inválida ou grande demais
+    """
+    _, widths, thumb_size = VARIANTS[kind]
+    with open(raw_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    prefix = digest if owner_id is None else f'{kind}-{owner_id}-{digest}'
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.verify()
+        img = Image.open(io.BytesIO(data))  # reabrir após verify
+        if img.width > MAX_DIMENSION or img.height > MAX_DIMENSION:
+            raise ValueError(f'Dimensões muito grandes. Máximo {MAX_DIMENSION}x{MAX_DIMENSION}px.')
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        # convert() gera uma imagem nova, sem EXIF/ICC/comentários do original
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    except ValueError:
+        raise
+    except Exception:
+        raise ValueError('Arquivo de imagem corrompido ou inválido.')
+
+    if kind == 'avatar':
+        side = min(img.size)
+        img = ImageOps.fit(img, (side, side), Image.LANCZOS)
+
+    # Nunca ampliar: larguras maiores que o original viram o próprio original
+    sizes = sorted({min(w, img.width) for w in widths})
+    os.makedirs(out_dir, exist_ok=True)
+
+    def resized(width):
+        if width == img.width:
+            return img
+        return img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+
+    sources = {}
+    for fmt in _output_formats():
+        sources[fmt] = []
+        for width in sizes:
+            filename = f'{prefix}-{width}.{fmt}'
+            params = {'quality': 60, 'speed': 6} if fmt == 'avif' else {'quality': 80, 'method': 4}
+            _save_atomic(resized(width), os.path.join(out_dir, filename), format=fmt.upper(), **params)
+            sources[fmt].append([width, filename])
+
+    largest = sizes[-1]
+    if has_alpha:
+        fallback = f'{prefix}-{largest}.png'
+        _save_atomic(resized(largest), os.path.join(out_dir, fallback), format='PNG', optimize=True)
+    else:
+        fallback = f'{prefix}-{largest}.jpg'
+        _save_atomic(resized(largest), os.path.join(out_dir, fallback), format='JPEG',
+                     quality=85, optimize=True, progressive=True)
+
+    manifest = {
+        'hash': digest,
+        'width': largest,
+        'height': resized(largest).height,
+        'fallback': fallback,
+        'sources': sources,
+    }
+    if thumb_size:
+        thumb = f'{prefix}-thumb.webp'
+        _save_atomic(ImageOps.fit(img, thumb_size, Image.LANCZOS), os.path.join(out_dir, thumb),
+                     format='WEBP', quality=75)
+        manifest['thumb'] = thumb
+    return manifest
+
+
+def manifest_files(manifest):
+    """Todos os arquivos de um manifesto"""
+    if not manifest:
+        return set()
+    files = {manifest['fallback']}
+    files.update(name for entries in manifest.get('sources', {}).values() for _, name in entries)
+    if manifest.get('thumb'):
+        files.add(manifest['thumb'])
+    return files
+
+
+def load_manifest(variants_json):
+    if not variants_json:
+        return None
+    try:
+        return json.loads(variants_json)
+    except (TypeError, ValueError):
+        return None
+
+
+# Envio e aplicação dos jobs
+
+def _target(kind):
+    from app.models import Creator, Group
+    if kind == 'avatar':
+        return Creator, 'avatar_url', 'avatar_variants_json'
+    return Group, 'cover_image_url', 'cover_variants_json'
+
+
+def accept_upload(file, kind, owner_id):
+    """
+    Validar o upload e agendar o processamento para depois do commit.
+
+    Raises:
+        ValueError com mensagem para o usuário se o arquivo for recusado
+    """
+    ext = validate_image_upload(file)
+    directory = raw_dir()
+    os.makedirs(directory, exist_ok=True)
+    uploaded_at = time.time()
+    raw_path = os.path.join(directory, f'{kind}-{owner_id}-{time.time_ns()}.{ext}')
+    file.save(raw_path)
+
+    job = {
+        'kind': kind,
+        'owner_id': owner_id,
+        'raw_path': raw_path,
+        'out_dir': upload_dir(kind),
+        'uploaded_at': uploaded_at,
+    }
+    db.session.info.setdefault(_JOBS_KEY, []).append(job)
+    return job
+
+
+def _get_executor(app):
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            # Um pool por processo (workers do gunicorn fazem fork)
+            _executor = ProcessPoolExecutor(
+                max_workers=app.config.get('MEDIA_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def apply_result(job, manifest):
+    """Gravar o manifesto no modelo e remover os arquivos substituídos"""
+    model, url_attr, variants_attr = _target(job['kind'])
+    out_dir = job['out_dir']
+    new_files = manifest_files(manifest)
+
+    obj = db.session.get(model, job['owner_id'])
+    current = load_manifest(getattr(obj, variants_attr)) if obj else None
+    if obj is None or (current and current.get('uploaded_at', 0) > job['uploaded_at']):
+        # Dono removido ou upload mais novo já aplicado
+        for name in new_files - manifest_files(current):
+            _remove(os.path.join(out_dir, name))
+        return False
+
+    old_files = manifest_files(current)
+    old_url = getattr(obj, url_attr) or ''
+    folder = VARIANTS[job['kind']][0]
+    if not current and f'/uploads/{folder}/' in old_url:
+        old_files.add(old_url.rsplit('/', 1)[-1])  # arquivo do formato antigo
+
+    manifest = dict(manifest, folder=folder, uploaded_at=job['uploaded_at'])
+    # Sem url_for: o callback do pool roda fora de request
+    setattr(obj, url_attr, f"{current_app.static_url_path}/uploads/{folder}/{manifest['fallback']}")
+    setattr(obj, variants_attr, json.dumps(manifest))
+    db.session.commit()
+
+    for name in old_files - new_files:
+        _remove(os.path.join(out_dir, name))
+    return True
+
+
+def _finish(app, job, manifest):
+    with app.app_context():
+        try:
+            apply_result(job, manifest)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao aplicar imagem processada ({job['kind']} {job['owner_id']}): {e}")
+        finally:
+            db.session.remove()
+
+
+def _on_done(app, job, future):
+    _remove(job['raw_path'])
+    try:
+        manifest = future.result()
+    except Exception as e:
+        logger.warning(f"Imagem recusada no processamento ({job['kind']} {job['owner_id']}): {e}")
+        return
+    _finish(app, job, manifest)
+
+
+def run_job(app, job):
+    """Processar o job: no pool (MEDIA_WORKERS > 0) ou na hora"""
+    if app.config.get('MEDIA_WORKERS', 2) <= 0:
+        try:
+            manifest = process_image(job['raw_path'], job['out_dir'], job['kind'], job['owner_id'])
+        except Exception as e:
+            logger.warning(f"Imagem recusada no processamento ({job['kind']} {job['owner_id']}): {e}")
+            return
+        finally:
+            _remove(job['raw_path'])
+        _finish(app, job, manifest)
+        return
+
+    future = _get_executor(app).submit(process_image, job['raw_path'], job['out_dir'], job['kind'],
+                                       job['owner_id'])
+    future.add_done_callback(lambda f: _on_done(app, job, f))
+
+
+@event.listens_for(Session, 'after_commit')
+def _submit_media_jobs(session):
+    jobs = session.info.pop(_JOBS_KEY, None)
+    if not jobs or not has_app_context():
+        return
+    app = current_app._get_current_object()
+    for job in jobs:
+        try:
+            run_job(app, job)
+        except Exception as e:
+            _remove(job['raw_path'])
+            logger.error(f"Falha ao enviar imagem para processamento: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_media_jobs(session):
+    for job in session.info.pop(_JOBS_KEY, None) or []:
+        _remove(job['raw_path'])
+
+
+# Templates
+
+def picture(url, variants_json=None, alt='', sizes='100vw', **attrs):
+    """
+    ``<picture>`` com srcset AVIF/WebP; sem manifesto, um ``<img>`` simples.
+
+    Atributos extras vão para o ``<img>`` (``class_`` vira ``class``).
+    """
+    if not url:
+        return Markup('')
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    manifest = load_manifest(variants_json)
+
+    sources = []
+    if manifest:
+        attrs.setdefault('width', manifest['width'])
+        attrs.setdefault('height', manifest['height'])
+        folder = manifest['folder']
+        for fmt in ('avif', 'webp'):
+            entries = manifest['sources'].get(fmt)
+            if not entries:
+                continue
+            srcset = ', '.join(
+                f"{url_for('static', filename=f'uploads/{folder}/{name}')} {width}w"
+                for width, name in entries
+            )
+            sources.append(
+                f'<source type="image/{fmt}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">'
+            )
+
+    img_attrs = ''.join(
+        f' {escape(name.rstrip("_").replace("_", "-"))}="{escape(value)}"'
+        for name, value in attrs.items() if value is not None
+    )
+    img = f'<img src="{escape(url)}" alt="{escape(alt)}"{img_attrs}>'
+    if not sources:
+        return Markup(img)
+    return Markup(f'<picture>{"".join(sources)}{img}</picture>')
+
+
+def thumbnail_url(url, variants_json=None):
+    """URL da miniatura da capa (ou a própria imagem, se não houver)"""
+    manifest = load_manifest(variants_json)
+    if manifest and manifest.get('thumb'):
+        return url_for('static', filename=f"uploads/{manifest['folder']}/{manifest['thumb']}")
+    return url
+
+
+def init_app(app):
+    """Registrar helpers de template e cache longo para /static/uploads"""
+    app.add_template_global(picture)
+    app.add_template_global(thumbnail_url)
+    prefix = f'{app.static_url_path}/uploads/'
+
+    @app.after_request
+    def immutable_uploads(response):
+        # Nomes com hash/timestamp: o conteúdo de uma URL nunca muda
+        if request.path.startswith(prefix) and response.status_code in (200, 304):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
@@ -0,0 +1,305 @@
+# app/services/sitemap_service.py
+"""
+Sitemap pré-gerado em arquivos gzip
+
+O sitemap é montado fora do caminho do crawler: quando um criador ou grupo
+público muda (username, bloqueio, visibilidade, ...), uma reconstrução é
+agendada em segundo plano (SITEMAP_REBUILD_DELAY segundos, agrupando várias
+alterações). Os arquivos ficam em SITEMAP_DIR:
+
+- até SHARD_SIZE URLs: ``sitemap.xml.gz`` é o próprio urlset;
+- acima disso: ``sitemap-N.xml.gz`` com SHARD_SIZE URLs cada e
+  ``sitemap.xml.gz`` vira o sitemap index apontando para eles.
+
+As rotas só leem os arquivos (com Last-Modified/GET condicional) — o
+tráfego de crawlers não chega ao banco.
+
+Cada reconstrução regera todos os arquivos. Os shards são posicionais (as
+URLs em ordem de criador), então um criador novo ou removido desloca todos
+os shards seguintes e regerar só "o shard afetado" não existe de fato. A
+geração é uma query em streaming, agrupada pelo SITEMAP_REBUILD_DELAY e
+feita por um worker por vez (LOCK_KEY).
+
+O padrão de SITEMAP_DIR é o ``instance_path`` do host. Com mais de um host,
+os outros não veem a geração feita em um deles. Nesse caso SITEMAP_DIR
+precisa apontar para um diretório compartilhado (NFS/volume).
+"""
+import gzip
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from flask import Response, current_app, has_app_context, request
+from sqlalchemy import and_, event, inspect, or_
+from sqlalchemy.orm import Session
+
+from app import cache, db
+from app.models import Creator, Group
+
+logger = logging.getLogger(__name__)
+
+SHARD_SIZE = 50000  # Limite do protocolo de sitemaps por arquivo
+INDEX_FILE = 'sitemap.xml.gz'
+LOCK_KEY = 'sitemap:rebuild-lock'
+
+STATIC_PAGES = [
+    ('/', 'daily', '1.0'),
+    ('/recursos', 'weekly', '0.8'),
+    ('/precos', 'weekly', '0.8'),
+    ('/como-funciona', 'weekly', '0.7'),
+    ('/termos', 'monthly', '0.3'),
+    ('/privacidade', 'monthly', '0.3'),
+    ('/denuncia', 'monthly', '0.3'),
+]
+
+# Campos que mudam o conteúdo do sitemap
+CREATOR_FIELDS = ('username', 'is_active', 'is_blocked')
+GROUP_FIELDS = ('invite_slug', 'is_public', 'is_active', 'creator_id')
+
+_STALE_KEY = 'sitemap_stale'
+_timer_lock = threading.Lock()
+_pending_timer = None
+
+
+def sitemap_dir(app=None):
+    app = app or current_app
+    return app.config.get('SITEMAP_DIR') or os.path.join(app.instance_path, 'sitemaps')
+
+
+def shard_name(number):
+    return f'sitemap-{number}.xml.gz'
+
+
+def iter_entries():
+    """(path, changefreq, priority) de todas as URLs — uma query, em lotes"""
+    for page in STATIC_PAGES:
+        yield page
+
+    rows = db.session.query(
+        Creator.id, Creator.username, Group.invite_slug
+    ).outerjoin(
+        Group, and_(Group.creator_id == Creator.id, Group.is_public == True, Group.is_active == True)
+    ).filter(
+        Creator.is_active == True,
+        or_(Creator.is_blocked == False, Creator.is_blocked.is_(None)),
+        Creator.username.isnot(None)
+    ).order_by(Creator.id, Group.id).yield_per(1000)
+
+    last_creator = None
+    for creator_id, username, invite_slug in rows:
+        if creator_id != last_creator:
+            last_creator = creator_id
+            yield (f'/c/{username}', 'weekly', '0.6')
+        if invite_slug:
+            yield (f'/c/{username}/{invite_slug}', 'weekly', '0.5')
+
+
+def _tmp_path(directory, filename):
+    # Único por processo/thread: duas gerações simultâneas não se atropelam
+    return os.path.join(directory, f'.{filename}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+
+def _url_xml(base, path, freq, priority):
+    return (
+        f'  <url>\n'
+        f'    <loc>{escape(base + path)}</loc>\n'
+        f'    <changefreq>{freq}</changefreq>\n'
+        f'    <priority>{priority}</priority>\n'
+        f'  </url>\n'
+    )
+
+
+class _ShardWriter:
+    """Escreve urlsets gzip de até shard_size URLs em arquivos temporários"""
+
+    def __init__(self, directory, base, shard_size):
+        self.directory = directory
+        self.base = base
+        self.shard_size = shard_size
+        self.shards = []  # caminhos temporários
+        self._file = None
+        self._count = 0
+
+    def add(self, path, freq, priority):
+        if self._file is None or self._count >= self.shard_size:
+            self._open_next()
+        self._file.write(_url_xml(self.base, path, freq, priority))
+        self._count += 1
+
+    def _open_next(self):
+        self._close_current()
+        tmp = _tmp_path(self.directory, shard_name(len(self.shards) + 1))
+        self._file = gzip.open(tmp, 'wt', encoding='utf-8')
+        self._file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self._file.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        self._count = 0
+        self.shards.append(tmp)
+
+    def _close_current(self):
+        if self._file is not None:
+            self._file.write('</urlset>\n')
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._close_current()
+
+
+def build_sitemap(directory=None, base_url=None, shard_size=SHARD_SIZE):
+    """Gerar os arquivos do sitemap; devolve o número de URLs"""
+    directory = directory or sitemap_dir()
+    base_url = base_url or current_app.config.get('SITEMAP_BASE_URL', 'https://televip.app')
+    os.makedirs(directory, exist_ok=True)
+
+    writer = _ShardWriter(directory, base_url, shard_size)
+    total = 0
+    try:
+        for entry in iter_entries():
+            writer.add(*entry)
+            total += 1
+    except Exception:
+        writer.close()
+        for tmp in writer.shards:
+            os.remove(tmp)
+        raise
+    writer.close()
+
+    if len(writer.shards) == 1:
+        os.replace(writer.shards[0], os.path.join(directory, INDEX_FILE))
+        shard_count = 0
+    else:
+        shard_count = len(writer.shards)
+        for number, tmp in enumerate(writer.shards, start=1):
+            os.replace(tmp, os.path.join(directory, shard_name(number)))
+        _write_index(directory, base_url, shard_count)
+
+    # Remover shards de uma geração anterior maior
+    for filename in os.listdir(directory):
+        if filename.startswith('sitemap-') and filename.endswith('.xml.gz'):
+            number = filename[len('sitemap-'):-len('.xml.gz')]
+            if number.isdigit() and int(number) > shard_count:
+                os.remove(os.path.join(directory, filename))
+
+    logger.info(f"Sitemap gerado: {total} URLs em {max(shard_count, 1)} arquivo(s)")
+    return total
+
+
+def _write_index(directory, base_url, shard_count):
+    lastmod = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+    tmp = _tmp_path(directory, INDEX_FILE)
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for number in range(1, shard_count + 1):
+            f.write(
+                f'  <sitemap>\n'
+                f'    <loc>{escape(base_url)}/{shard_name(number)}</loc>\n'
+                f'    <lastmod>{lastmod}</lastmod>\n'
+                f'  </sitemap>\n'
+            )
+        f.write('</sitemapindex>\n')
+    os.replace(tmp, os.path.join(directory, INDEX_FILE))
+
+
+def rebuild(app):
+    """Reconstruir em um app context próprio (um worker por vez)"""
+    with app.app_context():
+        if not cache.add(LOCK_KEY, 1, timeout=300):
+            # Outro worker está gerando; tentar de novo depois para não perder a alteração
+            if app.config.get('SITEMAP_REBUILD_DELAY', 30) > 0:
+                schedule_rebuild(app)
+            return
+        try:
+            build_sitemap()
+        except Exception as e:
+            logger.error(f"Erro ao gerar sitemap: {e}")
+        finally:
+            cache.delete(LOCK_KEY)
+            db.session.remove()
+
+
+def _run_scheduled(app):
+    global _pending_timer
+    with _timer_lock:
+        _pending_timer = None  # alterações a partir daqui agendam outra geração
+    rebuild(app)
+
+
+def schedule_rebuild(app):
+    """Agendar reconstrução (alterações dentro do intervalo viram uma só)"""
+    global _pending_timer
+    delay = app.config.get('SITEMAP_REBUILD_DELAY', 30)
+    if delay <= 0:
+        rebuild(app)
+        return
+    with _timer_lock:
+        if _pending_timer is not None and _pending_timer.is_alive():
+            return
+        _pending_timer = threading.Timer(delay, _run_scheduled, args=(app,))
+        _pending_timer.daemon = True
+        _pending_timer.start()
+
+
+def serve_sitemap_file(filename, gzip_file=False):
+    """Servir um arquivo gerado: ``.xml.gz`` como está; senão XML (gzip se aceito)"""
+    directory = sitemap_dir()
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        if filename != INDEX_FILE:
+            return None
+        build_sitemap(directory)  # primeira vez neste disco
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if gzip_file:
+        response = Response(data, content_type='application/gzip')
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(data, content_type='application/xml')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(data), content_type='application/xml')
+    response.vary.add('Accept-Encoding')
+    response.last_modified = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
+
+
+# Reconstrução automática quando algo relevante muda (após o commit)
+
+def _changed(obj, fields):
+    attrs = inspect(obj).attrs
+    return any(attrs[name].history.has_changes() for name in fields)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_sitemap_changes(session, flush_context):
+    if session.info.get(_STALE_KEY):
+        return
+    stale = any(isinstance(obj, (Creator, Group)) for obj in list(session.new) + list(session.deleted))
+    if not stale:
+        stale = any(
+            isinstance(obj, Creator) and _changed(obj, CREATOR_FIELDS)
+            or isinstance(obj, Group) and _changed(obj, GROUP_FIELDS)
+            for obj in session.dirty
+        )
+    if stale:
+        session.info[_STALE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _schedule_sitemap_rebuild(session):
+    if not session.info.pop(_STALE_KEY, False) or not has_app_context():
+        return
+    try:
+        schedule_rebuild(current_app._get_current_object())
+    except Exception as e:
+        logger.warning(f"Falha ao agendar geração do sitemap: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_sitemap_changes(session):
+    session.info.pop(_STALE_KEY, None)
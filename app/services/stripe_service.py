@@ -5,12 +5,18 @@ import os
 import stripe
 from datetime import datetime
 from typing import Dict, Optional
-from app import db
 from app.models import Transaction, Subscription, Creator
 
 # Configurar Stripe com a chave da API
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
 
+
+def configure_api_base():
+    """STRIPE_API_BASE aponta o SDK para outro servidor (stripe-mock ou benchmarks/fake_stripe.py)"""
+    base = os.getenv('STRIPE_API_BASE')
+    if base:
+        stripe.api_base = base.rstrip('/')
+
 class StripeService:
     """Serviço para gerenciar pagamentos via Stripe"""
     
@@ -123,6 +129,7 @@ class StripeService:
     @staticmethod
     def handle_payment_success(payment_intent_id: str) -> bool:
         """Processar pagamento bem-sucedido"""
+        from app import db
         try:
             # Buscar payment intent
             intent = stripe.PaymentIntent.retrieve(payment_intent_id)
@@ -1 +1,30 @@
 # Serviço de comunicação com Telegram
+"""
+URLs da Bot API do Telegram
+
+TELEGRAM_API_BASE troca o servidor da Bot API (padrão
+https://api.telegram.org) — Bot API local (telegram-bot-api) ou o servidor
+falso dos testes de carga (``python -m benchmarks.fake_telegram``). Vale
+para o Flask (chamadas com requests) e para o bot (``base_url`` do PTB).
+"""
+import os
+
+DEFAULT_API_BASE = 'https://api.telegram.org'
+
+
+def api_base() -> str:
+    return (os.getenv('TELEGRAM_API_BASE') or DEFAULT_API_BASE).rstrip('/')
+
+
+def api_url(token: str, method: str) -> str:
+    """URL de um método da Bot API (``sendMessage``, ``getChat``...)"""
+    return f'{api_base()}/bot{token}/{method}'
+
+
+def bot_base_url() -> str:
+    """``base_url`` do ApplicationBuilder do PTB (o token é concatenado no fim)"""
+    return f'{api_base()}/bot'
+
+
+def bot_base_file_url() -> str:
+    return f'{api_base()}/file/bot'
@@ -1,12 +1,13 @@
 from flask import session
 from flask_login import current_user
 
+from app.utils.identity import get_creator_snapshot
+
 
 def get_effective_creator():
     """Return the creator being viewed by admin, or current_user."""
     if current_user.is_admin and session.get('admin_viewing_id'):
-        from app.models.user import Creator
-        creator = Creator.query.get(session['admin_viewing_id'])
+        creator = get_creator_snapshot(session['admin_viewing_id'])
         if creator:
             return creator
     return current_user
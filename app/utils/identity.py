@@ -0,0 +1,160 @@
+"""Snapshot do criador compartilhado por user_loader, bloqueio e modo admin.
+
+Cada requisição autenticada consultava o criador várias vezes (load_user,
+check_blocked_user, inject_admin_viewing, get_effective_creator). Agora o
+criador vira um ``CreatorSnapshot``: um objeto leve, somente leitura, guardado
+no cache por CREATOR_SNAPSHOT_TTL segundos e memoizado em ``g`` — no máximo
+uma consulta por criador por requisição, nenhuma quando o cache acerta.
+
+O snapshot é invalidado automaticamente no commit de qualquer alteração em
+um Creator (perfil, bloqueio, taxas, ...). Senha, chave PIX e saldo não vão
+para o cache: o acesso a atributos fora do snapshot carrega o modelo.
+Para alterar o criador, use o modelo (``db.session.get(Creator, id)``).
+"""
+import logging
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import cache, db
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = (
+    'id', 'name', 'email', 'username', 'avatar_url', 'avatar_variants_json', 'bio',
+    'phone', 'telegram_id', 'telegram_username', 'page_theme',
+    'is_active', 'is_verified', 'is_admin', 'is_blocked',
+    'created_at', 'username_changed_at',
+    'custom_fixed_fee', 'custom_percentage_fee',
+)
+
+_STALE_KEY = 'stale_creator_ids'
+
+
+def _cache_key(creator_id):
+    return f'creator:snapshot:{creator_id}'
+
+
+class CreatorSnapshot:
+    """Visão somente leitura de um Creator, compatível com o Flask-Login"""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, data):
+        object.__setattr__(self, '_data', data)
+
+    def __getattr__(self, name):
+        data = object.__getattribute__(self, '_data')
+        if name in data:
+            return data[name]
+        if name.startswith('__'):
+            raise AttributeError(name)
+        # Fora do snapshot (senha, PIX, saldo, relacionamentos): usar o modelo
+        model = get_creator_model(data['id'])
+        if model is None:
+            raise AttributeError(name)
+        return getattr(model, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            f"CreatorSnapshot é somente leitura (atributo '{name}'); altere o modelo Creator"
+        )
+
+    def get_id(self):
+        return str(self._data['id'])
+
+    def __eq__(self, other):
+        other_id = getattr(other, 'id', None) if other is not None else None
+        return other_id is not None and other_id == self._data['id']
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(('creator', self._data['id']))
+
+    def __repr__(self):
+        return f"<CreatorSnapshot {self._data.get('username')}>"
+
+
+def _snapshot_data(creator):
+    data = {field: getattr(creator, field) for field in SNAPSHOT_FIELDS}
+    data['has_password'] = bool(creator.password_hash)
+    return data
+
+
+def _request_snapshots():
+    if '_creator_snapshots' not in g:
+        g._creator_snapshots = {}
+    return g._creator_snapshots
+
+
+def get_creator_model(creator_id):
+    """Creator do ORM (usa o identity map da sessão antes de ir ao banco)"""
+    from app.models.user import Creator
+    return db.session.get(Creator, int(creator_id))
+
+
+def get_creator_snapshot(creator_id):
+    """Snapshot do criador: memo da requisição → cache → banco"""
+    if creator_id is None:
+        return None
+    creator_id = int(creator_id)
+    snapshots = _request_snapshots()
+    if creator_id in snapshots:
+        return snapshots[creator_id]
+
+    key = _cache_key(creator_id)
+    data = cache.get(key)
+    if data is None:
+        creator = get_creator_model(creator_id)
+        if creator is None:
+            return None
+        data = _snapshot_data(creator)
+        cache.set(key, data, timeout=current_app.config.get('CREATOR_SNAPSHOT_TTL', 60))
+
+    snapshot = CreatorSnapshot(data)
+    snapshots[creator_id] = snapshot
+    return snapshot
+
+
+def invalidate_creator(creator_id):
+    """Descartar o snapshot (cache e memo da requisição)"""
+    creator_id = int(creator_id)
+    cache.delete(_cache_key(creator_id))
+    if '_creator_snapshots' in g:
+        g._creator_snapshots.pop(creator_id, None)
+    # Flask-Login recarrega o current_user no próximo acesso
+    if getattr(g.get('_login_user'), 'id', None) == creator_id:
+        g.pop('_login_user')
+
+
+# Invalidação automática: ids dos Creators alterados no flush, descartados
+# só depois do commit (um rollback mantém o snapshot válido)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_creators(session, flush_context):
+    from app.models.user import Creator
+    changed = [obj.id for obj in list(session.dirty) + list(session.deleted)
+               if isinstance(obj, Creator) and obj.id is not None]
+    if changed:
+        session.info.setdefault(_STALE_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stale_creators(session):
+    stale = session.info.pop(_STALE_KEY, None)
+    if not stale or not has_app_context():
+        return
+    for creator_id in stale:
+        try:
+            invalidate_creator(creator_id)
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar snapshot do criador {creator_id}: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stale_creators(session):
+    session.info.pop(_STALE_KEY, None)
@@ -0,0 +1,333 @@
+"""Métricas Prometheus do Flask, do bot, dos jobs e das APIs externas.
+
+O processo web expõe ``/metrics``; o bot sobe um servidor HTTP próprio
+(BOT_METRICS_PORT, ver bot/utils/metrics.py). Métricas:
+
+- ``televip_http_request_duration_seconds``: latência por rota e status;
+- ``televip_db_queries`` / ``televip_db_duration_seconds``: queries SQL e
+  tempo de banco por request, handler do bot ou job (``scope``/``name``);
+- ``televip_external_request_duration_seconds`` e
+  ``televip_external_rate_limited_total``: chamadas à Bot API e ao Stripe
+  (latência e respostas 429);
+- ``televip_broadcast_messages_total``: mensagens de broadcast/outbox;
+- ``televip_job_duration_seconds`` / ``televip_job_items_total``: execuções
+  dos jobs agendados e itens processados;
+- ``televip_cache_requests_total``: acertos e faltas do cache (a razão de
+  acerto sai no PromQL);
+- ``televip_bot_loop_lag_seconds`` e ``televip_bot_loop_blocks_total`` /
+  ``televip_bot_loop_blocked_seconds_total``: lag do event loop do bot e
+  bloqueios por local (ver bot/utils/loop_monitor.py);
+- ``televip_db_pool_connections_in_use`` / ``televip_db_pool_capacity``:
+  conexões do pool em uso e o máximo (pool_size + max_overflow) por
+  processo (``web``/``bot``) — saturação do pool sob carga.
+
+Com vários workers do gunicorn, defina PROMETHEUS_MULTIPROC_DIR (diretório
+vazio a cada start) para somar as métricas de todos os processos.
+
+Sem o prometheus_client instalado tudo vira no-op e ``/metrics`` responde 404.
+"""
+import hmac
+import ipaddress
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from urllib.parse import urlsplit
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from app.utils import sql_profiler, tracing
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+    )
+    from prometheus_client import multiprocess
+    has_prometheus = True
+except ImportError:
+    has_prometheus = False
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+JOB_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800)
+
+
+class _NoopMetric:
+    """Substituto quando o prometheus_client não está instalado"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+def _histogram(name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+    if not has_prometheus:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _counter(name, documentation, labelnames):
+    if not has_prometheus:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+
+def _gauge(name, documentation, labelnames):
+    if not has_prometheus:
+        return _NoopMetric()
+    # livesum: soma os workers vivos do gunicorn no modo multiprocesso
+    return Gauge(name, documentation, labelnames, multiprocess_mode='livesum')
+
+
+HTTP_LATENCY = _histogram(
+    'televip_http_request_duration_seconds', 'Latência das requisições Flask',
+    ['method', 'endpoint', 'status'])
+DB_QUERIES = _histogram(
+    'televip_db_queries', 'Queries SQL por request, update do bot ou job',
+    ['scope', 'name'], buckets=QUERY_COUNT_BUCKETS)
+DB_TIME = _histogram(
+    'televip_db_duration_seconds', 'Tempo total de banco por request, update do bot ou job',
+    ['scope', 'name'])
+EXTERNAL_LATENCY = _histogram(
+    'televip_external_request_duration_seconds', 'Latência das chamadas à Bot API e ao Stripe',
+    ['service', 'operation'])
+EXTERNAL_RATE_LIMITED = _counter(
+    'televip_external_rate_limited_total', 'Respostas 429 da Bot API e do Stripe',
+    ['service', 'operation'])
+BROADCAST_MESSAGES = _counter(
+    'televip_broadcast_messages_total', 'Mensagens de broadcast/outbox por resultado',
+    ['source', 'result'])
+JOB_DURATION = _histogram(
+    'televip_job_duration_seconds', 'Duração das execuções dos jobs agendados',
+    ['job'], buckets=JOB_BUCKETS)
+JOB_ITEMS = _counter(
+    'televip_job_items_total', 'Itens processados pelos jobs agendados', ['job'])
+CACHE_REQUESTS = _counter(
+    'televip_cache_requests_total', 'Consultas ao cache por resultado', ['cache', 'result'])
+BOT_UPDATE_LATENCY = _histogram(
+    'televip_bot_update_duration_seconds', 'Tempo de processamento de updates do bot', ['kind'])
+BOT_LOOP_LAG = _histogram(
+    'televip_bot_loop_lag_seconds', 'Atraso do event loop do bot', [], buckets=LOOP_LAG_BUCKETS)
+BOT_LOOP_BLOCKS = _counter(
+    'televip_bot_loop_blocks_total', 'Bloqueios do event loop do bot acima do limite', ['where'])
+BOT_LOOP_BLOCKED_SECONDS = _counter(
+    'televip_bot_loop_blocked_seconds_total', 'Tempo de event loop bloqueado por local', ['where'])
+DB_POOL_IN_USE = _gauge(
+    'televip_db_pool_connections_in_use', 'Conexões do pool do SQLAlchemy em uso', ['process'])
+DB_POOL_CAPACITY = _gauge(
+    'televip_db_pool_capacity', 'Máximo de conexões do pool (pool_size + max_overflow)', ['process'])
+BOT_STARTUP = _gauge(
+    'televip_bot_startup_seconds', 'Duração das fases do startup do bot', ['phase'])
+
+
+# Queries e tempo de banco por unidade de trabalho (request, update, job)
+
+def observe_db(scope, name, profile):
+    DB_QUERIES.labels(scope, name).observe(profile.queries)
+    DB_TIME.labels(scope, name).observe(profile.duration)
+
+
+@contextmanager
+def track_db(scope, name):
+    """Contar queries e tempo de banco do bloco (ver app/utils/sql_profiler.py)"""
+    with sql_profiler.profile_queries() as profile:
+        try:
+            yield profile
+        finally:
+            observe_db(scope, name, profile)
+
+
+def pool_capacity(pool):
+    """pool_size + max_overflow; 0 para pools sem limite (SQLite, NullPool)"""
+    if not isinstance(pool, QueuePool):
+        return 0
+    max_overflow = getattr(pool, '_max_overflow', 0)
+    return 0 if max_overflow < 0 else pool.size() + max_overflow
+
+
+def instrument_pool(engine, process):
+    """Acompanhar as conexões em uso do pool do ``engine``"""
+    if not has_prometheus or getattr(engine.pool, '_televip_instrumented', False):
+        return
+    engine.pool._televip_instrumented = True
+    in_use = DB_POOL_IN_USE.labels(process)
+    DB_POOL_CAPACITY.labels(process).set(pool_capacity(engine.pool))
+    event.listen(engine.pool, 'checkout', lambda *args: in_use.inc())
+    event.listen(engine.pool, 'checkin', lambda *args: in_use.dec())
+
+
+# Chamadas externas
+
+_STRIPE_ID = re.compile(r'[a-z]{1,8}_[A-Za-z0-9_]*[A-Z0-9][A-Za-z0-9_]*')
+
+
+def stripe_operation(method, url):
+    """``GET /v1/customers/:id`` — ids trocados para não explodir os labels"""
+    segments = urlsplit(url).path.split('/')
+    path = '/'.join(':id' if _STRIPE_ID.fullmatch(s) else s for s in segments)
+    return f'{method.upper()} {path}'
+
+
+def telegram_operation(url):
+    """Método da Bot API (``sendMessage``), sem o token que vai na URL"""
+    return urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1] or 'unknown'
+
+
+def observe_external(service, operation, seconds, status_code=None):
+    EXTERNAL_LATENCY.labels(service, operation).observe(seconds)
+    if status_code == 429:
+        EXTERNAL_RATE_LIMITED.labels(service, operation).inc()
+
+
+def _on_telegram_response(response, *args, **kwargs):
+    operation = telegram_operation(response.url)
+    seconds = response.elapsed.total_seconds()
+    observe_external('telegram', operation, seconds, response.status_code)
+    tracing.record_span(f'telegram {operation}', seconds, attributes={'http.status_code': response.status_code},
+                        error=f'HTTP {response.status_code}' if response.status_code >= 400 else None)
+
+
+# hooks= para as chamadas à Bot API feitas com requests no Flask
+TELEGRAM_HOOKS = {'response': _on_telegram_response}
+
+
+def install_stripe_client():
+    """Trocar o cliente HTTP global do SDK do Stripe pelo instrumentado"""
+    import stripe
+
+    if getattr(stripe.default_http_client, 'instrumented', False):
+        return
+
+    class InstrumentedStripeClient(stripe.RequestsClient):
+        instrumented = True
+
+        def request(self, method, url, headers, post_data=None):
+            operation = stripe_operation(method, url)
+            start = time.perf_counter()
+            status = None
+            with tracing.start_span(f'stripe {operation}', tracing.KIND_CLIENT) as span:
+                try:
+                    content, status, response_headers = super().request(method, url, headers, post_data)
+                    return content, status, response_headers
+                finally:
+                    observe_external('stripe', operation, time.perf_counter() - start, status)
+                    if span is not None:
+                        span.set_attribute('http.status_code', status)
+                        if status is None or status >= 400:
+                            span.set_error(f'HTTP {status}')
+
+    stripe.default_http_client = InstrumentedStripeClient(
+        verify_ssl_certs=stripe.verify_ssl_certs, proxy=stripe.proxy)
+
+
+# Broadcasts, jobs e cache
+
+def record_broadcast(source, sent, failed=0):
+    if sent:
+        BROADCAST_MESSAGES.labels(source, 'sent').inc(sent)
+    if failed:
+        BROADCAST_MESSAGES.labels(source, 'failed').inc(failed)
+
+
+def record_job_items(job, count):
+    if count:
+        JOB_ITEMS.labels(job).inc(count)
+
+
+def instrument_job(job, trace=True):
+    """Decorator de job assíncrono: duração, queries e span (``trace``) de cada execução"""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with (tracing.start_span(f'job {job}') if trace else nullcontext()), track_db('job', job):
+                    return await func(*args, **kwargs)
+            finally:
+                JOB_DURATION.labels(job).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache_name, result):
+    CACHE_REQUESTS.labels(cache_name, result).inc()
+
+
+# Endpoint /metrics e instrumentação das requisições
+
+def render_latest():
+    """(corpo, content-type) no formato de exposição do Prometheus"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _scrape_allowed():
+    from flask import current_app, request
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    try:
+        address = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+def metrics_view():
+    from flask import Response, abort
+    if not has_prometheus:
+        abort(404)
+    if not _scrape_allowed():
+        abort(403)
+    body, content_type = render_latest()
+    return Response(body, content_type=content_type)
+
+
+def init_app(app):
+    """Medir cada request (latência + banco), o pool e registrar a rota /metrics"""
+    from flask import g, request
+    install_stripe_client()  # latência e spans (tracing) das chamadas ao Stripe
+    if has_prometheus:
+        from app import db
+        with app.app_context():
+            instrument_pool(db.engine, 'web')
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        endpoint = request.endpoint or 'unmatched'
+        if start is not None and endpoint != 'metrics':
+            HTTP_LATENCY.labels(request.method, endpoint, response.status_code).observe(
+                time.perf_counter() - start)
+            profile = sql_profiler.request_profile()
+            if profile is not None:
+                observe_db('http', endpoint, profile)
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
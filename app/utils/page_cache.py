@@ -0,0 +1,141 @@
+"""Cache de página inteira para as páginas públicas (criador e landing de grupo).
+
+O HTML renderizado fica no cache por PUBLIC_PAGE_CACHE_TTL segundos,
+indexado pelo caminho da URL. Cada entrada guarda as surrogate keys
+(``creator:<id>``, ``group:<id>``) usadas na renderização e a versão de
+cada uma naquele momento. ``purge_surrogate_keys`` troca a versão: todas as
+páginas marcadas com a chave deixam de valer, sem precisar listar URLs.
+
+O purge é automático no commit de alterações em Creator, Group e
+PricingPlan (perfil, planos, visibilidade). Contagens de assinantes só se
+atualizam no fim do TTL.
+
+As respostas saem com ETag, Last-Modified e Cache-Control público, além do
+header ``Surrogate-Key`` para purge em CDN — um link viral custa uma
+renderização por TTL.
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import cache
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_STALE_KEY = 'stale_surrogate_keys'
+
+
+def _page_key(path):
+    return f'page:{path}'
+
+
+def _surrogate_key(key):
+    return f'surrogate:{key}'
+
+
+def add_surrogate_keys(*keys):
+    """Marcar a página em renderização com as surrogate keys dadas"""
+    if '_surrogate_keys' not in g:
+        g._surrogate_keys = set()
+    g._surrogate_keys.update(keys)
+
+
+def purge_surrogate_keys(*keys):
+    """Invalidar todas as páginas marcadas com alguma das chaves"""
+    version = time.time_ns()
+    for key in keys:
+        cache.set(_surrogate_key(key), version, timeout=0)
+
+
+def _current_versions(keys):
+    return dict(zip(keys, cache.get_many(*[_surrogate_key(k) for k in keys])))
+
+
+def _build_response(entry, hit):
+    ttl = current_app.config.get('PUBLIC_PAGE_CACHE_TTL', 60)
+    response = Response(entry['body'], mimetype='text/html')
+    response.set_etag(entry['etag'])
+    response.last_modified = datetime.fromtimestamp(entry['rendered_at'], tz=timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.max_age = ttl
+    response.cache_control.s_maxage = ttl
+    response.headers['Surrogate-Key'] = ' '.join(sorted(entry['versions']))
+    response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    metrics.record_cache('page', 'hit' if hit else 'miss')
+    return response.make_conditional(request)
+
+
+def cached_page(view):
+    """Servir a view do cache (por caminho), com GET condicional"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+
+        key = _page_key(request.path)
+        entry = cache.get(key)
+        if entry and _current_versions(list(entry['versions'])) == entry['versions']:
+            return _build_response(entry, hit=True)
+
+        g._surrogate_keys = set()
+        body = view(*args, **kwargs)
+        if not isinstance(body, str):
+            return body  # redirect/erro: não cachear
+
+        keys = sorted(g.pop('_surrogate_keys', set()))
+        entry = {
+            'body': body,
+            'etag': hashlib.sha1(body.encode()).hexdigest()[:20],
+            'rendered_at': int(time.time()),
+            'versions': _current_versions(keys),
+        }
+        cache.set(key, entry, timeout=current_app.config.get('PUBLIC_PAGE_CACHE_TTL', 60))
+        return _build_response(entry, hit=False)
+
+    return wrapper
+
+
+# Purge automático: chaves afetadas coletadas no flush, aplicadas após o commit
+
+def _keys_for(obj):
+    from app.models import Creator, Group, PricingPlan
+    if isinstance(obj, Creator):
+        return [f'creator:{obj.id}']
+    if isinstance(obj, Group):
+        return [f'group:{obj.id}', f'creator:{obj.creator_id}']
+    if isinstance(obj, PricingPlan):
+        return [f'group:{obj.group_id}']
+    return []
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_pages(session, flush_context):
+    keys = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        keys.update(_keys_for(obj))
+    if keys:
+        session.info.setdefault(_STALE_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, 'after_commit')
+def _purge_stale_pages(session):
+    keys = session.info.pop(_STALE_KEY, None)
+    if not keys or not has_app_context():
+        return
+    try:
+        purge_surrogate_keys(*keys)
+    except Exception as e:
+        logger.warning(f"Falha ao invalidar páginas públicas ({', '.join(sorted(keys))}): {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stale_pages(session):
+    session.info.pop(_STALE_KEY, None)
@@ -0,0 +1,133 @@
+"""Paginação por cursor (keyset) para listagens grandes.
+
+Em vez de OFFSET, cada página filtra a partir da última linha vista usando a
+chave de ordenação + id (``(created_at, id)``, ``(end_date, id)``), então a
+página 500 custa o mesmo que a primeira. Totais são aproximados (cache curto).
+Listagens que incluem o histórico arquivado intercalam a tabela quente e a de
+arquivo com ``keyset_paginate_union``.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from app import cache
+
+COUNT_CACHE_TIMEOUT = 60
+
+
+def encode_cursor(sort_value, row_id):
+    """Serializar (valor de ordenação, id) num token opaco para a URL"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Token -> (datetime, id). Retorna None se ausente ou inválido."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """Uma página de resultados com cursores para a anterior e a próxima"""
+
+    def __init__(self, items, per_page, has_next, has_prev, sort_attr, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.total = total
+        self.next_cursor = self._cursor_for(items[-1], sort_attr) if has_next and items else None
+        self.prev_cursor = self._cursor_for(items[0], sort_attr) if has_prev and items else None
+
+    @staticmethod
+    def _cursor_for(item, sort_attr):
+        return encode_cursor(getattr(item, sort_attr), item.id)
+
+    def to_dict(self, serialize):
+        return {
+            'items': [serialize(item) for item in self.items],
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'has_next': self.has_next,
+            'total': self.total,
+        }
+
+
+def _window(query, sort_column, id_column, after_key, before_key, limit):
+    """Linhas de ``query`` depois/antes do cursor, na ordem em que a página anda"""
+    query = query.order_by(None)
+    if before_key:
+        value, row_id = before_key
+        return query.filter(or_(
+            sort_column > value, and_(sort_column == value, id_column > row_id)
+        )).order_by(sort_column.asc(), id_column.asc()).limit(limit).all()
+    if after_key:
+        value, row_id = after_key
+        query = query.filter(or_(
+            sort_column < value, and_(sort_column == value, id_column < row_id)
+        ))
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(limit).all()
+
+
+def keyset_paginate(query, sort_column, id_column, after=None, before=None, per_page=20, total=None):
+    """Paginar ``query`` em ordem decrescente de (sort_column, id_column).
+
+    ``after``/``before`` são cursores (token) da última/primeira linha da
+    página atual. Sem cursor, retorna a primeira página.
+    """
+    return keyset_paginate_union([(query, sort_column, id_column)], after=after, before=before,
+                                 per_page=per_page, total=total)
+
+
+def keyset_paginate_union(sources, after=None, before=None, per_page=20, total=None):
+    """Paginar várias queries como uma listagem só (ex.: tabela quente + arquivo).
+
+    ``sources`` é uma lista de ``(query, sort_column, id_column)`` cujas
+    linhas têm o mesmo atributo de ordenação e ids que não se repetem entre
+    as queries. Cada query busca no máximo uma página a partir do cursor e
+    as linhas são intercaladas por (ordenação, id).
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if not after_key else None
+    sort_attr = sources[0][1].key
+
+    rows = []
+    for query, sort_column, id_column in sources:
+        rows.extend(_window(query, sort_column, id_column, after_key, before_key, per_page + 1))
+    if len(sources) > 1:
+        rows.sort(key=lambda row: (getattr(row, sort_attr) or datetime.min, row.id),
+                  reverse=not before_key)
+
+    if before_key:
+        # Página anterior: andou para trás em ordem crescente, inverter
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_key is not None
+
+    return KeysetPage(items, per_page, has_next, has_prev, sort_attr, total=total)
+
+
+def cached_count(query, *key_parts, timeout=COUNT_CACHE_TIMEOUT):
+    """COUNT(*) da query com cache curto — total aproximado para a listagem"""
+    digest = hashlib.sha1(repr(key_parts).encode()).hexdigest()
+    key = f"keyset_count:{digest}"
+    total = cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache.set(key, total, timeout=timeout)
+    return total
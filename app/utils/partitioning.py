@@ -0,0 +1,123 @@
+"""
+Partições mensais de ``transactions`` (só PostgreSQL)
+
+No PostgreSQL a migration f9b1e3c5a7d2 transforma ``transactions`` numa
+tabela particionada por intervalo de ``created_at``, uma partição por mês
+(``transactions_y2026m10``) e uma ``transactions_default`` para o que cair
+fora delas. As telas de receita filtram por período em ``created_at``
+(sem ``DATE()``/``func.date`` no filtro), então o planner só lê as partições
+do período (partition pruning).
+
+``ensure_transaction_partitions`` cria as partições do mês atual até
+MONTHS_AHEAD meses à frente; roda 1x por dia no bot (worker 0) e com
+``flask partitions``. Se a partição default já tiver linhas de um mês que
+está ganhando partição, elas são movidas na mesma transação. No SQLite (dev e
+testes) a tabela é comum e tudo aqui é no-op.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'transactions'
+DEFAULT_PARTITION = f'{TABLE}_default'
+MONTHS_AHEAD = 3
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f'{TABLE}_y{month:%Y}m{month:%m}'
+
+
+def partition_ddl(month: datetime) -> str:
+    """CREATE TABLE da partição do mês (``month`` = primeiro dia)"""
+    return (f"CREATE TABLE {partition_name(month)} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')")
+
+
+def is_partitioned(connection) -> bool:
+    """``transactions`` é particionada (PostgreSQL com a migration aplicada)?"""
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {'table': TABLE}).scalar()
+
+
+def existing_partitions(connection) -> set:
+    return set(connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {'table': TABLE}).scalars())
+
+
+def _create_partition(connection, month: datetime) -> bool:
+    """Criar a partição, movendo da default as linhas do mês (se houver)"""
+    # Bot e ``flask partitions`` podem rodar ao mesmo tempo
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:table))"), {'table': TABLE})
+    if connection.execute(text("SELECT to_regclass(:name)"), {'name': partition_name(month)}).scalar():
+        return False
+
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    in_month = 'created_at >= :start AND created_at < :end'
+    has_rows = connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})"
+    ), bounds).scalar()
+    if has_rows:
+        connection.execute(text(f"CREATE TEMP TABLE _moved_transactions (LIKE {TABLE}) ON COMMIT DROP"))
+        connection.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING *) "
+            f"INSERT INTO _moved_transactions SELECT * FROM moved"
+        ), bounds)
+    connection.execute(text(partition_ddl(month)))
+    if has_rows:
+        connection.execute(text(f"INSERT INTO {TABLE} SELECT * FROM _moved_transactions"))
+    return True
+
+
+def ensure_transaction_partitions(engine, months_ahead=MONTHS_AHEAD, now=None):
+    """Criar as partições que faltam do mês atual até ``months_ahead`` meses à frente
+
+    Retorna os nomes das partições criadas (vazio fora do PostgreSQL).
+    """
+    created = []
+    with engine.connect() as connection:
+        if not is_partitioned(connection):
+            return created
+        existing = existing_partitions(connection)
+        connection.commit()
+        current = month_start(now or datetime.utcnow())
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if partition_name(month) in existing:
+                continue
+            with connection.begin():
+                if _create_partition(connection, month):
+                    created.append(partition_name(month))
+
+    if created:
+        logger.info(f"Partições criadas: {', '.join(created)}")
+    return created
+
+
+def init_app(app):
+    """Registrar ``flask partitions``"""
+    import click
+
+    @app.cli.command('partitions')
+    @click.option('--months-ahead', default=MONTHS_AHEAD, show_default=True)
+    def partitions_command(months_ahead):
+        """Criar as partições mensais de transactions que faltam (PostgreSQL)"""
+        from app import db
+        created = ensure_transaction_partitions(db.engine, months_ahead)
+        click.echo(f"{len(created)} partições criadas" + (f": {', '.join(created)}" if created else ''))
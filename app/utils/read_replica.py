@@ -0,0 +1,95 @@
+"""Réplica de leitura para as telas de relatório.
+
+Analytics, estatísticas do grupo, painel admin e exportações fazem as
+consultas mais pesadas do sistema e rodavam no mesmo primário que recebe os
+webhooks e as escritas do bot. Com ``DATABASE_REPLICA_URL`` definido, essas
+views (marcadas com ``@use_replica``) leem do bind ``replica``:
+
+- ``RoutingSession`` (o ``db.session``) manda para a réplica os SELECTs
+  feitos durante uma view marcada; flush e INSERT/UPDATE/DELETE continuam
+  no primário;
+- guarda de staleness: quando um request do usuário grava algo, o horário
+  fica na sessão (``_db_last_write``) e, por READ_REPLICA_STALENESS_SECONDS
+  (padrão 10), as views de relatório desse usuário leem do primário — ele
+  vê as próprias alterações mesmo com a réplica atrasada.
+
+Sem réplica configurada, ``@use_replica`` não faz nada. Em testes, a réplica
+pode ser um segundo PostgreSQL local ou uma cópia do arquivo SQLite.
+"""
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+LAST_WRITE_KEY = '_db_last_write'
+DEFAULT_STALENESS_SECONDS = 10
+
+
+class RoutingSession(Session):
+    """``db.session`` que lê da réplica durante as views ``@use_replica``"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not isinstance(clause, UpdateBase)
+                and has_request_context() and g.get('_read_replica')):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(db_session, flush_context):
+    if has_request_context():
+        g._db_wrote = True
+
+
+def configured(app=None):
+    """Há um bind ``replica`` (DATABASE_REPLICA_URL)?"""
+    app = app or current_app
+    return REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def is_stale():
+    """O usuário gravou algo há menos de READ_REPLICA_STALENESS_SECONDS?"""
+    last_write = session.get(LAST_WRITE_KEY)
+    if last_write is None:
+        return False
+    window = current_app.config.get('READ_REPLICA_STALENESS_SECONDS', DEFAULT_STALENESS_SECONDS)
+    return time.time() - last_write < window
+
+
+def use_replica(view):
+    """Ler da réplica nesta view (exceto logo após escritas do próprio usuário)"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g._read_replica = configured() and not is_stale()
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_app(app):
+    """Registrar as escritas do usuário (guarda de staleness) e medir o pool da réplica"""
+    if not configured(app):
+        return
+
+    from app import db
+    from app.utils import metrics
+    if metrics.has_prometheus:
+        with app.app_context():
+            metrics.instrument_pool(db.engines[REPLICA_BIND], 'web_replica')
+
+    @app.after_request
+    def _remember_write(response):
+        if g.pop('_db_wrote', False) and current_user.is_authenticated:
+            session[LAST_WRITE_KEY] = time.time()
+        return response
+
+    @app.teardown_request
+    def _end_replica_reads(exc):
+        # Depois do streaming das exportações (stream_with_context)
+        g.pop('_read_replica', None)
@@ -303,28 +303,23 @@ _IMAGE_SIGNATURES = {
 }
 
 
-def validate_and_sanitize_image(file, max_size=MAX_IMAGE_SIZE):
+def validate_image_upload(file, max_size=MAX_IMAGE_SIZE):
     """
-    Validate uploaded image file for security:
+    Cheap upload validation, without decoding the image:
     1. Check extension is allowed
     2. Check file size
     3. Verify magic bytes match claimed extension
-    4. Re-process with Pillow to strip metadata and validate pixel data
-    5. Return sanitized image bytes
 
     Args:
         file: werkzeug FileStorage object
         max_size: Maximum file size in bytes
 
     Returns:
-        (sanitized_bytes, extension) tuple on success
+        Normalized extension ('png', 'jpg' or 'gif')
 
     Raises:
         ValueError with user-friendly message on any validation failure
     """
-    from PIL import Image
-    import io
-
     if not file or file.filename == '':
         raise ValueError('Nenhum arquivo selecionado.')
 
@@ -366,6 +361,34 @@ def validate_and_sanitize_image(file, max_size=MAX_IMAGE_SIZE):
     if ext_normalized != detected_normalized:
         raise ValueError('Extensão não corresponde ao conteúdo do arquivo.')
 
+    return ext
+
+
+def validate_and_sanitize_image(file, max_size=MAX_IMAGE_SIZE):
+    """
+    Validate uploaded image file for security:
+    1-3. validate_image_upload (extension, size, magic bytes)
+    4. Re-process with Pillow to strip metadata and validate pixel data
+    5. Return sanitized image bytes
+
+    Avatar and cover uploads use the async pipeline in
+    app/services/media_service.py instead.
+
+    Args:
+        file: werkzeug FileStorage object
+        max_size: Maximum file size in bytes
+
+    Returns:
+        (sanitized_bytes, extension) tuple on success
+
+    Raises:
+        ValueError with user-friendly message on any validation failure
+    """
+    from PIL import Image
+    import io
+
+    ext = validate_image_upload(file, max_size)
+
     # 4. Re-process with Pillow (strips EXIF, validates pixel data, prevents polyglot files)
     try:
         img = Image.open(file)
@@ -0,0 +1,79 @@
+"""Expiração deslizante da sessão com escrita limitada no Redis.
+
+Antes, ``session.permanent = True`` em todo request marcava a sessão como
+modificada: o Flask-Session reserializava e regravava a sessão no Redis
+(e renovava o TTL) a cada hit — inclusive estáticos e polling.
+
+``ThrottledSessionInterface`` envolve a interface do Flask-Session:
+- a sessão só é gravada quando modificada ou quando a última renovação tem
+  mais de SESSION_REFRESH_INTERVAL segundos (o timeout por inatividade
+  continua valendo, com folga de no máximo um intervalo);
+- rotas em SESSION_SKIP_PREFIXES (estáticos, webhooks) recebem uma sessão
+  vazia em memória: nenhuma leitura nem escrita no Redis.
+
+Os contadores (por worker) aparecem em /admin/cache-stats.
+"""
+import time
+
+from flask.sessions import SecureCookieSession
+
+REFRESHED_AT_KEY = '_refreshed_at'
+
+
+class TransientSession(SecureCookieSession):
+    """Sessão vazia em memória para rotas ignoradas (nunca é lida nem gravada)"""
+
+
+class ThrottledSessionInterface:
+    """Delega para a interface original, decidindo quando a sessão é gravada"""
+
+    def __init__(self, inner, refresh_interval=300, skip_prefixes=('/static', '/webhooks')):
+        self.inner = inner
+        self.refresh_interval = refresh_interval
+        self.skip_prefixes = tuple(skip_prefixes)
+
+        self.requests = 0
+        self.skipped = 0
+        self.writes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def open_session(self, app, request):
+        self.requests += 1
+        if request.path.startswith(self.skip_prefixes):
+            self.skipped += 1
+            return TransientSession()
+        return self.inner.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if isinstance(session, TransientSession):
+            return None
+        if session:
+            now = int(time.time())
+            if session.modified or now - session.get(REFRESHED_AT_KEY, 0) >= self.refresh_interval:
+                session[REFRESHED_AT_KEY] = now  # marca como modificada: grava e renova o TTL
+                self.writes += 1
+        elif session.modified:
+            self.writes += 1  # sessão esvaziada (logout): o backend apaga a chave
+        return self.inner.save_session(app, session, response)
+
+    def stats(self):
+        """Gravações feitas vs. uma por request (comportamento anterior)"""
+        return {
+            'requests': self.requests,
+            'skipped_requests': self.skipped,
+            'writes': self.writes,
+            'writes_avoided': self.requests - self.writes,
+            'write_reduction': round(1 - self.writes / self.requests, 4) if self.requests else None,
+        }
+
+
+def init_session_refresh(app):
+    """Envolver a interface de sessão já configurada pelo Flask-Session"""
+    app.session_interface = ThrottledSessionInterface(
+        app.session_interface,
+        refresh_interval=app.config.get('SESSION_REFRESH_INTERVAL', 300),
+        skip_prefixes=app.config.get('SESSION_SKIP_PREFIXES', ('/static', '/webhooks')),
+    )
+    return app.session_interface
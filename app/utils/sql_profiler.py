@@ -0,0 +1,236 @@
+"""Profiler de SQL por request do Flask e por update do bot.
+
+Os eventos de cursor do SQLAlchemy (em qualquer Engine: Flask e bot) contam
+as queries, o tempo de banco e quantas vezes cada statement rodou dentro da
+unidade de trabalho atual. O "formato" de um statement é o SQL com literais
+e listas de IN colapsados — o mesmo SELECT repetido dentro de um loop
+aparece como um formato com contagem alta (N+1).
+
+- Flask: cada request ganha um ``QueryProfile``; requests acima de
+  SQL_PROFILER_SLOW_MS ou com um formato repetido SQL_N_PLUS_ONE_THRESHOLD
+  vezes ou mais são logados com os statements que mais pesaram. Com
+  SQL_PROFILER_SERVER_TIMING o header ``Server-Timing`` mostra o banco no
+  DevTools.
+- Bot: ``ChatOrderedUpdateProcessor`` faz o mesmo por update (limites nas
+  variáveis de ambiente de mesmo nome).
+- Testes: ``max_queries(n)`` (context manager ou decorator; fixture
+  ``max_queries`` no conftest) falha com o relatório quando o bloco passa de
+  n queries.
+
+Os profiles ativos formam uma pilha por task/thread (contextvars): um bloco
+``max_queries`` em volta de ``client.get`` enxerga as queries do request.
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from contextlib import ContextDecorator, contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_MS = 500
+DEFAULT_N_PLUS_ONE = 10
+REPORT_TOP = 5
+
+_active = contextvars.ContextVar('televip_sql_profiles', default=())
+_QUERY_START_KEY = '_sql_profiler_start'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_IN_LIST = re.compile(rf'\(\s*{_PARAM}(?:\s*,\s*{_PARAM})+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(statement):
+    """Formato do statement: literais viram ``?`` e listas de IN ``(?...)``"""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryProfile:
+    """Queries de uma unidade de trabalho (request, update, bloco de teste)"""
+
+    __slots__ = ('queries', 'duration', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+        self.statements = {}  # SQL -> [execuções, segundos]
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.duration += seconds
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def shapes(self):
+        """[(formato, execuções, segundos)], do mais caro para o mais barato"""
+        merged = {}
+        for statement, (count, seconds) in self.statements.items():
+            entry = merged.setdefault(normalize(statement), [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+        return sorted(((shape, c, s) for shape, (c, s) in merged.items()),
+                      key=lambda item: (item[2], item[1]), reverse=True)
+
+    def repeated(self, threshold):
+        """Formatos executados ``threshold`` vezes ou mais (suspeitos de N+1)"""
+        return sorted((item for item in self.shapes() if item[1] >= threshold),
+                      key=lambda item: item[1], reverse=True)
+
+    def report(self, top=REPORT_TOP):
+        lines = [f'{self.queries} queries, {self.duration * 1000:.1f}ms de banco']
+        for shape, count, seconds in self.shapes()[:top]:
+            lines.append(f'  {count:>4}x {seconds * 1000:8.1f}ms  {shape[:300]}')
+        return '\n'.join(lines)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get():
+        conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiles = _active.get()
+    starts = conn.info.get(_QUERY_START_KEY)
+    if not profiles or not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    for profile in profiles:
+        profile.record(statement, seconds)
+
+
+def push_profile(profile=None):
+    """Ativar um profile; devolve (profile, token para ``pop_profile``)"""
+    profile = profile or QueryProfile()
+    return profile, _active.set(_active.get() + (profile,))
+
+
+def pop_profile(token):
+    _active.reset(token)
+
+
+@contextmanager
+def profile_queries():
+    """Registrar as queries do bloco (task/thread atual)"""
+    profile, token = push_profile()
+    try:
+        yield profile
+    finally:
+        pop_profile(token)
+
+
+def check(profile, label, elapsed=None, slow_ms=None, n_plus_one=None):
+    """Logar a unidade de trabalho se ela foi lenta ou repetiu um statement"""
+    slow_ms = DEFAULT_SLOW_MS if slow_ms is None else slow_ms
+    n_plus_one = DEFAULT_N_PLUS_ONE if n_plus_one is None else n_plus_one
+    elapsed = profile.duration if elapsed is None else elapsed
+
+    problems = []
+    if slow_ms > 0 and elapsed * 1000 >= slow_ms:
+        problems.append(f'lento ({elapsed * 1000:.0f}ms)')
+    repeated = profile.repeated(n_plus_one) if n_plus_one > 0 else []
+    if repeated:
+        problems.append(f'possível N+1 ({repeated[0][1]}x o mesmo statement)')
+    if problems:
+        logger.warning(f"SQL {label}: {', '.join(problems)} — {profile.report()}")
+    return problems
+
+
+def bot_limits():
+    """(slow_ms, n_plus_one) para os updates do bot, das variáveis de ambiente"""
+    return (int(os.getenv('SQL_PROFILER_SLOW_MS', DEFAULT_SLOW_MS)),
+            int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE)))
+
+
+# Flask
+
+def request_profile():
+    """Profile do request atual (ou None fora de um request perfilado)"""
+    from flask import g
+    return g.get('_sql_profile')
+
+
+def init_app(app):
+    """Perfilar cada request; registrar antes das métricas (que leem o profile)"""
+    from flask import current_app, g, request
+
+    @app.before_request
+    def _start_sql_profile():
+        g._sql_profile, g._sql_profile_token = push_profile()
+        g._sql_profile_started = time.perf_counter()
+
+    @app.after_request
+    def _finish_sql_profile(response):
+        profile = g.pop('_sql_profile', None)
+        token = g.pop('_sql_profile_token', None)
+        started = g.pop('_sql_profile_started', None)
+        if token is not None:
+            pop_profile(token)
+        if profile is None or request.endpoint in ('static', 'metrics'):
+            return response
+
+        config = current_app.config
+        check(profile, f'{request.method} {request.endpoint or request.path}',
+              elapsed=time.perf_counter() - started,
+              slow_ms=config.get('SQL_PROFILER_SLOW_MS', DEFAULT_SLOW_MS),
+              n_plus_one=config.get('SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE))
+        if config.get('SQL_PROFILER_SERVER_TIMING', app.debug):
+            response.headers.add(
+                'Server-Timing', f'db;dur={profile.duration * 1000:.1f};desc="{profile.queries} queries"')
+        return response
+
+    @app.teardown_request
+    def _discard_sql_profile(exc):
+        # Exceção propagada (sem after_request): só desempilhar
+        token = g.pop('_sql_profile_token', None)
+        g.pop('_sql_profile', None)
+        if token is not None:
+            pop_profile(token)
+
+
+# Testes
+
+class TooManyQueries(AssertionError):
+    pass
+
+
+class max_queries(ContextDecorator):
+    """Falhar se o bloco/função fizer mais de ``limit`` queries::
+
+        with max_queries(5):
+            client.get('/groups/')
+
+        @max_queries(3)
+        def test_algo(...): ...
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.profile = None
+        self._token = None
+
+    def __enter__(self):
+        self.profile, self._token = push_profile()
+        return self.profile
+
+    def __exit__(self, exc_type, exc, tb):
+        pop_profile(self._token)
+        if exc_type is None and self.profile.queries > self.limit:
+            raise TooManyQueries(
+                f'Esperado no máximo {self.limit} queries, executadas {self.profile.queries}:\n'
+                f'{self.profile.report(top=10)}')
+        return False
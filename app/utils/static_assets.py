@@ -0,0 +1,182 @@
+"""Assets estáticos com fingerprint e pré-compressão.
+
+``flask build-assets`` copia cada arquivo de ``app/static`` (menos
+``uploads/``) para ``static/dist/`` com o hash do conteúdo no nome
+(``css/dashboard.css`` -> ``dist/css/dashboard.3fa2c1d9e0ab.css``) e grava
+ao lado as versões ``.gz`` e ``.br`` (brotli, se instalado) dos tipos
+compressíveis. O mapa fica em ``static/dist/manifest.json``.
+
+Com o manifesto carregado e STATIC_FINGERPRINT ligado, ``url_for('static',
+filename=...)`` passa a gerar a URL com hash e a rota de estáticos serve a
+variante pré-comprimida aceita pelo cliente, com Cache-Control imutável de
+um ano. Sem manifesto (ou em desenvolvimento), nada muda.
+
+O build mantém os arquivos da geração anterior: HTML ainda em cache (CDN,
+navegador) continua achando os assets que referencia.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+
+import click
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+    has_brotli = True
+except ImportError:
+    brotli = None
+    has_brotli = False
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+SKIP_DIRS = ('uploads', DIST_DIR)
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.json', '.txt', '.xml', '.map'}
+MIN_COMPRESS_SIZE = 256  # bytes; abaixo disso o header custa mais que o ganho
+IMMUTABLE_MAX_AGE = 31536000  # 1 ano
+
+
+def _hashed_name(relpath, data):
+    stem, ext = os.path.splitext(relpath)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _compressed_siblings(data):
+    """(sufixo, bytes) das versões comprimidas que valem a pena"""
+    siblings = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if has_brotli:
+        siblings.append(('.br', brotli.compress(data, quality=11)))
+    return [(suffix, blob) for suffix, blob in siblings if len(blob) < len(data)]
+
+
+def read_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_assets(static_folder):
+    """Gerar ``static/dist`` e o manifesto; devolve o manifesto novo"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    previous = read_manifest(static_folder)
+    manifest = {}
+    written = set()
+
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder)
+        if rel_root == '.':
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        else:
+            dirs.sort()
+        for filename in sorted(files):
+            if filename.startswith('.'):
+                continue
+            relpath = os.path.normpath(os.path.join(rel_root, filename)).replace(os.sep, '/')
+            with open(os.path.join(root, filename), 'rb') as f:
+                data = f.read()
+
+            hashed = _hashed_name(relpath, data)
+            target = os.path.join(dist, hashed)
+            if not os.path.exists(target):
+                _write(target, data)
+            written.add(hashed)
+
+            if os.path.splitext(filename)[1].lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+                for suffix, blob in _compressed_siblings(data):
+                    if not os.path.exists(target + suffix):
+                        _write(target + suffix, blob)
+                    written.add(hashed + suffix)
+            manifest[relpath] = f'{DIST_DIR}/{hashed}'
+
+    # Manter a geração atual e a anterior; remover o resto
+    keep = written | {path[len(DIST_DIR) + 1:] for path in previous.values()}
+    keep |= {name + suffix for name in keep for suffix in ('.gz', '.br')}
+    for root, _, files in os.walk(dist):
+        for filename in files:
+            relpath = os.path.relpath(os.path.join(root, filename), dist).replace(os.sep, '/')
+            if relpath != MANIFEST_FILE and relpath not in keep:
+                os.remove(os.path.join(root, filename))
+
+    _write(os.path.join(dist, MANIFEST_FILE), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    logger.info(f"Assets gerados: {len(manifest)} arquivos em {dist}")
+    return manifest
+
+
+def load(app):
+    """(Re)carregar o manifesto; sem ele os estáticos seguem como antes"""
+    manifest = {}
+    if app.config.get('STATIC_FINGERPRINT', not app.debug):
+        manifest = read_manifest(app.static_folder)
+        if not manifest:
+            logger.info("Manifesto de assets ausente; rode 'flask build-assets' para ativar o fingerprint")
+    app.extensions['static_assets'] = manifest
+    return manifest
+
+
+def _send_dist(filename):
+    """Servir um arquivo de dist/ (pré-comprimido se o cliente aceitar)"""
+    static_folder = current_app.static_folder
+    path = safe_join(static_folder, filename)
+    response = None
+    if path and os.path.isfile(path):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[encoding] and os.path.isfile(path + suffix):
+                response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+    if response is None:
+        response = current_app.send_static_file(filename)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    """Registrar o comando de build, o url_for com hash e a rota de dist/"""
+    load(app)
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Gerar os assets com hash e pré-comprimidos em static/dist"""
+        manifest = build_assets(app.static_folder)
+        click.echo(f"{len(manifest)} assets em {os.path.join(app.static_folder, DIST_DIR)}"
+                   f" (brotli: {'sim' if has_brotli else 'não'})")
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == 'static':
+            hashed = app.extensions.get('static_assets', {}).get(values.get('filename'))
+            if hashed:
+                values['filename'] = hashed
+
+    serve_static = app.view_functions.get('static')
+    if serve_static is None:
+        return
+
+    def static(filename):
+        if filename.startswith(f'{DIST_DIR}/'):
+            return _send_dist(filename)
+        return serve_static(filename=filename)
+
+    app.view_functions['static'] = static
@@ -0,0 +1,472 @@
+"""Tracing distribuído no modelo do OpenTelemetry, sem dependências externas.
+
+Spans com trace id / span id do W3C (header ``traceparent``) cobrem o
+request do Flask, as queries SQL, as chamadas ao Stripe e à Bot API, os
+updates e jobs do bot e a entrega da outbox. O trace atravessa processos:
+
+- header ``traceparent`` nas requisições HTTP recebidas;
+- ``metadata.traceparent`` da sessão de checkout criada pelo bot — o
+  webhook do Stripe continua o trace do clique em "pagar";
+- ``traceparent`` no payload da outbox — a entrega no bot continua o
+  trace do webhook que enfileirou a mensagem.
+
+Exportação (desligada sem nenhuma das duas):
+
+- TRACE_FILE: um span por linha em JSON (``flask trace <trace_id>`` mostra
+  a árvore de um trace);
+- OTEL_EXPORTER_OTLP_ENDPOINT: OTLP/HTTP JSON para um collector
+  (``<endpoint>/v1/traces``).
+
+TRACE_SAMPLE_RATIO (padrão 1.0) amostra os traces novos; traces recebidos
+seguem a decisão de quem os iniciou. OTEL_SERVICE_NAME troca o nome do
+serviço (``televip-web`` / ``televip-bot``).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT, KIND_PRODUCER, KIND_CONSUMER = (
+    'internal', 'server', 'client', 'producer', 'consumer')
+_OTLP_KINDS = {KIND_INTERNAL: 1, KIND_SERVER: 2, KIND_CLIENT: 3, KIND_PRODUCER: 4, KIND_CONSUMER: 5}
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+STATEMENT_MAX_CHARS = 500
+EXPORT_BATCH = 256
+EXPORT_INTERVAL = 1.0
+
+_current = contextvars.ContextVar('televip_span', default=None)
+_tracer = None
+
+
+class SpanContext:
+    """Identidade de um span (o que viaja no ``traceparent``)"""
+    __slots__ = ('trace_id', 'span_id', 'sampled')
+
+    def __init__(self, trace_id, span_id, sampled=True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value):
+    """``SpanContext`` de um header ``traceparent`` (None se ausente/inválido)"""
+    match = _TRACEPARENT.match((value or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2), sampled=int(match.group(3), 16) & 1 == 1)
+
+
+class Span:
+    """Span em andamento; vira um dict ao terminar e vai para o exportador"""
+
+    def __init__(self, tracer, name, kind, context, parent_id, attributes=None, links=None):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.links = [link for link in (links or ()) if link is not None]
+        self.status = 'ok'
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def recording(self):
+        return self.context.sampled
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, error):
+        self.status = 'error'
+        self.error = str(error)[:500] if error else None
+
+    def end(self, end_ns=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.recording:
+            self.tracer.export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.context.trace_id,
+            'span_id': self.context.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'service': self.tracer.service,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': self.status,
+            'error': self.error,
+            'links': [{'trace_id': link.trace_id, 'span_id': link.span_id} for link in self.links],
+        }
+
+
+class FileExporter:
+    """Um span por linha (JSON) em ``path``"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        with open(self.path, 'a') as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + '\n')
+
+
+class OTLPExporter:
+    """OTLP/HTTP com corpo JSON, o formato que o OpenTelemetry Collector aceita"""
+
+    def __init__(self, endpoint, timeout=5):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.timeout = timeout
+
+    def export(self, spans):
+        import requests
+
+        by_service = {}
+        for span in spans:
+            by_service.setdefault(span['service'], []).append(otlp_span(span))
+        body = {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': service})},
+            'scopeSpans': [{'scope': {'name': 'televip'}, 'spans': items}],
+        } for service, items in by_service.items()]}
+        requests.post(self.url, json=body, timeout=self.timeout)
+
+
+class MemoryExporter:
+    """Guarda os spans em memória (testes)"""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def clear(self):
+        self.spans.clear()
+
+
+def otlp_span(span):
+    item = {
+        'traceId': span['trace_id'], 'spanId': span['span_id'], 'name': span['name'],
+        'kind': _OTLP_KINDS.get(span['kind'], 1),
+        'startTimeUnixNano': str(span['start_time_unix_nano']),
+        'endTimeUnixNano': str(span['end_time_unix_nano']),
+        'attributes': _otlp_attributes(span['attributes']),
+        'status': {'code': 2, 'message': span['error'] or ''} if span['status'] == 'error' else {'code': 1},
+        'links': [{'traceId': link['trace_id'], 'spanId': link['span_id']} for link in span['links']],
+    }
+    if span['parent_span_id']:
+        item['parentSpanId'] = span['parent_span_id']
+    return item
+
+
+def _otlp_attributes(attributes):
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        result.append({'key': key, 'value': typed})
+    return result
+
+
+class Tracer:
+    """Cria spans e os exporta em lote numa thread à parte"""
+
+    def __init__(self, service, exporter, sample_ratio=1.0, synchronous=False):
+        self.service = service
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self.synchronous = synchronous
+        self._queue = queue.Queue(maxsize=10_000)
+        self._worker = None
+        self.dropped = 0
+
+    def new_context(self, parent=None):
+        if parent is not None:
+            return SpanContext(parent.trace_id, secrets.token_hex(8), parent.sampled)
+        return SpanContext(secrets.token_hex(16), secrets.token_hex(8), random.random() < self.sample_ratio)
+
+    def export(self, span):
+        data = span.to_dict()
+        if self.synchronous:
+            self._export([data])
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < EXPORT_BATCH:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _export(self, batch):
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"Tracing: falha ao exportar {len(batch)} spans: {e}")
+
+    def flush(self):
+        """Exportar o que está na fila (fim do processo)"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+
+def configure(service, exporter=None, sample_ratio=None, synchronous=False):
+    """Ligar o tracing pelo ambiente (TRACE_FILE / OTEL_EXPORTER_OTLP_ENDPOINT) ou com ``exporter``"""
+    global _tracer
+    if exporter is None:
+        if os.getenv('TRACE_FILE'):
+            exporter = FileExporter(os.environ['TRACE_FILE'])
+        elif os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT'):
+            exporter = OTLPExporter(os.environ['OTEL_EXPORTER_OTLP_ENDPOINT'])
+        else:
+            _tracer = None
+            return None
+    if sample_ratio is None:
+        sample_ratio = float(os.getenv('TRACE_SAMPLE_RATIO', '1.0'))
+    _tracer = Tracer(os.getenv('OTEL_SERVICE_NAME') or service, exporter, sample_ratio, synchronous)
+    atexit.register(_tracer.flush)
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def enabled():
+    return _tracer is not None
+
+
+def current_span():
+    return _current.get()
+
+
+def current_traceparent():
+    """``traceparent`` do span atual, para propagar (None sem trace amostrado)"""
+    span = _current.get()
+    return span.context.traceparent if span is not None and span.recording else None
+
+
+def begin_span(name, kind=KIND_INTERNAL, attributes=None, parent=None, links=None):
+    """Abrir um span (``end()`` e ``_current.reset`` ficam com o chamador) — ver ``start_span``"""
+    if _tracer is None:
+        return None
+    if isinstance(parent, str):
+        parent = parse_traceparent(parent)
+    if parent is None:
+        active = _current.get()
+        parent = active.context if active is not None else None
+    return Span(_tracer, name, kind, _tracer.new_context(parent),
+                parent.span_id if parent is not None else None, attributes, links)
+
+
+@contextmanager
+def start_span(name, kind=KIND_INTERNAL, attributes=None, parent=None, links=None):
+    """Span do bloco; vira o span atual. ``parent`` aceita ``traceparent`` (str) ou SpanContext.
+
+    Com o tracing desligado devolve None e não custa nada.
+    """
+    span = begin_span(name, kind, attributes, parent, links)
+    if span is None:
+        yield None
+        return
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        span.end()
+
+
+def record_span(name, seconds, kind=KIND_CLIENT, attributes=None, error=None):
+    """Span já terminado (ex.: hook de resposta do requests, que só sabe a duração)"""
+    active = _current.get()
+    if _tracer is None or active is None or not active.recording:
+        return
+    span = begin_span(name, kind, attributes)
+    now = time.time_ns()
+    span.start_ns = now - int(seconds * 1e9)
+    if error:
+        span.set_error(error)
+    span.end(now)
+
+
+# Queries SQL (qualquer Engine), como filhas do span atual
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    active = _current.get()
+    if _tracer is None or active is None or not active.recording:
+        return
+    span = begin_span('db.query', KIND_CLIENT, {
+        'db.system': conn.engine.dialect.name,
+        'db.statement': statement[:STATEMENT_MAX_CHARS],
+    })
+    conn.info.setdefault('_trace_spans', []).append(span)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('_trace_spans')
+    if spans:
+        span = spans.pop()
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute('db.rows', cursor.rowcount)
+        span.end()
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get('_trace_spans') if conn is not None else None
+    if spans:
+        span = spans.pop()
+        span.set_error(exception_context.original_exception)
+        span.end()
+
+
+# Flask
+
+def init_app(app):
+    """Span por request (continuando o ``traceparent`` recebido) e o comando ``flask trace``"""
+    import click
+    from flask import g, request
+
+    configure('televip-web')
+
+    @app.before_request
+    def _start_request_span():
+        span = begin_span(f'{request.method} {request.url_rule.rule if request.url_rule else request.path}',
+                          KIND_SERVER, {'http.method': request.method, 'http.target': request.path},
+                          parent=request.headers.get('traceparent'))
+        if span is not None:
+            g._trace_span = span
+            g._trace_token = _current.set(span)
+
+    @app.after_request
+    def _tag_request_span(response):
+        span = g.get('_trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            span.set_attribute('http.route', request.endpoint)
+            if response.status_code >= 500:
+                span.set_error(f'HTTP {response.status_code}')
+            response.headers['traceparent'] = span.context.traceparent
+        return response
+
+    @app.teardown_request
+    def _end_request_span(exc):
+        span = g.pop('_trace_span', None)
+        token = g.pop('_trace_token', None)
+        if span is None:
+            return
+        if exc is not None:
+            span.set_error(exc)
+        try:
+            _current.reset(token)
+        except ValueError:
+            _current.set(None)  # teardown em outro contexto (streaming)
+        span.end()
+
+    @app.cli.command('trace')
+    @click.argument('trace_id')
+    @click.option('--file', 'path', default=lambda: os.getenv('TRACE_FILE', 'traces.jsonl'))
+    def trace_command(trace_id, path):
+        """Mostrar a árvore de spans de um trace gravado em TRACE_FILE"""
+        spans = load_trace(path, trace_id)
+        if not spans:
+            raise click.ClickException(f'Trace {trace_id} não encontrado em {path}')
+        click.echo(format_trace(spans))
+
+
+def load_trace(path, trace_id):
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if trace_id in line:
+                span = json.loads(line)
+                if span['trace_id'] == trace_id:
+                    spans.append(span)
+    return spans
+
+
+def format_trace(spans):
+    """Árvore com início relativo e duração de cada span"""
+    spans = sorted(spans, key=lambda s: s['start_time_unix_nano'])
+    ids = {s['span_id'] for s in spans}
+    children = {}
+    for span in spans:
+        parent = span['parent_span_id'] if span['parent_span_id'] in ids else None
+        children.setdefault(parent, []).append(span)
+    origin = spans[0]['start_time_unix_nano']
+    lines = []
+
+    def walk(parent, depth):
+        for span in children.get(parent, []):
+            offset = (span['start_time_unix_nano'] - origin) / 1e6
+            label = span['name']
+            if span['attributes'].get('db.statement'):
+                label = f"db: {span['attributes']['db.statement'][:80]}"
+            error = f"  ERRO: {span['error']}" if span['status'] == 'error' else ''
+            lines.append(f"{offset:>9.1f}ms {span['duration_ms']:>9.1f}ms  {'  ' * depth}"
+                         f"{label} [{span['service']}]{error}")
+            walk(span['span_id'], depth + 1)
+
+    walk(None, 0)
+    return '\n'.join(lines)
@@ -0,0 +1,258 @@
+"""Backend do Flask-Caching em dois níveis: LRU em memória (L1) + Redis (L2).
+
+Leituras quentes saem do L1 do próprio worker, sem ida ao Redis nem
+unpickle. Escritas e deleções vão para o Redis e são anunciadas num canal
+pub/sub para os outros workers descartarem a cópia local. Se o Redis cair,
+o backend segue só com o L1 e tenta reconectar a cada ``retry_interval``.
+
+Os valores do L1 são compartilhados entre requisições do mesmo worker —
+trate o que vem do cache como somente leitura.
+
+Uso: ``CACHE_TYPE = 'app.utils.two_tier_cache.TwoTierCache'``
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """LRU por processo na frente de um RedisCache, com invalidação via pub/sub"""
+
+    def __init__(self, l2, default_timeout=300, l1_max_entries=1024, l1_ttl=30,
+                 channel='televip:cache:invalidate', retry_interval=5, subscribe=True):
+        super().__init__(default_timeout=default_timeout)
+        self.l2 = l2
+        self.l1_max_entries = l1_max_entries
+        self.l1_ttl = l1_ttl  # limita a defasagem se uma invalidação se perder
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self.node_id = uuid.uuid4().hex[:12]
+
+        self._l1 = OrderedDict()  # key -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self._l2_down_until = 0.0
+        self._subscribe = subscribe
+        self._listener_pid = None
+
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.l2_errors = 0
+        self.invalidations = 0
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        redis_config = dict(config)
+        socket_timeout = float(config.get('CACHE_REDIS_SOCKET_TIMEOUT', 0.5))
+        redis_config['CACHE_OPTIONS'] = {
+            'socket_connect_timeout': socket_timeout,
+            'socket_timeout': socket_timeout,
+            **(config.get('CACHE_OPTIONS') or {}),
+        }
+        l2 = RedisCache.factory(app, redis_config, list(args), dict(kwargs))
+        return cls(
+            l2,
+            default_timeout=kwargs.get('default_timeout', 300),
+            l1_max_entries=int(config.get('CACHE_L1_MAX_ENTRIES', 1024)),
+            l1_ttl=int(config.get('CACHE_L1_TTL', 30)),
+            channel=config.get('CACHE_INVALIDATION_CHANNEL', 'televip:cache:invalidate'),
+        )
+
+    # ------------------------------------------------------------------ L1
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+            return value
+
+    def _l1_set(self, key, value, timeout):
+        ttl = self.l1_ttl if not timeout else min(timeout, self.l1_ttl)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _l1_clear(self):
+        with self._lock:
+            self._l1.clear()
+
+    # ------------------------------------------------------------------ L2
+
+    @property
+    def l2_available(self):
+        return time.monotonic() >= self._l2_down_until
+
+    def _l2_call(self, method, *args, default=None):
+        """Chamar o Redis; em erro, entra em modo só-L1 por retry_interval"""
+        if not self.l2_available:
+            return default
+        try:
+            self._ensure_listener()
+            return getattr(self.l2, method)(*args)
+        except Exception as e:
+            self.l2_errors += 1
+            if self.l2_available:
+                logger.warning(f"Cache: Redis indisponível ({e}); usando só o cache local")
+            self._l2_down_until = time.monotonic() + self.retry_interval
+            return default
+
+    def _publish(self, key):
+        if not self.l2_available:
+            return
+        try:
+            self.l2._write_client.publish(self.channel, f"{self.node_id}|{key}")
+        except Exception:
+            self._l2_down_until = time.monotonic() + self.retry_interval
+
+    # ------------------------------------------------------------ pub/sub
+
+    def _ensure_listener(self):
+        """Iniciar (uma vez por processo, após o fork) a thread de invalidação"""
+        if not self._subscribe or self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, name='cache-invalidation', daemon=True).start()
+
+    def _listen(self):
+        subscribed_before = False
+        while True:
+            try:
+                pubsub = self.l2._write_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if subscribed_before:
+                    self._l1_clear()  # invalidações podem ter se perdido durante a queda
+                subscribed_before = True
+                for message in pubsub.listen():
+                    self.handle_invalidation(message.get('data'))
+            except Exception as e:
+                logger.debug(f"Cache: assinatura de invalidação caiu: {e}")
+                time.sleep(self.retry_interval)
+
+    def handle_invalidation(self, data):
+        """Processar uma mensagem do canal (``node|key`` ou ``node|*``)"""
+        if isinstance(data, bytes):
+            data = data.decode()
+        if not data or '|' not in data:
+            return
+        node, key = data.split('|', 1)
+        if node == self.node_id:
+            return
+        self.invalidations += 1
+        if key == '*':
+            self._l1_clear()
+        else:
+            self._l1_delete(key)
+
+    # ------------------------------------------------------------ API
+
+    def get(self, key):
+        value = self._l1_get(key)
+        if value is not _MISSING:
+            self.l1_hits += 1
+            metrics.record_cache('two_tier', 'l1_hit')
+            return value
+
+        value = self._l2_call('get', key)
+        if value is None:
+            self.misses += 1
+            metrics.record_cache('two_tier', 'miss')
+            return None
+        self.l2_hits += 1
+        metrics.record_cache('two_tier', 'l2_hit')
+        self._l1_set(key, value, self.l1_ttl)
+        return value
+
+    def has(self, key):
+        if self._l1_get(key) is not _MISSING:
+            return True
+        return bool(self._l2_call('has', key, default=False))
+
+    def set(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        self._l1_set(key, value, timeout)
+        result = self._l2_call('set', key, value, timeout, default=True)
+        self._publish(key)
+        return result
+
+    def add(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        if not self.l2_available:
+            if self._l1_get(key) is not _MISSING:
+                return False
+            self._l1_set(key, value, timeout)
+            return True
+        added = self._l2_call('add', key, value, timeout, default=False)
+        if added:
+            self._l1_set(key, value, timeout)
+        return added
+
+    def delete(self, key):
+        self._l1_delete(key)
+        result = self._l2_call('delete', key, default=True)
+        self._publish(key)
+        return result
+
+    def delete_many(self, *keys):
+        for key in keys:
+            self._l1_delete(key)
+            self._publish(key)
+        return self._l2_call('delete_many', *keys, default=list(keys))
+
+    def clear(self):
+        self._l1_clear()
+        result = self._l2_call('clear', default=True)
+        self._publish('*')
+        return result
+
+    def inc(self, key, delta=1):
+        self._l1_delete(key)
+        result = self._l2_call('inc', key, delta)
+        self._publish(key)
+        return result
+
+    def dec(self, key, delta=1):
+        self._l1_delete(key)
+        result = self._l2_call('dec', key, delta)
+        self._publish(key)
+        return result
+
+    # ------------------------------------------------------------ métricas
+
+    def stats(self):
+        """Contadores do worker atual (hit ratio geral e por nível)"""
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            'l1_hits': self.l1_hits,
+            'l2_hits': self.l2_hits,
+            'misses': self.misses,
+            'l1_hit_ratio': round(self.l1_hits / lookups, 4) if lookups else None,
+            'hit_ratio': round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else None,
+            'l1_entries': len(self._l1),
+            'l2_available': self.l2_available,
+            'l2_errors': self.l2_errors,
+            'invalidations': self.invalidations,
+        }
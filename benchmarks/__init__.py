@@ -0,0 +1,3 @@
+"""
+Benchmarks de desempenho do TeleVIP (executar com ``python -m benchmarks.<nome>``)
+"""
@@ -0,0 +1,139 @@
+"""
+Benchmark: vazão de updates do bot em função do número de workers
+
+Gera updates de N usuários, roteia cada um com ``shard_for_update`` (o mesmo
+roteamento do /webhooks/telegram) e processa cada partição num processo
+separado, com um Application do PTB completo contra a Bot API falsa. O
+handler simula o custo de CPU de um handler real (ORM + montagem de teclado).
+
+Uso:
+    python -m benchmarks.bench_bot_sharding --updates 4000 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import time
+
+from benchmarks.fake_telegram import FakeBotAPIRequest, make_start_update
+
+
+def _simulate_handler_cpu(user_id: int, iterations: int) -> str:
+    """CPU equivalente a carregar assinaturas e formatar o menu"""
+    acc = 0
+    for i in range(iterations):
+        acc = (acc * 31 + user_id + i) % 1_000_003
+    return f"<b>Menu</b> {acc}"
+
+
+def _worker(payloads, cpu_iterations, latency, ready, start, results):
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+    from telegram.ext import Application, CommandHandler, TypeHandler
+    from bot.utils.update_processor import ChatOrderedUpdateProcessor
+
+    async def start_handler(update, context):
+        text = _simulate_handler_cpu(update.effective_user.id, cpu_iterations)
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Assinaturas", callback_data="subs_active")],
+            [InlineKeyboardButton("Histórico", callback_data="subs_history")],
+        ])
+        await context.bot.send_message(update.effective_chat.id, text, reply_markup=keyboard)
+
+    async def run():
+        done = 0
+        finished = asyncio.Event()
+
+        async def count(update, context):
+            nonlocal done
+            done += 1
+            if done == len(payloads):
+                finished.set()
+
+        app = (
+            Application.builder()
+            .token('123456:BENCH')
+            .request(FakeBotAPIRequest(latency=latency))
+            .get_updates_request(FakeBotAPIRequest())
+            .concurrent_updates(ChatOrderedUpdateProcessor(64))
+            .updater(None)
+            .job_queue(None)
+            .build()
+        )
+        app.add_handler(CommandHandler('start', start_handler))
+        app.add_handler(TypeHandler(Update, count), group=99)
+
+        async with app:
+            await app.start()
+            updates = [Update.de_json(p, app.bot) for p in payloads]
+            ready.set()
+            start.wait()
+            t0 = time.perf_counter()
+            for update in updates:
+                await app.update_queue.put(update)
+            if payloads:
+                await finished.wait()
+            elapsed = time.perf_counter() - t0
+            await app.stop()
+        return elapsed
+
+    results.put((len(payloads), asyncio.run(run())))
+
+
+def run_benchmark(total_updates: int, workers: int, cpu_iterations: int = 20000,
+                  latency: float = 0.005, users: int = 500) -> dict:
+    """Processar ``total_updates`` divididos entre ``workers`` processos"""
+    from bot.utils.sharding import shard_for_update
+
+    shards = [[] for _ in range(workers)]
+    for i in range(total_updates):
+        payload = make_start_update(i + 1, 100000 + (i % users))
+        shards[shard_for_update(payload, workers)].append(payload)
+
+    ctx = mp.get_context('spawn')
+    start = ctx.Event()
+    results = ctx.Queue()
+    readies, procs = [], []
+    for shard in shards:
+        ready = ctx.Event()
+        proc = ctx.Process(target=_worker, args=(shard, cpu_iterations, latency, ready, start, results))
+        proc.start()
+        readies.append(ready)
+        procs.append(proc)
+
+    for ready in readies:
+        ready.wait()
+    start.set()
+
+    per_worker = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    wall = max(elapsed for _, elapsed in per_worker)
+    return {
+        'workers': workers,
+        'updates': total_updates,
+        'shard_sizes': [len(s) for s in shards],
+        'seconds': round(wall, 3),
+        'updates_per_second': round(total_updates / wall, 1) if wall else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=4000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--cpu-iterations', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.005, help='latência da Bot API falsa (s)')
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>7} {'updates/s':>10} {'tempo (s)':>10} {'speedup':>8}  partições")
+    for n in args.workers:
+        result = run_benchmark(args.updates, n, args.cpu_iterations, args.latency)
+        baseline = baseline or result['updates_per_second']
+        speedup = result['updates_per_second'] / baseline
+        print(f"{n:>7} {result['updates_per_second']:>10} {result['seconds']:>10} "
+              f"{speedup:>7.2f}x  {result['shard_sizes']}")
+
+
+if __name__ == '__main__':
+    main()
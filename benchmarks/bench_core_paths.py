@@ -0,0 +1,181 @@
+"""
+Benchmark: caminhos críticos do web e do bot sobre um dataset semeado
+
+Mede, no criador pesado do dataset (20% dos grupos) e no admin:
+
+- ``calculate_balance``;
+- ``dashboard.index`` (casca + os 4 endpoints JSON, cache frio);
+- ``dashboard.analytics`` (30 dias);
+- ``admin.index``;
+- ``export.transactions`` (CSV completo do criador, em streaming);
+- ``jobs.check_expired_subscriptions`` e ``jobs.send_renewal_reminders``
+  (Bot API falsa; cada repetição é desfeita com rollback);
+- ``fees.calculate_fees`` (10 mil cálculos de taxa).
+
+Cada caso roda 1 aquecimento + ``--repeat`` medições; o JSON em
+benchmarks/results/ guarda min/mediana/média/máx, queries por execução,
+commit e escala. ``--compare`` mostra a variação contra um run anterior.
+
+Uso:
+    python -m benchmarks.bench_core_paths --scale 100k
+    python -m benchmarks.bench_core_paths --scale 100k --only dashboard --compare benchmarks/results/<run>.json
+    python -m benchmarks.bench_core_paths --scale 1m --database-url postgresql://localhost/televip_bench
+"""
+import argparse
+import asyncio
+from decimal import Decimal
+
+from benchmarks import harness
+from benchmarks.datagen import ADMIN_EMAIL, BENCH_PASSWORD, DEFAULT_SEED, HEAVY_CREATOR_EMAIL, SCALES
+
+DASHBOARD_API = ('/dashboard/api/kpis', '/dashboard/api/revenue-chart',
+                 '/dashboard/api/group-stats', '/dashboard/api/recent-transactions')
+FEE_CALCULATIONS = 10_000
+
+
+def _login(app, email):
+    client = app.test_client()
+    response = client.post('/login', data={'email': email, 'password': BENCH_PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f'Login de {email} falhou (HTTP {response.status_code}); rode com --reseed')
+    return client
+
+
+def _get(client, path):
+    response = client.get(path)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path}: HTTP {response.status_code}')
+    response.get_data()  # consumir respostas em streaming (export)
+    return response
+
+
+def web_cases(app):
+    """{nome: (func, setup)} dos caminhos do Flask"""
+    from app import cache
+    from app.models import Creator
+    from app.routes.dashboard import calculate_balance
+
+    creator = _login(app, HEAVY_CREATOR_EMAIL)
+    admin = _login(app, ADMIN_EMAIL)
+    with app.app_context():
+        heavy_id = Creator.query.filter_by(email=HEAVY_CREATOR_EMAIL).one().id
+
+    def dashboard_index():
+        _get(creator, '/dashboard/')
+        for path in DASHBOARD_API:
+            _get(creator, path)
+
+    def balance():
+        with app.app_context():
+            calculate_balance.uncached(heavy_id)  # sem o memoize de 60s
+
+    return {
+        'calculate_balance': (balance, None),
+        'dashboard.index': (dashboard_index, cache.clear),
+        'dashboard.analytics': (lambda: _get(creator, '/dashboard/analytics?period=30'), cache.clear),
+        'admin.index': (lambda: _get(admin, '/admin/'), cache.clear),
+        'export.transactions': (lambda: _get(creator, '/dashboard/transactions/export?format=csv'), None),
+    }
+
+
+def job_cases(app, loop):
+    """Jobs agendados contra a Bot API falsa, com rollback a cada execução"""
+    from telegram.ext import Application
+
+    from benchmarks.fake_telegram import FakeBotAPIRequest
+    from bot.jobs import scheduled_tasks
+    from bot.utils.database import engine
+
+    harness.enable_sqlite_savepoints(engine)
+    application = (
+        Application.builder()
+        .token('123456:BENCH')
+        .request(FakeBotAPIRequest())
+        .get_updates_request(FakeBotAPIRequest())
+        .updater(None)
+        .job_queue(None)
+        .build()
+    )
+    loop.run_until_complete(application.initialize())
+    scheduled_tasks._application = application
+    scheduled_tasks.get_db_session = lambda: harness.rollback_session(engine)
+
+    def run(job):
+        def call():
+            with app.app_context():  # try_fix_stale_end_date usa a sessão do Flask
+                loop.run_until_complete(job())
+        return call
+
+    return {
+        'jobs.check_expired_subscriptions': (run(scheduled_tasks.check_expired_subscriptions), None),
+        'jobs.send_renewal_reminders': (run(scheduled_tasks.send_renewal_reminders), None),
+    }
+
+
+def fee_cases():
+    from app.services.payment_service import PaymentService
+
+    amounts = [Decimal(f'{9 + (i % 500) * 0.5:.2f}') for i in range(FEE_CALCULATIONS)]
+
+    def calculate():
+        for i, amount in enumerate(amounts):
+            PaymentService.calculate_fees(amount, percentage_fee=PaymentService.get_tiered_percentage(i % 2000))
+
+    return {'fees.calculate_fees': (calculate, None)}
+
+
+def _print_results(results):
+    print(f"{'caso':<36} {'mediana ms':>11} {'min ms':>9} {'máx ms':>9} {'queries':>8}")
+    for name, stats in results.items():
+        print(f"{name:<36} {stats['median_ms']:>11.1f} {stats['min_ms']:>9.1f} "
+              f"{stats['max_ms']:>9.1f} {stats['queries']:>8}")
+
+
+def _print_comparison(rows):
+    print(f"\n{'caso':<36} {'antes ms':>10} {'agora ms':>10} {'variação':>9} {'queries':>11}")
+    for name, before, now, change, q_before, q_now in rows:
+        before_txt = f'{before:.1f}' if before is not None else '—'
+        change_txt = f'{change:+.1f}%' if change is not None else '—'
+        queries_txt = f'{q_before}→{q_now}' if q_before is not None else str(q_now)
+        print(f"{name:<36} {before_txt:>10} {now:>10.1f} {change_txt:>9} {queries_txt:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database-url', help='padrão: SQLite em benchmarks/data/')
+    parser.add_argument('--reseed', action='store_true', help='recriar o banco mesmo se já existir')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='+', default=[], help='prefixos dos casos (ex.: dashboard jobs)')
+    parser.add_argument('--output', help='arquivo JSON (padrão: benchmarks/results/<data>_<escala>_<commit>.json)')
+    parser.add_argument('--compare', help='JSON de um run anterior para comparar')
+    args = parser.parse_args()
+
+    database_url = args.database_url or harness.default_database_url(args.scale, args.seed)
+    app = harness.bench_app(database_url)
+    shape = harness.prepare_database(app, args.scale, args.seed, reseed=args.reseed)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    cases = {**web_cases(app), **job_cases(app, loop), **fee_cases()}
+    if args.only:
+        cases = {name: case for name, case in cases.items() if name.startswith(tuple(args.only))}
+
+    results = {}
+    for name, (func, setup) in cases.items():
+        results[name] = harness.measure(func, repeat=args.repeat, setup=setup)
+        print(f"  {name}: {results[name]['median_ms']:.1f}ms", flush=True)
+
+    meta = harness.run_metadata(app, args.scale, args.seed, shape)
+    path = harness.save_results(meta, results, args.output)
+    print()
+    _print_results(results)
+    print(f"\nResultados em {path}")
+
+    if args.compare:
+        _print_comparison(harness.compare(harness.load_results(args.compare), {'results': results}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Gerador de dados determinístico para os benchmarks
+
+Popula criadores, grupos, planos, assinaturas e transações numa escala
+dada pelo número de transações (10k, 100k, 1m). A mesma ``seed`` gera
+sempre o mesmo banco, então dois runs em commits diferentes medem o mesmo
+volume e a mesma distribuição.
+
+Formato do dataset (proporções fixas):
+
+- 1 transação em cada 2 é renovação → assinaturas = transações / 2;
+- grupos = transações / 500 (mínimo 10), 3 planos por grupo;
+- criadores = grupos / 10 (mínimo 3); o primeiro (``bench@televip.test``)
+  é o "criador pesado", dono de 20% dos grupos — é ele que os benchmarks
+  de dashboard usam;
+- assinaturas espalhadas pelos últimos 365 dias: as vigentes ficam
+  ``active`` (5% ``cancelled``), as vencidas ``expired``, exceto 2% que
+  continuam ``active`` para o job de expiração ter trabalho;
+- transações: 88% ``completed``, 8% ``pending``, 4% ``failed``.
+
+Nenhuma assinatura tem ``stripe_subscription_id``: os jobs não chamam o
+Stripe durante o benchmark.
+
+Uso:
+    python -m benchmarks.datagen --scale 100k --database-url sqlite:///benchmarks/data/bench_100k.db
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.models import Creator, Group, PricingPlan, Subscription, Transaction
+from app.services.payment_service import PaymentService
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+DEFAULT_SEED = 42
+CHUNK = 10_000
+
+BENCH_PASSWORD = 'BenchPass123'
+HEAVY_CREATOR_EMAIL = 'bench@televip.test'
+ADMIN_EMAIL = 'admin@televip.test'
+HEAVY_SHARE = 0.2
+
+PLANS = (('Mensal', 30, Decimal('29.90')), ('Trimestral', 90, Decimal('79.90')), ('Anual', 365, Decimal('249.90')))
+TRANSACTION_STATUS = (('completed', 0.88), ('pending', 0.08), ('failed', 0.04))
+
+
+def dataset_shape(transactions):
+    """Quantidade de cada entidade para ``transactions`` transações"""
+    groups = max(10, transactions // 500)
+    return {
+        'creators': max(3, groups // 10),
+        'groups': groups,
+        'plans': groups * len(PLANS),
+        'subscriptions': max(1, transactions // 2),
+        'transactions': transactions,
+    }
+
+
+def _bulk_insert(session, model, rows):
+    for start in range(0, len(rows), CHUNK):
+        session.execute(insert(model.__table__), rows[start:start + CHUNK])
+
+
+def _fees(price):
+    fees = PaymentService.calculate_fees(price)
+    return {
+        'fee': fees['total_fee'],
+        'net_amount': fees['net_amount'],
+        'fixed_fee': fees['fixed_fee'],
+        'percentage_fee': fees['percentage_fee'],
+        'total_fee': fees['total_fee'],
+    }
+
+
+def _pick_status(rng):
+    roll = rng.random()
+    for status, share in TRANSACTION_STATUS:
+        if roll < share:
+            return status
+        roll -= share
+    return TRANSACTION_STATUS[-1][0]
+
+
+def seed_database(session, scale='10k', seed=DEFAULT_SEED, now=None):
+    """Popular um banco vazio (tabelas já criadas); devolve a contagem por entidade"""
+    transactions = SCALES[scale] if isinstance(scale, str) else int(scale)
+    shape = dataset_shape(transactions)
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(microsecond=0)
+
+    # Criadores: o pesado, os demais e um admin (senha só nos que fazem login)
+    creators = []
+    for i in range(1, shape['creators'] + 1):
+        creators.append(Creator(
+            id=i, name=f'Criador {i}', username=f'criador{i}',
+            email=HEAVY_CREATOR_EMAIL if i == 1 else f'criador{i}@televip.test',
+            is_verified=True, balance=0, total_earned=0, created_at=now - timedelta(days=400),
+        ))
+    admin = Creator(id=shape['creators'] + 1, name='Admin', username='benchadmin', email=ADMIN_EMAIL,
+                    is_admin=True, is_verified=True, balance=0, total_earned=0)
+    creators[0].set_password(BENCH_PASSWORD)
+    admin.set_password(BENCH_PASSWORD)
+    session.add_all(creators + [admin])
+    session.flush()
+
+    heavy_groups = max(1, int(shape['groups'] * HEAVY_SHARE))
+    groups, plans = [], []
+    for gid in range(1, shape['groups'] + 1):
+        owner = 1 if gid <= heavy_groups else 2 + (gid % (shape['creators'] - 1))
+        groups.append({
+            'id': gid, 'name': f'Grupo {gid}', 'telegram_id': f'-100{7000000 + gid}',
+            'invite_slug': f'b{gid:06d}', 'creator_id': owner, 'is_active': True,
+            'is_public': gid % 3 == 0, 'created_at': now - timedelta(days=380),
+        })
+        for offset, (name, days, price) in enumerate(PLANS):
+            plans.append({
+                'id': (gid - 1) * len(PLANS) + offset + 1, 'group_id': gid, 'name': name,
+                'duration_days': days, 'price': price, 'is_active': True,
+            })
+    _bulk_insert(session, Group, groups)
+    _bulk_insert(session, PricingPlan, plans)
+
+    fees_by_plan = {offset: _fees(price) for offset, (_, _, price) in enumerate(PLANS)}
+    users = max(1, shape['subscriptions'] // 3)  # assinantes recorrentes
+    tx_per_sub = transactions / shape['subscriptions']
+    subs, txs = [], []
+    tx_id = 0
+    for sid in range(1, shape['subscriptions'] + 1):
+        gid = rng.randint(1, shape['groups'])
+        offset = rng.randrange(len(PLANS))
+        _, days, price = PLANS[offset]
+        start = now - timedelta(days=rng.uniform(0, 365))
+        end = start + timedelta(days=days)
+        if end > now:
+            status = 'cancelled' if rng.random() < 0.05 else 'active'
+        else:
+            status = 'active' if rng.random() < 0.02 else 'expired'
+        subs.append({
+            'id': sid, 'group_id': gid, 'plan_id': (gid - 1) * len(PLANS) + offset + 1,
+            'telegram_user_id': str(500000 + rng.randrange(users)),
+            'telegram_username': f'assinante{sid}', 'start_date': start, 'end_date': end,
+            'status': status, 'created_at': start,
+        })
+
+        # Distribuir as transações restantes sem passar do total pedido
+        count = int(sid * tx_per_sub) - tx_id
+        for _ in range(count):
+            tx_id += 1
+            created = start + timedelta(seconds=rng.uniform(0, max(1.0, (now - start).total_seconds())))
+            tx_status = _pick_status(rng)
+            txs.append({
+                'id': tx_id, 'subscription_id': sid, 'amount': price, 'status': tx_status,
+                'payment_method': 'stripe' if rng.random() < 0.7 else 'pix',
+                'created_at': created, 'paid_at': created if tx_status == 'completed' else None,
+                **fees_by_plan[offset],
+            })
+        if len(subs) >= CHUNK:
+            _bulk_insert(session, Subscription, subs)
+            _bulk_insert(session, Transaction, txs)
+            subs, txs = [], []
+    _bulk_insert(session, Subscription, subs)
+    _bulk_insert(session, Transaction, txs)
+    session.commit()
+    return shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database-url', required=True)
+    args = parser.parse_args()
+
+    from benchmarks.harness import bench_app
+    from app import db
+
+    app = bench_app(args.database_url)
+    with app.app_context():
+        db.create_all()
+        shape = seed_database(db.session, args.scale, args.seed)
+    print(', '.join(f'{name}={count}' for name, count in shape.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,532 @@
+"""
+API do Stripe falsa, para testes de carga de checkout, assinaturas e webhooks
+
+Servidor HTTP em memória com os recursos que o TeleVIP usa (customers,
+products, prices, checkout/sessions, payment_intents, subscriptions,
+invoices, charges, refunds), no formato da API real: o SDK oficial fala com
+ele trocando a base (``STRIPE_API_BASE=http://127.0.0.1:12111``).
+
+Pagamentos não acontecem sozinhos: o "cliente paga" em ``GET /pay/<id>``
+(a ``url`` da sessão), em ``POST /_sessions/<id>/complete`` ou
+automaticamente com ``--auto-complete SEGUNDOS``. Ao completar, o fake
+cria payment intent / assinatura / fatura e envia os webhooks como o
+Stripe (``checkout.session.completed`` e, no modo assinatura,
+``invoice.paid`` com ``billing_reason=subscription_create``), assinados com
+``--webhook-secret`` (o mesmo STRIPE_WEBHOOK_SECRET do Flask) para
+``--webhook-url``.
+
+Outros controles: ``POST /_subscriptions/<id>/renew`` (fatura do próximo
+ciclo + ``invoice.paid``), ``/_subscriptions/<id>/fail``
+(``invoice.payment_failed``), ``GET /_stats``, ``GET /_events`` e
+``POST /_reset``. ``--latency`` e ``--rate-limit`` (probabilidade de 429)
+valem para as chamadas à API.
+
+Uso:
+    python -m benchmarks.fake_stripe --port 12111 \\
+        --webhook-url http://127.0.0.1:5000/webhooks/stripe --webhook-secret whsec_test
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+RESOURCES = {
+    'customers': ('cus', 'customer'),
+    'products': ('prod', 'product'),
+    'prices': ('price', 'price'),
+    'checkout/sessions': ('cs_test', 'checkout.session'),
+    'payment_intents': ('pi', 'payment_intent'),
+    'subscriptions': ('sub', 'subscription'),
+    'invoices': ('in', 'invoice'),
+    'charges': ('ch', 'charge'),
+    'refunds': ('re', 'refund'),
+}
+INTERVAL_SECONDS = {'day': 86400, 'week': 7 * 86400, 'month': 30 * 86400, 'year': 365 * 86400}
+_KEY_PART = re.compile(r'\[([^\]]*)\]')
+EVENT_LOG_SIZE = 500
+
+
+class StripeError(Exception):
+
+    def __init__(self, status, message, error_type='invalid_request_error', code=None):
+        super().__init__(message)
+        self.status = status
+        self.body = {'error': {'type': error_type, 'message': message, 'code': code}}
+
+
+def decode_params(pairs):
+    """``metadata[a]=1&line_items[0][price]=x`` → dicts/listas aninhados"""
+    result = {}
+    for key, value in pairs:
+        head = key.split('[', 1)[0]
+        path = [head] + _KEY_PART.findall(key[len(head):])
+        node = result
+        for part, following in zip(path, path[1:] + [None]):
+            if following is None:
+                if isinstance(node, list):
+                    node.append(value)
+                else:
+                    node[part] = value
+                break
+            child_type = list if following == '' else dict
+            if isinstance(node, list):
+                index = int(part) if part.isdigit() else len(node)
+                while len(node) <= index:
+                    node.append(child_type())
+                node = node[index]
+            else:
+                node = node.setdefault(part, child_type())
+    return _listify(result)
+
+
+def _listify(node):
+    """Dicts com chaves 0..n viram listas (``line_items[0][price]``)"""
+    if isinstance(node, dict):
+        node = {k: _listify(v) for k, v in node.items()}
+        if node and all(k.isdigit() for k in node):
+            return [node[k] for k in sorted(node, key=int)]
+        return node
+    if isinstance(node, list):
+        return [_listify(v) for v in node]
+    return node
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: int = None) -> str:
+    """Header ``Stripe-Signature`` (esquema v1: HMAC-SHA256 de ``t.payload``)"""
+    timestamp = timestamp or int(time.time())
+    signed = f'{timestamp}.'.encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+class FakeStripe:
+    """Objetos, regras de pagamento e emissão de webhooks do Stripe falso"""
+
+    def __init__(self, latency=0.0, rate_limit=0.0, webhook_url=None, webhook_secret=None,
+                 auto_complete=None, public_url='http://127.0.0.1:12111', seed=None, sync_webhooks=False):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.auto_complete = auto_complete
+        self.public_url = public_url.rstrip('/')
+        self.sync_webhooks = sync_webhooks
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._deliveries = ThreadPoolExecutor(max_workers=8, thread_name_prefix='fake-stripe-webhook')
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.objects = {resource: {} for resource in RESOURCES}
+            self.calls = Counter()
+            self.rate_limited = 0
+            self.webhooks = Counter()
+            self.events = deque(maxlen=EVENT_LOG_SIZE)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'rate_limited': self.rate_limited,
+                'objects': {resource: len(items) for resource, items in self.objects.items()},
+                'events': len(self.events),
+                'webhooks': dict(self.webhooks),
+            }
+
+    # Objetos
+
+    def _new_id(self, resource):
+        prefix = RESOURCES[resource][0]
+        return f'{prefix}_{secrets.token_hex(12)}'
+
+    def _store(self, resource, obj):
+        obj.setdefault('id', self._new_id(resource))
+        obj.setdefault('object', RESOURCES[resource][1])
+        obj.setdefault('created', int(time.time()))
+        obj.setdefault('livemode', False)
+        obj.setdefault('metadata', {})
+        self.objects[resource][obj['id']] = obj
+        return obj
+
+    def get(self, resource, object_id):
+        obj = self.objects[resource].get(object_id)
+        if obj is None:
+            raise StripeError(404, f"No such {RESOURCES[resource][1]}: '{object_id}'", code='resource_missing')
+        return obj
+
+    @staticmethod
+    def public(obj):
+        """Cópia sem campos internos (``_x``)"""
+        return {k: v for k, v in obj.items() if not k.startswith('_')}
+
+    def _expand(self, obj, expand):
+        data = self.public(obj)
+        for field in expand or ():
+            value = data.get(field)
+            if isinstance(value, str):
+                for resource, (prefix, _) in RESOURCES.items():
+                    if value.startswith(prefix + '_') and value in self.objects[resource]:
+                        data[field] = self.public(self.objects[resource][value])
+                        break
+        return data
+
+    # API
+
+    def request(self, method, path, params):
+        """(status, corpo) de uma chamada ``/v1/...``"""
+        with self._lock:
+            self.calls[f'{method} {_route_label(path)}'] += 1
+            if self.rate_limit and self._random.random() < self.rate_limit:
+                self.rate_limited += 1
+                raise StripeError(429, 'Request rate limit exceeded.', error_type='rate_limit_error',
+                                  code='rate_limit')
+            resource, object_id, action = _parse_path(path)
+            expand = params.pop('expand', None)
+            if isinstance(expand, str):
+                expand = [expand]
+
+            if object_id is None:
+                if method == 'POST':
+                    return 200, self._expand(self._create(resource, params), expand)
+                return 200, self._list(resource, params)
+            obj = self.get(resource, object_id)
+            if action:
+                return 200, self._expand(self._action(resource, obj, action, params), expand)
+            if method == 'POST':
+                metadata = params.pop('metadata', None)
+                obj.update(params)
+                if metadata:
+                    obj['metadata'].update(metadata)
+            elif method == 'DELETE':
+                return 200, self.public(self._action(resource, obj, 'cancel', params))
+            return 200, self._expand(obj, expand)
+
+    def _list(self, resource, params):
+        limit = int(params.pop('limit', 10))
+        params.pop('starting_after', None)
+        items = [o for o in self.objects[resource].values()
+                 if all(str(o.get(k)) == str(v) for k, v in params.items() if not isinstance(v, dict))]
+        items.sort(key=lambda o: o['created'], reverse=True)
+        return {'object': 'list', 'url': f'/v1/{resource}', 'has_more': len(items) > limit,
+                'data': [self.public(o) for o in items[:limit]]}
+
+    def _create(self, resource, params):
+        obj = dict(params)
+        if resource == 'prices':
+            obj['unit_amount'] = int(obj.get('unit_amount', 0))
+            obj.setdefault('currency', 'brl')
+            obj['type'] = 'recurring' if obj.get('recurring') else 'one_time'
+            obj.setdefault('recurring', None)
+            obj['active'] = True
+        elif resource == 'products':
+            obj['active'] = True
+        elif resource == 'checkout/sessions':
+            return self._create_session(obj)
+        elif resource == 'payment_intents':
+            obj['amount'] = int(obj.get('amount', 0))
+            obj.setdefault('currency', 'brl')
+            obj['status'] = 'requires_payment_method'
+        elif resource == 'subscriptions':
+            items = obj.pop('items', [])
+            price = self.get('prices', items[0]['price']) if items else None
+            return self._create_subscription(obj.get('customer'), price, obj.get('metadata', {}))
+        elif resource == 'refunds':
+            intent = self.get('payment_intents', obj['payment_intent'])
+            obj['amount'] = int(obj.get('amount', intent['amount']))
+            obj['status'] = 'succeeded'
+        return self._store(resource, obj)
+
+    def _create_session(self, obj):
+        amount = 0
+        for item in obj.pop('line_items', []):
+            quantity = int(item.get('quantity', 1))
+            if 'price' in item:
+                amount += self.get('prices', item['price'])['unit_amount'] * quantity
+                obj.setdefault('_price', item['price'])
+            else:
+                amount += int(item.get('price_data', {}).get('unit_amount', 0)) * quantity
+        obj.update(amount_total=amount, amount_subtotal=amount, currency='brl', status='open',
+                   payment_status='unpaid', payment_intent=None, subscription=None, invoice=None)
+        obj.setdefault('mode', 'payment')
+        obj.setdefault('customer', None)
+        obj['_trial_end'] = obj.pop('subscription_data', {}).get('trial_end')
+        session = self._store('checkout/sessions', obj)
+        session['url'] = f"{self.public_url}/pay/{session['id']}"
+        if self.auto_complete is not None:
+            timer = threading.Timer(self.auto_complete, self._auto_complete, args=(session['id'],))
+            timer.daemon = True
+            timer.start()
+        return session
+
+    def _create_subscription(self, customer, price, metadata, trial_end=None):
+        now = int(time.time())
+        sub = self._store('subscriptions', {
+            'customer': customer, 'status': 'trialing' if trial_end else 'active',
+            'cancel_at_period_end': False, 'metadata': dict(metadata or {}),
+            'items': {'object': 'list', 'data': [{'object': 'subscription_item', 'price': self.public(price)}]}
+            if price else {'object': 'list', 'data': []},
+            'current_period_start': now,
+            'current_period_end': int(trial_end) if trial_end else now + _period_seconds(price),
+            '_price': price['id'] if price else None,
+        })
+        return sub
+
+    def _action(self, resource, obj, action, params):
+        if resource == 'checkout/sessions' and action == 'expire':
+            if obj['status'] != 'open':
+                raise StripeError(400, f"Session {obj['id']} is not open")
+            obj['status'] = 'expired'
+        elif resource == 'payment_intents' and action == 'cancel':
+            obj['status'] = 'canceled'
+        elif resource == 'subscriptions' and action == 'cancel':
+            obj['status'] = 'canceled'
+            obj['canceled_at'] = int(time.time())
+            self.emit('customer.subscription.deleted', obj)
+        else:
+            raise StripeError(404, f'Unrecognized request URL: {resource}/{action}')
+        return obj
+
+    # Pagamentos
+
+    def _charge(self, amount, customer, payment_method_type='card'):
+        intent = self._store('payment_intents', {
+            'amount': amount, 'amount_received': amount, 'currency': 'brl', 'status': 'succeeded',
+            'customer': customer, 'payment_method_types': [payment_method_type],
+        })
+        charge = self._store('charges', {
+            'amount': amount, 'currency': 'brl', 'status': 'succeeded', 'paid': True,
+            'payment_intent': intent['id'], 'customer': customer,
+            'payment_method_details': {'type': payment_method_type},
+        })
+        intent['latest_charge'] = charge['id']
+        return intent, charge
+
+    def _invoice(self, sub, billing_reason, amount, charge=None, intent=None, payment_method_type='card'):
+        return self._store('invoices', {
+            'subscription': sub['id'], 'customer': sub['customer'], 'billing_reason': billing_reason,
+            'status': 'paid', 'paid': True, 'amount_paid': amount, 'amount_due': amount, 'currency': 'brl',
+            'charge': charge['id'] if charge else None, 'payment_intent': intent['id'] if intent else None,
+            'payment_settings': {'payment_method_types': [payment_method_type]},
+            'lines': {'object': 'list', 'data': [{
+                'object': 'line_item', 'amount': amount, 'price': sub['_price'],
+                'period': {'start': sub['current_period_start'], 'end': sub['current_period_end']},
+            }]},
+        })
+
+    def complete_session(self, session_id, payment_method_type='card'):
+        """Cliente pagou: objetos do pagamento + webhooks, como no Stripe"""
+        with self._lock:
+            session = self.get('checkout/sessions', session_id)
+            if session['status'] != 'open':
+                return session
+            session.update(status='complete', payment_status='paid')
+            amount = session['amount_total']
+            events = []
+            if session['mode'] == 'subscription':
+                price = self.get('prices', session['_price'])
+                sub = self._create_subscription(session['customer'], price, session.get('metadata'),
+                                                trial_end=session.get('_trial_end'))
+                paid = 0 if session.get('_trial_end') else amount
+                intent, charge = self._charge(paid, session['customer'], payment_method_type) if paid else (None, None)
+                invoice = self._invoice(sub, 'subscription_create', paid, charge, intent, payment_method_type)
+                sub['latest_invoice'] = invoice['id']
+                session.update(subscription=sub['id'], invoice=invoice['id'])
+                events = [('checkout.session.completed', session), ('invoice.paid', invoice)]
+            else:
+                intent, _ = self._charge(amount, session['customer'], payment_method_type)
+                intent['metadata'] = dict(session.get('metadata') or {})
+                session['payment_intent'] = intent['id']
+                events = [('checkout.session.completed', session), ('payment_intent.succeeded', intent)]
+            for event_type, obj in events:
+                self.emit(event_type, obj)
+            return session
+
+    def _auto_complete(self, session_id):
+        try:
+            self.complete_session(session_id)
+        except StripeError:
+            pass
+
+    def renew_subscription(self, subscription_id):
+        """Próximo ciclo cobrado: fatura ``subscription_cycle`` + ``invoice.paid``"""
+        with self._lock:
+            sub = self.get('subscriptions', subscription_id)
+            price = self.get('prices', sub['_price'])
+            sub['current_period_start'] = sub['current_period_end']
+            sub['current_period_end'] = sub['current_period_start'] + _period_seconds(price)
+            sub['status'] = 'active'
+            intent, charge = self._charge(price['unit_amount'], sub['customer'])
+            invoice = self._invoice(sub, 'subscription_cycle', price['unit_amount'], charge, intent)
+            sub['latest_invoice'] = invoice['id']
+            self.emit('invoice.paid', invoice)
+            return invoice
+
+    def fail_subscription_payment(self, subscription_id):
+        with self._lock:
+            sub = self.get('subscriptions', subscription_id)
+            price = self.get('prices', sub['_price'])
+            invoice = self._invoice(sub, 'subscription_cycle', 0)
+            invoice.update(status='open', paid=False, amount_paid=0, amount_due=price['unit_amount'],
+                           attempt_count=1)
+            sub['status'] = 'past_due'
+            self.emit('invoice.payment_failed', invoice)
+            return invoice
+
+    # Webhooks
+
+    def emit(self, event_type, obj):
+        event = {
+            'id': f'evt_{secrets.token_hex(12)}', 'object': 'event', 'type': event_type,
+            'created': int(time.time()), 'livemode': False, 'api_version': '2023-10-16',
+            'pending_webhooks': 1, 'data': {'object': self.public(obj)},
+        }
+        self.events.append(event)
+        if not self.webhook_url:
+            return event
+        if self.sync_webhooks:
+            self._deliver(event)
+        else:
+            self._deliveries.submit(self._deliver, event)
+        return event
+
+    def _deliver(self, event):
+        import requests
+
+        payload = json.dumps(event).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.webhook_secret:
+            headers['Stripe-Signature'] = sign_payload(payload, self.webhook_secret)
+        try:
+            response = requests.post(self.webhook_url, data=payload, headers=headers, timeout=30)
+            result = str(response.status_code)
+        except requests.RequestException:
+            result = 'error'
+        with self._lock:
+            self.webhooks[result] += 1
+
+
+def _period_seconds(price):
+    recurring = (price or {}).get('recurring') or {}
+    interval = recurring.get('interval', 'month')
+    return INTERVAL_SECONDS.get(interval, INTERVAL_SECONDS['month']) * int(recurring.get('interval_count', 1))
+
+
+def _parse_path(path):
+    """``checkout/sessions/cs_x/expire`` → (recurso, id, ação)"""
+    path = path.strip('/')
+    for resource in sorted(RESOURCES, key=len, reverse=True):
+        if path == resource or path.startswith(resource + '/'):
+            rest = path[len(resource):].strip('/').split('/') if path != resource else []
+            object_id = rest[0] if rest else None
+            action = rest[1] if len(rest) > 1 else None
+            return resource, object_id, action
+    raise StripeError(404, f'Unrecognized request URL: /v1/{path}')
+
+
+def _route_label(path):
+    try:
+        resource, object_id, action = _parse_path(path)
+    except StripeError:
+        return path
+    return '/'.join(filter(None, [resource, ':id' if object_id else None, action]))
+
+
+def create_app(stripe_api: FakeStripe = None):
+    """Servidor HTTP do Stripe falso (Flask)"""
+    from flask import Flask, jsonify, redirect, request
+
+    stripe_api = stripe_api or FakeStripe()
+    app = Flask(__name__)
+    app.config['FAKE_STRIPE'] = stripe_api
+
+    def error_response(error):
+        return jsonify(error.body), error.status
+
+    @app.route('/v1/<path:path>', methods=['GET', 'POST', 'DELETE'])
+    def api(path):
+        if stripe_api.latency:
+            time.sleep(stripe_api.latency)
+        params = decode_params(list(request.args.items(multi=True)) + list(request.form.items(multi=True)))
+        try:
+            status, body = stripe_api.request(request.method, path, params)
+        except StripeError as e:
+            return error_response(e)
+        return jsonify(body), status
+
+    @app.get('/pay/<session_id>')
+    def pay(session_id):
+        try:
+            session = stripe_api.complete_session(session_id, request.args.get('method', 'card'))
+        except StripeError as e:
+            return error_response(e)
+        if session.get('success_url'):
+            return redirect(session['success_url'].replace('{CHECKOUT_SESSION_ID}', session_id))
+        return jsonify(stripe_api.public(session))
+
+    @app.post('/_sessions/<session_id>/complete')
+    def complete(session_id):
+        try:
+            session = stripe_api.complete_session(session_id, request.form.get('payment_method_type', 'card'))
+        except StripeError as e:
+            return error_response(e)
+        return jsonify(stripe_api.public(session))
+
+    @app.post('/_subscriptions/<subscription_id>/<action>')
+    def subscription_control(subscription_id, action):
+        handlers = {'renew': stripe_api.renew_subscription, 'fail': stripe_api.fail_subscription_payment}
+        if action not in handlers:
+            return jsonify(error='ação inválida'), 404
+        try:
+            return jsonify(stripe_api.public(handlers[action](subscription_id)))
+        except StripeError as e:
+            return error_response(e)
+
+    @app.get('/_stats')
+    def stats():
+        return jsonify(stripe_api.stats())
+
+    @app.get('/_events')
+    def events():
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify(list(stripe_api.events)[-limit:])
+
+    @app.post('/_reset')
+    def reset():
+        stripe_api.reset()
+        return jsonify(ok=True)
+
+    return app
+
+
+def main():
+    import os
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--latency', type=float, default=0.0, help='latência por chamada (s)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='probabilidade de 429 por chamada')
+    parser.add_argument('--webhook-url', help='ex.: http://127.0.0.1:5000/webhooks/stripe')
+    parser.add_argument('--webhook-secret', default=os.getenv('STRIPE_WEBHOOK_SECRET'))
+    parser.add_argument('--auto-complete', type=float, help='pagar as sessões sozinho após N segundos')
+    args = parser.parse_args()
+
+    from werkzeug.serving import run_simple
+
+    public_url = f'http://{args.host}:{args.port}'
+    fake = FakeStripe(args.latency, args.rate_limit, args.webhook_url, args.webhook_secret,
+                      args.auto_complete, public_url)
+    print(f"Stripe falso em {public_url} (STRIPE_API_BASE); webhooks → {args.webhook_url or 'desligados'}")
+    run_simple(args.host, args.port, create_app(fake), threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Bot API do Telegram falsa, para benchmarks e testes de carga
+
+Nenhuma chamada sai da máquina: cada método responde com um objeto
+plausível após uma latência configurável. Dois modos, com a mesma lógica
+(``FakeBotAPI``):
+
+- em processo: ``FakeBotAPIRequest`` implementa o BaseRequest do PTB;
+- servidor HTTP: ``python -m benchmarks.fake_telegram --port 8081`` e
+  ``TELEGRAM_API_BASE=http://127.0.0.1:8081`` no bot e no Flask.
+
+Métodos com resposta própria: getMe, sendMessage, sendPhoto,
+editMessageText, getChat, getChatMember, banChatMember, unbanChatMember,
+createChatInviteLink; os demais retornam True. Membros banidos aparecem
+como ``kicked`` no getChatMember até o unban.
+
+Rate limit: ``rate_limit`` (probabilidade por chamada) e
+``max_per_second`` (envios por segundo, global) respondem 429 com
+``parameters.retry_after``, como o Telegram. ``GET /_stats`` mostra as
+chamadas por método e os 429; ``POST /_reset`` zera o estado.
+
+As mensagens enviadas/editadas ficam em ``GET /_chats/<chat_id>?after=<seq>``
+(texto e teclado inline), para um driver de carga seguir os fluxos do bot
+como um usuário: ler o teclado e "clicar" com ``make_callback_update``.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from telegram.request import BaseRequest
+
+BOT_USER = {"id": 999000, "is_bot": True, "first_name": "TeleVIP", "username": "TestVIPBot"}
+
+# Métodos que contam para o limite de envios por segundo
+SEND_METHODS = frozenset({'sendMessage', 'sendPhoto', 'sendDocument', 'sendVideo', 'copyMessage',
+                          'forwardMessage', 'editMessageText'})
+CHAT_LOG_SIZE = 20
+
+
+class FakeBotAPI:
+    """Estado e respostas da Bot API falsa (thread-safe)"""
+
+    def __init__(self, latency: float = 0.0, rate_limit: float = 0.0, max_per_second: int = 0,
+                 retry_after: int = 1, seed=None):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.max_per_second = max_per_second
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = Counter()
+            self.rate_limited = Counter()
+            self._message_id = 0
+            self._invite_id = 0
+            self._banned = set()  # (chat_id, user_id)
+            self._window = (0, 0)  # (segundo, envios nele)
+            self._chats = defaultdict(lambda: deque(maxlen=CHAT_LOG_SIZE))
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'rate_limited': dict(self.rate_limited),
+                'total_calls': sum(self.calls.values()),
+                'total_rate_limited': sum(self.rate_limited.values()),
+                'banned': len(self._banned),
+            }
+
+    def _throttled(self, method: str) -> bool:
+        if self.rate_limit and self._random.random() < self.rate_limit:
+            return True
+        if self.max_per_second and method in SEND_METHODS:
+            second = int(time.monotonic())
+            current, count = self._window
+            count = count + 1 if current == second else 1
+            self._window = (second, count)
+            return count > self.max_per_second
+        return False
+
+    def handle(self, method: str, params: dict):
+        """(status HTTP, corpo JSON) da chamada ``method``"""
+        with self._lock:
+            self.calls[method] += 1
+            if self._throttled(method):
+                self.rate_limited[method] += 1
+                return 429, {
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+            return 200, {"ok": True, "result": self._result(method, params)}
+
+    def chat_log(self, chat_id: int, after: int = 0) -> list:
+        """Mensagens enviadas ao chat com ``seq`` > ``after``"""
+        with self._lock:
+            return [m for m in self._chats.get(chat_id, ()) if m['seq'] > after]
+
+    def _message(self, params: dict, **extra) -> dict:
+        self._message_id += 1
+        chat_id = _int(params.get('chat_id'))
+        markup = params.get('reply_markup')
+        if isinstance(markup, str):
+            markup = json.loads(markup)
+        self._chats[chat_id].append({
+            "seq": self._message_id, "text": params.get('text') or params.get('caption') or '',
+            "reply_markup": markup, "at": time.time(),
+        })
+        return {
+            "message_id": self._message_id, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": BOT_USER, **extra,
+        }
+
+    def _result(self, method: str, params: dict):
+        if method == 'getMe':
+            return BOT_USER
+        if method in ('sendMessage', 'editMessageText'):
+            return self._message(params, text=params.get('text', ''))
+        if method == 'sendPhoto':
+            return self._message(params, caption=params.get('caption', ''), photo=[
+                {"file_id": f"photo{self._message_id}", "file_unique_id": f"u{self._message_id}",
+                 "width": 800, "height": 600},
+            ])
+        if method == 'getChat':
+            chat_id = _int(params.get('chat_id'))
+            return {"id": chat_id, "type": "supergroup", "title": f"Grupo {chat_id}"}
+        if method == 'getChatMember':
+            chat_id, user_id = _int(params.get('chat_id')), _int(params.get('user_id'))
+            if user_id == BOT_USER['id']:
+                status = 'administrator'
+            else:
+                status = 'kicked' if (chat_id, user_id) in self._banned else 'member'
+            member = {"status": status, "user": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}}
+            if status == 'administrator':
+                member.update(can_be_edited=False, can_manage_chat=True, can_delete_messages=True,
+                              can_restrict_members=True, can_invite_users=True, can_promote_members=False,
+                              can_change_info=True, can_post_stories=False, can_edit_stories=False,
+                              can_delete_stories=False, can_manage_video_chats=True, is_anonymous=False)
+            elif status == 'kicked':
+                member['until_date'] = 0
+            return member
+        if method == 'banChatMember':
+            self._banned.add((_int(params.get('chat_id')), _int(params.get('user_id'))))
+            return True
+        if method == 'unbanChatMember':
+            self._banned.discard((_int(params.get('chat_id')), _int(params.get('user_id'))))
+            return True
+        if method == 'createChatInviteLink':
+            self._invite_id += 1
+            return {
+                "invite_link": f"https://t.me/+fake{self._invite_id:08d}", "creator": BOT_USER,
+                "creates_join_request": bool(params.get('creates_join_request')),
+                "is_primary": False, "is_revoked": False,
+                "member_limit": _int(params.get('member_limit')) or None,
+            }
+        return True
+
+
+def _int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class FakeBotAPIRequest(BaseRequest):
+    """BaseRequest do PTB respondendo com a ``FakeBotAPI``, sem rede"""
+
+    def __init__(self, latency: float = 0.0, api: FakeBotAPI = None):
+        self.api = api or FakeBotAPI()
+        self.latency = latency
+
+    @property
+    def calls(self) -> int:
+        return self.api.total_calls
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        status, body = self.api.handle(endpoint, params)
+        return status, json.dumps(body).encode()
+
+
+def create_app(api: FakeBotAPI = None):
+    """Servidor HTTP da Bot API falsa (Flask)"""
+    from flask import Flask, jsonify, request
+
+    api = api or FakeBotAPI()
+    app = Flask(__name__)
+    app.config['FAKE_BOT_API'] = api
+
+    @app.route('/bot<token>/<method>', methods=['GET', 'POST'])
+    def bot_method(token, method):
+        params = dict(request.args)
+        params.update(request.form)
+        params.update(request.get_json(silent=True) or {})
+        if api.latency:
+            time.sleep(api.latency)
+        status, body = api.handle(method, params)
+        return jsonify(body), status
+
+    @app.get('/_stats')
+    def stats():
+        return jsonify(api.stats())
+
+    @app.get('/_chats/<int(signed=True):chat_id>')
+    def chat_log(chat_id):
+        return jsonify(api.chat_log(chat_id, request.args.get('after', 0, type=int)))
+
+    @app.post('/_reset')
+    def reset():
+        api.reset()
+        return jsonify(ok=True)
+
+    return app
+
+
+def make_start_update(update_id: int, user_id: int, text: str = '/start') -> dict:
+    """Update de mensagem privada no formato da Bot API"""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    entities = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}] \
+        if text.startswith('/') else []
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+            "from": user, "text": text, "entities": entities,
+        },
+    }
+
+
+def make_callback_update(update_id: int, user_id: int, data: str, message_id: int = 1) -> dict:
+    """Clique num botão inline (callback_query) de uma mensagem do bot"""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": str(user_id), "data": data,
+            "message": {
+                "message_id": message_id, "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+                "from": BOT_USER, "text": "",
+            },
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='latência por chamada (s)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='probabilidade de 429 por chamada')
+    parser.add_argument('--max-per-second', type=int, default=0, help='envios/s antes de 429 (0 = sem limite)')
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    from werkzeug.serving import run_simple
+
+    api = FakeBotAPI(args.latency, args.rate_limit, args.max_per_second, args.retry_after)
+    print(f"Bot API falsa em http://{args.host}:{args.port} (TELEGRAM_API_BASE)")
+    run_simple(args.host, args.port, create_app(api), threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Infraestrutura dos benchmarks
+
+- ``bench_app``: app Flask com a config de teste (sem CSRF, rate limit ou
+  Redis) apontando para o banco de benchmark;
+- ``prepare_database``: cria e semeia o banco da escala pedida, ou
+  reaproveita o de um run anterior se o schema bate com os modelos e as
+  contagens também (SQLite em benchmarks/data/ por padrão;
+  ``--database-url`` para PostgreSQL);
+- ``measure``: cronometra uma função (aquecimento + repetições) e conta as
+  queries com o profiler de SQL;
+- ``save_results`` / ``compare``: resultados em JSON em benchmarks/results/
+  com commit, versões e escala, para comparar runs ao longo do tempo.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+def default_database_url(scale, seed):
+    return f"sqlite:///{os.path.join(DATA_DIR, f'bench_{scale}_s{seed}.db')}"
+
+
+def bench_app(database_url):
+    """App Flask para benchmark (precisa rodar antes de importar o bot)"""
+    # O engine do bot (bot/utils/database.py) lê DATABASE_URL no import
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['FLASK_ENV'] = 'benchmark'
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    os.environ.setdefault('STRIPE_SECRET_KEY', 'sk_test_benchmark')
+    os.environ.pop('BOT_TOKEN', None)
+    os.environ.pop('TELEGRAM_BOT_TOKEN', None)
+
+    import config as app_config
+
+    app_config.config['benchmark'] = type('BenchmarkConfig', (app_config.TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SESSION_FILE_DIR': os.path.join(tempfile.gettempdir(), 'televip-bench-sessions'),
+        # Sem logs de request lento/N+1: em 1M de linhas todo request é "lento"
+        'SQL_PROFILER_SLOW_MS': 0,
+        'SQL_N_PLUS_ONE_THRESHOLD': 0,
+    })
+
+    from app import create_app
+    app = create_app()
+    os.environ.pop('BOT_TOKEN', None)  # load_dotenv pode ter recarregado do .env
+    os.environ.pop('TELEGRAM_BOT_TOKEN', None)
+    return app
+
+
+def schema_matches(inspector, metadata):
+    """O banco tem todas as tabelas e colunas dos modelos atuais?"""
+    existing = set(inspector.get_table_names())
+    for name, table in metadata.tables.items():
+        if name not in existing:
+            return False
+        if {column.name for column in table.columns} - {c['name'] for c in inspector.get_columns(name)}:
+            return False
+    return True
+
+
+def prepare_database(app, scale, seed, reseed=False):
+    """Garantir o banco semeado da escala; devolve a contagem por entidade"""
+    from sqlalchemy import func, inspect
+
+    from app import db
+    from app.models import Creator, Transaction
+    from benchmarks.datagen import SCALES, dataset_shape, seed_database
+
+    shape = dataset_shape(SCALES[scale])
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with app.app_context():
+        if not reseed and schema_matches(inspect(db.engine), db.metadata):
+            existing = (db.session.query(func.count(Transaction.id)).scalar(),
+                        db.session.query(func.count(Creator.id)).scalar())
+            if existing == (shape['transactions'], shape['creators'] + 1):
+                return shape
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        seed_database(db.session, scale, seed)
+        print(f"Banco semeado ({scale}, seed {seed}) em {time.perf_counter() - started:.1f}s")
+    return shape
+
+
+def measure(func, repeat=5, warmup=1, setup=None):
+    """Tempos (ms) e queries de ``func``; ``setup`` roda fora do cronômetro"""
+    from app.utils import sql_profiler
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    times, queries = [], []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with sql_profiler.profile_queries() as profile:
+            started = time.perf_counter()
+            func()
+            times.append((time.perf_counter() - started) * 1000)
+        queries.append(profile.queries)
+
+    return {
+        'repeat': repeat,
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'mean_ms': round(statistics.mean(times), 3),
+        'max_ms': round(max(times), 3),
+        'stdev_ms': round(statistics.stdev(times), 3) if len(times) > 1 else 0.0,
+        'queries': int(statistics.median(queries)),
+    }
+
+
+@contextmanager
+def rollback_session(engine):
+    """Sessão cujos commits viram savepoints e tudo é desfeito no fim
+
+    Os jobs gravam no banco (expiram assinaturas, marcam lembretes); com o
+    rollback cada repetição encontra o mesmo estado.
+    """
+    from sqlalchemy.orm import Session
+
+    connection = engine.connect()
+    outer = connection.begin()
+    session = Session(bind=connection, join_transaction_mode='create_savepoint')
+    try:
+        yield session
+    finally:
+        session.close()
+        outer.rollback()
+        connection.close()
+
+
+def enable_sqlite_savepoints(engine):
+    """pysqlite adia o BEGIN e quebra SAVEPOINT; receita da documentação do SQLAlchemy"""
+    from sqlalchemy import event
+
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _emit_begin(connection):
+        connection.exec_driver_sql('BEGIN')
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(app, scale, seed, shape):
+    import sqlalchemy
+
+    from app import db
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    return {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'commit': _git_commit(),
+        'scale': scale,
+        'seed': seed,
+        'dataset': shape,
+        'database': dialect,
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'machine': f'{platform.system()} {platform.machine()}',
+    }
+
+
+def save_results(meta, results, path=None):
+    """Gravar o run em JSON; devolve o caminho"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = meta['created_at'].replace(':', '').replace('-', '').rstrip('Z')
+        path = os.path.join(RESULTS_DIR, f"{stamp}_{meta['scale']}_{meta['commit'] or 'nocommit'}.json")
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current):
+    """Linhas ``(nome, mediana antes, mediana agora, variação %, queries antes, queries agora)``"""
+    rows = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            rows.append((name, None, now['median_ms'], None, None, now['queries']))
+            continue
+        change = (now['median_ms'] - before['median_ms']) / before['median_ms'] * 100 \
+            if before['median_ms'] else None
+        rows.append((name, before['median_ms'], now['median_ms'], change, before['queries'], now['queries']))
+    return rows
@@ -0,0 +1,417 @@
+"""
+Teste de carga: dia de renovação (webhooks do Stripe + fluxos de compra no bot)
+
+Driver asyncio (httpx) contra um ambiente completo rodando localmente ou em
+staging:
+
+- renovações: para cada assinatura preparada, ``invoice.created`` seguido
+  de ``invoice.paid`` (``subscription_cycle``) ou, numa fração
+  (``--cancel-ratio``), ``customer.subscription.deleted`` — eventos
+  assinados com STRIPE_WEBHOOK_SECRET, enviados a /webhooks/stripe;
+- compras no bot: usuários novos mandam ``/start g_<slug>``, escolhem um
+  plano e pedem o checkout (``pay_stripe``), lendo as respostas do bot na
+  Bot API falsa (``/_chats``) e "clicando" nos botões como uma pessoa;
+- pool de conexões: ``/metrics`` do Flask (e do bot, ``--bot-metrics``)
+  é lido a cada ``--sample-interval`` para medir conexões em uso contra o
+  máximo do pool.
+
+Relatório: p50/p95/p99/máx e taxa de erro por cenário/etapa, vazão, e a
+saturação do pool por processo (pico, média, % do tempo no limite). O
+JSON vai para benchmarks/results/.
+
+Montagem (cada item num terminal):
+    python -m benchmarks.fake_telegram --port 8081
+    python -m benchmarks.fake_stripe --port 12111
+    # web: TELEGRAM_API_BASE=http://127.0.0.1:8081 STRIPE_API_BASE=http://127.0.0.1:12111
+    #      BOT_UPDATE_MODE=webhook RATELIMIT_ENABLED=false gunicorn -w 4 'app:create_app()'
+    # bot: as mesmas variáveis + BOT_UPDATE_MODE=webhook python -m bot.main
+    python -m benchmarks.load_renewal_day --database-url <banco do ambiente> --subscriptions 5000
+
+Sem RATELIMIT_ENABLED=false o limite de 60/min por IP do webhook do Stripe
+entra no teste (as respostas 429 aparecem separadas no relatório).
+Os eventos alteram as assinaturas preparadas (renovação/cancelamento): use
+um banco de benchmark (benchmarks/datagen.py) ou de staging.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from benchmarks import harness
+from benchmarks.fake_stripe import sign_payload
+from benchmarks.fake_telegram import make_callback_update, make_start_update
+
+LOAD_PREFIX = 'sub_load_'
+BOT_USER_BASE = 8_000_000_000
+_PLAN_CALLBACK = re.compile(r'^plan_\d+_\d+$')
+_POOL_SAMPLE = re.compile(r'^televip_db_pool_(connections_in_use|capacity)\{process="(\w+)"\} ([0-9.eE+-]+)$', re.M)
+
+
+# Dados
+
+def prepare(database_url, count, groups=20, boleto_ratio=0.25, seed=42):
+    """Assinaturas ativas com ``stripe_subscription_id`` de carga e grupos para o bot
+
+    Idempotente: assinaturas já preparadas são reaproveitadas.
+    """
+    from app import db
+    from app.models import Group, PricingPlan, Subscription
+
+    app = harness.bench_app(database_url)
+    rng = random.Random(seed)
+    with app.app_context():
+        subs = (Subscription.query
+                .filter(Subscription.status == 'active')
+                .filter(db.or_(Subscription.stripe_subscription_id.is_(None),
+                               Subscription.stripe_subscription_id.like(f'{LOAD_PREFIX}%')))
+                .order_by(Subscription.id).limit(count).all())
+        renewals = []
+        for sub in subs:
+            if not sub.stripe_subscription_id:
+                sub.stripe_subscription_id = f'{LOAD_PREFIX}{sub.id}'
+                sub.payment_method_type = 'boleto' if rng.random() < boleto_ratio else 'card'
+                sub.auto_renew = True
+            renewals.append({
+                'stripe_subscription_id': sub.stripe_subscription_id,
+                'amount': int(round(float(sub.plan.price) * 100)) if sub.plan else 0,
+                'duration_days': sub.plan.duration_days if sub.plan else 30,
+            })
+        db.session.commit()
+
+        active_plans = db.session.query(PricingPlan.group_id).filter(PricingPlan.is_active.is_(True))
+        slugs = [slug for slug, in db.session.query(Group.invite_slug)
+                 .filter(Group.is_active.is_(True), Group.id.in_(active_plans))
+                 .order_by(Group.id).limit(groups)]
+    return renewals, slugs
+
+
+def invoice_event(event_type, sub, billing_reason, charge_id=None, invoice_id=None):
+    now = datetime.utcnow()
+    period_end = int((now + timedelta(days=sub['duration_days'])).timestamp())
+    invoice = {
+        'id': invoice_id or f'in_load_{os.urandom(8).hex()}', 'object': 'invoice',
+        'subscription': sub['stripe_subscription_id'], 'billing_reason': billing_reason,
+        'amount_paid': sub['amount'] if event_type == 'invoice.paid' else 0,
+        'amount_due': sub['amount'], 'charge': charge_id,
+        'hosted_invoice_url': 'https://invoice.stripe.test/load',
+        'payment_settings': {'payment_method_types': ['card', 'boleto']},
+        'lines': {'data': [{'period': {'start': int(now.timestamp()), 'end': period_end}}]},
+    }
+    return _event(event_type, invoice)
+
+
+def deleted_event(sub):
+    return _event('customer.subscription.deleted', {
+        'id': sub['stripe_subscription_id'], 'object': 'subscription', 'status': 'canceled',
+        'cancel_at_period_end': False,
+    })
+
+
+def _event(event_type, obj):
+    return {'id': f'evt_load_{os.urandom(8).hex()}', 'object': 'event', 'type': event_type,
+            'created': int(time.time()), 'livemode': False, 'data': {'object': obj}}
+
+
+# Medição
+
+class Recorder:
+    """Latências e erros por cenário/etapa"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.counts = Counter()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def ok(self, name, seconds):
+        self.counts[name] += 1
+        self.latencies[name].append(seconds)
+
+    def error(self, name, reason, seconds=None):
+        self.counts[name] += 1
+        self.errors[name][reason] += 1
+        if seconds is not None:
+            self.latencies[name].append(seconds)
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        result = {}
+        for name in sorted(self.counts):
+            times = sorted(self.latencies[name])
+            errors = sum(self.errors[name].values())
+            total = self.counts[name]
+            result[name] = {
+                'requests': total,
+                'errors': dict(self.errors[name]),
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'throughput_per_s': round(total / elapsed, 2) if elapsed else 0.0,
+                **_percentiles(times),
+            }
+        return result
+
+
+def _percentiles(times):
+    if not times:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+
+    def pick(q):
+        return round(times[min(len(times) - 1, int(q * len(times)))] * 1000, 1)
+
+    return {'p50_ms': round(statistics.median(times) * 1000, 1), 'p95_ms': pick(0.95),
+            'p99_ms': pick(0.99), 'max_ms': round(times[-1] * 1000, 1)}
+
+
+class PoolSampler:
+    """Conexões em uso x máximo do pool, lidos do /metrics"""
+
+    def __init__(self, urls, interval, token=None):
+        self.urls = urls
+        self.interval = interval
+        self.headers = {'Authorization': f'Bearer {token}'} if token else {}
+        self.samples = defaultdict(list)  # processo -> [em uso]
+        self.capacity = {}
+        self.failures = 0
+
+    async def run(self, client, stop):
+        while not stop.is_set():
+            for url in self.urls:
+                try:
+                    response = await client.get(url, headers=self.headers)
+                    self.parse(response.text)
+                except Exception:
+                    self.failures += 1
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def parse(self, text):
+        in_use = Counter()
+        for metric, process, value in _POOL_SAMPLE.findall(text):
+            if metric == 'capacity':
+                self.capacity[process] = max(self.capacity.get(process, 0), int(float(value)))
+            else:
+                in_use[process] += float(value)
+        for process, value in in_use.items():
+            self.samples[process].append(value)
+
+    def summary(self):
+        result = {}
+        for process, values in self.samples.items():
+            capacity = self.capacity.get(process) or 0
+            peak = max(values)
+            result[process] = {
+                'samples': len(values), 'capacity': capacity or None,
+                'peak_in_use': peak, 'mean_in_use': round(statistics.mean(values), 2),
+                'peak_saturation': round(peak / capacity, 3) if capacity else None,
+                'time_at_capacity': round(sum(v >= capacity for v in values) / len(values), 3)
+                if capacity else None,
+            }
+        return result
+
+
+# Cenários
+
+async def renewal(client, args, sub, recorder, rng):
+    """invoice.created → invoice.paid, ou o cancelamento da assinatura"""
+    if rng.random() < args.cancel_ratio:
+        await post_stripe_event(client, args, deleted_event(sub), recorder)
+        return
+    charge_id = await create_fake_charge(client, args, sub) if args.stripe_fake else None
+    await post_stripe_event(client, args, invoice_event('invoice.created', sub, 'subscription_cycle'), recorder)
+    await post_stripe_event(client, args, invoice_event('invoice.paid', sub, 'subscription_cycle', charge_id),
+                            recorder)
+
+
+async def create_fake_charge(client, args, sub):
+    """Charge no Stripe falso, para o Charge.retrieve do invoice.paid ir e voltar"""
+    response = await client.post(f'{args.stripe_fake}/v1/charges', data={
+        'amount': sub['amount'], 'currency': 'brl', 'status': 'succeeded',
+        'payment_method_details[type]': 'card'})
+    return response.json().get('id')
+
+
+async def post_stripe_event(client, args, event, recorder):
+    payload = json.dumps(event).encode()
+    headers = {'Content-Type': 'application/json',
+               'Stripe-Signature': sign_payload(payload, args.webhook_secret)}
+    name = f"stripe:{event['type']}"
+    start = time.perf_counter()
+    try:
+        response = await client.post(f'{args.target}/webhooks/stripe', content=payload, headers=headers)
+    except Exception as e:
+        recorder.error(name, type(e).__name__, time.perf_counter() - start)
+        return
+    elapsed = time.perf_counter() - start
+    if response.status_code == 200:
+        recorder.ok(name, elapsed)
+    else:
+        recorder.error(name, f'http_{response.status_code}', elapsed)
+
+
+async def bot_purchase(client, args, index, slug, recorder):
+    """/start g_<slug> → plano → checkout, esperando cada resposta do bot"""
+    user_id = BOT_USER_BASE + index
+    update_id = index * 10
+    flow_start = time.perf_counter()
+    last_seq = 0
+
+    steps = (
+        ('start', make_start_update(update_id + 1, user_id, f'/start g_{slug}'),
+         lambda button: _PLAN_CALLBACK.match(button.get('callback_data', ''))),
+        ('plan', None, lambda button: button.get('callback_data') == 'pay_stripe'),
+        ('checkout', make_callback_update(update_id + 3, user_id, 'pay_stripe'),
+         lambda button: str(button.get('url', '')).startswith('http')),
+    )
+    chosen = None
+    for offset, (step, update, predicate) in enumerate(steps, start=1):
+        if update is None:
+            update = make_callback_update(update_id + offset, user_id, chosen)
+        name = f'bot:{step}'
+        start = time.perf_counter()
+        try:
+            response = await client.post(f'{args.target}/webhooks/telegram', json=update,
+                                         headers={'X-Telegram-Bot-Api-Secret-Token': args.telegram_secret})
+            if response.status_code != 200:
+                recorder.error(name, f'http_{response.status_code}', time.perf_counter() - start)
+                recorder.error('bot:flow', step)
+                return
+            button, last_seq = await wait_for_button(client, args, user_id, last_seq, predicate)
+        except Exception as e:
+            recorder.error(name, type(e).__name__, time.perf_counter() - start)
+            recorder.error('bot:flow', step)
+            return
+        if button is None:
+            recorder.error(name, 'timeout', time.perf_counter() - start)
+            recorder.error('bot:flow', step)
+            return
+        recorder.ok(name, time.perf_counter() - start)
+        chosen = button.get('callback_data')
+    recorder.ok('bot:flow', time.perf_counter() - flow_start)
+
+
+async def wait_for_button(client, args, chat_id, after, predicate):
+    """Primeiro botão que satisfaz ``predicate`` numa mensagem nova do bot"""
+    deadline = time.perf_counter() + args.step_timeout
+    while time.perf_counter() < deadline:
+        response = await client.get(f'{args.telegram_fake}/_chats/{chat_id}', params={'after': after})
+        for message in response.json():
+            after = max(after, message['seq'])
+            for row in (message.get('reply_markup') or {}).get('inline_keyboard', []):
+                for button in row:
+                    if predicate(button):
+                        return button, after
+        await asyncio.sleep(args.poll_interval)
+    return None, after
+
+
+async def run(args, renewals, slugs):
+    import httpx
+
+    recorder = Recorder()
+    sampler = PoolSampler([f'{args.target}/metrics'] + args.bot_metrics, args.sample_interval, args.metrics_token)
+    rng = random.Random(args.seed)
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.concurrency + args.bot_concurrency + 4)
+
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        sampling = asyncio.create_task(sampler.run(client, stop))
+        webhook_slots = asyncio.Semaphore(args.concurrency)
+        bot_slots = asyncio.Semaphore(args.bot_concurrency)
+
+        async def limited(slots, coro):
+            async with slots:
+                await coro
+
+        tasks = [limited(webhook_slots, renewal(client, args, sub, recorder, rng)) for sub in renewals]
+        if slugs:
+            tasks += [limited(bot_slots, bot_purchase(client, args, i, rng.choice(slugs), recorder))
+                      for i in range(1, args.bot_users + 1)]
+        rng.shuffle(tasks)
+        await asyncio.gather(*tasks)
+        recorder.finished = time.perf_counter()
+        stop.set()
+        await sampling
+    return recorder, sampler
+
+
+def _print_report(results, pool):
+    print(f"{'cenário':<38} {'req':>7} {'erro %':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'máx ms':>8}")
+    for name, row in results.items():
+        cells = [f"{row[k]:>8.1f}" if row[k] is not None else f"{'—':>8}"
+                 for k in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        print(f"{name:<38} {row['requests']:>7} {row['error_rate'] * 100:>6.1f}% "
+              f"{row['throughput_per_s']:>8.1f} {' '.join(cells)}")
+        if row['errors']:
+            print(f"{'':<38} erros: {row['errors']}")
+    if not pool:
+        print('\nPool: sem amostras (prometheus_client no alvo? /metrics acessível?)')
+        return
+    print(f"\n{'pool':<10} {'máximo':>7} {'pico':>6} {'média':>7} {'saturação':>10} {'tempo no limite':>16}")
+    for process, row in pool.items():
+        capacity = row['capacity'] or '∞'
+        saturation = f"{row['peak_saturation'] * 100:.0f}%" if row['peak_saturation'] is not None else '—'
+        at_capacity = f"{row['time_at_capacity'] * 100:.0f}%" if row['time_at_capacity'] is not None else '—'
+        print(f"{process:<10} {capacity:>7} {row['peak_in_use']:>6.0f} {row['mean_in_use']:>7.1f} "
+              f"{saturation:>10} {at_capacity:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='http://127.0.0.1:5000', help='Flask (gunicorn)')
+    parser.add_argument('--telegram-fake', default='http://127.0.0.1:8081')
+    parser.add_argument('--stripe-fake', help='ex.: http://127.0.0.1:12111 (cria as charges do invoice.paid)')
+    parser.add_argument('--bot-metrics', nargs='*', default=[], help='ex.: http://127.0.0.1:9101/metrics')
+    parser.add_argument('--metrics-token', default=os.getenv('METRICS_TOKEN'))
+    parser.add_argument('--database-url', required=True, help='banco do ambiente, para preparar as assinaturas')
+    parser.add_argument('--subscriptions', type=int, default=2000, help='assinaturas renovadas/canceladas')
+    parser.add_argument('--cancel-ratio', type=float, default=0.1)
+    parser.add_argument('--bot-users', type=int, default=200, help='fluxos de compra no bot')
+    parser.add_argument('--concurrency', type=int, default=50, help='webhooks do Stripe simultâneos')
+    parser.add_argument('--bot-concurrency', type=int, default=20, help='usuários do bot simultâneos')
+    parser.add_argument('--webhook-secret', default=os.getenv('STRIPE_WEBHOOK_SECRET'))
+    parser.add_argument('--telegram-secret', default=os.getenv('TELEGRAM_WEBHOOK_SECRET'))
+    parser.add_argument('--step-timeout', type=float, default=30.0, help='espera por resposta do bot (s)')
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--request-timeout', type=float, default=60.0)
+    parser.add_argument('--sample-interval', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='arquivo JSON (padrão: benchmarks/results/)')
+    args = parser.parse_args()
+    if not args.webhook_secret:
+        parser.error('--webhook-secret (ou STRIPE_WEBHOOK_SECRET) é obrigatório')
+    if args.bot_users and not args.telegram_secret:
+        parser.error('--telegram-secret (ou TELEGRAM_WEBHOOK_SECRET) é obrigatório com --bot-users')
+
+    renewals, slugs = prepare(args.database_url, args.subscriptions, seed=args.seed)
+    print(f"{len(renewals)} assinaturas preparadas, {len(slugs)} grupos para o bot; disparando...", flush=True)
+    recorder, sampler = asyncio.run(run(args, renewals, slugs))
+
+    results, pool = recorder.summary(), sampler.summary()
+    meta = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'commit': harness._git_commit(),
+        'scale': 'renewal-day',
+        'target': args.target,
+        'subscriptions': len(renewals),
+        'bot_users': args.bot_users if slugs else 0,
+        'concurrency': args.concurrency,
+        'bot_concurrency': args.bot_concurrency,
+        'pool': pool,
+    }
+    path = harness.save_results(meta, results, args.output)
+    print()
+    _print_report(results, pool)
+    print(f"\nResultados em {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,8 @@ from bot.utils.format_utils import (
     format_currency, escape_html
 )
 from app.models import Group, Creator, Subscription, Transaction, PricingPlan
+from app.utils import metrics
+from bot.utils import loop_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -252,6 +254,25 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode=ParseMode.HTML,
         )
 
+async def loopstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Piores bloqueios do event loop desde o start (só admins da plataforma, no privado)"""
+    chat = update.effective_chat
+    user = update.effective_user
+    if chat.type != 'private':
+        return
+
+    with get_db_session() as session:
+        is_admin = session.query(Creator.id).filter_by(
+            telegram_id=str(user.id), is_admin=True
+        ).first() is not None
+    if not is_admin:
+        return  # Silencioso
+
+    await update.message.reply_text(
+        loop_monitor.format_report(loop_monitor.get_monitor()),
+        parse_mode=ParseMode.HTML
+    )
+
 async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Enviar mensagem para todos os assinantes"""
     chat = update.effective_chat
@@ -559,6 +580,8 @@ async def handle_broadcast_confirm(update: Update, context: ContextTypes.DEFAULT
                 logger.warning(f"Falha ao enviar broadcast para {sub.telegram_user_id}: {e}")
                 failed += 1
 
+        metrics.record_broadcast('bot', sent, failed)
+
         # Atualizar last_broadcast_at
         group.last_broadcast_at = datetime.utcnow()
         session.commit()
@@ -8,6 +8,7 @@ from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
 from bot.utils.database import get_db_session
+from bot.utils.sharding import get_worker_count, get_worker_index, jump_hash
 from bot.utils.stripe_integration import (
     create_checkout_session,
     get_or_create_stripe_customer, get_or_create_stripe_price,
@@ -20,6 +21,7 @@ from bot.utils.format_utils import (
 )
 from app.models import Group, PricingPlan, Subscription, Transaction, Creator
 from app.services.payment_service import PaymentService
+from app.utils import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -588,6 +590,10 @@ async def _create_stripe_session(query, context, checkout_data):
         }
         if checkout_data.get('no_boleto'):
             metadata['no_boleto'] = 'true'
+        # O webhook do Stripe continua o trace deste clique (app/utils/tracing.py)
+        traceparent = tracing.current_traceparent()
+        if traceparent:
+            metadata['traceparent'] = traceparent
 
         if is_lifetime:
             result = await create_checkout_session(
@@ -743,14 +749,101 @@ async def _schedule_payment_check(context, user, chat_id, message_id, session_id
             'message_id': message_id,
             'session_id': session_id,
             'attempts': 0,
+            'traceparent': tracing.current_traceparent(),
         },
         name=job_name,
     )
+
+    # Registrar no user_data (persistido) para retomar o job após restart
+    context.user_data['payment_check'] = {
+        'chat_id': chat_id,
+        'message_id': message_id,
+        'session_id': session_id,
+        'scheduled_at': datetime.utcnow(),
+        'traceparent': tracing.current_traceparent(),
+    }
     logger.info(f"Auto-check de pagamento agendado para user {user.id}")
 
 
+def resume_payment_checks(application):
+    """Reagendar auto-checks de pagamento registrados no user_data persistido.
+
+    Os jobs do JobQueue vivem só em memória; após um restart (ou em outra
+    réplica) os checkouts em andamento são retomados a partir do user_data.
+    Com sharding, cada worker retoma só os usuários roteados para ele (mesma
+    chave de bot/utils/sharding.py), então nenhum checkout é verificado duas
+    vezes.
+    """
+    if not application.job_queue:
+        return 0
+
+    worker_count = get_worker_count()
+    worker_index = get_worker_index()
+    cutoff = datetime.utcnow() - timedelta(minutes=15)
+    resumed = 0
+    for user_id, user_data in application.user_data.items():
+        if worker_count > 1 and jump_hash(int(user_id), worker_count) != worker_index:
+            continue
+        pending = user_data.get('payment_check')
+        if not pending:
+            continue
+        if pending.get('scheduled_at', cutoff) <= cutoff:
+            user_data.pop('payment_check', None)
+            continue
+
+        job_name = f"payment_check_{user_id}"
+        if application.job_queue.get_jobs_by_name(job_name):
+            continue
+
+        # Descontar o tempo já decorrido do limite de 60 tentativas × 15s
+        elapsed = (datetime.utcnow() - pending['scheduled_at']).total_seconds()
+        application.job_queue.run_repeating(
+            _auto_check_payment,
+            interval=15,
+            first=5,
+            data={
+                'user_id': user_id,
+                'chat_id': pending['chat_id'],
+                'message_id': pending['message_id'],
+                'session_id': pending['session_id'],
+                'attempts': int(elapsed // 15),
+                'traceparent': pending.get('traceparent'),
+            },
+            name=job_name,
+        )
+        resumed += 1
+
+    if resumed:
+        logger.info(f"{resumed} auto-check(s) de pagamento retomado(s) do estado persistido")
+    return resumed
+
+
 async def _auto_check_payment(context: ContextTypes.DEFAULT_TYPE):
     """Job que verifica automaticamente se o pagamento foi confirmado."""
+    data = context.job.data
+    attributes = {'stripe.session_id': data['session_id'], 'attempt': data.get('attempts', 0) + 1}
+    with tracing.start_span('payment.auto_check', attributes=attributes, parent=data.get('traceparent')):
+        await _check_payment(context)
+
+
+def _finish_payment_check(context: ContextTypes.DEFAULT_TYPE):
+    """Encerrar o auto-check e esquecer o checkout persistido.
+
+    Sem isso, ``resume_payment_checks`` retomaria após um restart checkouts
+    já concluídos (e mandaria outro link de convite).
+    """
+    job = context.job
+    job.schedule_removal()
+    user_id = job.data['user_id']
+    user_data = context.application.user_data.get(user_id)
+    pending = (user_data or {}).get('payment_check')
+    # Só o checkout deste job: um checkout mais novo continua pendente
+    if pending and pending.get('session_id') == job.data['session_id']:
+        user_data.pop('payment_check', None)
+        context.application.mark_data_for_update_persistence(user_ids=user_id)
+
+
+async def _check_payment(context: ContextTypes.DEFAULT_TYPE):
     job = context.job
     data = job.data
     user_id = data['user_id']
@@ -763,7 +856,7 @@ async def _auto_check_payment(context: ContextTypes.DEFAULT_TYPE):
     # Timeout: 60 tentativas × 15s = 15 minutos
     if data['attempts'] > 60:
         logger.info(f"Auto-check timeout para user {user_id} session {session_id}")
-        job.schedule_removal()
+        _finish_payment_check(context)
         return
 
     try:
@@ -773,19 +866,19 @@ async def _auto_check_payment(context: ContextTypes.DEFAULT_TYPE):
             ).first()
 
             if not txn:
-                job.schedule_removal()
+                _finish_payment_check(context)
                 return
 
             # Já processado (pelo webhook ou pelo botão "Já Paguei")
             if txn.status == 'completed':
                 sub = txn.subscription
                 if not sub:
-                    job.schedule_removal()
+                    _finish_payment_check(context)
                     return
 
                 group = sub.group
                 if not group:
-                    job.schedule_removal()
+                    _finish_payment_check(context)
                     return
 
                 type_label = "canal" if group.chat_type == 'channel' else "grupo"
@@ -841,12 +934,12 @@ async def _auto_check_payment(context: ContextTypes.DEFAULT_TYPE):
                     # Mensagem pode já ter sido editada pelo botão "Já Paguei"
                     logger.debug(f"Auto-check: não conseguiu editar mensagem: {e}")
 
-                job.schedule_removal()
+                _finish_payment_check(context)
                 return
 
             # Cancelado ou falhou
             if txn.status in ('cancelled', 'failed'):
-                job.schedule_removal()
+                _finish_payment_check(context)
                 return
 
             # Ainda pendente — verificar diretamente no Stripe a cada 3 tentativas
@@ -959,6 +1052,7 @@ async def abandon_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
     checkout_data = context.user_data.get('checkout')
     _cancel_pending(context, telegram_user_id=user.id)
     context.user_data.pop('checkout', None)
+    context.user_data.pop('payment_check', None)
 
     if checkout_data:
         group_id = checkout_data.get('group_id')
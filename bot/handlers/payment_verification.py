@@ -308,6 +308,7 @@ async def handle_payment_confirmed(query, context, transaction, db_session):
     context.user_data.pop('stripe_session_id', None)
     context.user_data.pop('stripe_checkout_url', None)
     context.user_data.pop('checkout', None)
+    context.user_data.pop('payment_check', None)
 
     # Log final
     if user_added:
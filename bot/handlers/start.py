@@ -17,7 +17,6 @@ from bot.utils.format_utils import (
     try_fix_stale_end_date
 )
 from app.models import Group, Creator, PricingPlan, Subscription, Transaction
-from bot.handlers.payment_verification import check_payment_from_start
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +50,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Tratar diferentes tipos de argumentos
     if args:
         if args[0].startswith('success_') or args[0] == 'payment_success':
+            # Stripe só é carregado quando o pagamento é verificado
+            from bot.handlers.payment_verification import check_payment_from_start
             await check_payment_from_start(update, context)
             return
         elif args[0] == 'cancel':
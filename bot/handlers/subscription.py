@@ -7,18 +7,18 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
-import stripe
 import os
 
 from bot.utils.database import get_db_session
+from bot.utils.stripe_integration import stripe
 from bot.keyboards.menus import get_renewal_keyboard
 from bot.utils.format_utils import (
     format_remaining_text, get_expiry_emoji, format_date, format_date_code,
     format_currency, format_currency_code, escape_html,
     is_sub_effectively_active, is_sub_renewing, try_fix_stale_end_date
 )
-from app import db
 from app.models import Subscription, Group, Creator, PricingPlan, Transaction
+from app.services import archive_service
 from app.services.payment_service import PaymentService
 
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
@@ -984,6 +984,11 @@ async def show_subscription_history(update: Update, context: ContextTypes.DEFAUL
             if has_completed:
                 all_subs.append(sub)
 
+        # Assinaturas antigas movidas para o arquivo (mesmas regras)
+        for sub in archive_service.archived_subscriptions(telegram_user_id=user.id, session=session):
+            if sub.status == 'expired' or any(t.status == 'completed' for t in sub.transactions):
+                all_subs.append(sub)
+
         all_history = all_subs
 
         # Agrupar por grupo — manter todas as subs por grupo
@@ -1114,7 +1119,11 @@ async def show_group_history(update: Update, context: ContextTypes.DEFAULT_TYPE)
         all_subs = session.query(Subscription).filter(
             Subscription.telegram_user_id == str(user.id),
             Subscription.group_id == group_id
-        ).order_by(Subscription.start_date.desc()).all()
+        ).all()
+        all_subs += archive_service.archived_subscriptions(
+            group_id=group_id, telegram_user_id=user.id, session=session
+        ).all()
+        all_subs.sort(key=lambda s: s.start_date or datetime.min, reverse=True)
 
         # Filtrar: só subs com pagamento real ou status significativo
         subs = []
@@ -0,0 +1,341 @@
+"""
+Envio das notificações enfileiradas pelo Flask (tabela notification_outbox)
+
+O Flask grava as mensagens na mesma transação da mudança de estado; aqui o
+bot reivindica lotes (``pending`` -> ``sending``), envia respeitando o limite
+global da Bot API e o intervalo por chat, e registra o resultado. RetryAfter
+reagenda o item, Forbidden/BadRequest falham de vez, o resto faz backoff.
+
+Com vários workers a fila é particionada pelo destino (``chat_id``): tudo o
+que vai para um mesmo chat/grupo passa pelo mesmo worker, na ordem do id. O
+acesso ao banco roda em thread para não travar o event loop.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import BigInteger, cast, func, or_
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from bot.utils.database import get_db_session
+from bot.utils.sharding import group_partition
+from app.models import NotificationOutbox, Subscription
+from app.utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+SENDING_TIMEOUT = timedelta(minutes=5)    # 'sending' parado há mais que isso volta para 'pending'
+SENT_RETENTION = timedelta(days=7)
+SUPPORT_URL = 'https://t.me/suporte_televip'
+
+# Referência global para o bot
+_application = None
+
+
+class SendRateLimiter:
+    """Limite global de mensagens/s + intervalo mínimo por chat.
+
+    Baseado em reservas: cada chamada reserva o próximo horário livre, então
+    vários envios concorrentes ficam corretamente espaçados.
+    """
+
+    def __init__(self, rate=25.0, chat_interval=1.0, group_interval=3.0, clock=time.monotonic):
+        self.min_gap = 1.0 / rate if rate > 0 else 0.0
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval  # grupos: ~20 msgs/min
+        self.clock = clock
+        self._next_global = 0.0
+        self._next_chat = {}
+
+    def reserve(self, chat_id=None) -> float:
+        """Reservar um horário de envio; retorna quantos segundos esperar
+
+        Sem ``chat_id`` só o limite global conta (chamadas que não postam
+        mensagem no chat, como remover um membro).
+        """
+        now = self.clock()
+        start = max(now, self._next_global)
+        if chat_id is not None:
+            key = str(chat_id)
+            interval = self.group_interval if key.startswith('-') else self.chat_interval
+            start = max(start, self._next_chat.get(key, 0.0))
+            self._next_chat[key] = start + interval
+        self._next_global = start + self.min_gap
+
+        if len(self._next_chat) > 10000:
+            self._next_chat = {k: t for k, t in self._next_chat.items() if t > now}
+        return start - now
+
+    async def acquire(self, chat_id=None):
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def get_rate_limiter() -> SendRateLimiter:
+    return SendRateLimiter(
+        rate=float(os.getenv('BOT_OUTBOX_RATE', '25')),
+        chat_interval=float(os.getenv('BOT_OUTBOX_CHAT_INTERVAL', '1')),
+    )
+
+
+def setup_outbox(application):
+    """Iniciar o loop de envio do outbox"""
+    global _application
+    _application = application
+    asyncio.create_task(outbox_loop())
+
+
+async def outbox_loop():
+    """Drenar o outbox continuamente (intervalo curto quando vazio)"""
+    await asyncio.sleep(5)
+    limiter = get_rate_limiter()
+    last_maintenance = 0.0
+
+    while True:
+        try:
+            if time.monotonic() - last_maintenance > 300:
+                await asyncio.to_thread(release_stale_items)
+                await asyncio.to_thread(purge_sent_items)
+                last_maintenance = time.monotonic()
+
+            processed = await process_outbox_batch(_application.bot, limiter)
+            if not processed:
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Erro no outbox_loop: {e}")
+            await asyncio.sleep(10)
+
+
+def _target_partition():
+    """Partição deste worker pelo destino do item (``chat_id``)
+
+    Itens sem destino (aviso por plano) caem na partição do próprio id.
+    """
+    target = func.coalesce(func.abs(cast(NotificationOutbox.chat_id, BigInteger)), NotificationOutbox.id)
+    return group_partition(target)
+
+
+def _expand_plan_subscribers(session, item):
+    """Transformar um aviso por plano em uma mensagem por assinante ativo"""
+    payload = item.get_payload()
+    subs = session.query(Subscription).filter_by(
+        plan_id=payload.get('plan_id'), status='active'
+    ).all()
+    for sub in subs:
+        end_date_str = sub.end_date.strftime('%d/%m/%Y') if sub.end_date else 'N/A'
+        NotificationOutbox.enqueue_message(
+            sub.telegram_user_id,
+            payload.get('text', '').replace('{end_date}', end_date_str),
+            session=session,
+        )
+    item.status = 'sent'
+    item.sent_at = datetime.utcnow()
+    return len(subs)
+
+
+def claim_batch(limit=BATCH_SIZE):
+    """Reivindicar itens pendentes da partição deste worker (pending -> sending)"""
+    now = datetime.utcnow()
+    claimed = []
+
+    with get_db_session() as session:
+        items = session.query(NotificationOutbox).filter(
+            NotificationOutbox.status == 'pending',
+            or_(NotificationOutbox.available_at.is_(None), NotificationOutbox.available_at <= now),
+            _target_partition(),
+        ).order_by(NotificationOutbox.id).limit(limit).with_for_update(skip_locked=True).all()
+
+        for item in items:
+            if item.kind == NotificationOutbox.KIND_PLAN_SUBSCRIBERS:
+                _expand_plan_subscribers(session, item)
+                continue
+            item.status = 'sending'
+            item.available_at = now  # marca o início do envio (ver release_stale_items)
+            item.attempts = (item.attempts or 0) + 1
+            claimed.append({
+                'id': item.id,
+                'kind': item.kind,
+                'chat_id': item.chat_id,
+                'payload': item.get_payload(),
+                'attempts': item.attempts,
+            })
+
+    return claimed
+
+
+def _record_results(results):
+    """Gravar o resultado dos envios de um lote"""
+    if not results:
+        return
+    with get_db_session() as session:
+        for item_id, status, error, available_at in results:
+            item = session.get(NotificationOutbox, item_id)
+            if not item:
+                continue
+            item.status = status
+            item.last_error = error[:500] if error else None
+            if status == 'sent':
+                item.sent_at = datetime.utcnow()
+            elif status == 'pending':
+                item.available_at = available_at
+
+
+async def _send_message(bot, chat_id, payload):
+    reply_markup = payload.get('reply_markup')
+    await bot.send_message(
+        chat_id=chat_id,
+        text=payload.get('text', ''),
+        parse_mode=ParseMode.HTML,
+        reply_markup=InlineKeyboardMarkup.de_json(reply_markup, bot) if reply_markup else None,
+    )
+
+
+async def _send_access_link(bot, chat_id, payload):
+    """Criar link de uso único (fallback: link fixo) e enviar a mensagem de acesso"""
+    invite_link = None
+    if payload.get('group_chat_id'):
+        try:
+            link_obj = await bot.create_chat_invite_link(
+                chat_id=int(payload['group_chat_id']),
+                member_limit=1,
+            )
+            invite_link = link_obj.invite_link
+        except TelegramError as e:
+            logger.warning(f"Erro ao criar link de uso único: {e}")
+    invite_link = invite_link or payload.get('fallback_link')
+
+    if invite_link:
+        text = payload.get('text_with_link', '')
+        button = InlineKeyboardButton(payload.get('button_text', 'Entrar'), url=invite_link)
+    else:
+        text = payload.get('text_without_link', '')
+        button = InlineKeyboardButton('Suporte', url=SUPPORT_URL)
+
+    await bot.send_message(
+        chat_id=chat_id,
+        text=text,
+        parse_mode=ParseMode.HTML,
+        reply_markup=InlineKeyboardMarkup([[button]]),
+    )
+
+
+async def _kick_member(bot, chat_id, payload):
+    """Remover usuário do grupo (ban + unban), exceto admins"""
+    user_id = int(payload['user_id'])
+    chat_id = int(chat_id)
+    try:
+        member = await bot.get_chat_member(chat_id=chat_id, user_id=user_id)
+        if member.status in ['administrator', 'creator', 'left', 'kicked']:
+            return
+    except (Forbidden, BadRequest) as e:
+        # Usuário não encontrado no grupo (ou o bot já não está nele): nada a remover
+        logger.info(f"Usuário {user_id} não é membro do grupo {chat_id}: {e}")
+        return
+    except TelegramError:
+        pass  # Sem confirmação do status — segue com a remoção
+
+    await bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
+    await bot.unban_chat_member(chat_id=chat_id, user_id=user_id, only_if_banned=True)
+    logger.info(f"Usuário {user_id} removido do grupo {chat_id} (outbox)")
+
+
+_SENDERS = {
+    NotificationOutbox.KIND_MESSAGE: _send_message,
+    NotificationOutbox.KIND_ACCESS_LINK: _send_access_link,
+    NotificationOutbox.KIND_KICK: _kick_member,
+}
+
+
+async def _deliver(bot, limiter, item):
+    """Enviar um item; retorna (id, status, erro, available_at)
+
+    O span continua o trace de quem enfileirou (``traceparent`` do payload) e
+    inclui a espera no rate limiter.
+    """
+    attributes = {'outbox.id': item['id'], 'outbox.kind': item['kind'], 'outbox.attempt': item['attempts']}
+    with tracing.start_span(f"outbox {item['kind']}", tracing.KIND_CONSUMER, attributes,
+                            parent=item['payload'].get('traceparent')) as span:
+        result = await _attempt_delivery(bot, limiter, item)
+        if span is not None:
+            span.set_attribute('outbox.status', result[1])
+            if result[2]:
+                span.set_error(result[2])
+        return result
+
+
+async def _attempt_delivery(bot, limiter, item):
+    sender = _SENDERS.get(item['kind'])
+    if not sender:
+        return item['id'], 'failed', f"tipo desconhecido: {item['kind']}", None
+
+    # Remoção de membro não é mensagem no grupo: só o limite global
+    chat_id = None if item['kind'] == NotificationOutbox.KIND_KICK else item['chat_id']
+    await limiter.acquire(chat_id)
+    try:
+        await sender(bot, item['chat_id'], item['payload'])
+        return item['id'], 'sent', None, None
+    except RetryAfter as e:
+        retry_after = e.retry_after
+        if isinstance(retry_after, timedelta):
+            retry_after = retry_after.total_seconds()
+        logger.warning(f"Outbox: flood control, item {item['id']} reagendado em {retry_after}s")
+        return item['id'], 'pending', str(e), datetime.utcnow() + timedelta(seconds=float(retry_after))
+    except (Forbidden, BadRequest) as e:
+        # Usuário bloqueou o bot / chat inválido — tentar de novo não adianta
+        return item['id'], 'failed', str(e), None
+    except Exception as e:
+        if item['attempts'] >= MAX_ATTEMPTS:
+            logger.error(f"Outbox: item {item['id']} falhou após {item['attempts']} tentativas: {e}")
+            return item['id'], 'failed', str(e), None
+        delay = BACKOFF_BASE_SECONDS * 2 ** (item['attempts'] - 1)
+        return item['id'], 'pending', str(e), datetime.utcnow() + timedelta(seconds=delay)
+
+
+@metrics.instrument_job('outbox', trace=False)  # sem span por lote vazio; cada entrega tem o seu
+async def process_outbox_batch(bot, limiter=None, limit=BATCH_SIZE) -> int:
+    """Reivindicar e enviar um lote. Retorna quantos itens foram processados."""
+    items = await asyncio.to_thread(claim_batch, limit)
+    if not items:
+        return 0
+
+    limiter = limiter or get_rate_limiter()
+    results = await asyncio.gather(*(_deliver(bot, limiter, item) for item in items))
+    await asyncio.to_thread(_record_results, results)
+
+    sent = sum(1 for r in results if r[1] == 'sent')
+    metrics.record_job_items('outbox', len(items))
+    metrics.record_broadcast('outbox', sent, sum(1 for r in results if r[1] == 'failed'))
+    logger.info(f"Outbox: {sent}/{len(items)} itens enviados")
+    return len(items)
+
+
+def release_stale_items():
+    """Devolver para 'pending' itens presos em 'sending' (worker morreu no meio do envio)"""
+    cutoff = datetime.utcnow() - SENDING_TIMEOUT
+    with get_db_session() as session:
+        return session.query(NotificationOutbox).filter(
+            NotificationOutbox.status == 'sending',
+            NotificationOutbox.available_at < cutoff,
+            _target_partition(),
+        ).update({'status': 'pending'}, synchronize_session=False)
+
+
+def purge_sent_items():
+    """Apagar itens enviados há mais de SENT_RETENTION"""
+    cutoff = datetime.utcnow() - SENT_RETENTION
+    with get_db_session() as session:
+        return session.query(NotificationOutbox).filter(
+            NotificationOutbox.status == 'sent',
+            NotificationOutbox.sent_at < cutoff,
+            _target_partition(),
+        ).delete(synchronize_session=False)
@@ -9,9 +9,12 @@ from telegram.ext import Application
 from telegram.error import TelegramError
 from telegram.constants import ParseMode
 
-from bot.utils.database import get_db_session
+from bot.utils.database import engine, get_db_session
 from bot.utils.format_utils import try_fix_stale_end_date
+from bot.utils.sharding import get_worker_index, group_partition
 from app.models import Subscription, Group, Transaction
+from app.services import archive_service
+from app.utils import metrics, partitioning
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +23,7 @@ _application = None
 
 
 def setup_jobs(application: Application):
-    """Configurar jobs agendados"""
+    """Configurar jobs agendados (cada worker processa só a sua partição de grupos)"""
     global _application
     _application = application
 
@@ -30,6 +33,14 @@ def setup_jobs(application: Application):
     asyncio.create_task(send_reminders_loop())
     asyncio.create_task(audit_members_loop())
     asyncio.create_task(resubscribe_reminders_loop())
+    asyncio.create_task(archive_loop())
+    if get_worker_index() == 0:
+        # Partições de transactions não são por grupo: um worker só
+        asyncio.create_task(partitions_loop())
+
+    # Notificações enfileiradas pelo Flask (outbox)
+    from bot.jobs.notification_outbox import setup_outbox
+    setup_outbox(application)
 
     logger.info("Sistema de tarefas agendadas ativo")
 
@@ -68,6 +79,7 @@ async def send_reminders_loop():
             await asyncio.sleep(3600)
 
 
+@metrics.instrument_job('check_expired_subscriptions')
 async def check_expired_subscriptions():
     """Verificar assinaturas expiradas: avisar → grace period 2 dias → remover"""
     try:
@@ -79,6 +91,7 @@ async def check_expired_subscriptions():
 
             # ── Fase 0: Recuperar subs Stripe marcadas como expired incorretamente ──
             falsely_expired = session.query(Subscription).filter(
+                group_partition(Subscription.group_id),
                 Subscription.status == 'expired',
                 Subscription.stripe_subscription_id.isnot(None),
                 Subscription.is_legacy == False,
@@ -94,6 +107,7 @@ async def check_expired_subscriptions():
 
             # ── Fase 1: Marcar como expiradas + avisar (NÃO remove ainda) ──
             newly_expired = session.query(Subscription).filter(
+                group_partition(Subscription.group_id),
                 Subscription.status == 'active',
                 Subscription.end_date < now
             ).all()
@@ -129,6 +143,7 @@ async def check_expired_subscriptions():
 
             # ── Fase 2: Remover do grupo após grace period de 2 dias ──
             to_remove = session.query(Subscription).filter(
+                group_partition(Subscription.group_id),
                 Subscription.status == 'expired',
                 Subscription.end_date < grace_cutoff,
                 Subscription.end_date > now - timedelta(days=30)
@@ -169,6 +184,7 @@ async def check_expired_subscriptions():
 
             # ── Fase 3: Suspensos/disputados — remover sempre ──
             suspended_subs = session.query(Subscription).filter(
+                group_partition(Subscription.group_id),
                 Subscription.status.in_(['suspended', 'disputed'])
             ).all()
             suspended_processed = 0
@@ -177,6 +193,8 @@ async def check_expired_subscriptions():
                 suspended_processed += 1
 
             session.commit()
+            metrics.record_job_items(
+                'check_expired_subscriptions', warned + removed + suspended_processed + fixed + recovered)
 
             if warned or removed or skipped or suspended_processed or fixed:
                 logger.info(
@@ -348,6 +366,7 @@ async def audit_members_loop():
             await asyncio.sleep(3600)
 
 
+@metrics.instrument_job('audit_group_members')
 async def audit_group_members():
     """Verificar se usuários sem assinatura ativa ainda estão nos grupos"""
     if not _application:
@@ -357,6 +376,7 @@ async def audit_group_members():
         with get_db_session() as session:
             # Get all groups with telegram_id
             groups = session.query(Group).filter(
+                group_partition(Group.id),
                 Group.telegram_id != None,
                 Group.is_active == True
             ).all()
@@ -447,6 +467,7 @@ async def audit_group_members():
                     # Rate limiting: avoid hitting Telegram API too fast
                     await asyncio.sleep(0.5)
 
+            metrics.record_job_items('audit_group_members', total_removed)
             logger.info(f"Auditoria concluída: {total_removed} usuários removidos")
 
             # Reforçar permissões anti-leak em grupos com proteção ativa
@@ -462,6 +483,7 @@ async def audit_group_members():
         logger.error(f"Erro na auditoria de membros: {e}")
 
 
+@metrics.instrument_job('send_renewal_reminders')
 async def send_renewal_reminders():
     """Enviar lembretes de renovação (pré-expiração + grace period)"""
     if not _application:
@@ -478,6 +500,7 @@ async def send_renewal_reminders():
                 target_end = now + timedelta(days=days)
 
                 subs = session.query(Subscription).filter(
+                    group_partition(Subscription.group_id),
                     Subscription.status == 'active',
                     Subscription.end_date >= target_start,
                     Subscription.end_date < target_end
@@ -493,6 +516,7 @@ async def send_renewal_reminders():
             grace_end = now - timedelta(hours=12)
 
             expired_in_grace = session.query(Subscription).filter(
+                group_partition(Subscription.group_id),
                 Subscription.status == 'expired',
                 Subscription.end_date >= grace_start,
                 Subscription.end_date < grace_end
@@ -512,6 +536,7 @@ async def send_renewal_reminders():
                 await send_grace_period_reminder(sub)
                 reminders_sent += 1
 
+            metrics.record_job_items('send_renewal_reminders', reminders_sent)
             logger.info(f"{reminders_sent} lembretes enviados")
 
     except Exception as e:
@@ -575,7 +600,7 @@ async def send_renewal_notification(subscription, days_left):
                 # Fetch card last4 from Stripe Subscription's default payment method
                 if subscription.stripe_subscription_id:
                     try:
-                        import stripe
+                        from bot.utils.stripe_integration import stripe
                         stripe_sub = stripe.Subscription.retrieve(
                             subscription.stripe_subscription_id,
                             expand=['default_payment_method']
@@ -721,6 +746,7 @@ async def resubscribe_reminders_loop():
             await asyncio.sleep(3600)
 
 
+@metrics.instrument_job('send_resubscribe_reminders')
 async def send_resubscribe_reminders():
     """Enviar lembretes para assinaturas expiradas (3, 14, 30 dias)"""
     if not _application:
@@ -743,6 +769,7 @@ async def send_resubscribe_reminders():
                 target_end = now - timedelta(days=days) + timedelta(hours=tolerance_hours)
 
                 expired_subs = session.query(Subscription).filter(
+                    group_partition(Subscription.group_id),
                     Subscription.status == 'expired',
                     Subscription.end_date >= target_start,
                     Subscription.end_date <= target_end
@@ -775,6 +802,7 @@ async def send_resubscribe_reminders():
 
                 session.commit()
 
+            metrics.record_job_items('send_resubscribe_reminders', reminders_sent)
             logger.info(f"Remarketing: {reminders_sent} lembretes de re-assinatura enviados")
 
     except Exception as e:
@@ -833,3 +861,50 @@ async def _send_resubscribe_message(subscription, reminder_type):
     except Exception as e:
         logger.error(f"Erro ao enviar remarketing para {subscription.telegram_user_id}: {e}")
         return False
+
+
+# ──────────────────────────────────────────────
+# Arquivamento de assinaturas/transações frias
+# ──────────────────────────────────────────────
+
+async def archive_loop():
+    """Arquivar linhas frias 1x por dia"""
+    await asyncio.sleep(300)  # Depois dos outros jobs do startup
+
+    while True:
+        try:
+            await archive_cold_rows()
+            await asyncio.sleep(86400)  # 24 horas
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Erro no archive_loop: {e}")
+            await asyncio.sleep(3600)
+
+
+@metrics.instrument_job('archive_cold_rows')
+async def archive_cold_rows():
+    """Mover assinaturas expiradas antigas e checkouts abandonados para o arquivo"""
+    def run():
+        with get_db_session() as session:
+            return archive_service.archive_cold_rows(session, partition=group_partition)
+
+    # Em thread: o primeiro arquivamento pode levar vários lotes
+    moved = await asyncio.to_thread(run)
+    metrics.record_job_items('archive_cold_rows', moved['subscriptions'] + moved['transactions'])
+    return moved
+
+
+async def partitions_loop():
+    """Criar as próximas partições mensais de transactions 1x por dia (PostgreSQL)"""
+    await asyncio.sleep(60)
+
+    while True:
+        try:
+            await asyncio.to_thread(partitioning.ensure_transaction_partitions, engine)
+            await asyncio.sleep(86400)  # 24 horas
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Erro no partitions_loop: {e}")
+            await asyncio.sleep(3600)
@@ -22,6 +22,9 @@ if sys.platform == 'win32':
 # Adicionar o diretório raiz ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Marca o início do startup (fases em bot/utils/startup.py)
+from bot.utils import startup
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand, BotCommandScopeAllPrivateChats, BotCommandScopeAllGroupChats, BotCommandScopeAllChatAdministrators
 from telegram.constants import ParseMode
 from telegram.ext import (
@@ -31,30 +34,48 @@ from telegram.ext import (
 
 # Importar handlers
 from bot.handlers.start import start_command, show_user_dashboard
-from bot.handlers.payment import (
-    start_payment, handle_payment_method,
-    list_user_subscriptions, handle_payment_success,
-    abandon_payment, back_to_methods, show_group_plans, show_change_plan
-)
-from bot.handlers.subscription import (
-    status_command, handle_renewal,
-    cancel_subscription, confirm_cancel_subscription,
-    reactivate_subscription, get_invite_link,
-    show_active_subscriptions, show_subscription_detail,
-    show_subscription_history, show_group_history, show_subscription_transactions
-)
 from bot.handlers.admin import (
-    setup_command, stats_command, broadcast_command,
+    setup_command, stats_command, broadcast_command, loopstats_command,
     handle_join_request, handle_new_chat_members, handle_chat_member_update,
     handle_broadcast_to_group, handle_broadcast_confirm, handle_cancel_broadcast,
     handle_broadcast_text
 )
-from bot.handlers.payment_verification import check_payment_status
 from bot.handlers.antileak import (
     antileak_command, handle_antileak_toggle,
     antileak_message_monitor
 )
-from bot.utils.database import get_db_session
+from bot.utils.database import engine, get_db_session
+from bot.utils.loop_monitor import start_loop_monitor
+from bot.utils.metrics import InstrumentedHTTPXRequest, start_metrics_server
+from bot.utils.persistence import RedisPersistence
+from bot.utils.update_processor import ChatOrderedUpdateProcessor
+from bot.utils.ingress import get_update_mode, run_webhook_ingestion
+from bot.utils.sharding import get_worker_count, get_worker_index
+from app.services import telegram_service
+from app.utils import metrics, tracing
+
+# Handlers que usam o SDK do Stripe: importados no primeiro update ou no warm-up
+start_payment = startup.lazy('bot.handlers.payment:start_payment')
+handle_payment_method = startup.lazy('bot.handlers.payment:handle_payment_method')
+list_user_subscriptions = startup.lazy('bot.handlers.payment:list_user_subscriptions')
+abandon_payment = startup.lazy('bot.handlers.payment:abandon_payment')
+back_to_methods = startup.lazy('bot.handlers.payment:back_to_methods')
+show_group_plans = startup.lazy('bot.handlers.payment:show_group_plans')
+show_change_plan = startup.lazy('bot.handlers.payment:show_change_plan')
+check_payment_status = startup.lazy('bot.handlers.payment_verification:check_payment_status')
+status_command = startup.lazy('bot.handlers.subscription:status_command')
+handle_renewal = startup.lazy('bot.handlers.subscription:handle_renewal')
+cancel_subscription = startup.lazy('bot.handlers.subscription:cancel_subscription')
+confirm_cancel_subscription = startup.lazy('bot.handlers.subscription:confirm_cancel_subscription')
+reactivate_subscription = startup.lazy('bot.handlers.subscription:reactivate_subscription')
+get_invite_link = startup.lazy('bot.handlers.subscription:get_invite_link')
+show_active_subscriptions = startup.lazy('bot.handlers.subscription:show_active_subscriptions')
+show_subscription_detail = startup.lazy('bot.handlers.subscription:show_subscription_detail')
+show_subscription_history = startup.lazy('bot.handlers.subscription:show_subscription_history')
+show_group_history = startup.lazy('bot.handlers.subscription:show_group_history')
+show_subscription_transactions = startup.lazy('bot.handlers.subscription:show_subscription_transactions')
+
+startup.mark('imports')
 
 # Configurar logging
 logging.basicConfig(
@@ -130,8 +151,6 @@ async def handle_subs_button(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def handle_history_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler para botão fixo '📋 Histórico' — envia inline e depois mostra histórico"""
-    from bot.handlers.subscription import show_subscription_history
-
     # Criar callback query falso para reusar o handler
     class FakeQuery:
         def __init__(self, user, message):
@@ -155,47 +174,76 @@ async def handle_unknown_callback(update: Update, context: ContextTypes.DEFAULT_
     await query.answer("Use /start para voltar ao menu principal.", show_alert=True)
     logger.warning(f"Callback não reconhecido: {query.data}")
 
+async def register_commands(bot) -> None:
+    """Comandos do menu por escopo (em paralelo; não atrasam o startup)"""
+    try:
+        await asyncio.gather(
+            # Limpar comandos globais (sem escopo)
+            bot.set_my_commands([]),
+            # Comandos para CHAT PRIVADO (assinantes)
+            bot.set_my_commands(
+                [
+                    BotCommand("start", "Menu principal"),
+                    BotCommand("status", "Ver suas assinaturas"),
+                ],
+                scope=BotCommandScopeAllPrivateChats()
+            ),
+            # Comandos para ADMINS em grupos (criadores)
+            bot.set_my_commands(
+                [
+                    BotCommand("setup", "Configurar grupo"),
+                    BotCommand("stats", "Estatísticas do grupo"),
+                    BotCommand("broadcast", "Enviar mensagem aos assinantes"),
+                    BotCommand("antileak", "Proteção anti-vazamento"),
+                ],
+                scope=BotCommandScopeAllChatAdministrators()
+            ),
+            # Membros comuns em grupos: nenhum comando visível
+            bot.set_my_commands(
+                [],
+                scope=BotCommandScopeAllGroupChats()
+            ),
+        )
+    except Exception as e:
+        logger.error(f"Erro ao registrar comandos do bot: {e}")
+
+async def warm_up(application: Application) -> None:
+    """Importar os handlers lazy e retomar os auto-checks de pagamento"""
+    await startup.warm_up()
+
+    # Retomar auto-checks de pagamento de checkouts em andamento
+    if application.persistence:
+        try:
+            from bot.handlers.payment import resume_payment_checks
+            resume_payment_checks(application)
+        except Exception as e:
+            logger.error(f"Erro ao retomar verificações de pagamento: {e}")
+
 async def post_init(application: Application) -> None:
     """Executado após a inicialização do bot"""
     try:
-        bot_info = await application.bot.get_me()
-        logger.info(f"✅ Bot @{bot_info.username} iniciado com sucesso!")
-
-        # Limpar comandos globais (sem escopo)
-        await application.bot.set_my_commands([])
-
-        # Comandos para CHAT PRIVADO (assinantes)
-        await application.bot.set_my_commands(
-            [
-                BotCommand("start", "Menu principal"),
-                BotCommand("status", "Ver suas assinaturas"),
-            ],
-            scope=BotCommandScopeAllPrivateChats()
-        )
+        # get_me já foi feito no initialize(): username em cache
+        logger.info(f"✅ Bot @{application.bot.username} iniciado com sucesso!")
 
-        # Comandos para ADMINS em grupos (criadores)
-        await application.bot.set_my_commands(
-            [
-                BotCommand("setup", "Configurar grupo"),
-                BotCommand("stats", "Estatísticas do grupo"),
-                BotCommand("broadcast", "Enviar mensagem aos assinantes"),
-                BotCommand("antileak", "Proteção anti-vazamento"),
-            ],
-            scope=BotCommandScopeAllChatAdministrators()
-        )
+        # Lag do event loop e pilhas das chamadas que o bloqueiam
+        start_loop_monitor()
 
-        # Membros comuns em grupos: nenhum comando visível
-        await application.bot.set_my_commands(
-            [],
-            scope=BotCommandScopeAllGroupChats()
-        )
+        # Com vários workers, só o worker 0 registra os comandos
+        if get_worker_index() == 0:
+            startup.background(register_commands(application.bot))
 
         # Iniciar tarefas agendadas (controle de assinaturas)
         from bot.jobs.scheduled_tasks import setup_jobs
         setup_jobs(application)
 
+        # Handlers do Stripe em thread enquanto o bot já responde
+        startup.background(warm_up(application))
+
     except Exception as e:
-        logger.error(f"Erro ao obter informações do bot: {e}")
+        logger.error(f"Erro ao inicializar o bot: {e}")
+
+    startup.mark('initialize')
+    startup.report()
 
 def setup_handlers(application: Application) -> None:
     """Configurar todos os handlers do bot"""
@@ -210,6 +258,7 @@ def setup_handlers(application: Application) -> None:
     application.add_handler(CommandHandler("stats", stats_command))
     application.add_handler(CommandHandler("broadcast", broadcast_command))
     application.add_handler(CommandHandler("antileak", antileak_command))
+    application.add_handler(CommandHandler("loopstats", loopstats_command))
     
     # Callbacks de pagamento
     application.add_handler(CallbackQueryHandler(start_payment, pattern=r"^plan_\d+_\d+$"))
@@ -311,29 +360,62 @@ def main():
     
     try:
         # CORREÇÃO: Criar aplicação sem job_queue se houver problema
+        # Estado do bot (user_data/chat_data/bot_data) no Redis, se configurado
+        persistence = RedisPersistence.from_env()
+        if persistence:
+            logger.info("Persistência Redis ativa para o estado do bot")
+
+        # Updates de chats diferentes em paralelo; do mesmo chat, em ordem
+        max_concurrent = int(os.getenv('BOT_CONCURRENT_UPDATES', '64'))
+        builder = Application.builder().token(bot_token).concurrent_updates(
+            ChatOrderedUpdateProcessor(max_concurrent)
+        ).request(InstrumentedHTTPXRequest(connection_pool_size=256))
+        # Bot API em outro servidor (TELEGRAM_API_BASE): local ou fake de carga
+        builder = builder.base_url(telegram_service.bot_base_url()).base_file_url(
+            telegram_service.bot_base_file_url())
+        if persistence:
+            builder = builder.persistence(persistence)
+
         try:
             # Tentar criar normalmente
-            application = Application.builder().token(bot_token).build()
+            application = builder.build()
         except TypeError as e:
             # Se falhar, criar sem job_queue
             logger.warning("Criando aplicação sem job_queue devido a erro de weak reference")
-            application = Application.builder().token(bot_token).job_queue(None).build()
+            application = builder.job_queue(None).build()
         
         # Configurar handlers
         setup_handlers(application)
-        
+
+        # Métricas Prometheus em BOT_METRICS_PORT (Stripe: bot/utils/stripe_integration.py)
+        start_metrics_server()
+        metrics.instrument_pool(engine, 'bot')
+        # Spans dos updates, jobs e chamadas externas (TRACE_FILE / OTEL_EXPORTER_OTLP_ENDPOINT)
+        tracing.configure('televip-bot')
+
         # Adicionar callback de inicialização
         application.post_init = post_init
+        startup.mark('build')
         
         # Iniciar bot
         logger.info("🤖 Bot TeleVIP iniciando...")
         logger.info("Pressione Ctrl+C para parar")
         
         # Executar bot
-        application.run_polling(
-            drop_pending_updates=True,
-            allowed_updates=Update.ALL_TYPES
-        )
+        if get_worker_count() > 1 and get_update_mode() != 'webhook':
+            logger.error("❌ BOT_WORKER_COUNT > 1 exige BOT_UPDATE_MODE=webhook")
+            return
+
+        if get_update_mode() == 'webhook':
+            # Updates chegam pelo Flask (/webhooks/telegram) via fila no Redis
+            import redis.asyncio as aioredis
+            redis_url = os.getenv('BOT_REDIS_URL') or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+            asyncio.run(run_webhook_ingestion(application, aioredis.from_url(redis_url)))
+        else:
+            application.run_polling(
+                drop_pending_updates=True,
+                allowed_updates=Update.ALL_TYPES
+            )
         
     except Exception as e:
         logger.error(f"Erro ao iniciar bot: {e}", exc_info=True)
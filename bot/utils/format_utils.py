@@ -144,7 +144,7 @@ def try_fix_stale_end_date(sub):
             return False
 
         try:
-            import stripe
+            from bot.utils.stripe_integration import stripe
             stripe_sub = stripe.Subscription.retrieve(stripe_sub_id)
         except Exception as e:
             _logger.warning(f"try_fix: erro ao consultar Stripe sub {stripe_sub_id}: {e}")
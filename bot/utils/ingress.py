@@ -0,0 +1,142 @@
+"""
+Ingestão de updates do Telegram via webhook
+
+O Flask (``webhooks.telegram_webhook``) recebe o POST do Telegram, valida o
+secret token e empilha o JSON cru numa lista do Redis. O processo do bot
+consome essa fila e entrega cada update ao ``Application.update_queue`` —
+sem long polling e sem o Flask precisar carregar o PTB.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+from typing import Optional
+
+from telegram import Update
+
+from bot.utils.sharding import get_worker_count, get_worker_index, shard_for_update
+
+logger = logging.getLogger(__name__)
+
+UPDATE_QUEUE_KEY = 'televip:bot:updates'
+
+
+def get_update_mode() -> str:
+    """'polling' (padrão) ou 'webhook'"""
+    return os.getenv('BOT_UPDATE_MODE', 'polling').lower()
+
+
+def shard_queue_key(worker_index: int, worker_count: Optional[int] = None) -> str:
+    """Fila de updates de um worker (sem sufixo quando há um só worker)"""
+    worker_count = worker_count or get_worker_count()
+    if worker_count == 1:
+        return UPDATE_QUEUE_KEY
+    return f"{UPDATE_QUEUE_KEY}:{worker_index}"
+
+
+def enqueue_update(client, payload: dict, worker_count: Optional[int] = None) -> str:
+    """Empilhar um update recebido pelo webhook na fila do worker responsável.
+
+    Usa cliente redis síncrono. Retorna a chave da fila usada.
+    """
+    worker_count = worker_count or get_worker_count()
+    queue_key = shard_queue_key(shard_for_update(payload, worker_count), worker_count)
+    client.lpush(queue_key, json.dumps(payload, separators=(',', ':')))
+    return queue_key
+
+
+async def consume_updates(
+    application,
+    client,
+    queue_key: str = UPDATE_QUEUE_KEY,
+    stop_event: Optional[asyncio.Event] = None,
+    batch_size: int = 100,
+    block_timeout: int = 1,
+) -> int:
+    """Mover updates da fila do Redis para o update_queue do Application.
+
+    Usa BRPOP para esperar o primeiro item e RPOP em lote para drenar o que
+    já estiver acumulado. Retorna quantos updates foram entregues.
+    """
+    stop_event = stop_event or asyncio.Event()
+    delivered = 0
+
+    while not stop_event.is_set():
+        try:
+            item = await client.brpop(queue_key, timeout=block_timeout)
+            if not item:
+                continue
+            raws = [item[1]]
+            extra = await client.rpop(queue_key, batch_size - 1)
+            if extra:
+                raws.extend(extra)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ingestão: erro ao ler fila de updates: {e}")
+            await asyncio.sleep(1)
+            continue
+
+        for raw in raws:
+            try:
+                update = Update.de_json(json.loads(raw), application.bot)
+            except Exception as e:
+                logger.warning(f"Ingestão: update inválido descartado: {e}")
+                continue
+            await application.update_queue.put(update)
+            delivered += 1
+
+    return delivered
+
+
+async def _register_webhook(application) -> None:
+    """Apontar o Telegram para o /webhooks/telegram do Flask"""
+    webhook_url = os.getenv('TELEGRAM_WEBHOOK_URL') or (
+        f"{os.getenv('BASE_URL', '').rstrip('/')}/webhooks/telegram"
+    )
+    if not webhook_url.startswith('https://'):
+        logger.warning("Webhook não registrado: BASE_URL/TELEGRAM_WEBHOOK_URL precisa ser https")
+        return
+    await application.bot.set_webhook(
+        url=webhook_url,
+        secret_token=os.getenv('TELEGRAM_WEBHOOK_SECRET'),
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=True,
+    )
+    logger.info("Webhook do Telegram registrado")
+
+
+async def run_webhook_ingestion(application, client, queue_key: Optional[str] = None) -> None:
+    """Ciclo de vida do bot em modo webhook (equivalente ao run_polling)"""
+    worker_index = get_worker_index()
+    queue_key = queue_key or shard_queue_key(worker_index)
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows
+
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+
+        # Só o worker 0 registra o webhook (evita set_webhook concorrente)
+        if worker_index == 0:
+            await _register_webhook(application)
+
+        await application.start()
+        logger.info(f"Bot em modo webhook consumindo {queue_key}")
+        try:
+            await consume_updates(application, client, queue_key, stop_event)
+        finally:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -0,0 +1,210 @@
+"""
+Monitor de lag do event loop do bot
+
+O bot roda num único event loop: uma chamada síncrona (sessão do banco, SDK
+do Stripe, ``format_utils.try_fix_stale_end_date``, jobs agendados) trava
+todos os outros updates enquanto dura. O monitor tem duas partes:
+
+- um heartbeat no próprio loop (``asyncio.sleep(interval)``) mede o atraso
+  com que ele acorda — o lag do loop — em ``televip_bot_loop_lag_seconds``;
+- uma thread watchdog percebe quando o heartbeat passou do limite sem
+  rodar e captura a pilha da thread do loop naquele momento: é a chamada
+  que está bloqueando.
+
+Cada bloqueio é logado com a pilha e somado por local (o frame mais interno
+do código do projeto, ex. ``bot/handlers/payment.py:120 in start_payment``);
+``/loopstats`` (admins da plataforma) mostra os piores desde o start.
+
+Configuração: BOT_LOOP_LAG_THRESHOLD_MS (padrão 100; 0 desliga) e
+BOT_LOOP_LAG_INTERVAL_MS (padrão 50).
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from app.utils import metrics
+from bot.utils.format_utils import escape_html
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STACK_LIMIT = 12
+STACK_REPORT_CHARS = 1500
+
+
+def _project_path(filename: str) -> Optional[str]:
+    """Caminho relativo se o arquivo é do projeto (fora de site-packages)"""
+    path = os.path.abspath(filename)
+    if not path.startswith(PROJECT_ROOT + os.sep) or 'site-packages' in path:
+        return None
+    return os.path.relpath(path, PROJECT_ROOT)
+
+
+def blocking_location(stack: List[traceback.FrameSummary]) -> str:
+    """Frame mais interno do projeto (quem chamou a biblioteca que bloqueou)"""
+    for frame in reversed(stack):
+        path = _project_path(frame.filename)
+        if path and not path.startswith(os.path.join('bot', 'utils', 'loop_monitor')):
+            return f'{path}:{frame.lineno} in {frame.name}'
+    if stack:
+        frame = stack[-1]
+        return f'{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}'
+    return 'desconhecido'
+
+
+class Offender:
+    """Bloqueios somados de um local"""
+
+    __slots__ = ('where', 'count', 'total', 'worst', 'stack')
+
+    def __init__(self, where: str):
+        self.where = where
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.stack = ''
+
+
+class LoopMonitor:
+    """Heartbeat no loop + watchdog em thread que captura a pilha bloqueada"""
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.started_at: Optional[float] = None
+        self.max_lag = 0.0
+        self.offenders: Dict[str, Offender] = {}
+        self._beat = 0.0
+        self._captured = None  # (beat, pilha) do bloqueio em andamento
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Iniciar no loop atual (chamar de dentro de uma coroutine)"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self.started_at = time.time()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-monitor', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            before = self._beat
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - before - self.interval)
+            self._beat = now
+            metrics.BOT_LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            captured, self._captured = self._captured, None
+            if lag >= self.threshold:
+                # Pilha só vale se foi capturada durante este bloqueio
+                self._record(lag, captured[1] if captured and captured[0] == before else [])
+
+    def _watch(self) -> None:
+        # Checa em metade do limite: bloqueios de 1,5x o limite sempre têm pilha
+        period = max(self.threshold / 2, 0.005)
+        while not self._stopped.wait(period):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or (self._captured and self._captured[0] == beat):
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._captured = (beat, traceback.extract_stack(frame))
+
+    def _record(self, lag: float, stack: List[traceback.FrameSummary]) -> None:
+        where = blocking_location(stack)
+        offender = self.offenders.get(where)
+        if offender is None:
+            offender = self.offenders[where] = Offender(where)
+        offender.count += 1
+        offender.total += lag
+        stack_text = ''.join(traceback.format_list(stack[-STACK_LIMIT:]))
+        if lag >= offender.worst:
+            offender.worst = lag
+            offender.stack = stack_text
+        metrics.BOT_LOOP_BLOCKS.labels(where).inc()
+        metrics.BOT_LOOP_BLOCKED_SECONDS.labels(where).inc(lag)
+        logger.warning(f"Event loop bloqueado por {lag * 1000:.0f}ms em {where}\n{stack_text}")
+
+    def worst_offenders(self, limit: int = 10) -> List[Offender]:
+        """Locais que mais travaram o loop (tempo total bloqueado)"""
+        return sorted(self.offenders.values(), key=lambda o: (o.total, o.worst), reverse=True)[:limit]
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_monitor() -> Optional[LoopMonitor]:
+    return _monitor
+
+
+def start_loop_monitor() -> Optional[LoopMonitor]:
+    """Iniciar o monitor do processo (no loop atual); BOT_LOOP_LAG_THRESHOLD_MS=0 desliga"""
+    global _monitor
+    threshold_ms = int(os.getenv('BOT_LOOP_LAG_THRESHOLD_MS', '100'))
+    if threshold_ms <= 0:
+        return None
+    if _monitor is None:
+        interval_ms = int(os.getenv('BOT_LOOP_LAG_INTERVAL_MS', '50'))
+        _monitor = LoopMonitor(threshold_ms / 1000, interval_ms / 1000)
+    _monitor.start()
+    logger.info(f"Monitor do event loop ativo (limite {threshold_ms}ms)")
+    return _monitor
+
+
+def format_report(monitor: Optional[LoopMonitor], limit: int = 10) -> str:
+    """Resumo em HTML para o /loopstats"""
+    if monitor is None:
+        return "Monitor do event loop desligado (BOT_LOOP_LAG_THRESHOLD_MS=0)."
+
+    uptime = time.time() - (monitor.started_at or time.time())
+    lines = [
+        "<b>Event loop — piores bloqueios</b>",
+        f"Desde o start: {uptime / 3600:.1f}h · limite {monitor.threshold * 1000:.0f}ms · "
+        f"maior lag {monitor.max_lag * 1000:.0f}ms",
+        "",
+    ]
+    offenders = monitor.worst_offenders(limit)
+    if not offenders:
+        lines.append("Nenhum bloqueio acima do limite.")
+    for i, offender in enumerate(offenders, 1):
+        lines.append(
+            f"{i}. <code>{escape_html(offender.where)}</code>\n"
+            f"   {offender.count}x · total {offender.total * 1000:.0f}ms · "
+            f"pior {offender.worst * 1000:.0f}ms"
+        )
+    if offenders and offenders[0].stack:
+        # Pilha do pior bloqueio do primeiro colocado (mensagem tem limite de 4096)
+        stack = offenders[0].stack[-STACK_REPORT_CHARS:]
+        lines.append(f"\n<b>Pilha do 1º</b>\n<pre>{escape_html(stack)}</pre>")
+    return '\n'.join(lines)
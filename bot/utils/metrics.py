@@ -0,0 +1,84 @@
+"""
+Métricas do bot (ver app/utils/metrics.py para a lista completa)
+
+- chamadas à Bot API medidas no transporte HTTP (latência por método e 429);
+- cada update tem latência e queries registradas pelo tipo (comando,
+  prefixo do callback, mensagem, ...);
+- as métricas saem num servidor HTTP à parte em BOT_METRICS_PORT (+ índice
+  do worker quando há vários), já que o bot não passa pelo Flask.
+"""
+import logging
+import os
+import re
+import time
+
+from telegram import Update
+from telegram.request import HTTPXRequest
+
+from app.utils import metrics, tracing
+from bot.utils.sharding import get_worker_index
+
+logger = logging.getLogger(__name__)
+
+_COMMAND = re.compile(r'/([a-z0-9_]{1,32})(@\w+)?$')
+_CALLBACK = re.compile(r'[a-z_]{1,40}')
+_CALLBACK_SUFFIX = re.compile(r'(_p?\d+)+$')
+
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest que mede cada chamada à Bot API (métrica + span)"""
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        operation = metrics.telegram_operation(url)
+        start = time.perf_counter()
+        code = None
+        with tracing.start_span(f'telegram {operation}', tracing.KIND_CLIENT) as span:
+            try:
+                code, payload = await super().do_request(url, method, request_data=request_data, **kwargs)
+                return code, payload
+            finally:
+                metrics.observe_external('telegram', operation, time.perf_counter() - start, code)
+                if span is not None:
+                    span.set_attribute('http.status_code', code)
+                    if code is None or code >= 400:
+                        span.set_error(f'HTTP {code}')
+
+
+def update_kind(update: object) -> str:
+    """Rótulo de baixa cardinalidade para o update (ids e argumentos removidos)"""
+    if not isinstance(update, Update):
+        return 'other'
+    if update.callback_query is not None:
+        data = _CALLBACK_SUFFIX.sub('', update.callback_query.data or '')
+        return f'callback:{data}' if _CALLBACK.fullmatch(data) else 'callback:other'
+    message = update.message or update.edited_message
+    if message is not None:
+        text = message.text or ''
+        if text.startswith('/'):
+            match = _COMMAND.match(text.split(maxsplit=1)[0].lower())
+            return f'command:{match.group(1)}' if match else 'command:other'
+        return 'message'
+    if update.chat_member is not None:
+        return 'chat_member'
+    if update.my_chat_member is not None:
+        return 'my_chat_member'
+    if update.chat_join_request is not None:
+        return 'chat_join_request'
+    return 'other'
+
+
+def start_metrics_server():
+    """Servidor /metrics do bot; BOT_METRICS_PORT=0 desliga"""
+    port = int(os.getenv('BOT_METRICS_PORT', '9101'))
+    if not metrics.has_prometheus or port <= 0:
+        return None
+    from prometheus_client import start_http_server
+
+    port += get_worker_index()
+    try:
+        start_http_server(port, addr=os.getenv('BOT_METRICS_ADDR', '127.0.0.1'))
+    except OSError as e:
+        logger.warning(f"Métricas do bot indisponíveis na porta {port}: {e}")
+        return None
+    logger.info(f"Métricas do bot em :{port}/metrics")
+    return port
@@ -0,0 +1,254 @@
+"""
+Persistência do estado do bot no Redis
+
+Permite que várias réplicas do bot compartilhem user_data/chat_data/bot_data
+(rascunhos de broadcast, dados de checkout, auto-checks de pagamento pendentes)
+e que um restart não perca checkouts em andamento.
+
+- Escrita em lote (write-behind): updates ficam num buffer local e são
+  enviados ao Redis num único pipeline, a cada ``batch_delay`` segundos ou
+  quando o buffer atinge ``batch_size`` chaves.
+- TTL por chave: cada usuário/chat tem sua própria chave com expiração, então
+  usuários inativos somem sozinhos do Redis.
+- Cada escrita grava um token de versão junto com os dados; ``refresh_*`` só
+  desserializa de novo quando outra réplica escreveu uma versão diferente.
+"""
+import asyncio
+import logging
+import os
+import pickle
+import uuid
+from typing import Dict, Optional
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFIX = 'televip:bot'
+DEFAULT_USER_TTL = 7 * 24 * 3600   # 7 dias sem interação
+DEFAULT_CHAT_TTL = 30 * 24 * 3600  # 30 dias
+
+
+class RedisPersistence(BasePersistence):
+    """BasePersistence com armazenamento no Redis (redis.asyncio)"""
+
+    def __init__(
+        self,
+        client,
+        prefix: str = DEFAULT_PREFIX,
+        user_ttl: Optional[int] = DEFAULT_USER_TTL,
+        chat_ttl: Optional[int] = DEFAULT_CHAT_TTL,
+        batch_size: int = 100,
+        batch_delay: float = 0.5,
+        update_interval: float = 5,
+        store_data: Optional[PersistenceInput] = None,
+    ):
+        super().__init__(
+            store_data=store_data or PersistenceInput(callback_data=False),
+            update_interval=update_interval,
+        )
+        self._redis = client
+        self._prefix = prefix
+        self._user_ttl = user_ttl
+        self._chat_ttl = chat_ttl
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+
+        # Buffer de escrita: key -> (bytes | None, ttl). None = apagar.
+        self._pending: Dict[str, tuple] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # Último token de versão visto por chave (lido ou escrito por nós)
+        self._versions: Dict[str, str] = {}
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisPersistence':
+        """Criar a partir de uma URL redis://"""
+        import redis.asyncio as aioredis
+        return cls(aioredis.from_url(url), **kwargs)
+
+    @classmethod
+    def from_env(cls) -> Optional['RedisPersistence']:
+        """Criar a partir de BOT_REDIS_URL/REDIS_URL; None se não configurado"""
+        url = os.getenv('BOT_REDIS_URL') or os.getenv('REDIS_URL')
+        if not url:
+            return None
+        return cls.from_url(
+            url,
+            prefix=os.getenv('BOT_PERSISTENCE_PREFIX', DEFAULT_PREFIX),
+            user_ttl=int(os.getenv('BOT_PERSISTENCE_USER_TTL', DEFAULT_USER_TTL)),
+            chat_ttl=int(os.getenv('BOT_PERSISTENCE_CHAT_TTL', DEFAULT_CHAT_TTL)),
+        )
+
+    # ── Chaves e serialização ──
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self._prefix}:user:{user_id}"
+
+    def _chat_key(self, chat_id: int) -> str:
+        return f"{self._prefix}:chat:{chat_id}"
+
+    def _bot_key(self) -> str:
+        return f"{self._prefix}:bot"
+
+    def _conv_key(self, name: str) -> str:
+        return f"{self._prefix}:conv:{name}"
+
+    def _dump(self, key: str, data) -> bytes:
+        version = uuid.uuid4().hex
+        self._versions[key] = version
+        return pickle.dumps((version, data), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, key: str, raw: Optional[bytes]):
+        if raw is None:
+            return None
+        version, data = pickle.loads(raw)
+        self._versions[key] = version
+        return data
+
+    async def _load_all(self, kind: str) -> dict:
+        """Ler todas as chaves user:* ou chat:* (usado só na inicialização)"""
+        pattern = f"{self._prefix}:{kind}:*"
+        keys = [k async for k in self._redis.scan_iter(match=pattern, count=500)]
+        result = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            values = await self._redis.mget(chunk)
+            for key, raw in zip(chunk, values):
+                if raw is None:
+                    continue
+                key = key.decode() if isinstance(key, bytes) else key
+                try:
+                    result[int(key.rsplit(':', 1)[1])] = self._load(key, raw)
+                except Exception as e:
+                    logger.warning(f"Persistência: chave {key} ilegível, ignorando ({e})")
+        return result
+
+    # ── Write-behind ──
+
+    def _queue(self, key: str, value: Optional[bytes], ttl: Optional[int] = None):
+        self._pending[key] = (value, ttl)
+        if len(self._pending) >= self._batch_size:
+            self._schedule_flush(delay=0)
+        else:
+            self._schedule_flush(delay=self._batch_delay)
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_task and not self._flush_task.done():
+            if delay > 0:
+                return
+        self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+
+    async def _delayed_flush(self, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            await self._write_pending()
+        except Exception as e:
+            logger.error(f"Persistência: falha ao gravar lote no Redis: {e}")
+
+    async def _write_pending(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            pipe = self._redis.pipeline(transaction=False)
+            for key, (value, ttl) in batch.items():
+                if value is None:
+                    pipe.delete(key)
+                elif ttl:
+                    pipe.set(key, value, ex=ttl)
+                else:
+                    pipe.set(key, value)
+            try:
+                await pipe.execute()
+            except Exception:
+                # Devolver ao buffer sem sobrescrever escritas mais novas
+                for key, item in batch.items():
+                    self._pending.setdefault(key, item)
+                raise
+            logger.debug(f"Persistência: {len(batch)} chave(s) gravada(s) no Redis")
+
+    # ── Leitura inicial ──
+
+    async def get_user_data(self) -> Dict[int, dict]:
+        return await self._load_all('user')
+
+    async def get_chat_data(self) -> Dict[int, dict]:
+        return await self._load_all('chat')
+
+    async def get_bot_data(self) -> dict:
+        key = self._bot_key()
+        return self._load(key, await self._redis.get(key)) or {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        raw = await self._redis.hgetall(self._conv_key(name))
+        return {pickle.loads(k): pickle.loads(v) for k, v in raw.items()}
+
+    # ── Escrita ──
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        key = self._user_key(user_id)
+        self._queue(key, self._dump(key, data), self._user_ttl)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        key = self._chat_key(chat_id)
+        self._queue(key, self._dump(key, data), self._chat_ttl)
+
+    async def update_bot_data(self, data: dict) -> None:
+        key = self._bot_key()
+        self._queue(key, self._dump(key, data))
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        # Estados de conversa são raros e precisam ser consistentes: escrita direta
+        conv_key = self._conv_key(name)
+        field = pickle.dumps(key)
+        if new_state is None:
+            await self._redis.hdel(conv_key, field)
+        else:
+            await self._redis.hset(conv_key, field, pickle.dumps(new_state))
+
+    async def drop_user_data(self, user_id: int) -> None:
+        key = self._user_key(user_id)
+        self._versions.pop(key, None)
+        self._queue(key, None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        key = self._chat_key(chat_id)
+        self._versions.pop(key, None)
+        self._queue(key, None)
+
+    # ── Refresh (sincronização entre réplicas) ──
+
+    async def _refresh(self, key: str, target: dict) -> None:
+        if key in self._pending:
+            # Temos escrita local ainda não enviada — ela é a mais nova
+            return
+        raw = await self._redis.get(key)
+        if raw is None:
+            return
+        version, data = pickle.loads(raw)
+        if self._versions.get(key) == version:
+            return
+        self._versions[key] = version
+        target.clear()
+        target.update(data)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        await self._refresh(self._user_key(user_id), user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        await self._refresh(self._chat_key(chat_id), chat_data)
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        await self._refresh(self._bot_key(), bot_data)
+
+    async def flush(self) -> None:
+        """Gravar tudo que estiver no buffer (chamado no shutdown)"""
+        await self._write_pending()
@@ -0,0 +1,88 @@
+"""
+Sharding do bot entre vários processos (workers)
+
+Cada update é roteado para um worker fixo pelo id do usuário (ou do chat,
+quando não há usuário), de modo que o estado e a ordem das conversas de um
+usuário ficam sempre no mesmo processo. O roteamento usa jump consistent hash:
+ao mudar o número de workers, só ~1/N dos usuários trocam de worker.
+
+Os jobs agendados são particionados por ``group_id``: cada worker processa só
+os grupos da sua partição, então nenhuma assinatura é avisada/removida duas
+vezes.
+
+Configuração por variável de ambiente:
+    BOT_WORKER_COUNT   total de workers (padrão 1 = sem sharding)
+    BOT_WORKER_INDEX   índice deste worker, de 0 a BOT_WORKER_COUNT-1
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import true
+
+# Tipos de update cujo objeto tem ``from``/``chat`` no primeiro nível
+_UPDATE_FIELDS = (
+    'message', 'edited_message', 'channel_post', 'edited_channel_post',
+    'callback_query', 'inline_query', 'chosen_inline_result',
+    'shipping_query', 'pre_checkout_query', 'poll_answer',
+    'my_chat_member', 'chat_member', 'chat_join_request',
+)
+
+
+def get_worker_count() -> int:
+    return max(1, int(os.getenv('BOT_WORKER_COUNT', '1')))
+
+
+def get_worker_index() -> int:
+    index = int(os.getenv('BOT_WORKER_INDEX', '0'))
+    count = get_worker_count()
+    if not 0 <= index < count:
+        raise ValueError(f"BOT_WORKER_INDEX={index} fora do intervalo 0..{count - 1}")
+    return index
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach) — determinístico entre processos"""
+    key &= 0xFFFFFFFFFFFFFFFF
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def routing_key(payload: dict) -> Optional[int]:
+    """Id usado no roteamento de um update cru (JSON da Bot API)"""
+    for field in _UPDATE_FIELDS:
+        obj = payload.get(field)
+        if not obj:
+            continue
+        user = obj.get('from') or obj.get('user')
+        if user and 'id' in user:
+            return int(user['id'])
+        chat = obj.get('chat') or (obj.get('message') or {}).get('chat')
+        if chat and 'id' in chat:
+            return int(chat['id'])
+    return None
+
+
+def shard_for_update(payload: dict, worker_count: Optional[int] = None) -> int:
+    """Índice do worker responsável por um update"""
+    worker_count = worker_count or get_worker_count()
+    if worker_count == 1:
+        return 0
+    key = routing_key(payload)
+    if key is None:
+        # Sem usuário/chat (ex.: poll): distribuir pelo update_id
+        key = int(payload.get('update_id', 0))
+    return jump_hash(key, worker_count)
+
+
+def group_partition(column, worker_index: Optional[int] = None, worker_count: Optional[int] = None):
+    """Condição SQL que restringe uma query aos grupos deste worker"""
+    worker_count = worker_count or get_worker_count()
+    if worker_count == 1:
+        return true()
+    if worker_index is None:
+        worker_index = get_worker_index()
+    return (column % worker_count) == worker_index
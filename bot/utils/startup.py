@@ -0,0 +1,119 @@
+"""
+Startup do bot: fases medidas, handlers lazy e warm-up
+
+Todo deploy reinicia o bot e, até ele voltar a ler updates, ninguém é
+respondido. O startup é medido em fases — ``imports`` (do início do
+bot/main.py até os handlers importados), ``build`` (Application, handlers,
+métricas) e ``initialize`` (``get_me`` e ``post_init``) — logadas ao fim e
+expostas em ``televip_bot_startup_seconds{phase}``.
+
+O que mantém o startup curto:
+
+- ``app.models`` não importa o Flask (ver ``app/models/base.py``);
+- handlers que dependem do SDK do Stripe são registrados com
+  ``lazy('bot.handlers.payment:start_payment')``: o módulo só é importado no
+  primeiro update que precisar dele, ou antes, pelo ``warm_up`` que roda em
+  thread depois que o bot já está recebendo updates (o tempo de cada
+  módulo vai para o log). O SDK é configurado por
+  ``bot/utils/stripe_integration.py``, por onde todo uso do Stripe passa.
+
+``python -X importtime -m bot.main`` detalha o custo de cada import.
+"""
+import asyncio
+import importlib
+import logging
+import sys
+import threading
+import time
+from typing import Dict, Set
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Importado no topo do bot/main.py: referência do startup
+STARTED = time.perf_counter()
+
+_phases: Dict[str, float] = {}
+_last_mark = STARTED
+
+_lazy_modules: Set[str] = set()
+_load_lock = threading.Lock()
+_background: Set[asyncio.Task] = set()
+
+import_times: Dict[str, float] = {}
+
+
+# Fases
+
+def mark(phase: str) -> float:
+    """Encerrar a fase ``phase`` (tempo desde a marca anterior)"""
+    global _last_mark
+    now = time.perf_counter()
+    _phases[phase] = now - _last_mark
+    _last_mark = now
+    metrics.BOT_STARTUP.labels(phase).set(_phases[phase])
+    return _phases[phase]
+
+
+def report() -> Dict[str, float]:
+    """Logar as fases e o total desde o início do processo"""
+    total = _last_mark - STARTED
+    metrics.BOT_STARTUP.labels('total').set(total)
+    logger.info('Startup em %.2fs (%s)', total,
+                ', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in _phases.items()))
+    return dict(_phases, total=total)
+
+
+# Handlers lazy
+
+def load(module_name: str):
+    """Importar um módulo lazy (thread-safe; registra o tempo do import)"""
+    module = sys.modules.get(module_name)
+    # Um módulo ainda sendo importado (pelo warm-up, em outra thread) já está
+    # em sys.modules, mas incompleto: nesse caso esperar pelo import
+    if module is not None and not getattr(getattr(module, '__spec__', None), '_initializing', False):
+        return module
+    with _load_lock:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        import_times.setdefault(module_name, time.perf_counter() - started)
+    return module
+
+
+def lazy(target: str):
+    """Callback de handler que importa ``'modulo:funcao'`` no primeiro uso"""
+    module_name, name = target.split(':')
+    _lazy_modules.add(module_name)
+    resolved = None
+
+    async def callback(update, context):
+        nonlocal resolved
+        if resolved is None:
+            resolved = getattr(load(module_name), name)
+        return await resolved(update, context)
+
+    callback.__name__ = callback.__qualname__ = name
+    callback.lazy_target = target
+    return callback
+
+
+async def warm_up() -> Dict[str, float]:
+    """Importar em thread os módulos lazy ainda não carregados"""
+    for module_name in sorted(_lazy_modules):
+        try:
+            await asyncio.to_thread(load, module_name)
+        except Exception:
+            logger.exception(f'Warm-up: falha ao importar {module_name}')
+    if import_times:
+        logger.info('Warm-up: %s', ', '.join(
+            f'{name} {seconds * 1000:.0f}ms' for name, seconds in sorted(import_times.items())))
+    return dict(import_times)
+
+
+def background(coro) -> asyncio.Task:
+    """Tarefa em background no loop atual (referência mantida até terminar)"""
+    task = asyncio.get_running_loop().create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
@@ -8,10 +8,17 @@ import logging
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 
+from app.services import stripe_service
+from app.utils import metrics
+
 logger = logging.getLogger(__name__)
 
 # Configurar Stripe
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+# SDK instrumentado e STRIPE_API_BASE: o bot só carrega o Stripe no primeiro
+# handler que precisa dele (bot/utils/startup.py), sempre por este módulo
+metrics.install_stripe_client()
+stripe_service.configure_api_base()
 
 # Verificar se está em modo teste
 IS_TEST_MODE = os.getenv('STRIPE_SECRET_KEY', '').startswith('sk_test_')
@@ -240,6 +247,9 @@ async def create_subscription_checkout(
 
         if trial_end:
             params['subscription_data'] = {'trial_end': trial_end}
+        if metadata.get('traceparent'):
+            # A 1ª fatura (invoice.paid) traz a metadata da assinatura: o trace chega à ativação
+            params.setdefault('subscription_data', {})['metadata'] = {'traceparent': metadata['traceparent']}
 
         session = stripe.checkout.Session.create(**params)
 
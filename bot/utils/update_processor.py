@@ -0,0 +1,106 @@
+"""
+Processamento concorrente de updates com ordem garantida por chat
+
+Com ``concurrent_updates`` o PTB processa vários updates ao mesmo tempo, então
+o checkout lento (Stripe) de um usuário não atrasa o /start de outro. Para não
+embaralhar a conversa de um mesmo usuário, updates do mesmo chat passam por um
+lock por chave e são processados na ordem de chegada. O lock do chat é obtido
+antes da vaga de concorrência (``max_concurrent_updates``): um grupo
+movimentado com vários updates na fila ocupa uma vaga só, e os outros chats
+continuam sendo atendidos.
+
+Cada update tem a latência e as queries registradas em métricas pelo tipo
+(``bot.utils.metrics.update_kind``) e um span raiz de tracing; updates lentos
+ou com statements repetidos (N+1) são logados pelo profiler de SQL.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from app.utils import metrics, sql_profiler, tracing
+from bot.utils.metrics import update_kind
+
+logger = logging.getLogger(__name__)
+
+
+def update_ordering_key(update: object) -> Optional[int]:
+    """Chave de ordenação: chat do update, ou usuário quando não há chat"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return None
+
+
+class KeyedLock:
+    """Locks asyncio por chave, descartados quando ninguém mais os usa"""
+
+    def __init__(self):
+        self._locks: Dict[Any, list] = {}  # key -> [asyncio.Lock, refcount]
+
+    def __len__(self):
+        return len(self._locks)
+
+    async def run(self, key, coroutine: Awaitable[Any]):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await coroutine
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(key, None)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processa updates de chats diferentes em paralelo e do mesmo chat em série"""
+
+    def __init__(self, max_concurrent_updates: int = 64):
+        super().__init__(max_concurrent_updates)
+        self._locks = KeyedLock()
+        self._slow_ms, self._n_plus_one = sql_profiler.bot_limits()
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # Substitui o process_update do PTB, que pega a vaga do semáforo antes
+        # de do_process_update: aqui a fila do chat vem primeiro
+        key = update_ordering_key(update)
+        if key is None:
+            await self._in_slot(update, coroutine)
+            return
+        await self._locks.run(key, self._in_slot(update, coroutine))
+
+    async def _in_slot(self, update: object, coroutine: Awaitable[Any]) -> None:
+        async with self._semaphore:
+            await self.do_process_update(update, coroutine)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await self._measured(update, coroutine)
+
+    async def _measured(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # Mede só o processamento (a espera pelo lock do chat e pela vaga fica de fora)
+        kind = update_kind(update)
+        start = time.perf_counter()
+        attributes = {'telegram.update_id': getattr(update, 'update_id', None)}
+        with tracing.start_span(f'bot {kind}', tracing.KIND_SERVER, attributes), \
+                metrics.track_db('bot', kind) as profile:
+            try:
+                await coroutine
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.BOT_UPDATE_LATENCY.labels(kind).observe(elapsed)
+                sql_profiler.check(profile, f'bot {kind}', elapsed, self._slow_ms, self._n_plus_one)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
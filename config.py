@@ -3,6 +3,7 @@
 Arquivo de configuração da aplicação Flask
 """
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -30,6 +31,9 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'instance', 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Réplica de leitura para as telas de relatório (app/utils/read_replica.py)
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    READ_REPLICA_STALENESS_SECONDS = int(os.environ.get('READ_REPLICA_STALENESS_SECONDS', 10))
     
     # Configurações do Telegram
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
@@ -51,6 +55,19 @@ class Config:
     SESSION_TYPE = 'redis'
     SESSION_REDIS = None  # Set from REDIS_URL at init time
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)  # Expira após 2h de inatividade
+    # Renovar o TTL da sessão no máximo a cada N segundos (app/utils/session_refresh.py)
+    SESSION_REFRESH_EACH_REQUEST = False
+    SESSION_REFRESH_INTERVAL = int(os.environ.get('SESSION_REFRESH_INTERVAL', 300))
+    SESSION_SKIP_PREFIXES = ('/static', '/webhooks', '/c/', '/metrics')  # /c/: páginas públicas cacheadas
+    # Cache das páginas públicas do criador e dos grupos (app/utils/page_cache.py)
+    PUBLIC_PAGE_CACHE_TTL = int(os.environ.get('PUBLIC_PAGE_CACHE_TTL', 60))
+    # JSON do dashboard (/dashboard/api/kpis, revenue-chart, ...), cache por criador
+    DASHBOARD_JSON_TTL = int(os.environ.get('DASHBOARD_JSON_TTL', 30))  # segundos
+    # Sitemap pré-gerado (app/services/sitemap_service.py); padrão: instance/sitemaps,
+    # que é local ao host: com vários hosts, apontar para um diretório compartilhado
+    SITEMAP_DIR = os.environ.get('SITEMAP_DIR')
+    SITEMAP_BASE_URL = os.environ.get('SITEMAP_BASE_URL', 'https://televip.app')
+    SITEMAP_REBUILD_DELAY = int(os.environ.get('SITEMAP_REBUILD_DELAY', 30))  # segundos
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     SESSION_COOKIE_SECURE = os.environ.get('FLASK_ENV') == 'production'
@@ -59,15 +76,39 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-    
+    # Processamento de avatar/capa (app/services/media_service.py); padrão: instance/uploads/raw
+    MEDIA_RAW_DIR = os.environ.get('MEDIA_RAW_DIR')
+    MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', 2))  # 0 = processar na hora
+    # URLs de estáticos com hash (app/utils/static_assets.py); exige 'flask build-assets'
+    STATIC_FINGERPRINT = os.environ.get('STATIC_FINGERPRINT', 'true').lower() in ['true', '1', 'on']
+    
+    # /metrics (app/utils/metrics.py): com token exige 'Authorization: Bearer <token>';
+    # sem token, só IPs locais/privados
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Profiler de SQL (app/utils/sql_profiler.py): loga requests lentos e statements repetidos
+    SQL_PROFILER_SLOW_MS = int(os.environ.get('SQL_PROFILER_SLOW_MS', 500))  # 0 desliga
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))  # 0 desliga
+    SQL_PROFILER_SERVER_TIMING = os.environ.get('SQL_PROFILER_SERVER_TIMING', 'false').lower() in ['true', '1', 'on']
+
     # Configurações de paginação
     POSTS_PER_PAGE = 20
     USERS_PER_PAGE = 50
     
-    # Configurações de cache (Redis)
-    CACHE_TYPE = 'RedisCache'
+    # Configurações de cache (LRU local por worker + Redis, invalidação via pub/sub)
+    CACHE_TYPE = 'app.utils.two_tier_cache.TwoTierCache'
     CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_REDIS_SOCKET_TIMEOUT = 0.5  # Redis lento/fora do ar não trava a requisição
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_L1_MAX_ENTRIES = int(os.environ.get('CACHE_L1_MAX_ENTRIES', 1024))
+    CACHE_L1_TTL = int(os.environ.get('CACHE_L1_TTL', 30))  # segundos
+    # Snapshot do criador logado (app/utils/identity.py)
+    CREATOR_SNAPSHOT_TTL = int(os.environ.get('CREATOR_SNAPSHOT_TTL', 60))  # segundos
+
+    # Rate limit: se o Redis cair, limita em memória em vez de derrubar a requisição
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+    RATELIMIT_SWALLOW_ERRORS = True
+    # Só para testes de carga (benchmarks/load_renewal_day.py) medirem o app sem o limite por IP
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() not in ['false', 'off', '0']
     
     # Configurações de email (se necessário no futuro)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -122,6 +163,8 @@ class DevelopmentConfig(Config):
     """Configurações de desenvolvimento"""
     DEBUG = True
     SQLALCHEMY_ECHO = True  # Log de queries SQL
+    STATIC_FINGERPRINT = False  # editar CSS/JS sem rodar o build
+    SQL_PROFILER_SERVER_TIMING = True  # tempo de banco no DevTools
 
 class ProductionConfig(Config):
     """Configurações de produção"""
@@ -165,6 +208,10 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     SESSION_TYPE = 'filesystem'
     CACHE_TYPE = 'SimpleCache'
+    SITEMAP_DIR = os.path.join(tempfile.gettempdir(), f'televip-sitemaps-{os.getpid()}')
+    SITEMAP_REBUILD_DELAY = 0  # gerar na hora, após o commit
+    MEDIA_RAW_DIR = os.path.join(tempfile.gettempdir(), f'televip-media-raw-{os.getpid()}')
+    MEDIA_WORKERS = 0
     RATELIMIT_ENABLED = False
     RATELIMIT_STORAGE_URI = 'memory://'
 
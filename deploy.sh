@@ -48,6 +48,9 @@ sudo -u $APP_USER $APP_DIR/venv/bin/pip install --upgrade pip
 sudo -u $APP_USER $APP_DIR/venv/bin/pip install -r requirements.txt
 sudo -u $APP_USER $APP_DIR/venv/bin/pip install gunicorn
 
+# Estaticos com hash + .gz/.br em app/static/dist
+sudo -u $APP_USER $APP_DIR/venv/bin/flask --app "app:create_app()" build-assets
+
 # 6. Criar .env de producao
 echo "[6/10] Configurando .env..."
 if [ ! -f "$APP_DIR/.env" ]; then
@@ -114,6 +117,9 @@ Group=televip
 WorkingDirectory=/opt/televip
 Environment="PATH=/opt/televip/venv/bin"
 EnvironmentFile=/opt/televip/.env
+# Métricas dos workers somadas em /metrics (diretório recriado a cada start)
+RuntimeDirectory=televip-metrics
+Environment="PROMETHEUS_MULTIPROC_DIR=/run/televip-metrics"
 ExecStart=/opt/televip/venv/bin/gunicorn --workers 3 --bind unix:/opt/televip/televip.sock --timeout 120 "app:create_app()"
 Restart=always
 RestartSec=5
@@ -167,6 +173,14 @@ server {
         proxy_read_timeout 120s;
     }
 
+    # Assets com hash no nome: imutaveis, servindo o .gz gerado no build
+    location /static/dist/ {
+        alias /opt/televip/app/static/dist/;
+        gzip_static on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        add_header Vary Accept-Encoding;
+    }
+
     location /static {
         alias /opt/televip/app/static;
         expires 30d;
@@ -0,0 +1,39 @@
+"""add notification_outbox table
+
+Revision ID: c4e1a9d2b7f3
+Revises: 2f357bc54343
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1a9d2b7f3'
+down_revision = '2f357bc54343'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('chat_id', sa.String(length=50), nullable=True),
+    sa.Column('payload_json', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('available_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_outbox_status_available', 'notification_outbox',
+                    ['status', 'available_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notification_outbox_status_available', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,27 @@
+"""add keyset pagination indexes
+
+Revision ID: d7b2f0a4e915
+Revises: c4e1a9d2b7f3
+Create Date: 2026-10-18 11:03:27.504318
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7b2f0a4e915'
+down_revision = 'c4e1a9d2b7f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_subscriptions_group_end_date_id', 'subscriptions',
+                    ['group_id', 'end_date', 'id'], unique=False)
+    op.create_index('ix_transactions_created_at_id', 'transactions',
+                    ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transactions_created_at_id', table_name='transactions')
+    op.drop_index('ix_subscriptions_group_end_date_id', table_name='subscriptions')
@@ -0,0 +1,32 @@
+"""add avatar_variants_json to Creator and cover_variants_json to Group
+
+Revision ID: e5a8c3f1d920
+Revises: d7b2f0a4e915
+Create Date: 2026-10-18 15:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c3f1d920'
+down_revision = 'd7b2f0a4e915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('creators', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('avatar_variants_json', sa.Text(), nullable=True))
+
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cover_variants_json', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_column('cover_variants_json')
+
+    with op.batch_alter_table('creators', schema=None) as batch_op:
+        batch_op.drop_column('avatar_variants_json')
@@ -0,0 +1,75 @@
+"""add subscriptions_archive and transactions_archive tables
+
+Revision ID: f2c7d9a4b6e1
+Revises: e5a8c3f1d920
+Create Date: 2026-10-19 10:04:51.302117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7d9a4b6e1'
+down_revision = 'e5a8c3f1d920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('subscriptions_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('plan_id', sa.Integer(), nullable=False),
+    sa.Column('telegram_user_id', sa.String(length=50), nullable=False),
+    sa.Column('telegram_username', sa.String(length=100), nullable=True),
+    sa.Column('stripe_subscription_id', sa.String(length=100), nullable=True),
+    sa.Column('stripe_customer_id', sa.String(length=100), nullable=True),
+    sa.Column('start_date', sa.DateTime(), nullable=True),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('cancel_at_period_end', sa.Boolean(), nullable=True),
+    sa.Column('payment_method_type', sa.String(length=20), nullable=True),
+    sa.Column('auto_renew', sa.Boolean(), nullable=True),
+    sa.Column('is_legacy', sa.Boolean(), nullable=True),
+    sa.Column('last_reminder_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_subscriptions_archive_group_id', 'subscriptions_archive', ['group_id'], unique=False)
+
+    op.create_table('transactions_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('subscription_id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('fee', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('net_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('fixed_fee', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('percentage_fee', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_fee', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('pix_transaction_id', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('payment_method', sa.String(length=20), nullable=True),
+    sa.Column('stripe_payment_intent_id', sa.String(length=100), nullable=True),
+    sa.Column('stripe_session_id', sa.String(length=200), nullable=True),
+    sa.Column('stripe_invoice_id', sa.String(length=100), nullable=True),
+    sa.Column('billing_reason', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('paid_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transactions_archive_group_status', 'transactions_archive',
+                    ['group_id', 'status'], unique=False)
+    op.create_index('ix_transactions_archive_subscription_id', 'transactions_archive',
+                    ['subscription_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transactions_archive_subscription_id', table_name='transactions_archive')
+    op.drop_index('ix_transactions_archive_group_status', table_name='transactions_archive')
+    op.drop_table('transactions_archive')
+    op.drop_index('ix_subscriptions_archive_group_id', table_name='subscriptions_archive')
+    op.drop_table('subscriptions_archive')
@@ -0,0 +1,89 @@
+"""partition transactions by created_at month (PostgreSQL only)
+
+Revision ID: f9b1e3c5a7d2
+Revises: f2c7d9a4b6e1
+Create Date: 2026-10-19 14:37:08.521904
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9b1e3c5a7d2'
+down_revision = 'f2c7d9a4b6e1'
+branch_labels = None
+depends_on = None
+
+# Partições criadas já na migration além do mês atual; as seguintes vêm de
+# app/utils/partitioning.py (bot 1x por dia / flask partitions)
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _recreate_keys_and_indexes(primary_key):
+    op.execute(f"ALTER TABLE transactions ADD CONSTRAINT transactions_pkey PRIMARY KEY ({primary_key})")
+    op.execute("ALTER TABLE transactions ADD CONSTRAINT transactions_subscription_id_fkey "
+               "FOREIGN KEY (subscription_id) REFERENCES subscriptions (id)")
+    op.create_index('ix_transactions_stripe_session_id', 'transactions', ['stripe_session_id'], unique=False)
+    op.create_index('ix_transactions_created_at_id', 'transactions', ['created_at', 'id'], unique=False)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        # SQLite (dev/testes): tabela comum, nada muda
+        return
+
+    bind = op.get_bind()
+    op.execute("UPDATE transactions SET created_at = COALESCE(paid_at, now() AT TIME ZONE 'utc') "
+               "WHERE created_at IS NULL")
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('transactions', 'id')")).scalar()
+    first = bind.execute(sa.text("SELECT min(created_at) FROM transactions")).scalar()
+
+    # LIKE copia todas as colunas (inclusive as que o modelo não mapeia),
+    # defaults (nextval da sequence) e NOT NULLs
+    op.execute("ALTER TABLE transactions RENAME TO transactions_old")
+    op.execute("CREATE TABLE transactions (LIKE transactions_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+               "PARTITION BY RANGE (created_at)")
+    op.execute("ALTER TABLE transactions ALTER COLUMN created_at SET NOT NULL")
+    op.execute("ALTER TABLE transactions ALTER COLUMN created_at SET DEFAULT (now() AT TIME ZONE 'utc')")
+
+    now = datetime.utcnow()
+    month = datetime((first or now).year, (first or now).month, 1)
+    last = _add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(f"CREATE TABLE transactions_y{month:%Y}m{month:%m} PARTITION OF transactions "
+                   f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')")
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_old")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY transactions.id")
+    op.execute("DROP TABLE transactions_old")
+
+    # A chave primária de uma tabela particionada precisa incluir a chave de partição
+    _recreate_keys_and_indexes('id, created_at')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    sequence = op.get_bind().execute(sa.text("SELECT pg_get_serial_sequence('transactions', 'id')")).scalar()
+    op.execute("ALTER TABLE transactions RENAME TO transactions_old")
+    op.execute("CREATE TABLE transactions (LIKE transactions_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    op.execute("ALTER TABLE transactions ALTER COLUMN created_at DROP NOT NULL")
+    op.execute("ALTER TABLE transactions ALTER COLUMN created_at DROP DEFAULT")
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_old")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY transactions.id")
+    op.execute("DROP TABLE transactions_old")  # Leva junto as partições
+
+    _recreate_keys_and_indexes('id')
@@ -20,6 +20,7 @@ os.environ.pop('TELEGRAM_BOT_TOKEN', None)
 
 from app import create_app, db as _db
 from app.models import Creator, Group, PricingPlan, Subscription, Transaction, Withdrawal
+from app.utils import sql_profiler
 
 
 @pytest.fixture(scope='function')
@@ -211,6 +212,12 @@ def withdrawal(db, creator):
     return w
 
 
+@pytest.fixture
+def max_queries():
+    """``with max_queries(5): client.get(...)`` — falha se o bloco passar de 5 queries"""
+    return sql_profiler.max_queries
+
+
 def login(client, email, password):
     """Helper para fazer login nos testes"""
     return client.post('/login', data={
@@ -0,0 +1,215 @@
+# tests/test_archive.py
+"""
+Testes do arquivamento (app/services/archive_service.py): o que é frio, o
+que fica na tabela quente e o histórico (saldo, receita, exportações)
+somando o arquivo.
+"""
+import asyncio
+import csv
+import io
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models import (LeakIncident, Subscription, SubscriptionArchive, Transaction,
+                        TransactionArchive)
+from app.services import archive_service, export_service
+from bot.utils.sharding import group_partition
+from tests.conftest import login
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+def _sub(db, group, plan, user_id, status, ended_days_ago, created_days_ago=None):
+    sub = Subscription(
+        group_id=group.id, plan_id=plan.id,
+        telegram_user_id=str(user_id), telegram_username=f'user{user_id}',
+        start_date=NOW - timedelta(days=ended_days_ago + 30),
+        end_date=NOW - timedelta(days=ended_days_ago),
+        created_at=NOW - timedelta(days=created_days_ago if created_days_ago is not None else ended_days_ago + 30),
+        status=status,
+    )
+    db.session.add(sub)
+    db.session.flush()
+    return sub
+
+
+def _txn(db, sub, status, days_ago, amount='49.90'):
+    created = NOW - timedelta(days=days_ago)
+    txn = Transaction(subscription_id=sub.id, amount=Decimal(amount), status=status,
+                      created_at=created, paid_at=created if status == 'completed' else None)
+    db.session.add(txn)
+    db.session.flush()
+    return txn
+
+
+def _archive(**kwargs):
+    return archive_service.archive_cold_rows(now=NOW, **kwargs)
+
+
+def _history_rows(db, group, plan):
+    """Usuário 1 com assinatura e pagamento arquivados; usuário 2 ativo (quente)"""
+    old = _sub(db, group, plan, 1, 'expired', 400)
+    old_txn = _txn(db, old, 'completed', 430, amount='100.00')
+    current = _sub(db, group, plan, 2, 'active', -20)
+    current_txn = _txn(db, current, 'completed', 10, amount='50.00')
+    db.session.commit()
+    ids = {'old': old.id, 'old_txn': old_txn.id, 'current': current.id, 'current_txn': current_txn.id}
+    _archive()
+    return ids
+
+
+def _run_bot_callback(db, handler, data, user_id):
+    """Rodar um callback do bot contra o banco de teste; retorna o texto enviado"""
+
+    @contextmanager
+    def flask_db_session():
+        yield db.session
+        db.session.commit()
+
+    query = MagicMock()
+    query.data = data
+    query.from_user.id = user_id
+    query.answer = AsyncMock()
+    query.edit_message_text = AsyncMock()
+    with patch('bot.handlers.subscription.get_db_session', flask_db_session):
+        asyncio.get_event_loop().run_until_complete(handler(MagicMock(callback_query=query), MagicMock()))
+    return query.edit_message_text.call_args.args[0]
+
+
+class TestArchiveColdRows:
+
+    def test_moves_cold_rows_and_keeps_hot_ones(self, app_context, db, group, pricing_plan):
+        old_expired = _sub(db, group, pricing_plan, 1, 'expired', 400)
+        paid = _txn(db, old_expired, 'completed', 430)
+        recent_expired = _sub(db, group, pricing_plan, 2, 'expired', 20)
+        abandoned_sub = _sub(db, group, pricing_plan, 3, 'pending', -30, created_days_ago=45)
+        _txn(db, abandoned_sub, 'pending', 45)
+        abandoned_txn = _txn(db, recent_expired, 'pending', 60)
+        recent_pending = _txn(db, recent_expired, 'pending', 2)
+        active = _sub(db, group, pricing_plan, 4, 'active', -10)
+        active_pending = _txn(db, active, 'pending', 60)
+        leaked = _sub(db, group, pricing_plan, 5, 'cancelled', 400)
+        db.session.add(LeakIncident(group_id=group.id, subscription_id=leaked.id,
+                                    telegram_user_id='5'))
+        db.session.commit()
+        hot_subs = {recent_expired.id, active.id, leaked.id}
+        hot_txns = {recent_pending.id, active_pending.id}
+        old_expired_id, paid_id, abandoned_txn_id = old_expired.id, paid.id, abandoned_txn.id
+
+        moved = _archive()
+
+        assert moved == {'subscriptions': 2, 'transactions': 3}
+        assert {s.id for s in Subscription.query} == hot_subs
+        assert {t.id for t in Transaction.query} == hot_txns
+
+        archived_sub = db.session.get(SubscriptionArchive, old_expired_id)
+        assert archived_sub.telegram_username == 'user1' and archived_sub.archived_at == NOW
+        archived_paid = db.session.get(TransactionArchive, paid_id)
+        assert archived_paid.group_id == group.id
+        assert archived_paid.amount == Decimal('49.90') and archived_paid.status == 'completed'
+        assert db.session.get(TransactionArchive, abandoned_txn_id).subscription_id in hot_subs
+
+        # Nada mais a arquivar
+        assert _archive() == {'subscriptions': 0, 'transactions': 0}
+
+    def test_batches_and_partition(self, app_context, db, group, pricing_plan):
+        for user_id in range(5):
+            _txn(db, _sub(db, group, pricing_plan, user_id, 'expired', 300), 'completed', 330)
+        db.session.commit()
+
+        other_worker = 1 - group.id % 2
+        assert _archive(partition=lambda column: group_partition(column, other_worker, 2)) == \
+            {'subscriptions': 0, 'transactions': 0}
+        assert _archive(batch_size=2) == {'subscriptions': 5, 'transactions': 5}
+        assert SubscriptionArchive.query.count() == 5
+
+    def test_archive_tables_mirror_hot_columns(self):
+        for hot, archive in ((Subscription, SubscriptionArchive), (Transaction, TransactionArchive)):
+            assert set(hot.__table__.columns.keys()) <= set(archive.__table__.columns.keys())
+
+
+class TestHistory:
+
+    def test_balance_revenue_and_exports_include_archive(self, client, db, creator, group, pricing_plan):
+        from app.routes.dashboard import calculate_balance
+
+        old = _sub(db, group, pricing_plan, 1, 'expired', 400)
+        _txn(db, old, 'completed', 430, amount='100.00')
+        current = _sub(db, group, pricing_plan, 2, 'active', -20)
+        _txn(db, current, 'completed', 10, amount='50.00')
+        db.session.commit()
+
+        before = calculate_balance.uncached(creator.id)
+        revenue_before = list(export_service.group_revenue_rows(creator.id))
+        _archive()
+        after = calculate_balance.uncached(creator.id)
+
+        assert SubscriptionArchive.query.count() == 1
+        for key in ('total_received', 'total_fees', 'available_balance', 'blocked_balance', 'transaction_count'):
+            assert after[key] == before[key], key
+        assert list(export_service.group_revenue_rows(creator.id)) == revenue_before
+        assert archive_service.archived_revenue_by_group([group.id]) == {group.id: Decimal('100.00')}
+
+        login(client, 'creator@test.com', 'TestPass123')
+        stats = client.get('/dashboard/api/group-stats').get_json()
+        assert stats['groups'][str(group.id)]['revenue'] == 150.0
+        rows = list(csv.reader(io.StringIO(client.get('/dashboard/transactions/export').get_data(as_text=True))))
+        assert [(r[4], r[8]) for r in rows[1:]] == [('user1', 'R$ 100.00'), ('user2', 'R$ 50.00')]
+        rows = list(csv.reader(io.StringIO(
+            client.get(f'/groups/{group.id}/export-subscribers').get_data(as_text=True))))
+        assert [(r[0], r[3], r[-1]) for r in rows[1:]] == [('user1', 'expired', 'R$ 100.00'),
+                                                            ('user2', 'active', 'R$ 50.00')]
+
+    def test_group_delete_removes_archive(self, client, db, creator, group, pricing_plan):
+        _txn(db, _sub(db, group, pricing_plan, 1, 'expired', 400), 'completed', 430)
+        db.session.commit()
+        _archive()
+
+        login(client, 'creator@test.com', 'TestPass123')
+        client.post(f'/groups/{group.id}/delete')
+        assert SubscriptionArchive.query.count() == 0
+        assert TransactionArchive.query.count() == 0
+
+
+class TestHistoryListings:
+
+    def test_creator_transactions_include_archive(self, client, db, creator, group, pricing_plan):
+        ids = _history_rows(db, group, pricing_plan)
+        login(client, 'creator@test.com', 'TestPass123')
+
+        data = client.get('/dashboard/api/transactions').get_json()
+        assert [(i['id'], i['telegram_username'], i['group_name'], i['archived']) for i in data['items']] == [
+            (ids['current_txn'], 'user2', group.name, False),
+            (ids['old_txn'], 'user1', group.name, True),
+        ]
+        assert data['total'] == 2
+        assert [i['id'] for i in client.get(
+            f'/dashboard/api/transactions?group_id={group.id}&status=completed').get_json()['items']] == \
+            [ids['current_txn'], ids['old_txn']]
+        assert '@user1' in client.get('/dashboard/transactions').get_data(as_text=True)
+
+    def test_group_subscribers_include_archive(self, client, db, creator, group, pricing_plan):
+        ids = _history_rows(db, group, pricing_plan)
+        login(client, 'creator@test.com', 'TestPass123')
+
+        data = client.get(f'/groups/{group.id}/api/subscribers').get_json()
+        assert [(i['id'], i['plan_name'], i['archived']) for i in data['items']] == [
+            (ids['current'], pricing_plan.name, False),
+            (ids['old'], pricing_plan.name, True),
+        ]
+        expired = client.get(f'/groups/{group.id}/api/subscribers?status=expired&search=user1').get_json()
+        assert [i['id'] for i in expired['items']] == [ids['old']]
+        html = client.get(f'/groups/{group.id}/subscribers').get_data(as_text=True)
+        assert '@user1' in html and 'arquivada' in html
+
+    def test_bot_history_includes_archive(self, app_context, db, group, pricing_plan):
+        from bot.handlers.subscription import show_group_history, show_subscription_history
+
+        _history_rows(db, group, pricing_plan)
+
+        text = _run_bot_callback(db, show_subscription_history, 'subs_history', 1)
+        assert group.name in text and 'Expirou em' in text and '100' in text
+        text = _run_bot_callback(db, show_group_history, f'group_history_{group.id}', 1)
+        assert pricing_plan.name in text and '100' in text and 'Expirou em' in text
@@ -0,0 +1,72 @@
+# tests/test_benchmark_datagen.py
+"""
+Testes do gerador de dados dos benchmarks (benchmarks/datagen.py):
+proporções do dataset, login dos usuários do benchmark e determinismo; e a
+checagem de schema que decide se o banco semeado pode ser reaproveitado.
+"""
+from sqlalchemy import func, inspect, text
+
+from app.models import Creator, Group, PricingPlan, Subscription, Transaction
+from benchmarks.datagen import (
+    ADMIN_EMAIL, BENCH_PASSWORD, HEAVY_CREATOR_EMAIL, dataset_shape, seed_database,
+)
+from benchmarks.harness import schema_matches
+
+
+def _count(db, model):
+    return db.session.query(func.count(model.id)).scalar()
+
+
+class TestDatagen:
+
+    def test_shape(self, app_context, db):
+        shape = seed_database(db.session, 2000)
+
+        assert shape == dataset_shape(2000)
+        assert _count(db, Creator) == shape['creators'] + 1  # + admin
+        assert _count(db, Group) == shape['groups']
+        assert _count(db, PricingPlan) == shape['plans']
+        assert _count(db, Subscription) == shape['subscriptions']
+        assert _count(db, Transaction) == shape['transactions']
+
+        heavy = Creator.query.filter_by(email=HEAVY_CREATOR_EMAIL).one()
+        assert heavy.groups.count() == shape['groups'] // 5
+        assert heavy.check_password(BENCH_PASSWORD)
+        assert Creator.query.filter_by(email=ADMIN_EMAIL, is_admin=True).one().check_password(BENCH_PASSWORD)
+        assert Subscription.query.filter(Subscription.stripe_subscription_id.isnot(None)).count() == 0
+
+        # Trabalho para o job de expiração: ativas já vencidas
+        stale = Subscription.query.filter(
+            Subscription.status == 'active', Subscription.end_date < func.now()).count()
+        assert stale > 0
+
+    def test_deterministic(self, app_context, db):
+        seed_database(db.session, 1000, seed=7)
+        first = db.session.query(func.sum(Transaction.amount), func.count(Subscription.id.distinct())).join(
+            Subscription).filter(Transaction.status == 'completed').one()
+        statuses = dict(db.session.query(Subscription.status, func.count(Subscription.id))
+                        .group_by(Subscription.status).all())
+
+        db.drop_all()
+        db.create_all()
+        seed_database(db.session, 1000, seed=7)
+        again = db.session.query(func.sum(Transaction.amount), func.count(Subscription.id.distinct())).join(
+            Subscription).filter(Transaction.status == 'completed').one()
+        assert tuple(again) == tuple(first)
+        assert dict(db.session.query(Subscription.status, func.count(Subscription.id))
+                    .group_by(Subscription.status).all()) == statuses
+
+
+class TestSchemaMatches:
+
+    def test_missing_table_or_column_forces_reseed(self, app_context, db):
+        assert schema_matches(inspect(db.engine), db.metadata)
+
+        db.session.execute(text('DROP TABLE transactions_archive'))
+        db.session.commit()
+        assert not schema_matches(inspect(db.engine), db.metadata)
+
+        db.create_all()
+        db.session.execute(text('ALTER TABLE groups DROP COLUMN last_broadcast_at'))
+        db.session.commit()
+        assert not schema_matches(inspect(db.engine), db.metadata)
@@ -0,0 +1,300 @@
+# tests/test_bot_persistence.py
+"""
+Testes da persistência Redis do estado do bot (bot/utils/persistence.py):
+escrita em lote, TTL por usuário, refresh entre réplicas e retomada dos
+auto-checks de pagamento após restart.
+"""
+import asyncio
+import fnmatch
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bot.utils.persistence import RedisPersistence
+
+
+class FakeAsyncRedis:
+    """Cliente Redis assíncrono mínimo em memória (só o que a persistência usa)"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.hashes = {}
+        self.pipelines_executed = 0
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(k.decode() if isinstance(k, bytes) else k) for k in keys]
+
+    async def scan_iter(self, match='*', count=None):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key.encode()
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def set(self, key, value, ex=None):
+        self.ops.append(('set', key, value, ex))
+
+    def delete(self, key):
+        self.ops.append(('delete', key, None, None))
+
+    async def execute(self):
+        self.redis.pipelines_executed += 1
+        for op, key, value, ex in self.ops:
+            if op == 'set':
+                self.redis.data[key] = value
+                self.redis.ttls[key] = ex
+            else:
+                self.redis.data.pop(key, None)
+                self.redis.ttls.pop(key, None)
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class TestRedisPersistence:
+
+    def test_user_data_roundtrip_with_ttl(self):
+        """user_data gravado volta igual e a chave tem TTL por usuário"""
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            p = RedisPersistence(redis, user_ttl=3600, batch_delay=0)
+            await p.update_user_data(42, {'broadcast_message': 'oi', 'checkout': {'plan_id': 1}})
+            await p.flush()
+            fresh = RedisPersistence(redis)
+            return await fresh.get_user_data()
+
+        loaded = _run(scenario())
+        assert loaded == {42: {'broadcast_message': 'oi', 'checkout': {'plan_id': 1}}}
+        assert redis.ttls['televip:bot:user:42'] == 3600
+
+    def test_writes_are_batched_in_one_pipeline(self):
+        """Várias atualizações dentro da janela viram um único pipeline"""
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            p = RedisPersistence(redis, batch_delay=0.05)
+            for uid in range(20):
+                await p.update_user_data(uid, {'n': uid})
+            assert redis.data == {}  # nada gravado ainda (write-behind)
+            await asyncio.sleep(0.1)
+
+        _run(scenario())
+        assert redis.pipelines_executed == 1
+        assert len(redis.data) == 20
+
+    def test_batch_size_triggers_immediate_flush(self):
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            p = RedisPersistence(redis, batch_size=5, batch_delay=10)
+            for uid in range(5):
+                await p.update_user_data(uid, {})
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+        _run(scenario())
+        assert len(redis.data) == 5
+
+    def test_drop_user_data(self):
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            p = RedisPersistence(redis, batch_delay=0)
+            await p.update_user_data(7, {'a': 1})
+            await p.flush()
+            await p.drop_user_data(7)
+            await p.flush()
+
+        _run(scenario())
+        assert 'televip:bot:user:7' not in redis.data
+
+    def test_refresh_picks_up_other_replica_write(self):
+        """Réplica B vê o rascunho gravado pela réplica A"""
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            a = RedisPersistence(redis)
+            b = RedisPersistence(redis)
+            await b.get_user_data()
+            await a.update_user_data(1, {'broadcast_message': 'rascunho'})
+            await a.flush()
+            local = {}
+            await b.refresh_user_data(1, local)
+            return local
+
+        assert _run(scenario()) == {'broadcast_message': 'rascunho'}
+
+    def test_refresh_keeps_unflushed_local_changes(self):
+        """Escrita local pendente não é sobrescrita por dado antigo do Redis"""
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            p = RedisPersistence(redis, batch_delay=10)
+            await p.update_user_data(1, {'v': 1})
+            await p.flush()
+            await p.update_user_data(1, {'v': 2})
+            local = {'v': 2}
+            await p.refresh_user_data(1, local)
+            return local
+
+        assert _run(scenario()) == {'v': 2}
+
+    def test_refresh_skips_own_version(self):
+        """Dado que a própria réplica escreveu não é recarregado"""
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            p = RedisPersistence(redis, batch_delay=0)
+            await p.update_user_data(1, {'v': 1})
+            await p.flush()
+            local = {'v': 1, 'transient': True}
+            await p.refresh_user_data(1, local)
+            return local
+
+        assert _run(scenario()) == {'v': 1, 'transient': True}
+
+    def test_conversations(self):
+        redis = FakeAsyncRedis()
+
+        async def scenario():
+            p = RedisPersistence(redis)
+            await p.update_conversation('flow', (1, 2), 3)
+            await p.update_conversation('flow', (4, 5), 6)
+            await p.update_conversation('flow', (4, 5), None)
+            return await p.get_conversations('flow')
+
+        assert _run(scenario()) == {(1, 2): 3}
+
+    def test_from_env_without_url(self, monkeypatch):
+        monkeypatch.delenv('BOT_REDIS_URL', raising=False)
+        monkeypatch.delenv('REDIS_URL', raising=False)
+        assert RedisPersistence.from_env() is None
+
+
+class TestResumePaymentChecks:
+
+    def _app(self, user_data):
+        app = MagicMock()
+        app.user_data = user_data
+        app.job_queue.get_jobs_by_name.return_value = []
+        return app
+
+    def test_recent_checkout_is_rescheduled(self):
+        from bot.handlers.payment import resume_payment_checks, _auto_check_payment
+
+        scheduled_at = datetime.utcnow() - timedelta(minutes=2)
+        app = self._app({
+            555: {'payment_check': {
+                'chat_id': 555, 'message_id': 10,
+                'session_id': 'cs_test_resume', 'scheduled_at': scheduled_at,
+            }},
+        })
+
+        assert resume_payment_checks(app) == 1
+        args, kwargs = app.job_queue.run_repeating.call_args
+        assert args[0] is _auto_check_payment
+        assert kwargs['name'] == 'payment_check_555'
+        assert kwargs['data']['session_id'] == 'cs_test_resume'
+        assert kwargs['data']['attempts'] >= 7
+
+    def test_stale_checkout_is_discarded(self):
+        from bot.handlers.payment import resume_payment_checks
+
+        user_data = {555: {'payment_check': {
+            'chat_id': 555, 'message_id': 10, 'session_id': 'cs_old',
+            'scheduled_at': datetime.utcnow() - timedelta(hours=1),
+        }}}
+        app = self._app(user_data)
+
+        assert resume_payment_checks(app) == 0
+        assert 'payment_check' not in user_data[555]
+        app.job_queue.run_repeating.assert_not_called()
+
+    def test_finished_check_is_not_resumed(self, app_context, db, transaction):
+        from bot.handlers import payment
+
+        @contextmanager
+        def flask_db_session():
+            yield db.session
+            db.session.commit()
+
+        user_data = {555: {'payment_check': {
+            'chat_id': 555, 'message_id': 10, 'session_id': transaction.stripe_session_id,
+            'scheduled_at': datetime.utcnow() - timedelta(minutes=2),
+        }}}
+        app = self._app(user_data)
+        context = MagicMock()
+        context.application = app
+        context.job.data = {'user_id': 555, 'chat_id': 555, 'message_id': 10,
+                            'session_id': transaction.stripe_session_id, 'attempts': 0}
+        context.bot.create_chat_invite_link = AsyncMock(return_value=MagicMock(invite_link='https://t.me/+x'))
+        context.bot.edit_message_text = AsyncMock()
+
+        with patch('bot.handlers.payment.get_db_session', flask_db_session):
+            _run(payment._check_payment(context))
+
+        context.job.schedule_removal.assert_called_once_with()
+        context.bot.edit_message_text.assert_called_once()
+        assert 'payment_check' not in user_data[555]
+        app.mark_data_for_update_persistence.assert_called_once_with(user_ids=555)
+        assert payment.resume_payment_checks(app) == 0
+        app.job_queue.run_repeating.assert_not_called()
+
+    def test_finished_check_keeps_newer_checkout(self):
+        from bot.handlers import payment
+
+        user_data = {555: {'payment_check': {'session_id': 'cs_new'}}}
+        context = MagicMock()
+        context.application = self._app(user_data)
+        context.job.data = {'user_id': 555, 'session_id': 'cs_old'}
+
+        payment._finish_payment_check(context)
+
+        context.job.schedule_removal.assert_called_once_with()
+        assert user_data[555]['payment_check'] == {'session_id': 'cs_new'}
+
+    def test_each_check_resumed_by_exactly_one_worker(self, monkeypatch):
+        from bot.handlers.payment import resume_payment_checks
+
+        scheduled_at = datetime.utcnow() - timedelta(minutes=2)
+        user_data = {
+            user_id: {'payment_check': {
+                'chat_id': user_id, 'message_id': 10,
+                'session_id': f'cs_{user_id}', 'scheduled_at': scheduled_at,
+            }}
+            for user_id in range(1000, 1020)
+        }
+        monkeypatch.setenv('BOT_WORKER_COUNT', '2')
+        resumed_by = {}
+        for worker_index in range(2):
+            monkeypatch.setenv('BOT_WORKER_INDEX', str(worker_index))
+            app = self._app(user_data)
+            resume_payment_checks(app)
+            for call in app.job_queue.run_repeating.call_args_list:
+                resumed_by.setdefault(call.kwargs['data']['user_id'], []).append(worker_index)
+
+        assert sorted(resumed_by) == sorted(user_data)
+        assert all(len(workers) == 1 for workers in resumed_by.values())
+        assert set(w for workers in resumed_by.values() for w in workers) == {0, 1}
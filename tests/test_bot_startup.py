@@ -0,0 +1,109 @@
+# tests/test_bot_startup.py
+"""
+Testes do startup do bot (bot/utils/startup.py e bot/main.py): modelos sem
+Flask, handlers lazy com warm-up e comandos registrados em background.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bot.utils import startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class TestImports:
+
+    def test_bot_main_does_not_import_flask_or_stripe(self):
+        code = ('import sys, bot.main; '
+                "print(sorted(m for m in ('flask', 'flask_sqlalchemy', 'flask_login', 'stripe') if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                                env=dict(os.environ, STRIPE_SECRET_KEY=''), timeout=60)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().splitlines()[-1] == '[]'
+
+    def test_models_query_resolves_flask_session(self, app_context, creator):
+        from app import db
+        from app.models import Creator
+        from app.models.base import Model
+
+        assert db.metadata is Model.metadata
+        assert Creator.query.filter_by(email='creator@test.com').one().id == creator.id
+        assert creator.is_authenticated and creator.get_id() == str(creator.id)
+
+
+class TestLazyHandlers:
+
+    def test_lazy_callback_and_warm_up(self, tmp_path, monkeypatch):
+        (tmp_path / 'lazy_handlers_mod.py').write_text(
+            'async def handler(update, context):\n    return update + context\n')
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.setattr(startup, '_lazy_modules', set())
+        monkeypatch.setattr(startup, 'import_times', {})
+
+        callback = startup.lazy('lazy_handlers_mod:handler')
+        assert callback.__name__ == 'handler'
+        assert 'lazy_handlers_mod' not in sys.modules
+
+        times = _run(startup.warm_up())
+        assert 'lazy_handlers_mod' in sys.modules
+        assert list(times) == ['lazy_handlers_mod']
+        assert _run(callback(1, 2)) == 3
+        sys.modules.pop('lazy_handlers_mod')
+
+    def test_load_waits_for_module_being_imported(self, tmp_path, monkeypatch):
+        (tmp_path / 'slow_handlers_mod.py').write_text(
+            'import time\ntime.sleep(0.5)\n\nasync def handler(update, context):\n    return None\n')
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.setattr(startup, 'import_times', {})
+
+        warm = threading.Thread(target=startup.load, args=('slow_handlers_mod',))
+        warm.start()
+        deadline = time.monotonic() + 5
+        while 'slow_handlers_mod' not in sys.modules and time.monotonic() < deadline:
+            time.sleep(0.01)
+        try:
+            assert hasattr(startup.load('slow_handlers_mod'), 'handler')
+        finally:
+            warm.join()
+            sys.modules.pop('slow_handlers_mod', None)
+
+    def test_phases_report(self, monkeypatch):
+        monkeypatch.setattr(startup, '_phases', {})
+        startup.mark('imports')
+        startup.mark('build')
+        report = startup.report()
+        assert list(report) == ['imports', 'build', 'total']
+        assert report['total'] >= report['imports'] + report['build']
+
+
+class TestPostInit:
+
+    def test_commands_in_background_without_get_me(self):
+        from bot import main
+
+        application = MagicMock()
+        application.persistence = None
+        application.bot.username = 'TestVIPBot'
+        application.bot.get_me = AsyncMock()
+        application.bot.set_my_commands = AsyncMock()
+
+        async def scenario():
+            await main.post_init(application)
+            await asyncio.gather(*list(startup._background))
+
+        with patch.object(main, 'start_loop_monitor'), patch.object(main, 'get_worker_index', return_value=0), \
+                patch('bot.jobs.scheduled_tasks.setup_jobs') as setup_jobs:
+            _run(scenario())
+
+        setup_jobs.assert_called_once_with(application)
+        application.bot.get_me.assert_not_called()
+        assert application.bot.set_my_commands.await_count == 4
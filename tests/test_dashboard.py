@@ -44,6 +44,92 @@ class TestDashboardStats:
         assert resp.status_code == 200
 
 
+class TestDashboardJSON:
+    """Casca do dashboard + JSON em cache (KPIs, gráfico, grupos, transações)"""
+
+    def _count_queries(self, client, url):
+        from sqlalchemy import event
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(_db.engine, 'before_cursor_execute', listener)
+        try:
+            assert client.get(url).status_code == 200
+        finally:
+            event.remove(_db.engine, 'before_cursor_execute', listener)
+        return len(statements)
+
+    def _add_group_with_sales(self, creator, n):
+        group = Group(name=f'Grupo {n}', telegram_id=f'-100{n}', creator_id=creator.id)
+        _db.session.add(group)
+        _db.session.flush()
+        plan = PricingPlan(group_id=group.id, name='Mensal', duration_days=30, price=Decimal('10.00'))
+        _db.session.add(plan)
+        _db.session.flush()
+        sub = Subscription(group_id=group.id, plan_id=plan.id, telegram_user_id=str(n),
+                           start_date=datetime.utcnow(), end_date=datetime.utcnow() + timedelta(days=30),
+                           status='active')
+        _db.session.add(sub)
+        _db.session.flush()
+        _db.session.add(Transaction(subscription_id=sub.id, amount=Decimal('10.00'), status='completed'))
+        _db.session.commit()
+
+    def test_shell_queries_do_not_grow_with_groups(self, client, creator, group):
+        login(client, 'creator@test.com', 'TestPass123')
+        client.get('/dashboard/')
+        _db.session.expire_all()  # o commit abaixo expira o criador; igualar as duas medições
+        few = self._count_queries(client, '/dashboard/')
+        for n in range(8):
+            self._add_group_with_sales(creator, n)
+        _db.session.expire_all()
+        assert self._count_queries(client, '/dashboard/') == few
+
+    def test_kpis(self, client, creator, group, subscription, transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        data = client.get('/dashboard/api/kpis').get_json()
+        assert data['total_revenue'] == 49.9
+        assert data['total_subscribers'] == 1
+        assert data['total_groups'] == 1 and data['num_channels'] == 0
+        assert data['transaction_count'] == 1
+        assert data['blocked_balance'] > 0
+        assert data['blocked_by_days'][0]['count'] == 1
+
+    def test_group_stats_and_chart(self, client, creator, group, subscription, transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        stats = client.get('/dashboard/api/group-stats').get_json()
+        assert stats['groups'][str(group.id)] == {'subscribers': 1, 'revenue': 49.9}
+
+        chart = client.get('/dashboard/api/revenue-chart').get_json()
+        assert len(chart['labels']) == 7
+        assert chart['data'][-1] == 49.9
+
+    def test_recent_transactions(self, client, creator, group, pricing_plan, subscription, transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        data = client.get('/dashboard/api/recent-transactions').get_json()
+        assert data['transactions'][0]['subscriber'] == 'testsubscriber'
+        assert data['transactions'][0]['plan_name'] == pricing_plan.name
+
+    def test_etag_and_short_cache(self, client, creator, group, subscription, transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = client.get('/dashboard/api/kpis')
+        assert 'private' in resp.headers['Cache-Control']
+        assert 'max-age=30' in resp.headers['Cache-Control']
+
+        again = client.get('/dashboard/api/kpis', headers={'If-None-Match': resp.headers['ETag']})
+        assert again.status_code == 304
+
+    def test_cached_per_creator(self, client, creator, second_creator, group, subscription, transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        assert self._count_queries(client, '/dashboard/api/group-stats') > 0
+        assert self._count_queries(client, '/dashboard/api/group-stats') == 0
+
+        client.post('/logout')
+        login(client, 'second@test.com', 'SecondPass123')
+        assert client.get('/dashboard/api/group-stats').get_json() == {'groups': {}}
+
+    def test_requires_login(self, client):
+        assert client.get('/dashboard/api/kpis').status_code == 302
+
+
 class TestTransactions:
     """Testes da página de transações"""
 
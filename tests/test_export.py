@@ -0,0 +1,132 @@
+# tests/test_export.py
+"""
+Testes da exportação em streaming (app/services/export_service.py):
+conteúdo do CSV, Parquet, filtros e memória constante com muitas linhas.
+
+A verificação de memória usa EXPORT_MEMORY_ROWS linhas (padrão 50.000);
+rode com EXPORT_MEMORY_ROWS=1000000 para o teste completo de 1M linhas.
+"""
+import csv
+import io
+import os
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models import Subscription, Transaction
+from app.services import export_service
+from tests.conftest import login
+
+
+def _seed_subscriptions(db, group, plan, count):
+    """Inserção em massa (Core) — sem passar pelo ORM"""
+    now = datetime.utcnow()
+    batch = []
+    for i in range(count):
+        batch.append({
+            'group_id': group.id, 'plan_id': plan.id,
+            'telegram_user_id': str(10_000_000 + i), 'telegram_username': f'bulk{i}',
+            'start_date': now, 'end_date': now + timedelta(days=30), 'status': 'active',
+        })
+        if len(batch) == 20000:
+            db.session.execute(Subscription.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Subscription.__table__.insert(), batch)
+    db.session.commit()
+
+
+def _csv_rows(resp):
+    return list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+
+
+class TestSubscribersExport:
+
+    def test_csv_is_streamed_with_total_paid(self, client, creator, group, subscription, transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = client.get(f'/groups/{group.id}/export-subscribers')
+
+        assert resp.status_code == 200
+        assert resp.is_streamed
+        assert 'text/csv' in resp.content_type
+        rows = _csv_rows(resp)
+        assert rows[0][0] == 'Username'
+        assert rows[1][0] == 'testsubscriber'
+        assert rows[1][-1] == f'R$ {transaction.amount:.2f}'
+
+    def test_parquet_roundtrip(self, client, creator, group, subscription, transaction):
+        pq = pytest.importorskip('pyarrow.parquet')
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = client.get(f'/groups/{group.id}/export-subscribers?format=parquet')
+
+        assert resp.status_code == 200
+        assert resp.headers['Content-Disposition'].endswith('.parquet"')
+        table = pq.read_table(io.BytesIO(resp.get_data()))
+        assert table.num_rows == 1
+        assert table.column('Telegram ID').to_pylist() == ['123456789']
+        assert table.column('Valor Pago').to_pylist() == [Decimal(str(transaction.amount))]
+
+    def test_parquet_unavailable_falls_back_with_message(self, client, creator, group, monkeypatch):
+        monkeypatch.setattr(export_service, 'has_pyarrow', False)
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = client.get(f'/groups/{group.id}/export-subscribers?format=parquet')
+        assert resp.status_code == 302
+
+
+class TestTransactionsExport:
+
+    def test_filters_by_status(self, client, db, creator, subscription):
+        for status in ('completed', 'completed', 'pending'):
+            db.session.add(Transaction(subscription_id=subscription.id, amount=Decimal('10.00'), status=status))
+        db.session.commit()
+
+        login(client, 'creator@test.com', 'TestPass123')
+        rows = _csv_rows(client.get('/dashboard/transactions/export?status=completed'))
+        assert len(rows) == 3
+        assert {r[6] for r in rows[1:]} == {'completed'}
+
+    def test_only_own_transactions(self, client, db, second_creator, transaction):
+        login(client, 'second@test.com', 'SecondPass123')
+        rows = _csv_rows(client.get('/dashboard/transactions/export'))
+        assert len(rows) == 1  # só o cabeçalho
+
+    def test_revenue_per_group(self, client, db, creator, group, subscription):
+        for amount in ('10.00', '30.00'):
+            db.session.add(Transaction(subscription_id=subscription.id, amount=Decimal(amount), status='completed'))
+        db.session.commit()
+
+        login(client, 'creator@test.com', 'TestPass123')
+        rows = _csv_rows(client.get('/dashboard/revenue/export'))
+        assert rows[1][:3] == [group.name, '2', 'R$ 40.00']
+
+
+class TestExportMemory:
+
+    def _peak_while_streaming(self, body):
+        tracemalloc.start()
+        try:
+            total = 0
+            for chunk in body:
+                total += len(chunk)
+            return tracemalloc.get_traced_memory()[1], total
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_stays_flat(self, app_context, db, group, pricing_plan):
+        rows = int(os.getenv('EXPORT_MEMORY_ROWS', '50000'))
+        small = max(rows // 10, 2000)
+
+        _seed_subscriptions(db, group, pricing_plan, small)
+        peak_small, size_small = self._peak_while_streaming(
+            export_service.iter_csv(export_service.SUBSCRIBERS, export_service.subscriber_rows(group.id)))
+
+        _seed_subscriptions(db, group, pricing_plan, rows - small)
+        db.session.expire_all()
+        peak_large, size_large = self._peak_while_streaming(
+            export_service.iter_csv(export_service.SUBSCRIBERS, export_service.subscriber_rows(group.id)))
+
+        assert size_large > size_small * 5
+        # 10x mais linhas sem crescimento relevante do pico (o arquivo em si não fica em memória)
+        assert peak_large < peak_small * 2
@@ -0,0 +1,161 @@
+# tests/test_fake_apis.py
+"""
+Testes das APIs falsas dos benchmarks (benchmarks/fake_telegram.py e
+benchmarks/fake_stripe.py) e das bases configuráveis
+(TELEGRAM_API_BASE / STRIPE_API_BASE).
+"""
+import json
+import threading
+
+import pytest
+import stripe
+from werkzeug.serving import make_server
+
+from app.services import stripe_service, telegram_service
+from benchmarks import fake_stripe, fake_telegram
+
+WEBHOOK_SECRET = 'whsec_fake_test'
+
+
+class TestApiBase:
+
+    def test_telegram_default(self, monkeypatch):
+        monkeypatch.delenv('TELEGRAM_API_BASE', raising=False)
+        assert telegram_service.api_url('123:ABC', 'getMe') == 'https://api.telegram.org/bot123:ABC/getMe'
+
+    def test_telegram_override(self, monkeypatch):
+        monkeypatch.setenv('TELEGRAM_API_BASE', 'http://127.0.0.1:8081/')
+        assert telegram_service.api_url('123:ABC', 'sendMessage') == 'http://127.0.0.1:8081/bot123:ABC/sendMessage'
+        assert telegram_service.bot_base_url() == 'http://127.0.0.1:8081/bot'
+        assert telegram_service.bot_base_file_url() == 'http://127.0.0.1:8081/file/bot'
+
+    def test_stripe_override(self, monkeypatch):
+        monkeypatch.setattr(stripe, 'api_base', stripe.api_base)
+        monkeypatch.setenv('STRIPE_API_BASE', 'http://127.0.0.1:12111/')
+        stripe_service.configure_api_base()
+        assert stripe.api_base == 'http://127.0.0.1:12111'
+
+
+class TestFakeTelegram:
+
+    def test_ban_and_rate_limit(self):
+        api = fake_telegram.FakeBotAPI(max_per_second=1, retry_after=3)
+        client = fake_telegram.create_app(api).test_client()
+
+        client.post('/bot1:X/banChatMember', data={'chat_id': '-100', 'user_id': '42'})
+        member = client.post('/bot1:X/getChatMember', data={'chat_id': '-100', 'user_id': '42'}).get_json()
+        assert member['result']['status'] == 'kicked'
+
+        assert client.post('/bot1:X/sendMessage', data={'chat_id': '42', 'text': 'a'}).status_code == 200
+        limited = client.post('/bot1:X/sendMessage', data={'chat_id': '42', 'text': 'b'})
+        assert limited.status_code == 429
+        assert limited.get_json()['parameters']['retry_after'] == 3
+        assert client.get('/_stats').get_json()['total_rate_limited'] == 1
+
+    def test_chat_log_keeps_keyboards(self):
+        api = fake_telegram.FakeBotAPI()
+        client = fake_telegram.create_app(api).test_client()
+        keyboard = {'inline_keyboard': [[{'text': 'VIP', 'callback_data': 'plan_1_2'}]]}
+        client.post('/bot1:X/sendMessage', data={'chat_id': '42', 'text': 'planos',
+                                                 'reply_markup': json.dumps(keyboard)})
+
+        log = client.get('/_chats/42').get_json()
+        assert log[0]['text'] == 'planos'
+        assert log[0]['reply_markup'] == keyboard
+        assert client.get(f"/_chats/42?after={log[0]['seq']}").get_json() == []
+
+        update = fake_telegram.make_callback_update(7, 42, 'plan_1_2')
+        assert update['callback_query']['data'] == 'plan_1_2'
+        assert update['callback_query']['message']['chat']['id'] == 42
+
+
+@pytest.fixture
+def stripe_server(monkeypatch):
+    """Stripe falso numa porta local, com o SDK apontado para ele"""
+    fake = fake_stripe.FakeStripe(webhook_secret=WEBHOOK_SECRET)
+    server = make_server('127.0.0.1', 0, fake_stripe.create_app(fake), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(stripe, 'api_base', f'http://127.0.0.1:{server.port}')
+    monkeypatch.setattr(stripe, 'api_key', 'sk_test_fake')
+    yield fake
+    server.shutdown()
+
+
+class TestFakeStripe:
+
+    def test_decode_params(self):
+        params = fake_stripe.decode_params([
+            ('line_items[0][price]', 'price_1'), ('line_items[0][quantity]', '1'),
+            ('metadata[user_id]', '7'), ('expand[]', 'payment_intent'),
+        ])
+        assert params == {
+            'line_items': [{'price': 'price_1', 'quantity': '1'}],
+            'metadata': {'user_id': '7'}, 'expand': ['payment_intent'],
+        }
+
+    def test_subscription_checkout_with_sdk(self, stripe_server):
+        customer = stripe.Customer.create(email='fan@test.com')
+        assert stripe.Customer.list(email='fan@test.com').data[0].id == customer.id
+
+        product = stripe.Product.create(name='Plano VIP')
+        price = stripe.Price.create(product=product.id, unit_amount=2990, currency='brl',
+                                    recurring={'interval': 'month'})
+        session = stripe.checkout.Session.create(
+            mode='subscription', customer=customer.id, line_items=[{'price': price.id, 'quantity': 1}],
+            metadata={'group_id': '1'}, success_url='https://televip.test/ok', cancel_url='https://televip.test/x',
+        )
+        assert session.status == 'open' and session.amount_total == 2990
+
+        stripe_server.complete_session(session.id)
+        completed = stripe.checkout.Session.retrieve(session.id)
+        assert completed.payment_status == 'paid'
+        subscription = stripe.Subscription.retrieve(completed.subscription)
+        assert subscription.status == 'active'
+
+        events = [e['type'] for e in stripe_server.events]
+        assert events == ['checkout.session.completed', 'invoice.paid']
+        invoice = stripe_server.events[-1]['data']['object']
+        assert invoice['billing_reason'] == 'subscription_create'
+        assert invoice['amount_paid'] == 2990
+        assert invoice['lines']['data'][0]['period']['end'] == subscription.current_period_end
+
+        stripe.Subscription.cancel(subscription.id)
+        assert stripe_server.events[-1]['type'] == 'customer.subscription.deleted'
+
+    def test_payment_checkout_and_errors(self, stripe_server):
+        session = stripe.checkout.Session.create(
+            mode='payment', line_items=[{'price_data': {'currency': 'brl', 'unit_amount': 1500,
+                                                        'product_data': {'name': 'Acesso'}}, 'quantity': 2}],
+            success_url='https://televip.test/ok', cancel_url='https://televip.test/x',
+        )
+        stripe_server.complete_session(session.id)
+        expanded = stripe.checkout.Session.retrieve(session.id, expand=['payment_intent'])
+        assert expanded.payment_intent.status == 'succeeded'
+        assert expanded.payment_intent.amount == 3000
+
+        with pytest.raises(stripe.InvalidRequestError):
+            stripe.checkout.Session.retrieve('cs_test_missing')
+
+        stripe_server.rate_limit = 1.0
+        with pytest.raises(stripe.RateLimitError):
+            stripe.Customer.create(email='x@test.com')
+
+    def test_signed_webhook_accepted_by_app(self, client, monkeypatch):
+        monkeypatch.setenv('STRIPE_WEBHOOK_SECRET', WEBHOOK_SECRET)
+        fake = fake_stripe.FakeStripe(webhook_secret=WEBHOOK_SECRET)
+        fake.objects['checkout/sessions']['cs_test_x'] = {
+            'id': 'cs_test_x', 'object': 'checkout.session', 'created': 0, 'metadata': {},
+            'mode': 'payment', 'status': 'open', 'payment_status': 'unpaid', 'amount_total': 100,
+            'customer': None,
+        }
+        fake.complete_session('cs_test_x')
+
+        event = fake.events[0]
+        payload = json.dumps(event).encode()
+        header = fake_stripe.sign_payload(payload, WEBHOOK_SECRET)
+        assert stripe.Webhook.construct_event(payload, header, WEBHOOK_SECRET)['type'] == 'checkout.session.completed'
+
+        response = client.post('/webhooks/stripe', data=payload, content_type='application/json',
+                               headers={'Stripe-Signature': header})
+        assert response.status_code == 200
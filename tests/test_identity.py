@@ -0,0 +1,117 @@
+# tests/test_identity.py
+"""
+Testes do snapshot do criador (app/utils/identity.py): user_loader em cache,
+uma consulta por requisição, modo admin e invalidação nas alterações.
+"""
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from app import cache
+from app.utils.identity import CreatorSnapshot, get_creator_snapshot
+from tests.conftest import login
+
+
+@pytest.fixture
+def creator_lookups(db):
+    """Conta os SELECTs por chave primária na tabela creators"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        normalized = ' '.join(statement.split())
+        if normalized.startswith('SELECT') and 'FROM creators WHERE creators.id =' in normalized:
+            statements.append(normalized)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _new_request_scope(db):
+    """Simula um novo worker/requisição: sem memo em g nem identity map"""
+    g.pop('_login_user', None)
+    g.pop('_creator_snapshots', None)
+    db.session.expunge_all()
+
+
+class TestCreatorSnapshot:
+
+    def test_cached_between_requests(self, app_context, db, creator, creator_lookups):
+        first = get_creator_snapshot(creator.id)
+        _new_request_scope(db)
+        second = get_creator_snapshot(creator.id)
+
+        assert first.name == second.name == 'Test Creator'
+        assert len(creator_lookups) == 1
+
+    def test_is_read_only(self, app_context, creator):
+        snapshot = get_creator_snapshot(creator.id)
+        assert isinstance(snapshot, CreatorSnapshot)
+        with pytest.raises(AttributeError):
+            snapshot.name = 'Outro'
+
+    def test_sensitive_fields_stay_out_of_cache(self, app_context, creator):
+        snapshot = get_creator_snapshot(creator.id)
+        assert 'password_hash' not in snapshot._data
+        assert snapshot.has_password is True
+        assert snapshot.check_password('TestPass123')  # carrega o modelo sob demanda
+
+    def test_commit_invalidates(self, app_context, db, creator):
+        assert get_creator_snapshot(creator.id).is_blocked is False
+        creator.is_blocked = True
+        db.session.commit()
+        assert get_creator_snapshot(creator.id).is_blocked is True
+
+    def test_rollback_keeps_snapshot(self, app_context, db, creator):
+        get_creator_snapshot(creator.id)
+        creator.name = 'Nunca salvo'
+        db.session.flush()
+        db.session.rollback()
+        assert cache.get(f'creator:snapshot:{creator.id}')['name'] == 'Test Creator'
+
+    def test_unknown_creator(self, app_context):
+        assert get_creator_snapshot(999999) is None
+
+
+class TestRequestIdentity:
+
+    def test_one_lookup_per_request(self, client, db, creator, creator_lookups):
+        login(client, 'creator@test.com', 'TestPass123')
+        _new_request_scope(db)
+        creator_lookups.clear()
+
+        assert client.get('/dashboard/transactions').status_code == 200
+        assert len(creator_lookups) <= 1
+
+        _new_request_scope(db)
+        creator_lookups.clear()
+        assert client.get('/dashboard/transactions').status_code == 200
+        assert creator_lookups == []
+
+    def test_admin_viewing_uses_snapshots(self, client, db, admin_user, creator, creator_lookups):
+        login(client, 'admin@test.com', 'AdminPass123')
+        client.get(f'/admin/creator/{creator.id}/dashboard')
+        _new_request_scope(db)
+        creator_lookups.clear()
+
+        resp = client.get('/dashboard/transactions')
+        assert resp.status_code == 200
+        assert 'Test Creator' in resp.get_data(as_text=True)
+        assert len(creator_lookups) <= 2  # admin + criador visualizado, uma vez cada
+
+    def test_block_takes_effect_immediately(self, client, db, creator):
+        login(client, 'creator@test.com', 'TestPass123')
+        assert client.get('/dashboard/transactions').status_code == 200
+
+        creator.is_blocked = True
+        db.session.commit()
+
+        resp = client.get('/dashboard/transactions')
+        assert resp.status_code == 302
+        assert '/conta-bloqueada' in resp.headers['Location']
+
+    def test_profile_update_refreshes_snapshot(self, client, db, creator):
+        login(client, 'creator@test.com', 'TestPass123')
+        client.post('/dashboard/profile/update', data={'name': 'Nome Novo', 'email': 'creator@test.com'})
+        assert get_creator_snapshot(creator.id).name == 'Nome Novo'
@@ -0,0 +1,73 @@
+# tests/test_load_renewal_day.py
+"""
+Testes do teste de carga do dia de renovação (benchmarks/load_renewal_day.py):
+eventos gerados aceitos pelo webhook real, percentis e leitura do pool no
+/metrics.
+"""
+import json
+
+from app.models import Subscription, Transaction
+from benchmarks import load_renewal_day as load
+from benchmarks.fake_stripe import sign_payload
+
+SECRET = 'whsec_load_test'
+
+
+def _post(client, event):
+    payload = json.dumps(event).encode()
+    return client.post('/webhooks/stripe', data=payload, content_type='application/json',
+                       headers={'Stripe-Signature': sign_payload(payload, SECRET)})
+
+
+class TestEvents:
+
+    def test_renewal_and_cancel_processed(self, client, db, subscription, monkeypatch):
+        monkeypatch.setenv('STRIPE_WEBHOOK_SECRET', SECRET)
+        subscription.stripe_subscription_id = f'{load.LOAD_PREFIX}{subscription.id}'
+        db.session.commit()
+        sub = {'stripe_subscription_id': subscription.stripe_subscription_id, 'amount': 4990,
+               'duration_days': 60}
+        old_end = subscription.end_date
+
+        assert _post(client, load.invoice_event('invoice.created', sub, 'subscription_cycle')).status_code == 200
+        assert _post(client, load.invoice_event('invoice.paid', sub, 'subscription_cycle')).status_code == 200
+        renewed = db.session.get(Subscription, subscription.id)
+        assert renewed.end_date > old_end
+        assert Transaction.query.filter_by(subscription_id=subscription.id,
+                                           billing_reason='subscription_cycle').count() == 1
+
+        assert _post(client, load.deleted_event(sub)).status_code == 200
+        assert db.session.get(Subscription, subscription.id).status == 'expired'
+
+
+class TestReport:
+
+    def test_recorder_percentiles_and_errors(self):
+        recorder = load.Recorder()
+        for ms in range(1, 101):
+            recorder.ok('stripe:invoice.paid', ms / 1000)
+        recorder.error('stripe:invoice.paid', 'http_500', 0.5)
+        recorder.error('bot:flow', 'start')
+
+        summary = recorder.summary()
+        paid = summary['stripe:invoice.paid']
+        assert paid['requests'] == 101
+        assert paid['errors'] == {'http_500': 1}
+        assert paid['p50_ms'] == 51.0
+        assert paid['p99_ms'] == 100.0
+        assert paid['max_ms'] == 500.0
+        assert summary['bot:flow']['error_rate'] == 1.0
+        assert summary['bot:flow']['p50_ms'] is None
+
+    def test_pool_sampler(self):
+        sampler = load.PoolSampler([], interval=1)
+        for in_use in (3, 10, 10):
+            sampler.parse(
+                '# HELP televip_db_pool_capacity x\n'
+                'televip_db_pool_capacity{process="web"} 10.0\n'
+                f'televip_db_pool_connections_in_use{{process="web"}} {in_use}.0\n'
+            )
+        web = sampler.summary()['web']
+        assert web['capacity'] == 10
+        assert web['peak_saturation'] == 1.0
+        assert web['time_at_capacity'] == round(2 / 3, 3)
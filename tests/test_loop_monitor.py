@@ -0,0 +1,111 @@
+# tests/test_loop_monitor.py
+"""
+Testes do monitor de lag do event loop (bot/utils/loop_monitor.py):
+captura da pilha bloqueante, agregação por local, relatório e /loopstats.
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bot.handlers.admin import loopstats_command
+from bot.utils import loop_monitor
+from bot.utils.loop_monitor import LoopMonitor, format_report
+
+
+def _blocking_handler(seconds):
+    time.sleep(seconds)  # chamada síncrona dentro do loop
+
+
+async def _run_with_block(monitor, seconds):
+    monitor.start()
+    await asyncio.sleep(0.05)
+    _blocking_handler(seconds)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+
+def _run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class TestLoopMonitor:
+
+    def test_captures_blocking_stack(self, caplog):
+        monitor = LoopMonitor(threshold=0.05, interval=0.01)
+        with caplog.at_level('WARNING', logger='bot.utils.loop_monitor'):
+            _run(_run_with_block(monitor, 0.2))
+
+        [offender] = monitor.worst_offenders()
+        assert offender.where.startswith('tests/test_loop_monitor.py:')
+        assert offender.where.endswith('in _blocking_handler')
+        assert offender.count == 1
+        assert offender.worst >= 0.15
+        assert '_run_with_block' in offender.stack
+        assert monitor.max_lag >= 0.15
+        assert 'Event loop bloqueado' in caplog.text
+
+    def test_short_pauses_ignored(self):
+        monitor = LoopMonitor(threshold=0.2, interval=0.01)
+        _run(_run_with_block(monitor, 0.02))
+        assert monitor.offenders == {}
+
+    def test_offenders_aggregated_by_location(self):
+        monitor = LoopMonitor(threshold=0.05, interval=0.01)
+
+        async def scenario():
+            monitor.start()
+            for _ in range(2):
+                await asyncio.sleep(0.03)
+                _blocking_handler(0.12)
+            await asyncio.sleep(0.03)
+            await monitor.stop()
+
+        _run(scenario())
+        [offender] = monitor.worst_offenders()
+        assert offender.count == 2
+        assert offender.total >= offender.worst * 2 - 0.05
+
+    def test_report(self):
+        monitor = LoopMonitor(threshold=0.05, interval=0.01)
+        _run(_run_with_block(monitor, 0.12))
+        report = format_report(monitor)
+        assert '_blocking_handler' in report
+        assert '<pre>' in report
+        assert 'desligado' in format_report(None)
+
+
+class TestLoopStatsCommand:
+
+    def _update(self, chat_type='private', user_id=555):
+        update = MagicMock()
+        update.effective_chat.type = chat_type
+        update.effective_user.id = user_id
+        update.message.reply_text = AsyncMock()
+        return update
+
+    def _session(self, is_admin):
+        session = MagicMock()
+        query = session.query.return_value.filter_by.return_value
+        query.first.return_value = (1,) if is_admin else None
+        ctx = MagicMock()
+        ctx.__enter__.return_value = session
+        return ctx
+
+    def test_admin_gets_report(self):
+        update = self._update()
+        with patch('bot.handlers.admin.get_db_session', return_value=self._session(True)), \
+                patch.object(loop_monitor, '_monitor', LoopMonitor()):
+            _run(loopstats_command(update, MagicMock()))
+        text = update.message.reply_text.call_args[0][0]
+        assert 'piores bloqueios' in text
+
+    def test_non_admin_ignored(self):
+        update = self._update()
+        with patch('bot.handlers.admin.get_db_session', return_value=self._session(False)):
+            _run(loopstats_command(update, MagicMock()))
+        update.message.reply_text.assert_not_called()
+
+    def test_group_ignored(self):
+        update = self._update(chat_type='supergroup')
+        _run(loopstats_command(update, MagicMock()))
+        update.message.reply_text.assert_not_called()
@@ -0,0 +1,191 @@
+# tests/test_media_pipeline.py
+"""
+Testes do pipeline de imagens (app/services/media_service.py): validação
+barata no request, variantes WebP/AVIF com hash, remoção de metadados,
+troca de arquivos antigos e <picture> nos templates.
+"""
+import io
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from app.models import Creator, Group
+from app.services import media_service
+from tests.conftest import login, logout
+
+
+def _image_bytes(size=(800, 600), fmt='JPEG', color=(200, 40, 40), exif=True):
+    img = Image.new('RGB', size, color)
+    buf = io.BytesIO()
+    params = {}
+    if exif:
+        data = Image.Exif()
+        data[0x0110] = 'Camera Secreta'  # Model
+        data[0x0112] = 6  # Orientation: girar 90°
+        params['exif'] = data
+    img.save(buf, format=fmt, **params)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def static_dir(app, tmp_path):
+    app.static_folder = str(tmp_path / 'static')
+    return tmp_path / 'static'
+
+
+class TestProcessImage:
+
+    def test_variants_hashed_and_not_upscaled(self, tmp_path):
+        raw = tmp_path / 'raw.jpg'
+        raw.write_bytes(_image_bytes(size=(1000, 500), exif=False))
+        manifest = media_service.process_image(str(raw), str(tmp_path / 'out'), 'cover')
+
+        widths = [w for w, _ in manifest['sources']['webp']]
+        assert widths == [480, 960, 1000]
+        assert all(name.startswith(manifest['hash']) for name in media_service.manifest_files(manifest))
+        assert manifest['fallback'] == f"{manifest['hash']}-1000.jpg"
+        with Image.open(tmp_path / 'out' / manifest['thumb']) as thumb:
+            assert thumb.size == (320, 180)
+        for name in media_service.manifest_files(manifest):
+            assert (tmp_path / 'out' / name).exists()
+
+    def test_metadata_stripped_and_orientation_applied(self, tmp_path):
+        raw = tmp_path / 'raw.jpg'
+        raw.write_bytes(_image_bytes(size=(800, 600)))
+        manifest = media_service.process_image(str(raw), str(tmp_path / 'out'), 'cover')
+
+        with Image.open(tmp_path / 'out' / manifest['fallback']) as img:
+            assert img.size == (600, 800)  # orientação EXIF aplicada
+            assert not img.getexif()
+        assert b'Camera Secreta' not in (tmp_path / 'out' / manifest['fallback']).read_bytes()
+
+    def test_avatar_square_with_alpha_fallback(self, tmp_path):
+        raw = tmp_path / 'raw.png'
+        buf = io.BytesIO()
+        Image.new('RGBA', (300, 200), (0, 0, 0, 0)).save(buf, format='PNG')
+        raw.write_bytes(buf.getvalue())
+        manifest = media_service.process_image(str(raw), str(tmp_path / 'out'), 'avatar')
+
+        assert (manifest['width'], manifest['height']) == (200, 200)
+        assert manifest['fallback'].endswith('-200.png')
+        assert 'thumb' not in manifest
+
+    def test_corrupted_image_rejected(self, tmp_path):
+        raw = tmp_path / 'raw.png'
+        raw.write_bytes(b'\x89PNG\r\n\x1a\n' + b'lixo' * 100)
+        with pytest.raises(ValueError):
+            media_service.process_image(str(raw), str(tmp_path / 'out'), 'avatar')
+
+
+class TestAvatarUpload:
+
+    def _upload(self, client, data, filename='foto.jpg'):
+        return client.post('/dashboard/profile/upload-avatar',
+                           data={'avatar': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+
+    def test_upload_applies_variants_after_commit(self, client, db, creator, static_dir):
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = self._upload(client, _image_bytes())
+        assert resp.get_json() == {'success': True, 'pending': True}
+
+        db.session.expire_all()
+        fresh = db.session.get(Creator, creator.id)
+        manifest = json.loads(fresh.avatar_variants_json)
+        assert fresh.avatar_url.endswith(f"/uploads/avatars/{manifest['fallback']}")
+        files = os.listdir(static_dir / 'uploads' / 'avatars')
+        assert sorted(files) == sorted(media_service.manifest_files(manifest))
+        assert os.listdir(media_service.raw_dir()) == []
+
+    def test_reupload_removes_old_files(self, client, db, creator, static_dir):
+        login(client, 'creator@test.com', 'TestPass123')
+        self._upload(client, _image_bytes(color=(1, 2, 3)))
+        self._upload(client, _image_bytes(color=(9, 8, 7)))
+
+        db.session.expire_all()
+        manifest = json.loads(db.session.get(Creator, creator.id).avatar_variants_json)
+        files = os.listdir(static_dir / 'uploads' / 'avatars')
+        assert sorted(files) == sorted(media_service.manifest_files(manifest))
+
+    def test_replacing_shared_image_keeps_other_owner_files(self, client, db, creator, static_dir):
+        other = Creator(name='Outro', email='outro@test.com', username='outro', is_verified=True)
+        other.set_password('TestPass123')
+        db.session.add(other)
+        db.session.commit()
+        same_logo = _image_bytes(color=(10, 20, 30))
+
+        login(client, 'outro@test.com', 'TestPass123')
+        self._upload(client, same_logo)
+        logout(client)
+        login(client, 'creator@test.com', 'TestPass123')
+        self._upload(client, same_logo)
+        self._upload(client, _image_bytes(color=(9, 8, 7)))
+
+        db.session.expire_all()
+        kept = json.loads(db.session.get(Creator, other.id).avatar_variants_json)
+        replaced = json.loads(db.session.get(Creator, creator.id).avatar_variants_json)
+        assert kept['hash'] != replaced['hash']
+        files = set(os.listdir(static_dir / 'uploads' / 'avatars'))
+        assert files == media_service.manifest_files(kept) | media_service.manifest_files(replaced)
+        assert all(name.startswith(f'avatar-{other.id}-') for name in media_service.manifest_files(kept))
+
+    def test_invalid_file_rejected_in_request(self, client, creator, static_dir):
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = self._upload(client, b'GIF89a' + b'0' * 200, filename='foto.jpg')
+        assert resp.status_code == 400
+        assert not os.path.exists(static_dir / 'uploads' / 'avatars')
+
+    def test_uploads_served_immutable(self, client, db, creator, static_dir):
+        login(client, 'creator@test.com', 'TestPass123')
+        self._upload(client, _image_bytes())
+        db.session.expire_all()
+        url = db.session.get(Creator, creator.id).avatar_url
+
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert 'immutable' in resp.headers['Cache-Control']
+        assert 'max-age=31536000' in resp.headers['Cache-Control']
+
+
+class TestCoverUpload:
+
+    def test_new_group_cover_processed_after_commit(self, client, db, creator, static_dir):
+        login(client, 'creator@test.com', 'TestPass123')
+        client.post('/groups/create', data={
+            'name': 'Grupo com capa',
+            'telegram_id': '-100777',
+            'plan_name[]': ['Mensal'],
+            'plan_duration[]': ['30'],
+            'plan_price[]': ['29.90'],
+            'cover_image': (io.BytesIO(_image_bytes()), 'capa.jpg'),
+        }, content_type='multipart/form-data')
+
+        group = Group.query.filter_by(telegram_id='-100777').first()
+        assert group is not None
+        manifest = json.loads(group.cover_variants_json)
+        assert manifest['thumb'] in os.listdir(static_dir / 'uploads' / 'covers')
+
+
+class TestPictureHelper:
+
+    def test_picture_with_variants(self, app):
+        manifest = {
+            'folder': 'covers', 'width': 960, 'height': 540, 'fallback': 'abc-960.jpg',
+            'sources': {'avif': [[480, 'abc-480.avif']], 'webp': [[480, 'abc-480.webp'], [960, 'abc-960.webp']]},
+        }
+        with app.test_request_context():
+            html = str(media_service.picture('/static/uploads/covers/abc-960.jpg', json.dumps(manifest),
+                                             alt='Capa "x"', sizes='50vw'))
+        assert html.index('image/avif') < html.index('image/webp')
+        assert '/static/uploads/covers/abc-480.webp 480w, /static/uploads/covers/abc-960.webp 960w' in html
+        assert 'sizes="50vw"' in html
+        assert 'alt="Capa &#34;x&#34;"' in html
+        assert 'width="960"' in html and 'loading="lazy"' in html
+
+    def test_legacy_url_renders_plain_img(self, app):
+        with app.test_request_context():
+            html = str(media_service.picture('/static/uploads/avatars/1_123.jpg', None, class_='avatar'))
+        assert html.startswith('<img ') and '<picture>' not in html
+        assert 'class="avatar"' in html
@@ -0,0 +1,162 @@
+# tests/test_metrics.py
+"""
+Testes das métricas Prometheus (app/utils/metrics.py e bot/utils/metrics.py):
+endpoint /metrics, latência e queries por request, APIs externas, jobs,
+cache e rótulos dos updates do bot.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+import requests
+import stripe
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+from telegram import CallbackQuery, Chat, Message, Update, User
+
+from app.utils import metrics
+from bot.utils.metrics import update_kind
+from tests.conftest import login
+
+prometheus_client = pytest.importorskip('prometheus_client')
+
+
+def _value(metric, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(metric, labels) or 0
+
+
+class TestEndpoint:
+
+    def test_exposes_request_latency_and_queries(self, client, creator):
+        login(client, 'creator@test.com', 'TestPass123')
+        before = _value('televip_db_queries_count', scope='http', name='dashboard.index')
+        client.get('/dashboard/')
+
+        resp = client.get('/metrics')
+        assert resp.status_code == 200
+        assert resp.content_type.startswith('text/plain')
+        body = resp.data.decode()
+        assert 'televip_http_request_duration_seconds_bucket{' in body
+        assert 'endpoint="dashboard.index"' in body
+        assert _value('televip_db_queries_count', scope='http', name='dashboard.index') == before + 1
+        assert _value('televip_db_queries_sum', scope='http', name='dashboard.index') > 0
+
+    def test_metrics_endpoint_not_measured(self, client):
+        client.get('/metrics')
+        assert 'endpoint="metrics"' not in client.get('/metrics').data.decode()
+
+    def test_token_required_when_configured(self, app, client):
+        app.config['METRICS_TOKEN'] = 's3cret'
+        assert client.get('/metrics').status_code == 403
+        resp = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        assert resp.status_code == 200
+
+    def test_public_address_rejected_without_token(self, client):
+        resp = client.get('/metrics', environ_base={'REMOTE_ADDR': '8.8.8.8'})
+        assert resp.status_code == 403
+
+
+class TestDatabase:
+
+    def test_track_db_counts_queries(self, app_context, db):
+        with metrics.track_db('job', 'teste') as usage:
+            db.session.execute(text('SELECT 1'))
+            db.session.execute(text('SELECT 2'))
+        assert usage.queries == 2
+        assert usage.duration > 0
+
+        # Fora do bloco nada é contado
+        db.session.execute(text('SELECT 3'))
+        assert usage.queries == 2
+
+    def test_pool_connections_in_use(self):
+        engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=2, max_overflow=3)
+        metrics.instrument_pool(engine, 'teste')
+        assert _value('televip_db_pool_capacity', process='teste') == 5
+
+        before = _value('televip_db_pool_connections_in_use', process='teste')
+        with engine.connect():
+            assert _value('televip_db_pool_connections_in_use', process='teste') == before + 1
+        assert _value('televip_db_pool_connections_in_use', process='teste') == before
+        engine.dispose()
+
+
+class TestExternalCalls:
+
+    def test_telegram_hook_records_latency_and_429(self):
+        response = requests.Response()
+        response.url = 'https://api.telegram.org/bot123:ABC/sendMessage'
+        response.status_code = 429
+        response.elapsed = timedelta(milliseconds=120)
+        before = _value('televip_external_rate_limited_total', service='telegram', operation='sendMessage')
+
+        metrics.TELEGRAM_HOOKS['response'](response)
+
+        assert _value('televip_external_rate_limited_total',
+                      service='telegram', operation='sendMessage') == before + 1
+        assert 'bot123' not in prometheus_client.generate_latest().decode()
+
+    def test_stripe_client_instrumented(self, app, monkeypatch):
+        monkeypatch.setattr(stripe.RequestsClient, 'request',
+                            lambda self, method, url, headers, post_data=None: (b'{}', 429, {}))
+        operation = 'GET /v1/customers/:id'
+        before = _value('televip_external_request_duration_seconds_count', service='stripe', operation=operation)
+
+        stripe.default_http_client.request('get', 'https://api.stripe.com/v1/customers/cus_Q1w2E3r4', {})
+
+        assert _value('televip_external_request_duration_seconds_count',
+                      service='stripe', operation=operation) == before + 1
+        assert _value('televip_external_rate_limited_total', service='stripe', operation=operation) >= 1
+
+    def test_stripe_operation_normalizes_ids(self):
+        assert metrics.stripe_operation('post', 'https://api.stripe.com/v1/payment_intents') == \
+            'POST /v1/payment_intents'
+        assert metrics.stripe_operation('get', 'https://api.stripe.com/v1/checkout/sessions/cs_test_a1B2?x=1') == \
+            'GET /v1/checkout/sessions/:id'
+
+
+class TestJobsAndCache:
+
+    def test_instrument_job(self, app_context, db):
+        @metrics.instrument_job('teste_job')
+        async def job():
+            db.session.execute(text('SELECT 1'))
+            metrics.record_job_items('teste_job', 3)
+
+        before = _value('televip_job_items_total', job='teste_job')
+        asyncio.get_event_loop().run_until_complete(job())
+
+        assert _value('televip_job_duration_seconds_count', job='teste_job') >= 1
+        assert _value('televip_job_items_total', job='teste_job') == before + 3
+        assert _value('televip_db_queries_sum', scope='job', name='teste_job') >= 1
+
+    def test_page_cache_hits_counted(self, client, creator):
+        path = f'/c/{creator.username}'
+        before = _value('televip_cache_requests_total', cache='page', result='hit')
+        client.get(path)
+        client.get(path)
+        assert _value('televip_cache_requests_total', cache='page', result='hit') == before + 1
+
+
+class TestBotUpdateKind:
+
+    def _user(self):
+        return User(id=42, first_name='Ana', is_bot=False)
+
+    def test_callback_ids_removed(self):
+        query = CallbackQuery(id='1', from_user=self._user(), chat_instance='x', data='plan_12_34')
+        assert update_kind(Update(update_id=1, callback_query=query)) == 'callback:plan'
+        query = CallbackQuery(id='2', from_user=self._user(), chat_instance='x', data='subs_active_p2')
+        assert update_kind(Update(update_id=2, callback_query=query)) == 'callback:subs_active'
+        query = CallbackQuery(id='3', from_user=self._user(), chat_instance='x', data='<script>')
+        assert update_kind(Update(update_id=3, callback_query=query)) == 'callback:other'
+
+    def test_commands_and_messages(self):
+        chat = Chat(id=42, type='private')
+
+        def message(text_):
+            return Message(message_id=1, date=None, chat=chat, from_user=self._user(), text=text_)
+
+        assert update_kind(Update(update_id=1, message=message('/start g_abc123'))) == 'command:start'
+        assert update_kind(Update(update_id=2, message=message('/Stats@TeleVipBot'))) == 'command:stats'
+        assert update_kind(Update(update_id=3, message=message('oi'))) == 'message'
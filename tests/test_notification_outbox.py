@@ -0,0 +1,269 @@
+# tests/test_notification_outbox.py
+"""
+Testes do outbox de notificações: o Flask enfileira na mesma transação da
+mudança de estado (sem chamar a Bot API) e o bot drena a fila respeitando
+rate limit, RetryAfter e falhas permanentes.
+"""
+import asyncio
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from app import db as _db
+from app.models import NotificationOutbox, Subscription
+from bot.jobs import notification_outbox as outbox
+from bot.jobs.notification_outbox import SendRateLimiter, process_outbox_batch
+
+
+@contextmanager
+def _flask_db_session():
+    """get_db_session do bot apontando para o banco de teste do Flask"""
+    yield _db.session
+    _db.session.commit()
+
+
+@pytest.fixture
+def bot_db(app_context, db):
+    with patch('bot.jobs.notification_outbox.get_db_session', _flask_db_session):
+        yield db
+
+
+@pytest.fixture
+def fake_bot():
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    bot.create_chat_invite_link = AsyncMock(return_value=MagicMock(invite_link='https://t.me/+unico'))
+    bot.get_chat_member = AsyncMock(return_value=MagicMock(status='member'))
+    bot.ban_chat_member = AsyncMock()
+    bot.unban_chat_member = AsyncMock()
+    return bot
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _no_wait_limiter():
+    return SendRateLimiter(rate=0, chat_interval=0, group_interval=0)
+
+
+class TestEnqueueInTransaction:
+
+    def test_invoice_paid_enqueues_access_link(self, app_context, db, subscription):
+        """Ativação e notificação são gravadas juntas, sem HTTP no request"""
+        from app.routes.webhooks import handle_invoice_paid
+
+        subscription.status = 'pending'
+        subscription.stripe_subscription_id = 'sub_outbox_1'
+        db.session.commit()
+
+        with patch('requests.post') as http_post:
+            handle_invoice_paid({
+                'id': 'in_outbox_1', 'subscription': 'sub_outbox_1',
+                'billing_reason': 'subscription_create', 'amount_paid': 4990,
+                'charge': None, 'lines': {'data': []},
+            })
+            http_post.assert_not_called()
+
+        item = NotificationOutbox.query.one()
+        assert item.kind == NotificationOutbox.KIND_ACCESS_LINK
+        assert item.chat_id == subscription.telegram_user_id
+        assert item.get_payload()['group_chat_id'] == subscription.group.telegram_id
+        assert Subscription.query.get(subscription.id).status == 'active'
+
+    def test_rollback_discards_notification(self, app_context, db, subscription):
+        from app.routes.webhooks import notify_user_via_bot
+
+        notify_user_via_bot(subscription.telegram_user_id, 'oi')
+        db.session.rollback()
+        assert NotificationOutbox.query.count() == 0
+
+    def test_whitelisted_user_is_not_kicked(self, app_context, db, subscription):
+        from app.routes.webhooks import remove_user_from_group_via_bot
+
+        with patch.object(type(subscription.group), 'is_whitelisted', return_value=True):
+            remove_user_from_group_via_bot(subscription)
+        assert NotificationOutbox.query.count() == 0
+
+        remove_user_from_group_via_bot(subscription)
+        item = NotificationOutbox.query.one()
+        assert item.kind == NotificationOutbox.KIND_KICK
+        assert item.chat_id == subscription.group.telegram_id
+
+
+class TestOutboxSender:
+
+    def test_sends_pending_messages(self, bot_db, fake_bot):
+        NotificationOutbox.enqueue_message('111', '<b>oi</b>', keyboard={
+            'inline_keyboard': [[{'text': 'Ver', 'callback_data': 'subs_active'}]],
+        })
+        bot_db.session.commit()
+
+        assert _run(process_outbox_batch(fake_bot, _no_wait_limiter())) == 1
+
+        kwargs = fake_bot.send_message.call_args.kwargs
+        assert kwargs['chat_id'] == '111'
+        assert kwargs['reply_markup'].inline_keyboard[0][0].callback_data == 'subs_active'
+        item = NotificationOutbox.query.one()
+        assert item.status == 'sent'
+        assert item.sent_at is not None
+
+    def test_access_link_falls_back_to_stored_link(self, bot_db, fake_bot):
+        fake_bot.create_chat_invite_link.side_effect = NetworkError('x')
+        NotificationOutbox.enqueue(NotificationOutbox.KIND_ACCESS_LINK, '111', {
+            'group_chat_id': '-100', 'fallback_link': 'https://t.me/grupo',
+            'text_with_link': 'com link', 'text_without_link': 'sem link', 'button_text': 'Entrar',
+        })
+        bot_db.session.commit()
+
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+
+        kwargs = fake_bot.send_message.call_args.kwargs
+        assert kwargs['text'] == 'com link'
+        assert kwargs['reply_markup'].inline_keyboard[0][0].url == 'https://t.me/grupo'
+
+    def test_kick_skips_admins(self, bot_db, fake_bot):
+        fake_bot.get_chat_member.return_value = MagicMock(status='administrator')
+        NotificationOutbox.enqueue(NotificationOutbox.KIND_KICK, '-100', {'user_id': '5'})
+        bot_db.session.commit()
+
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+
+        fake_bot.ban_chat_member.assert_not_called()
+        assert NotificationOutbox.query.one().status == 'sent'
+
+    def test_kick_of_non_member_is_done(self, bot_db, fake_bot):
+        fake_bot.get_chat_member.side_effect = BadRequest('User not found')
+        NotificationOutbox.enqueue(NotificationOutbox.KIND_KICK, '-100', {'user_id': '5'})
+        bot_db.session.commit()
+
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+
+        fake_bot.ban_chat_member.assert_not_called()
+        assert NotificationOutbox.query.one().status == 'sent'
+
+    def test_database_access_runs_off_the_event_loop(self, bot_db, fake_bot):
+        NotificationOutbox.enqueue_message('111', 'oi')
+        bot_db.session.commit()
+        threads = []
+        claim_batch = outbox.claim_batch
+
+        def tracking_claim_batch(limit):
+            threads.append(threading.get_ident())
+            return claim_batch(limit)
+
+        with patch.object(outbox, 'claim_batch', tracking_claim_batch):
+            assert _run(process_outbox_batch(fake_bot, _no_wait_limiter())) == 1
+        assert threads and threading.get_ident() not in threads
+
+    def test_workers_partition_by_target_chat(self, bot_db, fake_bot, monkeypatch):
+        chats = ['111', '112', '-1001234567891', '-1001234567892']
+        for chat_id in chats * 2:
+            NotificationOutbox.enqueue_message(chat_id, 'oi')
+        bot_db.session.commit()
+
+        monkeypatch.setenv('BOT_WORKER_COUNT', '2')
+        claimed = {}
+        for worker_index in range(2):
+            monkeypatch.setenv('BOT_WORKER_INDEX', str(worker_index))
+            claimed[worker_index] = outbox.claim_batch()
+
+        assert sorted(i['id'] for items in claimed.values() for i in items) == \
+            [i.id for i in NotificationOutbox.query.order_by(NotificationOutbox.id)]
+        for worker_index, items in claimed.items():
+            other = {i['chat_id'] for i in claimed[1 - worker_index]}
+            assert not {i['chat_id'] for i in items} & other
+            assert [i['id'] for i in items] == sorted(i['id'] for i in items)
+
+    def test_retry_after_reschedules(self, bot_db, fake_bot):
+        fake_bot.send_message.side_effect = RetryAfter(30)
+        NotificationOutbox.enqueue_message('111', 'oi')
+        bot_db.session.commit()
+
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+
+        item = NotificationOutbox.query.one()
+        assert item.status == 'pending'
+        assert item.available_at > datetime.utcnow() + timedelta(seconds=20)
+        # Não volta a ser reivindicado antes do prazo
+        assert _run(process_outbox_batch(fake_bot, _no_wait_limiter())) == 0
+
+    def test_forbidden_fails_permanently(self, bot_db, fake_bot):
+        fake_bot.send_message.side_effect = Forbidden('bot was blocked by the user')
+        NotificationOutbox.enqueue_message('111', 'oi')
+        bot_db.session.commit()
+
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+
+        item = NotificationOutbox.query.one()
+        assert item.status == 'failed'
+        assert 'blocked' in item.last_error
+
+    def test_transient_error_gives_up_after_max_attempts(self, bot_db, fake_bot):
+        fake_bot.send_message.side_effect = NetworkError('timeout')
+        item = NotificationOutbox.enqueue_message('111', 'oi')
+        item.attempts = outbox.MAX_ATTEMPTS - 1
+        bot_db.session.commit()
+
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+        assert NotificationOutbox.query.one().status == 'failed'
+
+    def test_plan_subscribers_expands_per_subscriber(self, bot_db, fake_bot, subscription):
+        NotificationOutbox.enqueue(NotificationOutbox.KIND_PLAN_SUBSCRIBERS, None, {
+            'plan_id': subscription.plan_id, 'text': 'Renova em {end_date}',
+        })
+        bot_db.session.commit()
+
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+        _run(process_outbox_batch(fake_bot, _no_wait_limiter()))
+
+        kwargs = fake_bot.send_message.call_args.kwargs
+        assert kwargs['chat_id'] == subscription.telegram_user_id
+        assert kwargs['text'] == f"Renova em {subscription.end_date.strftime('%d/%m/%Y')}"
+
+    def test_stale_sending_items_are_released(self, bot_db):
+        item = NotificationOutbox.enqueue_message('111', 'oi')
+        item.status = 'sending'
+        item.available_at = datetime.utcnow() - timedelta(minutes=10)
+        bot_db.session.commit()
+
+        assert outbox.release_stale_items() == 1
+        assert NotificationOutbox.query.one().status == 'pending'
+
+
+class TestSendRateLimiter:
+
+    def test_global_rate(self):
+        limiter = SendRateLimiter(rate=25, clock=lambda: 0.0)
+        delays = [limiter.reserve(chat_id) for chat_id in range(50)]
+        assert delays[-1] == pytest.approx(49 / 25)
+
+    def test_per_chat_interval(self):
+        limiter = SendRateLimiter(rate=1000, chat_interval=1.0, group_interval=3.0, clock=lambda: 0.0)
+        assert limiter.reserve('111') == 0
+        assert limiter.reserve('-100') == pytest.approx(0.001)  # outro chat: só o gap global
+        assert limiter.reserve('-100') == pytest.approx(3.001)  # grupo: intervalo maior
+        assert limiter.reserve('222') == pytest.approx(3.002)
+
+    def test_without_chat_only_global_rate(self):
+        limiter = SendRateLimiter(rate=1000, chat_interval=1.0, group_interval=3.0, clock=lambda: 0.0)
+        assert limiter.reserve('-100') == 0
+        assert limiter.reserve() == pytest.approx(0.001)
+        assert limiter.reserve() == pytest.approx(0.002)
+        assert limiter.reserve('-100') == pytest.approx(3.0)
+
+    def test_kicks_are_not_spaced_by_group_interval(self, bot_db, fake_bot):
+        for user_id in range(3):
+            NotificationOutbox.enqueue(NotificationOutbox.KIND_KICK, '-100', {'user_id': str(user_id)})
+        bot_db.session.commit()
+        limiter = SendRateLimiter(rate=1000, chat_interval=1.0, group_interval=3.0, clock=lambda: 0.0)
+        limiter.acquire = AsyncMock(wraps=limiter.acquire)
+
+        _run(process_outbox_batch(fake_bot, limiter))
+
+        assert [c.args for c in limiter.acquire.call_args_list] == [(None,)] * 3
+        assert fake_bot.ban_chat_member.call_count == 3
@@ -0,0 +1,150 @@
+# tests/test_pagination.py
+"""
+Testes da paginação por cursor (app/utils/pagination.py) nas listagens de
+transações e assinantes, incluindo a API JSON do scroll infinito.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models import Subscription, Transaction
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_paginate, keyset_paginate_union
+from tests.conftest import login
+
+
+@pytest.fixture
+def many_subscribers(db, group, pricing_plan):
+    """45 assinantes, vários com o mesmo end_date (empates resolvidos pelo id)"""
+    base = datetime(2030, 1, 1)
+    subs = []
+    for i in range(45):
+        subs.append(Subscription(
+            group_id=group.id, plan_id=pricing_plan.id,
+            telegram_user_id=str(5000 + i), telegram_username=f'pag{i}',
+            start_date=base - timedelta(days=30),
+            end_date=base + timedelta(days=i // 4),
+            status='active' if i % 3 else 'expired',
+        ))
+    db.session.add_all(subs)
+    db.session.commit()
+    return subs
+
+
+class TestCursor:
+
+    def test_roundtrip(self):
+        when = datetime(2026, 5, 17, 12, 30, 1, 123456)
+        assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+
+    def test_garbage_cursor_is_ignored(self):
+        assert decode_cursor('nao-e-um-cursor') is None
+        assert decode_cursor(None) is None
+
+
+class TestKeysetPaginate:
+
+    def test_walks_every_row_once(self, app_context, many_subscribers):
+        query = Subscription.query
+        seen, after = [], None
+        while True:
+            page = keyset_paginate(query, Subscription.end_date, Subscription.id, after=after, per_page=10)
+            seen.extend(sub.id for sub in page.items)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+
+        expected = [s.id for s in sorted(many_subscribers, key=lambda s: (s.end_date, s.id), reverse=True)]
+        assert seen == expected
+
+    def test_before_returns_previous_page(self, app_context, many_subscribers):
+        query = Subscription.query
+        first = keyset_paginate(query, Subscription.end_date, Subscription.id, per_page=10)
+        second = keyset_paginate(query, Subscription.end_date, Subscription.id,
+                                 after=first.next_cursor, per_page=10)
+        back = keyset_paginate(query, Subscription.end_date, Subscription.id,
+                               before=second.prev_cursor, per_page=10)
+
+        assert [s.id for s in back.items] == [s.id for s in first.items]
+        assert not back.has_prev
+        assert back.has_next
+
+    def test_union_interleaves_sources_in_both_directions(self, app_context, many_subscribers):
+        sources = [
+            (Subscription.query.filter_by(status=status), Subscription.end_date, Subscription.id)
+            for status in ('active', 'expired')
+        ]
+        pages, after = [], None
+        while True:
+            page = keyset_paginate_union(sources, after=after, per_page=10)
+            pages.append(page)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+
+        expected = [s.id for s in sorted(many_subscribers, key=lambda s: (s.end_date, s.id), reverse=True)]
+        assert [sub.id for page in pages for sub in page.items] == expected
+        previous = keyset_paginate_union(sources, before=pages[2].prev_cursor, per_page=10)
+        assert [sub.id for sub in previous.items] == [sub.id for sub in pages[1].items]
+
+
+class TestSubscribersListing:
+
+    def test_api_pages_through_group(self, client, creator, group, many_subscribers):
+        login(client, 'creator@test.com', 'TestPass123')
+
+        ids, after = [], ''
+        while True:
+            data = client.get(f'/groups/{group.id}/api/subscribers?after={after}').get_json()
+            ids.extend(item['id'] for item in data['items'])
+            assert data['total'] == 45
+            if not data['has_next']:
+                break
+            after = data['next_cursor']
+
+        assert sorted(ids) == sorted(s.id for s in many_subscribers)
+        assert len(ids) == len(set(ids))
+
+    def test_api_respects_filters(self, client, creator, group, many_subscribers):
+        login(client, 'creator@test.com', 'TestPass123')
+        data = client.get(f'/groups/{group.id}/api/subscribers?status=expired').get_json()
+        assert data['total'] == 15
+        assert {item['status'] for item in data['items']} == {'expired'}
+
+    def test_html_has_cursor_links(self, client, creator, group, many_subscribers):
+        login(client, 'creator@test.com', 'TestPass123')
+        html = client.get(f'/groups/{group.id}/subscribers?status=active').data.decode()
+        assert 'after=' in html
+        assert 'status=active' in html
+
+    def test_api_wrong_owner(self, client, second_creator, group):
+        login(client, 'second@test.com', 'SecondPass123')
+        assert client.get(f'/groups/{group.id}/api/subscribers').status_code == 404
+
+
+class TestTransactionsListing:
+
+    def test_api_pages_through_transactions(self, client, db, creator, subscription):
+        base = datetime.utcnow() - timedelta(days=1)
+        for i in range(25):
+            db.session.add(Transaction(
+                subscription_id=subscription.id, amount=Decimal('10.00'),
+                status='completed', created_at=base + timedelta(minutes=i // 2),
+            ))
+        db.session.commit()
+
+        login(client, 'creator@test.com', 'TestPass123')
+        first = client.get('/dashboard/api/transactions').get_json()
+        second = client.get(f"/dashboard/api/transactions?after={first['next_cursor']}").get_json()
+
+        assert len(first['items']) == 20
+        assert len(second['items']) == 5
+        assert not second['has_next']
+        assert first['total'] == 25
+        ids = [t['id'] for t in first['items'] + second['items']]
+        assert len(set(ids)) == 25
+
+    def test_transactions_page_renders_with_cursor(self, client, creator, transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = client.get(f"/dashboard/transactions?after={encode_cursor(datetime(2100, 1, 1), 10**9)}")
+        assert resp.status_code == 200
@@ -0,0 +1,272 @@
+# tests/test_partitioning.py
+"""
+Testes das partições mensais de transactions (app/utils/partitioning.py):
+nomes/intervalos, criação das próximas partições (conexão PostgreSQL falsa),
+no-op no SQLite e filtros de receita que permitem partition pruning.
+
+A ida e volta da migration f9b1e3c5a7d2 precisa de um PostgreSQL de verdade:
+roda só com ``TEST_POSTGRES_URL`` apontando para um banco descartável (o
+schema ``public`` é recriado).
+"""
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, text
+
+from app import create_app, db as _db
+from app.models import Creator, Group, PricingPlan, Subscription, Transaction
+from app.utils import partitioning
+from config import get_config
+from tests.conftest import login
+
+TEST_POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+class FakeConnection:
+    """Conexão PostgreSQL mínima: responde às consultas de catálogo e grava o DDL"""
+
+    class dialect:
+        name = 'postgresql'
+
+    def __init__(self, existing=(), default_rows=False):
+        self.existing = set(existing)
+        self.default_rows = default_rows
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def connect(self):
+        return self
+
+    def begin(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if 'pg_partitioned_table' in sql:
+            return _Result(True)
+        if 'pg_inherits' in sql:
+            return _Result(sorted(self.existing))
+        if 'to_regclass(:name)' in sql:
+            return _Result(params['name'] if params['name'] in self.existing else None)
+        if sql.startswith('SELECT EXISTS') and partitioning.DEFAULT_PARTITION in sql:
+            return _Result(self.default_rows)
+        match = re.match(r'CREATE TABLE (\w+) PARTITION OF', sql)
+        if match:
+            self.existing.add(match.group(1))
+        return _Result(None)
+
+
+class _Result:
+
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def scalars(self):
+        return self.value
+
+
+class TestMonths:
+
+    def test_names_and_bounds(self):
+        month = partitioning.month_start(datetime(2026, 12, 19, 15, 30))
+        assert month == datetime(2026, 12, 1)
+        assert partitioning.add_months(month, 1) == datetime(2027, 1, 1)
+        assert partitioning.add_months(month, -12) == datetime(2025, 12, 1)
+        assert partitioning.partition_name(month) == 'transactions_y2026m12'
+        assert partitioning.partition_ddl(month) == (
+            "CREATE TABLE transactions_y2026m12 PARTITION OF transactions "
+            "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')")
+
+
+class TestEnsurePartitions:
+
+    def test_creates_missing_months_ahead(self):
+        connection = FakeConnection(existing={'transactions_default', 'transactions_y2026m10'})
+        created = partitioning.ensure_transaction_partitions(connection, months_ahead=3,
+                                                             now=datetime(2026, 10, 19))
+        assert created == ['transactions_y2026m11', 'transactions_y2026m12', 'transactions_y2027m01']
+        assert not any('_moved_transactions' in sql for sql in connection.statements)
+
+        # Segunda execução: nada a criar
+        assert partitioning.ensure_transaction_partitions(connection, months_ahead=3,
+                                                          now=datetime(2026, 10, 19)) == []
+
+    def test_moves_rows_out_of_default_partition(self):
+        connection = FakeConnection(existing={'transactions_default'}, default_rows=True)
+        partitioning.ensure_transaction_partitions(connection, months_ahead=0, now=datetime(2026, 10, 19))
+
+        ddl = [sql.split(' ')[0:3] for sql in connection.statements
+               if sql.startswith(('WITH moved', 'CREATE TABLE', 'INSERT INTO'))]
+        assert ddl == [['WITH', 'moved', 'AS'], ['CREATE', 'TABLE', 'transactions_y2026m10'],
+                       ['INSERT', 'INTO', 'transactions']]
+
+    def test_sqlite_is_noop(self, app_context, db):
+        assert partitioning.ensure_transaction_partitions(db.engine) == []
+
+
+class TestPruningFriendlyFilters:
+
+    def test_revenue_queries_filter_created_at_directly(self, client, db, creator, group, subscription,
+                                                        transaction):
+        login(client, 'creator@test.com', 'TestPass123')
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            chart = client.get('/dashboard/api/revenue-chart').get_json()
+            analytics = client.get('/dashboard/analytics?period=7')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert chart['data'][-1] == 49.9
+        assert analytics.status_code == 200
+        filters = [re.split(r'GROUP BY', sql, flags=re.I)[0].split('WHERE', 1)[-1]
+                   for sql in statements if 'transactions' in sql and 'WHERE' in sql]
+        assert filters
+        assert not [f for f in filters if re.search(r'date\((t|transactions)\.created_at\)', f, re.I)]
+
+
+def _reset_schema(engine):
+    with engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA public CASCADE'))
+        conn.execute(text('CREATE SCHEMA public'))
+
+
+@pytest.fixture
+def pg_app(monkeypatch):
+    """App apontando para o PostgreSQL de teste, com o schema da revisão anterior"""
+    monkeypatch.setattr(get_config(), 'SQLALCHEMY_DATABASE_URI', TEST_POSTGRES_URL)
+    app = create_app()
+    app.config.update({'TESTING': True, 'SERVER_NAME': 'localhost'})
+    os.environ.pop('BOT_TOKEN', None)
+    os.environ.pop('TELEGRAM_BOT_TOKEN', None)
+    with app.app_context():
+        _reset_schema(_db.engine)
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _reset_schema(_db.engine)
+        _db.engine.dispose()
+    # O fileConfig do migrations/env.py desliga os loggers já existentes
+    for logger in logging.root.manager.loggerDict.values():
+        if isinstance(logger, logging.Logger):
+            logger.disabled = False
+
+
+def _seed(now):
+    """Criador com transações em dois meses (um antigo, um atual)"""
+    creator = Creator(name='PG Creator', email='pg@test.com', username='pgcreator',
+                      balance=Decimal('0'), total_earned=Decimal('0'))
+    creator.set_password('TestPass123')
+    _db.session.add(creator)
+    _db.session.flush()
+    group = Group(name='PG Group', telegram_id='-1009876543210', creator_id=creator.id)
+    _db.session.add(group)
+    _db.session.flush()
+    plan = PricingPlan(group_id=group.id, name='Mensal', duration_days=30, price=Decimal('49.90'))
+    _db.session.add(plan)
+    _db.session.flush()
+    sub = Subscription(group_id=group.id, plan_id=plan.id, telegram_user_id='555',
+                       start_date=now, end_date=now + timedelta(days=30), status='active')
+    _db.session.add(sub)
+    _db.session.flush()
+    old = partitioning.add_months(partitioning.month_start(now), -4) + timedelta(days=2)
+    for index, created_at in enumerate([old, old, now, now - timedelta(hours=1)]):
+        _db.session.add(Transaction(subscription_id=sub.id, amount=Decimal('49.90'), status='completed',
+                                    stripe_session_id=f'cs_pg_{index}', created_at=created_at,
+                                    paid_at=created_at))
+    _db.session.commit()
+    return creator, sub, old
+
+
+def _transactions_state(conn):
+    """O que a migration precisa preservar nos dois sentidos"""
+    return {
+        'rows': conn.execute(text('SELECT count(*) FROM transactions')).scalar(),
+        'sequence': conn.execute(text("SELECT pg_get_serial_sequence('transactions', 'id')")).scalar(),
+        'foreign_keys': set(conn.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = 'transactions'::regclass AND contype = 'f'"
+        )).scalars()),
+        'indexes': set(conn.execute(text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = 'transactions'::regclass"
+        )).scalars()),
+    }
+
+
+def _revenue_chart_plan(creator):
+    """EXPLAIN da query de receita exatamente como o dashboard a executa"""
+    from app.routes.dashboard import _revenue_chart
+
+    executed = []
+    listener = lambda conn, cursor, statement, parameters, *args: executed.append((statement, parameters))
+    event.listen(_db.engine, 'before_cursor_execute', listener)
+    try:
+        _revenue_chart(creator)
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', listener)
+    statement, parameters = next((sql, params) for sql, params in executed if 'FROM transactions t' in sql)
+    with _db.engine.connect() as conn:
+        return '\n'.join(conn.exec_driver_sql(f'EXPLAIN {statement}', parameters).scalars())
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason='TEST_POSTGRES_URL não definido')
+class TestMigrationRoundTrip:
+
+    def test_upgrade_downgrade_upgrade(self, pg_app):
+        from flask_migrate import downgrade, stamp, upgrade
+
+        now = datetime.utcnow()
+        creator, sub, old = _seed(now)
+        stamp(directory=MIGRATIONS_DIR, revision='f2c7d9a4b6e1')
+        with _db.engine.connect() as conn:
+            before = _transactions_state(conn)
+        assert before['rows'] == 4
+        assert before['sequence'] == 'public.transactions_id_seq'
+        assert 'transactions_subscription_id_fkey' in before['foreign_keys']
+        assert {'ix_transactions_stripe_session_id', 'ix_transactions_created_at_id'} <= before['indexes']
+
+        for step, revision in ((upgrade, 'f9b1e3c5a7d2'), (downgrade, 'f2c7d9a4b6e1'),
+                               (upgrade, 'f9b1e3c5a7d2')):
+            _db.session.remove()
+            step(directory=MIGRATIONS_DIR, revision=revision)
+            with _db.engine.connect() as conn:
+                state = _transactions_state(conn)
+                partitioned = partitioning.is_partitioned(conn)
+            assert partitioned == (revision == 'f9b1e3c5a7d2')
+            assert state['rows'] == before['rows']
+            assert state['sequence'] == before['sequence']
+            assert state['foreign_keys'] == before['foreign_keys']
+            assert before['indexes'] - {'transactions_pkey'} <= state['indexes']
+
+        # Sequence continua dona do id (novas linhas seguem a numeração) e a FK vale
+        _db.session.add(Transaction(subscription_id=sub.id, amount=Decimal('10'), status='pending'))
+        _db.session.commit()
+        assert _db.session.execute(text('SELECT max(id) FROM transactions')).scalar() == 5
+        with pytest.raises(Exception, match='transactions_subscription_id_fkey'):
+            with _db.engine.begin() as conn:
+                conn.execute(text("INSERT INTO transactions (subscription_id, amount, status) "
+                                  "VALUES (-1, 1, 'pending')"))
+
+        # Partition pruning: a receita dos últimos 7 dias não lê o mês antigo
+        plan = _revenue_chart_plan(creator)
+        assert partitioning.partition_name(partitioning.month_start(now)) in plan
+        assert partitioning.partition_name(partitioning.month_start(old)) not in plan
+        assert partitioning.DEFAULT_PARTITION not in plan
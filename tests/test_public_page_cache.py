@@ -0,0 +1,102 @@
+# tests/test_public_page_cache.py
+"""
+Testes do cache das páginas públicas (app/utils/page_cache.py): HIT/MISS,
+GET condicional, headers de CDN e invalidação por surrogate key.
+"""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models import PricingPlan
+
+
+@pytest.fixture
+def public_group(db, group, pricing_plan):
+    group.is_public = True
+    db.session.commit()
+    return group
+
+
+@pytest.fixture
+def queries(db):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class TestCreatorPageCache:
+
+    def test_second_hit_served_from_cache(self, client, creator, public_group, queries):
+        first = client.get(f'/c/{creator.username}')
+        assert first.status_code == 200
+        assert first.headers['X-Cache'] == 'MISS'
+
+        queries.clear()
+        second = client.get(f'/c/{creator.username}')
+        assert second.headers['X-Cache'] == 'HIT'
+        assert second.data == first.data
+        assert queries == []
+
+    def test_cdn_headers(self, client, creator, public_group):
+        resp = client.get(f'/c/{creator.username}')
+        assert resp.headers['ETag']
+        assert resp.headers['Last-Modified']
+        assert 'public' in resp.headers['Cache-Control']
+        assert 's-maxage=60' in resp.headers['Cache-Control']
+        assert set(resp.headers['Surrogate-Key'].split()) == {f'creator:{creator.id}', f'group:{public_group.id}'}
+        assert 'Set-Cookie' not in resp.headers
+        assert 'Cookie' not in resp.headers.get('Vary', '')
+
+    def test_conditional_get_returns_304(self, client, creator, public_group):
+        etag = client.get(f'/c/{creator.username}').headers['ETag']
+        resp = client.get(f'/c/{creator.username}', headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert resp.data == b''
+
+    def test_profile_edit_purges(self, client, db, creator, public_group):
+        client.get(f'/c/{creator.username}')
+        creator.bio = 'Bio nova do criador'
+        db.session.commit()
+
+        resp = client.get(f'/c/{creator.username}')
+        assert resp.headers['X-Cache'] == 'MISS'
+        assert 'Bio nova do criador' in resp.get_data(as_text=True)
+
+    def test_group_visibility_purges(self, client, db, creator, public_group):
+        assert public_group.name in client.get(f'/c/{creator.username}').get_data(as_text=True)
+        public_group.is_public = False
+        db.session.commit()
+        assert public_group.name not in client.get(f'/c/{creator.username}').get_data(as_text=True)
+
+    def test_unknown_creator_not_cached(self, client, db):
+        assert client.get('/c/ninguem').status_code == 404
+        assert client.get('/c/ninguem').status_code == 404
+
+
+class TestGroupLandingCache:
+
+    def test_plan_change_purges_landing(self, client, db, creator, public_group, pricing_plan):
+        url = f'/c/{creator.username}/{public_group.invite_slug}'
+        assert client.get(url).headers['X-Cache'] == 'MISS'
+        assert client.get(url).headers['X-Cache'] == 'HIT'
+
+        db.session.add(PricingPlan(group_id=public_group.id, name='Plano Anual',
+                                   duration_days=365, price=Decimal('399.00'), is_active=True))
+        db.session.commit()
+
+        resp = client.get(url)
+        assert resp.headers['X-Cache'] == 'MISS'
+        assert 'Plano Anual' in resp.get_data(as_text=True)
+
+    def test_other_creator_edit_keeps_cache(self, client, db, creator, second_creator, public_group):
+        url = f'/c/{creator.username}/{public_group.invite_slug}'
+        client.get(url)
+        second_creator.bio = 'outra bio'
+        db.session.commit()
+        assert client.get(url).headers['X-Cache'] == 'HIT'
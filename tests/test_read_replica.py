@@ -0,0 +1,108 @@
+# tests/test_read_replica.py
+"""
+Testes da réplica de leitura (app/utils/read_replica.py) com uma cópia do
+arquivo SQLite: views de relatório lendo da réplica, escritas no primário e
+guarda de staleness depois das escritas do próprio usuário.
+"""
+import os
+import shutil
+import time
+
+import pytest
+from flask import g
+from sqlalchemy import event, text, update
+
+from app import create_app, db as _db
+from app.models import Group
+from app.utils import read_replica
+from config import get_config
+from tests.conftest import login
+
+REPLICA_NAME = 'Grupo na Réplica'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App com primário e réplica em arquivos SQLite separados"""
+    monkeypatch.setattr(get_config(), 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(get_config(), 'SQLALCHEMY_BINDS', {'replica': f"sqlite:///{tmp_path / 'replica.db'}"})
+    app = create_app()
+    app.config.update({'TESTING': True, 'WTF_CSRF_ENABLED': False, 'SERVER_NAME': 'localhost',
+                       'RATELIMIT_ENABLED': False})
+    os.environ.pop('BOT_TOKEN', None)
+    os.environ.pop('TELEGRAM_BOT_TOKEN', None)
+    yield app
+    # O db é global: sem isso o create_all dos outros testes procura o bind
+    _db.metadatas.pop(read_replica.REPLICA_BIND, None)
+
+
+@pytest.fixture
+def replica(app, db, tmp_path, group):
+    """Cópia do primário (com o grupo), depois renomeado só na réplica"""
+    db.engines[None].dispose()
+    shutil.copy(tmp_path / 'primary.db', tmp_path / 'replica.db')
+    with db.engines['replica'].begin() as conn:
+        conn.execute(text('UPDATE groups SET name = :name'), {'name': REPLICA_NAME})
+    return db.engines['replica']
+
+
+class TestRouting:
+
+    def test_reads_go_to_replica_and_writes_to_primary(self, app, db, replica):
+        primary = db.engines[None]
+        with app.test_request_context('/'):
+            g._read_replica = True
+            assert db.session.get_bind(mapper=Group) is replica
+            assert db.session.get_bind(clause=update(Group).values(name='x')) is primary
+            g._read_replica = False
+            assert db.session.get_bind(mapper=Group) is primary
+
+    def test_not_configured_is_noop(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(get_config(), 'SQLALCHEMY_BINDS', {})
+        plain = create_app()
+        assert not read_replica.configured(plain)
+        view = read_replica.use_replica(lambda: g.get('_read_replica'))
+        with plain.test_request_context('/'):
+            assert not view()
+
+
+class TestReportViews:
+
+    def test_creator_reports_query_replica(self, client, db, creator, group, replica):
+        urls = ['/dashboard/analytics', '/dashboard/transactions/export', '/dashboard/revenue/export',
+                f'/groups/{group.id}/stats', f'/groups/{group.id}/export-subscribers']
+        login(client, 'creator@test.com', 'TestPass123')
+        with client.session_transaction() as sess:
+            sess.pop(read_replica.LAST_WRITE_KEY, None)
+
+        statements = []
+        event.listen(replica, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+        for url in urls:
+            del statements[:]
+            db.session.expire_all()  # nos testes a sessão é a mesma entre requests
+            response = client.get(url)
+            assert response.status_code == 200, url
+            response.get_data()  # exportações em streaming
+            assert statements, url
+
+
+class TestStalenessGuard:
+
+    def test_report_reads_replica_unless_user_just_wrote(self, client, db, creator, group, replica):
+        # Login grava last_login: a view lê do primário logo em seguida
+        url = f'/groups/{group.id}/stats'
+        login(client, 'creator@test.com', 'TestPass123')
+        response = client.get(url)
+        assert response.status_code == 200
+        assert REPLICA_NAME not in response.get_data(as_text=True)
+
+        with client.session_transaction() as sess:
+            sess[read_replica.LAST_WRITE_KEY] = time.time() - 60
+        db.session.expire_all()  # nos testes a sessão é a mesma entre requests
+        response = client.get(url)
+        assert REPLICA_NAME in response.get_data(as_text=True)
+
+        # Nova escrita do usuário volta a ler do primário
+        client.post('/logout')
+        login(client, 'creator@test.com', 'TestPass123')
+        assert REPLICA_NAME not in client.get(url).get_data(as_text=True)
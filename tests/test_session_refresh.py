@@ -0,0 +1,84 @@
+# tests/test_session_refresh.py
+"""
+Testes da renovação limitada da sessão (app/utils/session_refresh.py):
+gravação só quando modificada ou após o intervalo, rotas ignoradas e métrica.
+"""
+from app.utils.session_refresh import REFRESHED_AT_KEY, ThrottledSessionInterface
+from tests.conftest import login
+
+
+def _interface(app):
+    interface = app.session_interface
+    assert isinstance(interface, ThrottledSessionInterface)
+    return interface
+
+
+class TestThrottledRefresh:
+
+    def test_repeated_requests_do_not_rewrite(self, client, app, creator):
+        login(client, 'creator@test.com', 'TestPass123')
+        interface = _interface(app)
+        writes = interface.writes
+
+        for _ in range(5):
+            resp = client.get('/dashboard/transactions')
+            assert resp.status_code == 200
+            assert 'Set-Cookie' not in resp.headers
+
+        assert interface.writes == writes
+        assert interface.stats()['writes_avoided'] >= 5
+
+    def test_refresh_after_interval(self, client, app, creator, monkeypatch):
+        login(client, 'creator@test.com', 'TestPass123')
+        interface = _interface(app)
+        with client.session_transaction() as sess:
+            refreshed_at = sess[REFRESHED_AT_KEY]
+        writes = interface.writes
+
+        monkeypatch.setattr('app.utils.session_refresh.time.time',
+                            lambda: refreshed_at + interface.refresh_interval)
+        resp = client.get('/dashboard/transactions')
+        assert 'Set-Cookie' in resp.headers  # TTL e cookie renovados
+        assert interface.writes == writes + 1
+
+        resp = client.get('/dashboard/transactions')
+        assert 'Set-Cookie' not in resp.headers
+
+    def test_modified_session_is_saved(self, client, app, creator):
+        interface = _interface(app)
+        writes = interface.writes
+        login(client, 'creator@test.com', 'TestPass123')
+        assert interface.writes > writes
+        with client.session_transaction() as sess:
+            assert sess.get('_user_id') == str(creator.id)
+
+    def test_anonymous_visitor_not_stored(self, client, app):
+        interface = _interface(app)
+        resp = client.get('/robots.txt')
+        assert resp.status_code == 200
+        assert 'Set-Cookie' not in resp.headers
+        assert interface.writes == 0
+
+
+class TestSkippedRoutes:
+
+    def test_static_and_webhooks_skip_session(self, client, app, creator, monkeypatch):
+        login(client, 'creator@test.com', 'TestPass123')
+        interface = _interface(app)
+        opened = []
+        original_open = interface.inner.open_session
+        monkeypatch.setattr(interface.inner, 'open_session',
+                            lambda app_, request: opened.append(request.path) or original_open(app_, request))
+
+        client.get('/static/js/main.js')
+        client.post('/webhooks/stripe', data='{}', headers={'Stripe-Signature': 'x'})
+
+        assert opened == []
+        assert interface.stats()['skipped_requests'] == 2
+
+    def test_stats_in_admin_endpoint(self, client, admin_user):
+        login(client, 'admin@test.com', 'AdminPass123')
+        client.get('/admin/cache-stats')
+        data = client.get('/admin/cache-stats').get_json()
+        assert data['session']['requests'] >= 2
+        assert 0 < data['session']['write_reduction'] <= 1
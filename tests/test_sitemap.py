@@ -0,0 +1,124 @@
+# tests/test_sitemap.py
+"""
+Testes do sitemap pré-gerado (app/services/sitemap_service.py): shards com
+índice, arquivos gzip, Last-Modified e nenhum acesso ao banco por crawler.
+"""
+import gzip
+import os
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Creator, Group
+from app.services import sitemap_service
+
+
+def _creators(db, count):
+    for i in range(count):
+        creator = Creator(name=f'Criador {i}', email=f'c{i}@test.com', username=f'criador{i}')
+        creator.set_password('Pass12345')
+        db.session.add(creator)
+    db.session.commit()
+
+
+def _locs(data):
+    return re.findall(r'<loc>([^<]+)</loc>', data)
+
+
+class TestBuild:
+
+    def test_shards_and_index(self, app_context, db, tmp_path):
+        _creators(db, 10)
+        total = sitemap_service.build_sitemap(str(tmp_path), 'https://x.test', shard_size=5)
+        assert total == len(sitemap_service.STATIC_PAGES) + 10
+
+        index = gzip.decompress((tmp_path / 'sitemap.xml.gz').read_bytes()).decode()
+        assert '<sitemapindex' in index
+        shards = _locs(index)
+        assert shards == [f'https://x.test/sitemap-{n}.xml.gz' for n in range(1, 5)]
+
+        urls = []
+        for n in range(1, 5):
+            urls += _locs(gzip.decompress((tmp_path / f'sitemap-{n}.xml.gz').read_bytes()).decode())
+        assert len(urls) == total == len(set(urls))
+        assert 'https://x.test/c/criador9' in urls
+
+    def test_shrinking_removes_old_shards(self, app_context, db, tmp_path):
+        _creators(db, 10)
+        sitemap_service.build_sitemap(str(tmp_path), 'https://x.test', shard_size=5)
+        sitemap_service.build_sitemap(str(tmp_path), 'https://x.test')
+
+        assert sorted(os.listdir(tmp_path)) == ['sitemap.xml.gz']
+        assert '<urlset' in gzip.decompress((tmp_path / 'sitemap.xml.gz').read_bytes()).decode()
+
+    def test_public_groups_without_n_plus_one(self, app_context, db, creator, group, tmp_path):
+        group.is_public = True
+        db.session.commit()
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            sitemap_service.build_sitemap(str(tmp_path), 'https://x.test')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len(statements) == 1
+        data = gzip.decompress((tmp_path / 'sitemap.xml.gz').read_bytes()).decode()
+        assert f'https://x.test/c/{creator.username}/{group.invite_slug}' in data
+
+
+class TestServe:
+
+    def test_crawler_hit_does_not_query_db(self, client, db, creator):
+        client.get('/sitemap.xml')
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            resp = client.get('/sitemap.xml')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert resp.status_code == 200
+        assert statements == []
+
+    def test_gzip_passthrough_and_conditional_get(self, client, creator):
+        resp = client.get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert f'/c/{creator.username}<' in gzip.decompress(resp.data).decode()
+        assert resp.headers['Last-Modified']
+
+        again = client.get('/sitemap.xml', headers={'If-Modified-Since': resp.headers['Last-Modified']})
+        assert again.status_code == 304
+
+    def test_missing_shard_is_404(self, client, creator):
+        assert client.get('/sitemap-99.xml.gz').status_code == 404
+
+
+class TestRebuildTriggers:
+
+    @pytest.fixture
+    def builds(self, monkeypatch):
+        calls = []
+        original = sitemap_service.build_sitemap
+        monkeypatch.setattr(sitemap_service, 'build_sitemap', lambda *a, **kw: calls.append(1) or original(*a, **kw))
+        return calls
+
+    def test_username_change_rebuilds(self, client, db, creator, builds):
+        creator.username = 'novonome'
+        db.session.commit()
+        assert builds == [1]
+        assert '/c/novonome<' in client.get('/sitemap.xml').data.decode()
+
+    def test_irrelevant_change_does_not_rebuild(self, app_context, db, creator, group, builds):
+        creator.last_login = datetime.utcnow()
+        group.description = 'Nova descrição'
+        db.session.commit()
+        assert builds == []
+
+    def test_new_group_rebuilds(self, app_context, db, creator, builds):
+        db.session.add(Group(name='Outro', telegram_id='-100999', creator_id=creator.id, is_public=True))
+        db.session.commit()
+        assert builds == [1]
@@ -0,0 +1,171 @@
+# tests/test_sql_profiler.py
+"""
+Testes do profiler de SQL (app/utils/sql_profiler.py): formato dos
+statements, detecção de N+1, log/Server-Timing por request, max_queries e
+regressões de N+1 nas telas com um loop por grupo.
+"""
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from app import cache
+from app.models import Group, PricingPlan, Subscription, Transaction
+from app.utils import sql_profiler
+from tests.conftest import login
+
+
+def _add_groups(db, creator, count):
+    """Grupos extras, cada um com plano, assinante ativo e transação paga"""
+    now = datetime.utcnow()
+    for i in range(count):
+        group = Group(name=f'Extra {i}', telegram_id=f'-100200{i}', creator_id=creator.id,
+                      is_active=True, is_public=True)
+        db.session.add(group)
+        db.session.flush()
+        plan = PricingPlan(group_id=group.id, name='Mensal', duration_days=30,
+                           price=Decimal('19.90'), is_active=True)
+        db.session.add(plan)
+        db.session.flush()
+        sub = Subscription(group_id=group.id, plan_id=plan.id, telegram_user_id=f'77{i}',
+                           telegram_username=f'extra{i}', start_date=now,
+                           end_date=now + timedelta(days=30), status='active')
+        db.session.add(sub)
+        db.session.flush()
+        db.session.add(Transaction(subscription_id=sub.id, amount=Decimal('19.90'),
+                                   status='completed', payment_method='stripe', paid_at=now))
+    db.session.commit()
+
+
+def _queries(client, path):
+    client.get(path)  # aquece snapshot do usuário e caches
+    with sql_profiler.profile_queries() as profile:
+        assert client.get(path).status_code == 200
+    return profile.queries
+
+
+class TestProfile:
+
+    def test_normalize_collapses_literals_and_in_lists(self):
+        shape = sql_profiler.normalize(
+            "SELECT * FROM groups WHERE id IN (?, ?, ?) AND name = 'x'\n  LIMIT 10")
+        assert shape == 'SELECT * FROM groups WHERE id IN (?...) AND name = ? LIMIT ?'
+        assert sql_profiler.normalize('SELECT anon_1.id FROM t WHERE a = %(a_1)s') == \
+            'SELECT anon_1.id FROM t WHERE a = %(a_1)s'
+
+    def test_repeated_statements_detected(self, app_context, db, caplog):
+        with sql_profiler.profile_queries() as profile:
+            for i in range(4):
+                db.session.execute(text(f'SELECT {i}'))
+            db.session.execute(text("SELECT 'outro'"))
+
+        assert profile.queries == 5
+        assert profile.repeated(4)[0][:2] == ('SELECT ?', 5)
+
+        with caplog.at_level(logging.WARNING, logger='app.utils.sql_profiler'):
+            assert sql_profiler.check(profile, 'teste', elapsed=0.01, slow_ms=500, n_plus_one=4)
+        assert 'possível N+1 (5x' in caplog.text
+        assert sql_profiler.check(profile, 'teste', elapsed=0.01, slow_ms=500, n_plus_one=10) == []
+
+    def test_nested_profiles_both_record(self, app_context, db):
+        with sql_profiler.profile_queries() as outer:
+            db.session.execute(text('SELECT 1'))
+            with sql_profiler.profile_queries() as inner:
+                db.session.execute(text('SELECT 2'))
+        assert (outer.queries, inner.queries) == (2, 1)
+
+
+class TestMaxQueries:
+
+    def test_fails_with_report(self, app_context, db, max_queries):
+        with pytest.raises(sql_profiler.TooManyQueries) as exc:
+            with max_queries(1):
+                db.session.execute(text('SELECT 1'))
+                db.session.execute(text('SELECT 2'))
+        assert 'executadas 2' in str(exc.value)
+        assert 'SELECT ?' in str(exc.value)
+
+    def test_decorator(self, app_context, db):
+        @sql_profiler.max_queries(2)
+        def two_queries():
+            db.session.execute(text('SELECT 1'))
+            db.session.execute(text('SELECT 2'))
+
+        two_queries()
+
+    def test_sees_queries_of_requests(self, client, creator, group, max_queries):
+        login(client, 'creator@test.com', 'TestPass123')
+        with pytest.raises(sql_profiler.TooManyQueries):
+            with max_queries(0):
+                client.get('/groups/')
+
+
+class TestRequestProfiling:
+
+    def test_n_plus_one_request_checked(self, app, db, monkeypatch):
+        # Rota própria com um statement repetido conhecido: o resultado não
+        # depende de cache nem das queries de outras telas
+        app.config['SQL_N_PLUS_ONE_THRESHOLD'] = 3
+        seen = {}
+
+        @app.route('/_test/n-plus-one')
+        def n_plus_one():
+            for i in range(3):
+                db.session.execute(text(f'SELECT {i}'))
+            seen['repeated'] = sql_profiler.request_profile().repeated(3)
+            return 'ok'
+
+        checks = []
+        real_check = sql_profiler.check
+
+        def recording_check(profile, label, **kwargs):
+            checks.append((label, real_check(profile, label, **kwargs)))
+            return checks[-1][1]
+
+        monkeypatch.setattr(sql_profiler, 'check', recording_check)
+        with app.test_client() as client:
+            assert client.get('/_test/n-plus-one').status_code == 200
+
+        assert seen['repeated'][0][:2] == ('SELECT ?', 3)
+        assert [label for label, _ in checks] == ['GET n_plus_one']
+        assert 'possível N+1 (3x o mesmo statement)' in checks[0][1]
+
+    def test_server_timing_header(self, app, client, creator, group):
+        app.config['SQL_PROFILER_SERVER_TIMING'] = True
+        login(client, 'creator@test.com', 'TestPass123')
+        header = client.get('/groups/').headers['Server-Timing']
+        assert header.startswith('db;dur=') and 'queries' in header
+
+    def test_server_timing_off_by_default(self, client, creator):
+        assert 'Server-Timing' not in client.get('/login').headers
+
+
+class TestNoNPlusOne:
+    """A quantidade de queries não pode crescer com o número de grupos"""
+
+    def test_groups_list(self, client, db, creator, subscription):
+        login(client, 'creator@test.com', 'TestPass123')
+        baseline = _queries(client, '/groups/')
+        _add_groups(db, creator, 3)
+        assert _queries(client, '/groups/') == baseline
+
+    def test_analytics(self, client, db, creator, subscription):
+        login(client, 'creator@test.com', 'TestPass123')
+        baseline = _queries(client, '/dashboard/analytics')
+        _add_groups(db, creator, 3)
+        assert _queries(client, '/dashboard/analytics') == baseline
+
+    def test_admin_creator_details(self, client, db, admin_user, creator, subscription):
+        login(client, 'admin@test.com', 'AdminPass123')
+        path = f'/admin/creator/{creator.id}/details'
+        baseline = _queries(client, path)
+        _add_groups(db, creator, 3)
+        assert _queries(client, path) == baseline
+
+    def test_public_creator_page(self, client, db, creator, subscription, max_queries):
+        _add_groups(db, creator, 3)
+        cache.clear()
+        with max_queries(5):
+            assert client.get(f'/c/{creator.username}').status_code == 200
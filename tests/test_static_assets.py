@@ -0,0 +1,90 @@
+# tests/test_static_assets.py
+"""
+Testes dos estáticos com fingerprint (app/utils/static_assets.py): build com
+hash e .gz, url_for com hash, variante pré-comprimida e cache imutável.
+"""
+import gzip
+
+import pytest
+from flask import url_for
+
+from app.utils import static_assets
+
+CSS = 'body { color: #fff; }\n' * 100
+
+
+@pytest.fixture
+def static_dir(app, tmp_path):
+    static = tmp_path / 'static'
+    (static / 'css').mkdir(parents=True)
+    (static / 'css' / 'site.css').write_text(CSS)
+    (static / 'img').mkdir()
+    (static / 'img' / 'logo.png').write_bytes(b'\x89PNG\r\n\x1a\n' + b'0' * 500)
+    (static / 'uploads').mkdir()
+    (static / 'uploads' / 'avatar.jpg').write_bytes(b'x')
+    app.static_folder = str(static)
+    return static
+
+
+@pytest.fixture
+def built(app, static_dir):
+    manifest = static_assets.build_assets(str(static_dir))
+    static_assets.load(app)
+    return manifest
+
+
+class TestBuild:
+
+    def test_hashed_copies_and_gzip_siblings(self, static_dir, built):
+        assert set(built) == {'css/site.css', 'img/logo.png'}
+        css = static_dir / built['css/site.css']
+        assert css.read_text() == CSS
+        assert gzip.decompress((static_dir / (built['css/site.css'] + '.gz')).read_bytes()).decode() == CSS
+        assert not (static_dir / (built['img/logo.png'] + '.gz')).exists()
+
+    def test_rebuild_keeps_previous_generation_only(self, static_dir, built):
+        first = built['css/site.css']
+        (static_dir / 'css' / 'site.css').write_text(CSS + 'a {}\n')
+        second = static_assets.build_assets(str(static_dir))['css/site.css']
+        (static_dir / 'css' / 'site.css').write_text(CSS + 'b {}\n')
+        third = static_assets.build_assets(str(static_dir))['css/site.css']
+
+        assert not (static_dir / first).exists()
+        assert (static_dir / second).exists() and (static_dir / third).exists()
+
+
+class TestServe:
+
+    def test_url_for_uses_hashed_name(self, app, built):
+        with app.test_request_context():
+            assert url_for('static', filename='css/site.css') == f"/static/{built['css/site.css']}"
+            assert url_for('static', filename='uploads/avatar.jpg') == '/static/uploads/avatar.jpg'
+
+    def test_precompressed_and_immutable(self, client, built):
+        resp = client.get(f"/static/{built['css/site.css']}", headers={'Accept-Encoding': 'gzip, br'})
+        assert resp.status_code == 200
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert resp.mimetype == 'text/css'
+        assert gzip.decompress(resp.data).decode() == CSS
+        assert 'immutable' in resp.headers['Cache-Control']
+        assert 'max-age=31536000' in resp.headers['Cache-Control']
+        assert 'Accept-Encoding' in resp.headers['Vary']
+
+    def test_identity_without_accept_encoding(self, client, built):
+        resp = client.get(f"/static/{built['css/site.css']}", headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in resp.headers
+        assert resp.get_data(as_text=True) == CSS
+
+    def test_without_manifest_behaves_as_before(self, app, client, static_dir):
+        static_assets.load(app)
+        with app.test_request_context():
+            assert url_for('static', filename='css/site.css') == '/static/css/site.css'
+        resp = client.get('/static/css/site.css')
+        assert resp.status_code == 200
+        assert 'immutable' not in resp.headers.get('Cache-Control', '')
+
+    def test_disabled_in_development(self, app, static_dir, built):
+        app.config['STATIC_FINGERPRINT'] = False
+        static_assets.load(app)
+        with app.test_request_context():
+            assert url_for('static', filename='css/site.css') == '/static/css/site.css'
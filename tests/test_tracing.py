@@ -0,0 +1,151 @@
+# tests/test_tracing.py
+"""
+Testes do tracing (app/utils/tracing.py): traceparent, spans do request e
+das queries, continuação do trace do checkout no webhook do Stripe e na
+entrega da outbox, exportação em arquivo/OTLP e o comando ``flask trace``.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models import NotificationOutbox, Subscription
+from app.utils import tracing
+from benchmarks.fake_stripe import sign_payload
+from bot.jobs import notification_outbox as outbox
+
+CHECKOUT_TRACE = '4bf92f3577b34da6a3ce929d0e0e4736'
+CHECKOUT_SPAN = '00f067aa0ba902b7'
+CHECKOUT_TRACEPARENT = f'00-{CHECKOUT_TRACE}-{CHECKOUT_SPAN}-01'
+
+
+@pytest.fixture
+def spans():
+    exporter = tracing.MemoryExporter()
+    tracing.configure('televip-test', exporter=exporter, sample_ratio=1.0, synchronous=True)
+    yield exporter.spans
+    tracing.disable()
+
+
+def _named(spans, name):
+    return [s for s in spans if s['name'] == name]
+
+
+class TestTraceparent:
+
+    def test_roundtrip(self):
+        context = tracing.parse_traceparent(CHECKOUT_TRACEPARENT)
+        assert (context.trace_id, context.span_id, context.sampled) == (CHECKOUT_TRACE, CHECKOUT_SPAN, True)
+        assert context.traceparent == CHECKOUT_TRACEPARENT
+
+    def test_invalid(self):
+        assert tracing.parse_traceparent(None) is None
+        assert tracing.parse_traceparent('00-abc-def-01') is None
+        assert tracing.parse_traceparent(f"00-{'0' * 32}-{CHECKOUT_SPAN}-01") is None
+
+    def test_disabled_is_noop(self):
+        tracing.disable()
+        with tracing.start_span('nada') as span:
+            assert span is None
+            assert tracing.current_traceparent() is None
+
+
+class TestFlask:
+
+    def test_request_span_with_queries(self, client, creator, spans):
+        response = client.post('/login', data={'email': 'creator@test.com', 'password': 'TestPass123'},
+                               headers={'traceparent': CHECKOUT_TRACEPARENT})
+
+        request_span = _named(spans, 'POST /login')[0]
+        assert request_span['trace_id'] == CHECKOUT_TRACE
+        assert request_span['parent_span_id'] == CHECKOUT_SPAN
+        assert request_span['kind'] == tracing.KIND_SERVER
+        assert request_span['attributes']['http.status_code'] == 302
+        assert response.headers['traceparent'].split('-')[2] == request_span['span_id']
+
+        queries = _named(spans, 'db.query')
+        assert queries and all(q['parent_span_id'] == request_span['span_id'] for q in queries)
+        assert any('creators' in q['attributes']['db.statement'] for q in queries)
+
+    def test_webhook_continues_checkout_trace_into_outbox(self, client, db, subscription, spans, monkeypatch):
+        monkeypatch.setenv('STRIPE_WEBHOOK_SECRET', 'whsec_trace')
+        subscription.status = 'pending'
+        subscription.stripe_subscription_id = 'sub_trace_1'
+        db.session.commit()
+        event = {'id': 'evt_trace', 'type': 'invoice.paid', 'data': {'object': {
+            'id': 'in_trace_1', 'subscription': 'sub_trace_1', 'billing_reason': 'subscription_create',
+            'amount_paid': 4990, 'charge': None, 'metadata': {},
+            'subscription_details': {'metadata': {'traceparent': CHECKOUT_TRACEPARENT}},
+            'lines': {'data': [{'period': {'end': 1900000000}}]},
+        }}}
+        payload = json.dumps(event).encode()
+        response = client.post('/webhooks/stripe', data=payload, content_type='application/json',
+                               headers={'Stripe-Signature': sign_payload(payload, 'whsec_trace')})
+        assert response.status_code == 200
+        assert db.session.get(Subscription, subscription.id).status == 'active'
+
+        handler = _named(spans, 'stripe.invoice.paid')[0]
+        request_span = _named(spans, 'POST /webhooks/stripe')[0]
+        assert handler['trace_id'] == CHECKOUT_TRACE
+        assert handler['parent_span_id'] == CHECKOUT_SPAN
+        assert handler['links'] == [{'trace_id': request_span['trace_id'], 'span_id': request_span['span_id']}]
+
+        item = NotificationOutbox.query.filter_by(kind=NotificationOutbox.KIND_ACCESS_LINK).one()
+        context = tracing.parse_traceparent(item.get_payload()['traceparent'])
+        assert context.trace_id == CHECKOUT_TRACE
+
+
+class TestOutboxDelivery:
+
+    def test_delivery_span_joins_enqueuing_trace(self, spans):
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        item = {'id': 1, 'kind': 'message', 'chat_id': '42', 'attempts': 1,
+                'payload': {'text': 'oi', 'traceparent': CHECKOUT_TRACEPARENT}}
+        limiter = outbox.SendRateLimiter(rate=0, chat_interval=0, group_interval=0)
+
+        result = asyncio.get_event_loop().run_until_complete(outbox._deliver(bot, limiter, item))
+
+        assert result[1] == 'sent'
+        span = _named(spans, 'outbox message')[0]
+        assert (span['trace_id'], span['parent_span_id']) == (CHECKOUT_TRACE, CHECKOUT_SPAN)
+        assert span['kind'] == tracing.KIND_CONSUMER
+        assert span['attributes']['outbox.status'] == 'sent'
+
+
+class TestExport:
+
+    def test_file_export_and_trace_command(self, app, tmp_path):
+        path = str(tmp_path / 'traces.jsonl')
+        tracing.configure('televip-test', exporter=tracing.FileExporter(path), synchronous=True)
+        try:
+            with tracing.start_span('webhook', tracing.KIND_SERVER, parent=CHECKOUT_TRACEPARENT):
+                with tracing.start_span('stripe GET /v1/charges/:id', tracing.KIND_CLIENT):
+                    pass
+                with pytest.raises(RuntimeError):
+                    with tracing.start_span('outbox message'):
+                        raise RuntimeError('falhou')
+        finally:
+            tracing.disable()
+
+        spans = tracing.load_trace(path, CHECKOUT_TRACE)
+        assert len(spans) == 3
+        lines = tracing.format_trace(spans).splitlines()
+        assert 'webhook [televip-test]' in lines[0]
+        assert '  stripe GET /v1/charges/:id' in lines[1]
+        assert 'ERRO: falhou' in lines[2]
+
+        result = app.test_cli_runner().invoke(args=['trace', CHECKOUT_TRACE, '--file', path])
+        assert result.exit_code == 0
+        assert 'outbox message' in result.output
+
+    def test_otlp_span_format(self, spans):
+        with tracing.start_span('job outbox', attributes={'items': 3, 'ok': True, 'ratio': 0.5}):
+            pass
+        item = tracing.otlp_span(spans[0])
+        assert item['kind'] == 1
+        assert len(item['traceId']) == 32 and 'parentSpanId' not in item
+        assert {'key': 'items', 'value': {'intValue': '3'}} in item['attributes']
+        assert {'key': 'ok', 'value': {'boolValue': True}} in item['attributes']
+        assert item['status'] == {'code': 1}
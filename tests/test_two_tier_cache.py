@@ -0,0 +1,213 @@
+# tests/test_two_tier_cache.py
+"""
+Testes do backend de cache em dois níveis (app/utils/two_tier_cache.py):
+hits no L1, invalidação entre workers via pub/sub e modo só-L1 com o
+Redis fora do ar.
+"""
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.utils.two_tier_cache import TwoTierCache
+from tests.conftest import login
+
+
+class FakeRedisCache:
+    """RedisCache mínimo em memória; ``down=True`` simula o Redis fora do ar"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+        self.down = False
+        self.published = []
+        self._write_client = self
+
+    def _check(self):
+        self.calls += 1
+        if self.down:
+            raise RedisConnectionError('Connection refused')
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def has(self, key):
+        self._check()
+        return key in self.data
+
+    def set(self, key, value, timeout=None):
+        self._check()
+        self.data[key] = value
+        return True
+
+    def add(self, key, value, timeout=None):
+        self._check()
+        if key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self._check()
+        return self.data.pop(key, None) is not None
+
+    def clear(self):
+        self._check()
+        self.data.clear()
+        return True
+
+    def publish(self, channel, message):
+        self._check()
+        self.published.append((channel, message))
+
+
+def _cache(l2=None, **kwargs):
+    return TwoTierCache(l2 or FakeRedisCache(), subscribe=False, **kwargs)
+
+
+class TestTwoTierCache:
+
+    def test_l1_hit_skips_redis(self):
+        cache = _cache()
+        cache.set('k', {'v': 1})
+        calls = cache.l2.calls
+
+        for _ in range(10):
+            assert cache.get('k') == {'v': 1}
+
+        assert cache.l2.calls == calls
+        assert cache.stats()['l1_hits'] == 10
+
+    def test_l2_hit_fills_l1(self):
+        l2 = FakeRedisCache()
+        l2.data['k'] = 'do-redis'
+        cache = _cache(l2)
+
+        assert cache.get('k') == 'do-redis'
+        assert cache.get('k') == 'do-redis'
+        stats = cache.stats()
+        assert (stats['l2_hits'], stats['l1_hits'], stats['misses']) == (1, 1, 0)
+        assert stats['hit_ratio'] == 1.0
+
+    def test_miss(self):
+        cache = _cache()
+        assert cache.get('nada') is None
+        assert cache.stats()['misses'] == 1
+
+    def test_lru_eviction(self):
+        cache = _cache(l1_max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')        # 'a' fica mais recente
+        cache.set('c', 3)     # expulsa 'b'
+        assert cache.stats()['l1_entries'] == 2
+        assert 'b' not in cache._l1
+        assert 'a' in cache._l1
+
+    def test_write_publishes_invalidation(self):
+        cache = _cache()
+        cache.set('k', 1)
+        cache.delete('k')
+        keys = [message.split('|', 1)[1] for _, message in cache.l2.published]
+        assert keys == ['k', 'k']
+
+    def test_invalidation_from_other_worker_evicts_l1(self):
+        shared = FakeRedisCache()
+        worker_a, worker_b = _cache(shared), _cache(shared)
+
+        worker_a.set('saldo', 10)
+        assert worker_b.get('saldo') == 10  # B guarda no L1
+
+        worker_a.set('saldo', 20)
+        for _, message in shared.published:
+            worker_b.handle_invalidation(message.encode())
+
+        assert worker_b.get('saldo') == 20
+        assert worker_b.stats()['invalidations'] == 2
+
+    def test_own_invalidation_is_ignored(self):
+        cache = _cache()
+        cache.set('k', 1)
+        cache.handle_invalidation(cache.l2.published[-1][1])
+        assert cache.stats()['invalidations'] == 0
+        assert cache.get('k') == 1
+
+    def test_clear_invalidates_everything(self):
+        cache = _cache()
+        cache.set('a', 1)
+        cache.handle_invalidation('outro-no|*')
+        assert cache.stats()['l1_entries'] == 0
+
+
+class TestRedisDown:
+
+    def test_falls_back_to_l1_only(self):
+        cache = _cache(retry_interval=60)
+        cache.l2.down = True
+
+        assert cache.set('k', 'local') is True
+        assert cache.get('k') == 'local'
+        assert cache.get('outra') is None
+        stats = cache.stats()
+        assert stats['l2_available'] is False
+        assert stats['l2_errors'] == 1
+
+    def test_no_redis_calls_while_down(self):
+        cache = _cache(retry_interval=60)
+        cache.l2.down = True
+        cache.get('x')
+        calls = cache.l2.calls
+        for _ in range(20):
+            cache.get('x')
+            cache.set('y', 1)
+        assert cache.l2.calls == calls
+
+    def test_recovers_after_retry_interval(self):
+        cache = _cache(retry_interval=0)
+        cache.l2.down = True
+        cache.get('x')
+        cache.l2.down = False
+        cache.l2.data['x'] = 'voltou'
+        assert cache.get('x') == 'voltou'
+        assert cache.stats()['l2_available'] is True
+
+    def test_add_while_down_uses_l1(self):
+        cache = _cache(retry_interval=60)
+        cache.l2.down = True
+        cache.get('x')
+        assert cache.add('lock', 1) is True
+        assert cache.add('lock', 1) is False
+
+    def test_memoize_keeps_working(self, app):
+        """Funções com @cache.memoize continuam respondendo sem Redis"""
+        from flask_caching import Cache
+
+        app.config['CACHE_TYPE'] = 'SimpleCache'
+        memo_cache = Cache(app)
+        backend = _cache(retry_interval=60)
+        backend.l2.down = True
+        app.extensions['cache'][memo_cache] = backend
+
+        calls = []
+
+        @memo_cache.memoize(60)
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        with app.app_context():
+            assert double(2) == 4
+            assert double(2) == 4
+        assert calls == [2]
+
+
+class TestCacheStatsEndpoint:
+
+    def test_requires_admin(self, client, creator):
+        login(client, 'creator@test.com', 'TestPass123')
+        resp = client.get('/admin/cache-stats')
+        assert resp.status_code == 404
+
+    def test_admin_sees_backend(self, client, admin_user):
+        login(client, 'admin@test.com', 'AdminPass123')
+        resp = client.get('/admin/cache-stats')
+        assert resp.status_code == 200
+        assert resp.get_json()['backend'] == 'SimpleCache'